@@ -0,0 +1,70 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""
+Memory benchmark: heap memory retained by the negation instances of a corpus,
+for NegationInstance (which references its whole sentence) vs. CompactNegationInstance.
+
+Usage:
+
+    python bench_instance_memory.py [-h] [-n NUM_SENTENCES] [corpus_file]
+
+If no corpus file is given, a synthetic one is generated.
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "instance_based_eval"))
+
+import myconll
+from negation_instance import read_negation_instances_from_corpus, SentenceTextIndex
+from synthetic_corpus import write_corpus_pair
+
+
+def measure(corpus_path, **kwargs):
+    """Returns (retained bytes, peak bytes, seconds, number of instances) for reading all instances."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    neg_sents = read_negation_instances_from_corpus(myconll.iter_from_file(corpus_path), **kwargs)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    num_instances = sum(len(sent) for sent in neg_sents)
+    del neg_sents
+    return retained, peak, elapsed, num_instances
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Negation instance memory benchmark")
+    argparser.add_argument("corpus_file", type=str, nargs="?", help="*SEM corpus file (default: synthetic)")
+    argparser.add_argument("-n", "--num-sentences", type=int, default=10000,
+                           help="number of sentences of the synthetic corpus, default: %(default)s")
+    args = argparser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        corpus_path = args.corpus_file
+        if corpus_path is None:
+            corpus_path = os.path.join(tmp_dir, "gold.txt")
+            write_corpus_pair(corpus_path, os.path.join(tmp_dir, "system.txt"), args.num_sentences)
+
+        variants = [("NegationInstance", {}),
+                    ("CompactNegationInstance", {"compact": True}),
+                    ("Compact + text index", {"compact": True, "text_index": SentenceTextIndex()})]
+
+        print("{:<26} {:>10} {:>14} {:>12} {:>10}".format("variant", "instances", "retained (MB)", "peak (MB)",
+                                                          "time (s)"))
+        for name, kwargs in variants:
+            retained, peak, elapsed, num_instances = measure(corpus_path, **kwargs)
+            print("{:<26} {:>10d} {:>14.2f} {:>12.2f} {:>10.2f}".format(name, num_instances, retained / 2**20,
+                                                                        peak / 2**20, elapsed))
@@ -0,0 +1,71 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""
+Per-sentence microbenchmark of process_independent in starsem2012_eval_extended.py
+(cue-independent token- and scope-level metrics) for sentences with many negation instances:
+its list-based and multiset-based implementations, and process_independent itself
+(which picks one of them by the number of instances of the sentence).
+
+Usage:
+
+    python bench_process_independent.py [-h] [-n NUM_SENTENCES] [--instances N [N ...]] [--max-tokens N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "starsem_eval"))
+
+from starsem2012_eval_extended import (MetricPlan, process_sent, process_independent,
+                                       process_independent_lists, process_independent_multisets)
+from synthetic_corpus import generate_corpus_pair
+
+
+def parse_sentences(gold_str, system_str):
+    """Returns a list of (gold instances, pred instances) pairs, one for each sentence."""
+    sents = []
+    for gold_sent, pred_sent in zip(gold_str.strip().split("\n\n"), system_str.strip().split("\n\n")):
+        gold_rows = [line.split("\t") for line in gold_sent.split("\n")]
+        pred_rows = [line.split("\t") for line in pred_sent.split("\n")]
+        sents.append(process_sent(gold_rows, pred_rows, 1))
+    return sents
+
+
+def measure(sents, repeats, func=process_independent):
+    """Returns the time (in seconds) per sentence of func, best of several passes."""
+    plan = MetricPlan()
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for gold_insts, pred_insts in sents:
+            func(plan, gold_insts, pred_insts)
+        best = min(best, time.perf_counter() - start)
+    return best / len(sents)
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="process_independent microbenchmark")
+    argparser.add_argument("-n", "--num-sentences", type=int, default=200, help="number of sentences per setting")
+    argparser.add_argument("--instances", type=int, nargs="+", default=[1, 5, 20, 50, 100, 200],
+                           help="numbers of negation instances per sentence")
+    argparser.add_argument("--max-tokens", type=int, default=60, help="maximum number of tokens per sentence")
+    argparser.add_argument("--repeats", type=int, default=5, help="number of passes over the sentences (the fastest one is reported)")
+    args = argparser.parse_args()
+
+    funcs = [process_independent_lists, process_independent_multisets, process_independent]
+    print("{:>10} {:>14} {:>10} {:>10} {:>10}   (us / sentence)".format(
+        "instances", "pred tokens", "lists", "multisets", "selected"))
+    for num_instances in args.instances:
+        gold_str, system_str = generate_corpus_pair(args.num_sentences, max_instances=num_instances,
+                                                    max_tokens=args.max_tokens, min_instances=num_instances)
+        sents = parse_sentences(gold_str, system_str)
+        num_pred_tokens = sum(len(tokens) for _, pred_insts in sents for inst in pred_insts
+                              for tokens in inst.values()) / len(sents)
+        elapsed = [measure(sents, args.repeats, func) * 1e6 for func in funcs]
+        print("{:>10d} {:>14.1f} {:>10.1f} {:>10.1f} {:>10.1f}".format(num_instances, num_pred_tokens, *elapsed))
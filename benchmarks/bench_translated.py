@@ -0,0 +1,84 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""
+Whole-file benchmark of starsem2012_eval_translated.py on a synthetic corpus pair.
+
+Another version of the script (e.g. one extracted with `git show <rev>:starsem_eval/starsem2012_eval_translated.py`)
+can be passed with --baseline; both are then timed on the same corpora and their outputs are compared.
+
+Usage:
+
+    python bench_translated.py [-h] [-n NUM_SENTENCES] [--max-instances N [N ...]] [--max-tokens N]
+                               [--repeats N] [--baseline PATH]
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TRANSLATED_PATH = os.path.join(SCRIPT_DIR, "..", "starsem_eval", "starsem2012_eval_translated.py")
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "..", "instance_based_eval"))
+
+from synthetic_corpus import write_corpus_pair
+
+
+def load_script(path):
+    """Load a fresh copy of an evaluation script (the translated script keeps its counts in module globals)."""
+    spec = importlib.util.spec_from_file_location("translated_bench", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure(path, gold_path, system_path, repeats, starsem_exact):
+    """Returns the best wall time (in seconds) of main() over several runs, and the printed output."""
+    best = float("inf")
+    output = None
+    for _ in range(repeats):
+        module = load_script(path)
+        buf = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(buf):
+            module.main(gold_path, system_path, starsem_exact=starsem_exact)
+        best = min(best, time.perf_counter() - start)
+        output = buf.getvalue()
+    return best, output
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="starsem2012_eval_translated.py benchmark")
+    argparser.add_argument("-n", "--num-sentences", type=int, default=5000, help="number of sentences")
+    argparser.add_argument("--max-instances", type=int, nargs="+", default=[3, 10],
+                           help="maximum numbers of negation instances per sentence (one corpus each)")
+    argparser.add_argument("--max-tokens", type=int, default=25, help="maximum number of tokens per sentence")
+    argparser.add_argument("--repeats", type=int, default=3, help="number of runs (the fastest one is reported)")
+    argparser.add_argument("-e", "--starsem-exact", default=False, action="store_true",
+                           help="evaluate with the --starsem-exact option")
+    argparser.add_argument("--baseline", type=str, help="path of another version of the script to compare with")
+    args = argparser.parse_args()
+
+    print("{:>14} {:>12} {:>14}".format("max instances", "current (s)", "baseline (s)"))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        gold_path = os.path.join(tmp_dir, "gold.txt")
+        system_path = os.path.join(tmp_dir, "system.txt")
+        for max_instances in args.max_instances:
+            write_corpus_pair(gold_path, system_path, args.num_sentences, max_instances=max_instances,
+                              max_tokens=args.max_tokens)
+            elapsed, output = measure(TRANSLATED_PATH, gold_path, system_path, args.repeats, args.starsem_exact)
+            if args.baseline:
+                base_elapsed, base_output = measure(args.baseline, gold_path, system_path, args.repeats,
+                                                    args.starsem_exact)
+                assert output == base_output, "outputs of the current and the baseline script differ"
+                print("{:>14d} {:>12.3f} {:>14.3f}".format(max_instances, elapsed, base_elapsed))
+            else:
+                print("{:>14d} {:>12.3f} {:>14}".format(max_instances, elapsed, "-"))
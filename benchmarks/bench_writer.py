@@ -0,0 +1,86 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""
+Write benchmark for *SEM output: Conll.write (Token objects) vs. StarsemWriter.write_instances
+(straight from token forms and instance annotations, without Token objects).
+
+Both writers are fed the same synthetic corpus and their outputs are compared.
+
+Usage:
+
+    python bench_writer.py [-h] [-n NUM_SENTENCES] [--max-instances N] [--repeats N]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "instance_based_eval"))
+
+import myconll
+from myconll.writer import StarsemWriter
+from synthetic_corpus import generate_corpus_pair
+
+
+def to_instances(sentence):
+    """Convert a parsed sentence to the arguments of StarsemWriter.write_instances."""
+    num_instances = max((token.num_neg_instances() for token in sentence), default=0)
+    instances = [({}, {}, {}) for _ in range(num_instances)]
+    for token_idx, token in enumerate(sentence):
+        for part, annotations in enumerate((token.cue, token.scope, token.event)):
+            for i, value in annotations or ():
+                if value != "_":
+                    instances[i][part][token_idx] = value
+    first = sentence[0]
+    return dict(doc_id=first.doc_id, sent_id=first.sent_id, forms=[token.form for token in sentence],
+                instances=instances, lemmas=[token.lemma for token in sentence],
+                xpos=[token.xpos for token in sentence], parses=[token.parse or "_" for token in sentence])
+
+
+def best_time(func, repeats):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def write_conll(conll):
+    buf = io.StringIO()
+    conll.write(buf)
+    return buf.getvalue()
+
+
+def write_instances(sentences):
+    buf = io.StringIO()
+    with StarsemWriter(buf) as writer:
+        for kwargs in sentences:
+            writer.write_instances(**kwargs)
+    return buf.getvalue()
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="*SEM writer benchmark")
+    argparser.add_argument("-n", "--num-sentences", type=int, default=20000, help="number of sentences")
+    argparser.add_argument("--max-instances", type=int, default=3, help="maximum number of instances per sentence")
+    argparser.add_argument("--repeats", type=int, default=3, help="number of runs (the fastest one is reported)")
+    args = argparser.parse_args()
+
+    gold_str, _ = generate_corpus_pair(args.num_sentences, max_instances=args.max_instances)
+    conll = myconll.load_from_string(gold_str)
+    sentences = [to_instances(sentence) for sentence in conll]
+
+    conll_time, conll_out = best_time(lambda: write_conll(conll), args.repeats)
+    instances_time, instances_out = best_time(lambda: write_instances(sentences), args.repeats)
+    assert conll_out == instances_out, "outputs of the two writers differ"
+
+    print("{:>26} {:>10}".format("writer", "time (s)"))
+    print("{:>26} {:>10.3f}".format("Conll.write", conll_time))
+    print("{:>26} {:>10.3f}".format("StarsemWriter (instances)", instances_time))
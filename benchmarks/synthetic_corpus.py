@@ -0,0 +1,162 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""
+Generator for synthetic pairs of gold/system corpora in *SEM format, used by the benchmark scripts.
+
+The system corpus is derived from the gold corpus by randomly dropping, extending and shrinking
+negation instances (cues, scopes and events), and by adding spurious instances.
+Sentences may contain affixal cues, multiword cues, events and punctuation.
+
+Usage:
+
+    python synthetic_corpus.py [-h] [-n NUM_SENTENCES] [--max-instances N] [--max-tokens N]
+                               [--seed SEED] gold_file system_file
+"""
+
+import argparse
+import random
+
+WORDS = ["the", "man", "was", "not", "happy", "never", "house", "saw", "Mr.", "unhappy", "nothing",
+         "careless", "he", "said", "no", "one", "impossible", "walked", "door", "it", "dark"]
+AFFIXES = {"unhappy": "un", "impossible": "im", "careless": "less"}
+PUNCT = {",": "PUNC,", ".": "PUNC.", "!": "PUNC.", "``": "PUNC``", "''": "PUNC''", "(": "-LRB-", ")": "-RRB-"}
+SENTENCES_PER_DOC = 40
+
+
+def _random_tokens(rng, max_tokens):
+    tokens = []
+    for _ in range(rng.randint(3, max_tokens)):
+        if rng.random() < 0.15:
+            form = rng.choice(list(PUNCT))
+            tokens.append((form, PUNCT[form]))
+        else:
+            tokens.append((rng.choice(WORDS), rng.choice(["NN", "VBD", "DT", "JJ", "RB"])))
+    return tokens
+
+
+def _random_instance(rng, tokens):
+    """Returns a negation instance as a triple of dicts (cue, scope, event) from token index to form."""
+    n = len(tokens)
+    cue, scope, event = {}, {}, {}
+
+    cue_idx = rng.randrange(n)
+    form = tokens[cue_idx][0]
+    rest = None
+    if form in AFFIXES and rng.random() < 0.7:
+        cue[cue_idx] = AFFIXES[form]
+        rest = form.replace(AFFIXES[form], "", 1)
+    else:
+        cue[cue_idx] = form
+        if rng.random() < 0.2 and cue_idx + 1 < n:
+            cue[cue_idx + 1] = tokens[cue_idx + 1][0]
+
+    start = rng.randrange(n)
+    for j in range(start, min(n, start + rng.randint(0, 8))):
+        if j == cue_idx and rest:
+            scope[j] = rest
+        elif j not in cue:
+            scope[j] = tokens[j][0]
+
+    if scope and rng.random() < 0.5:
+        j = rng.choice(sorted(scope))
+        event[j] = scope[j]
+
+    return cue, scope, event
+
+
+def _perturb(rng, tokens, instance):
+    cue, scope, event = (dict(part) for part in instance)
+    n = len(tokens)
+    if rng.random() < 0.2:
+        for j in list(scope):
+            if rng.random() < 0.3:
+                del scope[j]
+        j = rng.randrange(n)
+        if j not in cue:
+            scope[j] = tokens[j][0]
+    if rng.random() < 0.1:
+        j = rng.randrange(n)
+        cue[j] = tokens[j][0]
+    if rng.random() < 0.15:
+        event = {}
+        if scope and rng.random() < 0.5:
+            j = rng.choice(sorted(scope))
+            event[j] = scope[j]
+    return cue, scope, event
+
+
+def _sentence_lines(doc_id, sent_id, tokens, instances):
+    lines = []
+    for i, (form, pos) in enumerate(tokens):
+        cols = [doc_id, str(sent_id), str(i), form, form.lower(), pos, "*"]
+        if not instances:
+            cols.append("***")
+        for cue, scope, event in instances:
+            cols += [cue.get(i, "_"), scope.get(i, "_"), event.get(i, "_")]
+        lines.append("\t".join(cols))
+    return "\n".join(lines)
+
+
+def generate_corpus_pair(num_sentences, max_instances=3, max_tokens=25, seed=0, min_instances=None):
+    """Generate a synthetic gold corpus and a system corpus for it.
+
+    Args:
+        num_sentences: Number of sentences.
+        max_instances: Maximum number of negation instances per gold sentence.
+        max_tokens: Maximum number of tokens per sentence.
+        seed: Random seed.
+        min_instances: Minimum number of negation instances per gold sentence. If not given,
+          about a third of the sentences have no negation instance.
+
+    Returns: A pair of strings (gold, system) in *SEM format.
+    """
+    rng = random.Random(seed)
+    gold_sents, system_sents = [], []
+    for sent_num in range(num_sentences):
+        doc_id = "doc{}".format(sent_num // SENTENCES_PER_DOC)
+        sent_id = sent_num % SENTENCES_PER_DOC
+        tokens = _random_tokens(rng, max_tokens)
+
+        if min_instances is None:
+            num_instances = rng.choice([0, 0] + list(range(1, max_instances + 1)))
+        else:
+            num_instances = rng.randint(min_instances, max_instances)
+        gold = [_random_instance(rng, tokens) for _ in range(num_instances)]
+        system = [_perturb(rng, tokens, inst) for inst in gold if rng.random() >= 0.15]
+        if rng.random() < 0.2:
+            system.append(_random_instance(rng, tokens))
+        if rng.random() < 0.3:
+            rng.shuffle(system)
+
+        gold_sents.append(_sentence_lines(doc_id, sent_id, tokens, gold))
+        system_sents.append(_sentence_lines(doc_id, sent_id, tokens, system))
+
+    return "\n\n".join(gold_sents) + "\n\n", "\n\n".join(system_sents) + "\n\n"
+
+
+def write_corpus_pair(gold_path, system_path, num_sentences, max_instances=3, max_tokens=25, seed=0):
+    """Generate a synthetic corpus pair (see generate_corpus_pair) and write it to the given paths."""
+    gold_str, system_str = generate_corpus_pair(num_sentences, max_instances=max_instances,
+                                                max_tokens=max_tokens, seed=seed)
+    with open(gold_path, "w", encoding="utf-8") as f:
+        f.write(gold_str)
+    with open(system_path, "w", encoding="utf-8") as f:
+        f.write(system_str)
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Generate a synthetic gold/system corpus pair in *SEM format")
+    argparser.add_argument("gold_file", type=str, help="output path of the gold corpus")
+    argparser.add_argument("system_file", type=str, help="output path of the system corpus")
+    argparser.add_argument("-n", "--num-sentences", type=int, default=1000, help="number of sentences")
+    argparser.add_argument("--max-instances", type=int, default=3, help="maximum number of instances per sentence")
+    argparser.add_argument("--max-tokens", type=int, default=25, help="maximum number of tokens per sentence")
+    argparser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = argparser.parse_args()
+
+    write_corpus_pair(args.gold_file, args.system_file, args.num_sentences,
+                      max_instances=args.max_instances, max_tokens=args.max_tokens, seed=args.seed)
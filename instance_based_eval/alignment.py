@@ -0,0 +1,254 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Alignment of gold and system sentences by their (doc_id, sent_id) key instead of their position.
+
+System files written by distributed inference may contain the sentences in a different order than
+the gold file, or lack some of them. The alignment builds a hash index over the system sentences and
+pairs every gold sentence with the system sentence of the same key in O(n); gold sentences without a
+system counterpart (missing) and system sentences without a gold counterpart (extra) are paired with
+None and listed in an AlignmentReport. If a key occurs several times in a file, the occurrences are
+paired in file order.
+"""
+
+from collections import deque
+
+# Column of the first instance in the *SEM format; sentences without any instance have NO_INSTANCES there
+FIRST_INSTANCE_COLUMN = 7
+NO_INSTANCES = "***"
+
+
+def row_key(rows):
+    """Return the (doc_id, sent_id) key of a sentence given as token rows (lists of columns)."""
+    return rows[0][0], rows[0][1]
+
+
+def sentence_key(sentence):
+    """Return the (doc_id, sent_id) key of a myconll Sentence (as parsed by its first Token)."""
+    first_token = sentence[0]
+    return first_token.doc_id, first_token.sent_id
+
+
+def unannotated_rows(rows):
+    """Return a copy of the token rows of a sentence without any negation instances, i.e. the counterpart
+    of a sentence that is missing in the other file.
+    """
+    return [cols[:FIRST_INSTANCE_COLUMN] + [NO_INSTANCES] for cols in rows]
+
+
+class AlignmentReport:
+    """Outcome of an alignment: number of aligned pairs, and the keys of missing and extra sentences."""
+    MAX_LISTED_KEYS = 10
+
+    def __init__(self):
+        self.num_aligned = 0
+        self.missing = []  # Keys of gold sentences that are not in the system file
+        self.extra = []  # Keys of system sentences that are not in the gold file
+        self.reordered = False  # Whether the system sentences were in a different order than the gold sentences
+
+    @property
+    def complete(self):
+        return not self.missing and not self.extra
+
+    def __str__(self):
+        def list_keys(keys):
+            listed = ", ".join("{}/{}".format(doc_id, sent_id) for doc_id, sent_id in keys[:self.MAX_LISTED_KEYS])
+            if len(keys) > self.MAX_LISTED_KEYS:
+                listed += ", ... ({} more)".format(len(keys) - self.MAX_LISTED_KEYS)
+            return listed
+
+        res = "Aligned sentences:               {}\n".format(self.num_aligned)
+        res += "Gold sentences missing in system: {}\n".format(len(self.missing))
+        if self.missing:
+            res += "  {}\n".format(list_keys(self.missing))
+        res += "Extra system sentences:           {}\n".format(len(self.extra))
+        if self.extra:
+            res += "  {}\n".format(list_keys(self.extra))
+        res += "System sentences reordered:       {}\n".format("yes" if self.reordered else "no")
+
+        return res
+
+
+def align_by_key(gold_sents, system_sents, key=row_key):
+    """Pair gold and system sentences by key.
+
+    Args:
+        gold_sents: Iterable of gold sentences (consumed in a single pass).
+        system_sents: Iterable of system sentences (indexed in memory).
+        key: Function returning the (doc_id, sent_id) key of a sentence. Default: row_key (token rows).
+
+    Returns: A pair of
+      1) a list of (gold sentence, system sentence) pairs, in gold order, followed by the extra system
+         sentences (in system order); the missing side of a pair is None;
+      2) an AlignmentReport.
+    """
+    report = AlignmentReport()
+
+    system_by_key = {}
+    system_order = []  # Keys of the system sentences, in file order
+    for system_sent in system_sents:
+        sent_key = key(system_sent)
+        system_by_key.setdefault(sent_key, deque()).append(system_sent)
+        system_order.append(sent_key)
+
+    pairs = []
+    gold_order = []
+    for gold_sent in gold_sents:
+        sent_key = key(gold_sent)
+        gold_order.append(sent_key)
+        candidates = system_by_key.get(sent_key)
+        if candidates:
+            pairs.append((gold_sent, candidates.popleft()))
+            report.num_aligned += 1
+        else:
+            pairs.append((gold_sent, None))
+            report.missing.append(sent_key)
+
+    # System sentences that were not consumed, in file order
+    for sent_key in system_order:
+        candidates = system_by_key[sent_key]
+        if candidates:
+            pairs.append((None, candidates.popleft()))
+            report.extra.append(sent_key)
+
+    # The order only counts as changed if the sentences present in both files appear in a different order
+    extra_keys = set(report.extra)
+    missing_keys = set(report.missing)
+    report.reordered = ([k for k in gold_order if k not in missing_keys]
+                        != [k for k in system_order if k not in extra_keys])
+
+    return pairs, report
+
+
+DEFAULT_BAND = 8  # Maximum deviation (in tokens) of a token alignment from the diagonal
+
+
+def tokens_match(gold_rows, system_rows):
+    """Check whether two sentences (given as token rows) have the same token ids and (lowercased) words."""
+    return len(gold_rows) == len(system_rows) and all(
+        gold_cols[2] == system_cols[2] and gold_cols[3].lower() == system_cols[3].lower()
+        for gold_cols, system_cols in zip(gold_rows, system_rows))
+
+
+def align_tokens(gold_words, system_words, band=DEFAULT_BAND):
+    """Align two tokenizations of a sentence with a banded edit-distance alignment.
+
+    Equal words (ignoring case) are aligned at no cost; substituting, inserting or deleting a word costs 1.
+    Only alignments that stay within `band` tokens of the diagonal (widened by the difference in length)
+    are considered, so the time is linear in the sentence length for near-identical tokenizations.
+
+    Args:
+        gold_words: The gold token forms.
+        system_words: The system token forms.
+        band: Maximum deviation from the diagonal. Default: DEFAULT_BAND.
+
+    Returns: A pair of the edit distance and the alignment, a list of (gold index, system index) pairs
+      in sentence order, where inserted or deleted tokens have None on the other side.
+    """
+    n, m = len(gold_words), len(system_words)
+    gold_lower = [word.lower() for word in gold_words]
+    system_lower = [word.lower() for word in system_words]
+
+    # Cells (i, j) with min_diag <= j - i <= max_diag
+    min_diag = min(0, m - n) - band
+    max_diag = max(0, m - n) + band
+    infinity = n + m + 1
+
+    # costs[i][j - lows[i]] = edit distance of gold_words[:i] and system_words[:j]
+    lows = [max(0, i + min_diag) for i in range(n + 1)]
+    highs = [min(m, i + max_diag) for i in range(n + 1)]
+    costs = []
+    for i in range(n + 1):
+        row = []
+        for j in range(lows[i], highs[i] + 1):
+            if i == 0:
+                cost = j
+            else:
+                prev, prev_low, prev_high = costs[i - 1], lows[i - 1], highs[i - 1]
+                cost = infinity
+                if prev_low <= j <= prev_high:  # delete gold token
+                    cost = prev[j - prev_low] + 1
+                if j > 0 and prev_low <= j - 1 <= prev_high:  # align (substitute) tokens
+                    cost = min(cost, prev[j - 1 - prev_low] + (gold_lower[i - 1] != system_lower[j - 1]))
+                if j > lows[i]:  # insert system token
+                    cost = min(cost, row[-1] + 1)
+            row.append(cost)
+        costs.append(row)
+
+    def cost_at(i, j):
+        return costs[i][j - lows[i]] if lows[i] <= j <= highs[i] else infinity
+
+    # Trace back, preferring aligned tokens over insertions/deletions
+    alignment = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        cost = cost_at(i, j)
+        if i > 0 and j > 0 and cost == cost_at(i - 1, j - 1) + (gold_lower[i - 1] != system_lower[j - 1]):
+            i, j = i - 1, j - 1
+            alignment.append((i, j))
+        elif i > 0 and cost == cost_at(i - 1, j) + 1:
+            i -= 1
+            alignment.append((i, None))
+        else:
+            j -= 1
+            alignment.append((None, j))
+    alignment.reverse()
+
+    return cost_at(n, m), alignment
+
+
+def project_label(label, system_word, gold_word):
+    """Project a label (an instance column) of a system token onto the gold token it is aligned with.
+
+    A label that covers the whole system word covers the whole gold word. Any other (affix) label is only kept
+    if it is part of the gold word (ignoring case; it then takes the case of the gold word): if the words
+    differ, e.g. gold "can" and system "cannot" with the cue "not", the affix belongs to another gold token.
+
+    Returns: The projected label, or "_" if the label does not apply to the gold token.
+    """
+    if label == "_":
+        return label
+    if label == system_word:
+        return gold_word
+    if label in gold_word:
+        return label
+    start = gold_word.lower().find(label.lower())
+    return gold_word[start:start + len(label)] if start >= 0 else "_"
+
+
+def project_rows(gold_rows, system_rows, band=DEFAULT_BAND):
+    """Project the annotation of the system token rows of a sentence onto the gold tokens of the sentence.
+
+    The tokens are aligned with align_tokens. A gold token gets the instance columns of its aligned system
+    token, projected with project_label: labels that cover the whole system word are replaced by the gold word,
+    affix labels are kept if they are part of the gold word and dropped otherwise. Gold tokens without a system
+    counterpart get no labels, and the labels of unaligned system tokens are dropped.
+
+    Args:
+        gold_rows: The gold token rows (lists of columns) of the sentence.
+        system_rows: The system token rows of the sentence.
+        band: Maximum deviation of the token alignment from the diagonal. Default: DEFAULT_BAND.
+
+    Returns: A pair of the projected system rows (one per gold token) and the edit distance of the alignment.
+    """
+    distance, alignment = align_tokens([cols[3] for cols in gold_rows], [cols[3] for cols in system_rows],
+                                       band=band)
+
+    num_instance_cols = len(system_rows[0]) - FIRST_INSTANCE_COLUMN if system_rows else 0
+    if num_instance_cols <= 1:  # no instances in the system sentence
+        return unannotated_rows(gold_rows), distance
+
+    projected = [cols[:FIRST_INSTANCE_COLUMN] + ["_"] * num_instance_cols for cols in gold_rows]
+    for gold_idx, system_idx in alignment:
+        if gold_idx is None or system_idx is None:
+            continue
+        gold_word = gold_rows[gold_idx][3]
+        system_cols = system_rows[system_idx]
+        system_word = system_cols[3]
+        projected[gold_idx][FIRST_INSTANCE_COLUMN:] = [project_label(label, system_word, gold_word)
+                                                       for label in system_cols[FIRST_INSTANCE_COLUMN:]]
+
+    return projected, distance
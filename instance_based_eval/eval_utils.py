@@ -6,14 +6,20 @@
 #
 #  Author: Stefan Grünewald
 
+from operator import truediv
+
 import numpy as np
 
+from negation_instance import labelled
+
 
 class EvaluationResult:
     """Class for representing the results of a negation evaluation run.
-    As of now, the included metrics are precision, recall, F1 score for cues and scopes.
+    As of now, the included metrics are precision, recall, F1 score for cues, scopes and events.
+    The event metrics are optional (None if a result is created without them, as before events were scored).
     """
-    def __init__(self, cue_precision, cue_recall, cue_f1, scope_precision, scope_recall, scope_f1):
+    def __init__(self, cue_precision, cue_recall, cue_f1, scope_precision, scope_recall, scope_f1,
+                 event_precision=None, event_recall=None, event_f1=None):
         self.cue_precision = cue_precision
         self.cue_recall = cue_recall
         self.cue_f1 = cue_f1
@@ -22,20 +28,42 @@ class EvaluationResult:
         self.scope_recall = scope_recall
         self.scope_f1 = scope_f1
 
+        self.event_precision = event_precision
+        self.event_recall = event_recall
+        self.event_f1 = event_f1
+
     @classmethod
     def from_counts(cls, num_instances_gold, num_instances_system, num_instances_matched,
                    scope_precision_numerator, scope_precision_denominator,
-                   scope_recall_numerator, scope_recall_denominator):
-        """Create an EvaluationResult instance from """
-        cue_precision = num_instances_matched / num_instances_system
-        cue_recall = num_instances_matched / num_instances_gold
-        cue_f1 = (2 * cue_precision * cue_recall) / (cue_precision + cue_recall) if cue_precision+cue_recall else 0.0
+                   scope_recall_numerator, scope_recall_denominator,
+                   event_precision_numerator=None, event_precision_denominator=None,
+                   event_recall_numerator=None, event_recall_denominator=None, allow_empty=False):
+        """Create an EvaluationResult instance from counts.
+
+        If allow_empty is True, metrics with a denominator of 0 (e.g. the precision of a part of the corpus
+        without system instances) are 0 instead of raising a ZeroDivisionError. Without event counts, the event
+        metrics are None. Event metrics with a denominator of 0 are always 0: the cue and scope metrics of a corpus
+        without event tokens (scored over tokens) are still valid.
+        """
+        divide = safe_divide if allow_empty else truediv
+
+        cue_precision = divide(num_instances_matched, num_instances_system)
+        cue_recall = divide(num_instances_matched, num_instances_gold)
+        cue_f1 = f1(cue_precision, cue_recall)
+
+        scope_precision = divide(scope_precision_numerator, scope_precision_denominator)
+        scope_recall = divide(scope_recall_numerator, scope_recall_denominator)
+        scope_f1 = f1(scope_precision, scope_recall)
 
-        scope_precision = scope_precision_numerator / scope_precision_denominator
-        scope_recall = scope_recall_numerator / scope_recall_denominator
-        scope_f1 = (2 * scope_precision * scope_recall) / (scope_precision + scope_recall) if scope_precision + scope_recall else 0.0
+        if event_precision_denominator is None or event_recall_denominator is None:
+            event_precision = event_recall = event_f1 = None
+        else:
+            event_precision = safe_divide(event_precision_numerator, event_precision_denominator)
+            event_recall = safe_divide(event_recall_numerator, event_recall_denominator)
+            event_f1 = f1(event_precision, event_recall)
 
-        return cls(cue_precision, cue_recall, cue_f1, scope_precision, scope_recall, scope_f1)
+        return cls(cue_precision, cue_recall, cue_f1, scope_precision, scope_recall, scope_f1,
+                   event_precision, event_recall, event_f1)
 
     @classmethod
     def average(cls, eval_results):
@@ -44,7 +72,8 @@ class EvaluationResult:
         Args:
             eval_results: An iterable of EvaluationResults.
 
-        Returns: A new EvaluationResult instance containing the averages of all metrics.
+        Returns: A new EvaluationResult instance containing the averages of all metrics (the event metrics are
+          None unless all results have them).
         """
         avg_cue_precision = np.mean([e.cue_precision for e in eval_results])
         avg_cue_recall = np.mean([e.cue_recall for e in eval_results])
@@ -54,7 +83,15 @@ class EvaluationResult:
         avg_scope_recall = np.mean([e.scope_recall for e in eval_results])
         avg_scope_f1 = np.mean([e.scope_f1 for e in eval_results])
 
-        return cls(avg_cue_precision, avg_cue_recall, avg_cue_f1, avg_scope_precision, avg_scope_recall, avg_scope_f1)
+        if all(e.event_precision is not None for e in eval_results):
+            avg_event_precision = np.mean([e.event_precision for e in eval_results])
+            avg_event_recall = np.mean([e.event_recall for e in eval_results])
+            avg_event_f1 = np.mean([e.event_f1 for e in eval_results])
+        else:
+            avg_event_precision = avg_event_recall = avg_event_f1 = None
+
+        return cls(avg_cue_precision, avg_cue_recall, avg_cue_f1, avg_scope_precision, avg_scope_recall, avg_scope_f1,
+                   avg_event_precision, avg_event_recall, avg_event_f1)
 
     def __str__(self):
         res = ""
@@ -65,10 +102,205 @@ class EvaluationResult:
         res += "Scope precision:  {:.1f}\n".format(self.scope_precision*100)
         res += "Scope recall:     {:.1f}\n".format(self.scope_recall*100)
         res += "Scope F1:         {:.1f}\n".format(self.scope_f1*100)
+        if self.event_precision is not None:
+            res += "\n"
+            res += "Event precision:  {:.1f}\n".format(self.event_precision*100)
+            res += "Event recall:     {:.1f}\n".format(self.event_recall*100)
+            res += "Event F1:         {:.1f}\n".format(self.event_f1*100)
 
         return res
 
 
+class EvaluationCounts:
+    """Sufficient statistics of an evaluation run, accumulated sentence by sentence.
+    Counts of separate runs (e.g. over different parts of a corpus) can be merged.
+    """
+    # The counters, in the order used by to_stats/from_stats
+    STATS_FIELDS = ("num_instances_gold", "num_instances_system", "num_instances_matched",
+                    "scope_precision_numerator", "scope_recall_numerator",
+                    "num_scope_tokens_gold", "num_scope_tokens_system",
+                    "event_precision_numerator", "event_recall_numerator",
+                    "num_event_tokens_gold", "num_event_tokens_system")
+    _FLOAT_FIELDS = ("scope_precision_numerator", "scope_recall_numerator",
+                     "event_precision_numerator", "event_recall_numerator")
+    # Fixed point scale of the float counters in to_int_stats/from_int_stats
+    INT_STATS_SCALE = 1 << 40
+
+    def __init__(self, normalize_scopes=True):
+        self.normalize_scopes = normalize_scopes
+
+        self.num_instances_gold = 0
+        self.num_instances_system = 0
+        self.num_instances_matched = 0
+
+        self.scope_precision_numerator = 0.0
+        self.scope_recall_numerator = 0.0
+
+        # Only needed as denominators if scopes are not normalized
+        self.num_scope_tokens_gold = 0
+        self.num_scope_tokens_system = 0
+
+        # Events are scored like scopes, on the labelled event tokens of matched instances
+        self.event_precision_numerator = 0.0
+        self.event_recall_numerator = 0.0
+        self.num_event_tokens_gold = 0
+        self.num_event_tokens_system = 0
+
+    def add_sentence(self, gold_sent, system_sent):
+        """Add the counts for a single sentence.
+
+        Args:
+            gold_sent: The gold NegationInstances of the sentence.
+            system_sent: The system NegationInstances of the sentence.
+
+        Returns: The matched instances of the sentence as (gold instance, system instance, scope precision
+          numerator, scope recall numerator, event precision numerator, event recall numerator) tuples, e.g. to
+          break the counts down further (see slices.py).
+        """
+        self.num_instances_gold += len(gold_sent)
+        self.num_instances_system += len(system_sent)
+        self.num_scope_tokens_gold += sum(inst.scope_length for inst in gold_sent)
+        self.num_scope_tokens_system += sum(inst.scope_length for inst in system_sent)
+        self.num_event_tokens_gold += sum(inst.event_length for inst in gold_sent)
+        self.num_event_tokens_system += sum(inst.event_length for inst in system_sent)
+
+        scored_matches = []
+        for m_gold_inst, m_sys_inst in get_matching_instances(gold_sent, system_sent):
+            self.num_instances_matched += 1
+
+            if self.normalize_scopes:
+                p, r, _ = scope_match_normalized(m_gold_inst, m_sys_inst)
+                event_p, event_r, _ = event_match_normalized(m_gold_inst, m_sys_inst)
+            else:
+                _, _, num_correct_tok = scope_match_tokens(m_gold_inst, m_sys_inst)
+                p = r = num_correct_tok
+                _, _, num_correct_event_tok = event_match_tokens(m_gold_inst, m_sys_inst)
+                event_p = event_r = num_correct_event_tok
+            self.scope_precision_numerator += p
+            self.scope_recall_numerator += r
+            self.event_precision_numerator += event_p
+            self.event_recall_numerator += event_r
+            scored_matches.append((m_gold_inst, m_sys_inst, p, r, event_p, event_r))
+
+        return scored_matches
+
+    def merge(self, other):
+        """Add the counts of another EvaluationCounts instance to this one.
+
+        Args:
+            other: The EvaluationCounts to add. Must use the same scope normalization setting.
+        """
+        assert self.normalize_scopes == other.normalize_scopes
+
+        self.num_instances_gold += other.num_instances_gold
+        self.num_instances_system += other.num_instances_system
+        self.num_instances_matched += other.num_instances_matched
+        self.scope_precision_numerator += other.scope_precision_numerator
+        self.scope_recall_numerator += other.scope_recall_numerator
+        self.num_scope_tokens_gold += other.num_scope_tokens_gold
+        self.num_scope_tokens_system += other.num_scope_tokens_system
+        self.event_precision_numerator += other.event_precision_numerator
+        self.event_recall_numerator += other.event_recall_numerator
+        self.num_event_tokens_gold += other.num_event_tokens_gold
+        self.num_event_tokens_system += other.num_event_tokens_system
+
+    def to_stats(self):
+        """Return the counters as a list (in the order of STATS_FIELDS)."""
+        return [getattr(self, field) for field in self.STATS_FIELDS]
+
+    @classmethod
+    def from_stats(cls, stats, normalize_scopes=True):
+        """Create an EvaluationCounts instance from a sequence of counters as returned by to_stats.
+
+        Args:
+            stats: The counters, in the order of STATS_FIELDS.
+            normalize_scopes: Whether the counts were computed with normalized scopes. Default: True.
+        """
+        counts = cls(normalize_scopes=normalize_scopes)
+        for field, value in zip(cls.STATS_FIELDS, stats):
+            setattr(counts, field, value if field in cls._FLOAT_FIELDS else int(round(value)))
+        return counts
+
+    def to_int_stats(self):
+        """Return the counters as a list of integers (in the order of STATS_FIELDS): the float counters are stored
+        in fixed point, multiplied by INT_STATS_SCALE and rounded. Unlike floats, such counters can be added and
+        subtracted in any order (e.g. to patch stored totals, see sentence_stats.py) without rounding errors.
+        """
+        return [int(round(value * self.INT_STATS_SCALE)) if field in self._FLOAT_FIELDS else value
+                for field, value in zip(self.STATS_FIELDS, self.to_stats())]
+
+    @classmethod
+    def from_int_stats(cls, stats, normalize_scopes=True):
+        """Create an EvaluationCounts instance from a sequence of counters as returned by to_int_stats.
+
+        Args:
+            stats: The integer counters, in the order of STATS_FIELDS.
+            normalize_scopes: Whether the counts were computed with normalized scopes. Default: True.
+        """
+        return cls.from_stats([value / cls.INT_STATS_SCALE if field in cls._FLOAT_FIELDS else value
+                               for field, value in zip(cls.STATS_FIELDS, stats)],
+                              normalize_scopes=normalize_scopes)
+
+    def to_result(self, allow_empty=False):
+        """Compute the evaluation metrics from the accumulated counts.
+
+        Args:
+            allow_empty: Whether metrics with a denominator of 0 are 0 (instead of raising a ZeroDivisionError).
+              Default: False.
+
+        Returns: An EvaluationResult object.
+        """
+        if self.normalize_scopes:
+            scope_precision_denominator = event_precision_denominator = self.num_instances_system
+            scope_recall_denominator = event_recall_denominator = self.num_instances_gold
+        else:
+            scope_precision_denominator = self.num_scope_tokens_system
+            scope_recall_denominator = self.num_scope_tokens_gold
+            event_precision_denominator = self.num_event_tokens_system
+            event_recall_denominator = self.num_event_tokens_gold
+
+        return EvaluationResult.from_counts(self.num_instances_gold, self.num_instances_system,
+                                            self.num_instances_matched,
+                                            self.scope_precision_numerator, scope_precision_denominator,
+                                            self.scope_recall_numerator, scope_recall_denominator,
+                                            self.event_precision_numerator, event_precision_denominator,
+                                            self.event_recall_numerator, event_recall_denominator,
+                                            allow_empty=allow_empty)
+
+
+def safe_divide(numerator, denominator):
+    """Divide, returning 0.0 if the denominator is 0."""
+    return numerator / denominator if denominator else 0.0
+
+
+def f1(precision, recall):
+    """Return the F1 score (harmonic mean) of a precision and a recall, 0.0 if both are 0."""
+    return (2 * precision * recall) / (precision + recall) if precision + recall else 0.0
+
+
+def format_result_table(header, rows):
+    """Format EvaluationResults of several parts of an evaluation (e.g. slices or groups) as a table.
+
+    Args:
+        header: The heading of the first column.
+        rows: (name, number of gold instances, number of system instances, EvaluationResult) tuples;
+          the numbers of instances may be None.
+
+    Returns: The table as a string, one line per row.
+    """
+    res = "{:<34}{:>7}{:>8}{:>9}{:>9}{:>9}{:>9}{:>9}{:>9}{:>9}{:>9}{:>9}\n".format(
+        header, "Gold", "System", "Cue P", "Cue R", "Cue F1", "Scope P", "Scope R", "Scope F1",
+        "Event P", "Event R", "Event F1")
+    for name, num_gold, num_system, result in rows:
+        res += "{:<34}{:>7}{:>8}{:>9.1f}{:>9.1f}{:>9.1f}{:>9.1f}{:>9.1f}{:>9.1f}{:>9.1f}{:>9.1f}{:>9.1f}\n".format(
+            name, "" if num_gold is None else int(num_gold), "" if num_system is None else int(num_system),
+            result.cue_precision * 100, result.cue_recall * 100, result.cue_f1 * 100,
+            result.scope_precision * 100, result.scope_recall * 100, result.scope_f1 * 100,
+            result.event_precision * 100, result.event_recall * 100, result.event_f1 * 100)
+
+    return res
+
+
 def get_matching_instances(gold_sent, system_sent):
     """For a pair of negation-annotated sentences (gold, system), provide a list of NegationInstances
     that match between the two. A match is here defined as exact cue match (i.e., the set of cue tokens
@@ -97,6 +329,53 @@ def get_matching_instances(gold_sent, system_sent):
     return matched_instances
 
 
+def span_overlap(gold_span, system_span):
+    """Count the tokens (pairs of index and word form) that two cue, scope or event spans have in common.
+
+    Args:
+        gold_span: The (index, word_form) pairs of the gold span.
+        system_span: The (index, word_form) pairs of the system span.
+
+    Returns: The number of system tokens that are also in the gold span.
+    """
+    gold_tokens = set(gold_span)  # matching by position and word form
+    return sum(map(gold_tokens.__contains__, system_span))
+
+
+def span_match_normalized(gold_span, system_span):
+    """Calculate the overlap of a gold and a system span, normalizing by span length.
+
+    Args:
+        gold_span: The (index, word_form) pairs of the gold span.
+        system_span: The (index, word_form) pairs of the system span.
+
+    Returns: A triple consisting of
+      1) precision, defined as num_matched_tokens / len(system_span);
+      2) recall, defined as num_matched_tokens / len(gold_span);
+      3) F1.
+      An empty span counts as fully correct (precision or recall 1.0).
+    """
+    num_matched_tokens = span_overlap(gold_span, system_span)
+
+    # Determine precision and recall for this span
+    if len(gold_span) == 0 and len(system_span) == 0:
+        precision = 1.0
+        recall = 1.0
+    elif len(gold_span) == 0 and len(system_span) > 0:
+        precision = 0.0
+        recall = 1.0
+    elif len(gold_span) > 0 and len(system_span) == 0:
+        precision = 1.0
+        recall = 0.0
+    else:
+        precision = num_matched_tokens / len(system_span)
+        recall = num_matched_tokens / len(gold_span)
+
+    f1 = 2*precision*recall/(precision+recall) if precision+recall else 0.0
+
+    return precision, recall, f1
+
+
 def scope_match_tokens(gold_inst, system_inst):
     """Given a gold NegationInstance and matched system NegationInstance, count the number of matching
     scope tokens between them.
@@ -110,14 +389,7 @@ def scope_match_tokens(gold_inst, system_inst):
       2) the number of tokens in the system scope;
       3) the number of tokens that match up between the two.
     """
-    # Count tokens that match up between scopes
-    num_matched_tokens = 0
-    for token1 in gold_inst.scope:
-        for token2 in system_inst.scope:
-            if token1 == token2: # matching by position and word form
-                num_matched_tokens += 1
-
-    return len(gold_inst.scope), len(system_inst.scope), num_matched_tokens,   # Gold, predicted, correct
+    return len(gold_inst.scope), len(system_inst.scope), span_overlap(gold_inst.scope, system_inst.scope)
 
 
 def scope_match_normalized(gold_inst, system_inst):
@@ -133,29 +405,36 @@ def scope_match_normalized(gold_inst, system_inst):
       2) scope recall, defined as num_matched_tokens / len(gold_inst.scope);
       3) scope F1.
     """
-    # Count tokens that match up between scopes
-    num_matched_tokens = 0
-    for token1 in gold_inst.scope:
-        for token2 in system_inst.scope:
-            if token1 == token2: # matching by position and word form
-                num_matched_tokens += 1
+    return span_match_normalized(gold_inst.scope, system_inst.scope)
 
 
-    # Determine precision and recall for this scope
-    if len(gold_inst.scope) == 0 and len(system_inst.scope) == 0:
-        precision = 1.0
-        recall = 1.0
-    elif len(gold_inst.scope) == 0 and len(system_inst.scope) > 0:
-        precision = 0.0
-        recall = 1.0
-    elif len(gold_inst.scope) > 0 and len(system_inst.scope) == 0:
-        precision = 1.0
-        recall = 0.0
-    else:
-        precision = num_matched_tokens / len(system_inst.scope)
-        recall = num_matched_tokens / len(gold_inst.scope)
-            
-    f1 = 2*precision*recall/(precision+recall) if precision+recall else 0.0
+def event_match_tokens(gold_inst, system_inst):
+    """Given a gold NegationInstance and matched system NegationInstance, count the number of matching
+    event tokens between them. Only labelled event tokens are counted (see negation_instance.labelled).
 
-    return precision, recall, f1
+    Args:
+        gold_inst: The gold NegationInstance.
+        system_inst: The system NegationInstance.
 
+    Returns: A triple consisting of
+      1) the number of tokens in the gold event;
+      2) the number of tokens in the system event;
+      3) the number of tokens that match up between the two.
+    """
+    gold_event = labelled(gold_inst.event)
+    system_event = labelled(system_inst.event)
+    return len(gold_event), len(system_event), span_overlap(gold_event, system_event)
+
+
+def event_match_normalized(gold_inst, system_inst):
+    """Given a gold NegationInstance and matched system NegationInstance, calculate the overlap of their
+    (labelled) event tokens, normalizing by event length. Instances without an event on either side count
+    as correct.
+
+    Args:
+        gold_inst: The gold NegationInstance.
+        system_inst: The system NegationInstance.
+
+    Returns: A triple consisting of event precision, recall and F1 (see span_match_normalized).
+    """
+    return span_match_normalized(labelled(gold_inst.event), labelled(system_inst.event))
@@ -0,0 +1,134 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Grouping of sentences by their document id (first column of the *SEM format), e.g. to report results per
+document or per source of a corpus that combines several sources.
+
+A grouping maps a document id to the name of its group:
+  * "doc": every document is a group of its own;
+  * "prefix:P1,P2,...": documents are grouped by the first of the given prefixes their id starts with;
+  * "regex:PATTERN": documents are grouped by the first group of the regular expression (or the whole match if
+    it has no group), searched in their id.
+Documents that match none of the prefixes or the expression form the group OTHER_GROUP. The group of every
+document id is only computed once, so grouping adds one dict lookup per sentence.
+
+The counts of the instance-based evaluation are accumulated per group (GroupCounts); the micro totals are the
+counts of all groups added up, the macro totals the average of the results of all groups with gold instances.
+"""
+
+import re
+
+from eval_utils import EvaluationCounts, EvaluationResult, format_result_table
+
+OTHER_GROUP = "(other)"
+
+
+class DocumentGrouping:
+    """Maps document ids to group names (see the module documentation for the specifications)."""
+    def __init__(self, spec="doc"):
+        """
+        Args:
+            spec: The grouping: "doc", "prefix:P1,P2,..." or "regex:PATTERN". Default: "doc".
+
+        Raises:
+            ValueError: If the specification is invalid.
+        """
+        self.spec = spec
+        kind, _, arg = spec.partition(":")
+        if kind == "doc" and not arg:
+            self._group = lambda doc_id: doc_id
+        elif kind == "prefix" and arg:
+            prefixes = [prefix for prefix in arg.split(",") if prefix]
+            self._group = lambda doc_id: next((prefix for prefix in prefixes if doc_id.startswith(prefix)),
+                                              OTHER_GROUP)
+        elif kind == "regex" and arg:
+            try:
+                pattern = re.compile(arg)
+            except re.error as e:
+                raise ValueError("Invalid regular expression in grouping {}: {}".format(spec, e))
+            self._group = lambda doc_id: _match_group(pattern, doc_id)
+        else:
+            raise ValueError("Invalid grouping {} (expected doc, prefix:P1,P2,... or regex:PATTERN)".format(spec))
+
+        self._groups = {}  # Group of every document id seen so far
+
+    def __call__(self, doc_id):
+        group = self._groups.get(doc_id)
+        if group is None:
+            group = self._groups[doc_id] = self._group(doc_id)
+        return group
+
+
+def _match_group(pattern, doc_id):
+    match = pattern.search(doc_id)
+    if match is None:
+        return OTHER_GROUP
+    return match.group(1) if pattern.groups else match.group(0)
+
+
+class GroupCounts:
+    """EvaluationCounts of the instance-based evaluation per group, accumulated sentence by sentence."""
+    def __init__(self, grouping, normalize_scopes=True):
+        """
+        Args:
+            grouping: A DocumentGrouping.
+            normalize_scopes: Whether scope metrics are normalized by scope length. Default: True.
+        """
+        self.grouping = grouping
+        self.normalize_scopes = normalize_scopes
+        self.groups = {}  # Group name -> EvaluationCounts, in order of appearance
+        self.num_sentences = {}  # Group name -> number of sentences
+
+    def counts_for(self, doc_id):
+        """Return the EvaluationCounts to which a sentence of the given document is to be added."""
+        group = self.grouping(doc_id)
+        counts = self.groups.get(group)
+        if counts is None:
+            counts = self.groups[group] = EvaluationCounts(normalize_scopes=self.normalize_scopes)
+            self.num_sentences[group] = 0
+        self.num_sentences[group] += 1
+        return counts
+
+    def add_sentence(self, doc_id, gold_sent, system_sent):
+        """Add the counts for a single sentence to its group.
+
+        Args:
+            doc_id: The document id of the sentence.
+            gold_sent: The gold NegationInstances of the sentence.
+            system_sent: The system NegationInstances of the sentence.
+        """
+        self.counts_for(doc_id).add_sentence(gold_sent, system_sent)
+
+    def micro(self):
+        """Return the counts of all groups added up, as EvaluationCounts."""
+        total = EvaluationCounts(normalize_scopes=self.normalize_scopes)
+        for counts in self.groups.values():
+            total.merge(counts)
+        return total
+
+    def to_results(self):
+        """Return a dict from group name to EvaluationResult (metrics with a denominator of 0 are 0)."""
+        return {group: counts.to_result(allow_empty=True) for group, counts in self.groups.items()}
+
+    def macro(self):
+        """Return the average EvaluationResult of all groups with at least one gold instance, or None if
+        there is no such group.
+        """
+        results = [result for group, result in self.to_results().items()
+                   if self.groups[group].num_instances_gold]
+        return EvaluationResult.average(results) if results else None
+
+    def __str__(self):
+        rows = [(group, counts.num_instances_gold, counts.num_instances_system, result)
+                for (group, counts), result in zip(self.groups.items(), self.to_results().values())]
+        micro = self.micro()
+        rows.append(("MICRO", micro.num_instances_gold, micro.num_instances_system,
+                     micro.to_result(allow_empty=True)))
+        macro = self.macro()
+        if macro is not None:
+            rows.append(("MACRO", None, None, macro))
+
+        return format_result_table("Group ({})".format(self.grouping.spec), rows)
@@ -0,0 +1,158 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Evaluation of several annotation layers (e.g. negation and speculation) over the same tokens in one pass.
+
+A layer is a group of (cue, scope, event) column triples in a gold and a system file. The layers of a corpus may
+be stored in separate files, or as separate column groups of the same file: e.g. columns 7-15 for up to three
+negation instances and columns 16-24 for up to three speculation instances, padded with '_' triples. A layer is
+specified as
+
+    NAME[:FIRST-LAST][=GOLD,SYSTEM]
+
+where FIRST-LAST are the (0-based, inclusive) columns of the layer (default: all columns from 7 on) and GOLD,
+SYSTEM its files (default: the gold and system file given for the whole run).
+
+Every file is read and split into token rows once, however many layers it holds; the rows of each layer are cut
+out of the rows of its files (see layer_rows). Triples that are empty in the whole sentence are dropped, and a
+sentence without any instance of the layer gets the '***' placeholder, so every layer looks like a *SEM file of
+its own to the evaluations.
+"""
+
+from itertools import zip_longest
+
+from myconll import iter_rows_from_file
+from myconll.unit.token import Token
+
+# Number of token columns before the (cue, scope, event) triples
+NUM_TOKEN_COLUMNS = 7
+
+_EMPTY_VALUES = (Token.EMPTY, Token.PLACEHOLDER)
+
+
+class AnnotationLayer:
+    """An annotation layer: a group of instance columns in a gold and a system file."""
+    def __init__(self, name, columns=None, gold_path=None, system_path=None, all_gold_columns=False):
+        """
+        Args:
+            name: Name of the layer (e.g. "negation" or "speculation").
+            columns: (first, last) column of the layer (0-based, inclusive), or None for all columns from
+              NUM_TOKEN_COLUMNS on. Default: None.
+            gold_path: Path to the gold file of the layer, or None for the gold file of the run. Default: None.
+            system_path: Path to the system file of the layer, or None for the system file of the run.
+              Default: None.
+            all_gold_columns: Whether the columns only apply to the system file, and the layer has all instance
+              columns of the gold file (e.g. for N-best hypotheses in column groups of the system file, see
+              nbest.py). Default: False.
+
+        Raises:
+            ValueError: If the columns are not a group of whole triples after the token columns.
+        """
+        if columns is not None:
+            first, last = columns
+            if first < NUM_TOKEN_COLUMNS or last < first or (last - first + 1) % 3:
+                raise ValueError("Columns {}-{} of layer {} are not a group of (cue, scope, event) triples after "
+                                 "the first {} columns".format(first, last, name, NUM_TOKEN_COLUMNS))
+        self.name = name
+        self.columns = columns
+        self.gold_path = gold_path
+        self.system_path = system_path
+        self.all_gold_columns = all_gold_columns
+
+    @property
+    def gold_columns(self):
+        """The (first, last) column of the layer in the gold file, or None for all columns."""
+        return None if self.all_gold_columns else self.columns
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Create a layer from a specification NAME[:FIRST-LAST][=GOLD,SYSTEM] (see the module documentation).
+
+        Raises:
+            ValueError: If the specification is invalid.
+        """
+        layer, _, paths = spec.partition("=")
+        name, _, columns = layer.partition(":")
+        if not name:
+            raise ValueError("Layer {} has no name".format(spec))
+
+        if columns:
+            try:
+                first, last = (int(column) for column in columns.split("-"))
+            except ValueError:
+                raise ValueError("Invalid columns of layer {} (expected FIRST-LAST)".format(spec))
+            columns = (first, last)
+        else:
+            columns = None
+
+        gold_path = system_path = None
+        if paths:
+            try:
+                gold_path, system_path = paths.split(",")
+            except ValueError:
+                raise ValueError("Invalid files of layer {} (expected GOLD,SYSTEM)".format(spec))
+
+        return cls(name, columns=columns, gold_path=gold_path, system_path=system_path)
+
+    def with_paths(self, gold_path, system_path):
+        """Return the layer, with the given files filled in where it has none of its own."""
+        return AnnotationLayer(self.name, columns=self.columns, gold_path=self.gold_path or gold_path,
+                               system_path=self.system_path or system_path, all_gold_columns=self.all_gold_columns)
+
+    def __repr__(self):
+        return "AnnotationLayer({!r}, columns={!r}, gold_path={!r}, system_path={!r}, " \
+               "all_gold_columns={!r})".format(self.name, self.columns, self.gold_path, self.system_path,
+                                               self.all_gold_columns)
+
+
+def layer_rows(rows, columns):
+    """Cut the rows of a layer out of the token rows of a sentence.
+
+    Args:
+        rows: The token rows (lists of column values) of the sentence.
+        columns: (first, last) column of the layer, or None for all columns (the rows are returned as they are).
+
+    Returns: The token rows of the layer: the token columns followed by the triples of the layer that are used in
+      the sentence, or by the '***' placeholder if there are none.
+    """
+    if columns is None:
+        return rows
+
+    first, last = columns
+    token_rows = [row[:NUM_TOKEN_COLUMNS] for row in rows]
+    groups = [row[first:last + 1] for row in rows]
+
+    # Columns up to the last triple with a label on any token
+    num_columns = max(max((column + 1 for column, value in enumerate(group) if value not in _EMPTY_VALUES),
+                          default=0)
+                      for group in groups)
+    num_columns = -(-num_columns // 3) * 3
+
+    if not num_columns:
+        return [token_row + [Token.PLACEHOLDER] for token_row in token_rows]
+    # Rows with fewer columns than the group are padded
+    return [token_row + group[:num_columns] + [Token.EMPTY] * (num_columns - len(group))
+            for token_row, group in zip(token_rows, groups)]
+
+
+def iter_layer_rows(layers):
+    """Read the files of all layers in one pass, each file only once, and yield the rows of every layer.
+
+    Args:
+        layers: The AnnotationLayers, all with a gold and a system file.
+
+    Yields: For each sentence, a dict from layer name to a pair of the gold and system token rows of the layer
+      (None for a file that has fewer sentences than the others).
+    """
+    paths = list(dict.fromkeys(path for layer in layers for path in (layer.gold_path, layer.system_path)))
+    file_positions = {path: pos for pos, path in enumerate(paths)}
+
+    for sentence_rows in zip_longest(*(iter_rows_from_file(path) for path in paths)):
+        yield {layer.name: tuple(None if sentence_rows[file_positions[path]] is None
+                                 else layer_rows(sentence_rows[file_positions[path]], columns)
+                                 for path, columns in ((layer.gold_path, layer.gold_columns),
+                                                       (layer.system_path, layer.columns)))
+               for layer in layers}
@@ -0,0 +1,328 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Evaluation matrix: several systems (e.g. checkpoints) against several gold sets in one run.
+
+The systems and gold sets are listed in a JSON manifest:
+
+    {"gold": {"cdsco-dev": "gold/dev.txt", "cdsco-test": "gold/test.txt", ...},
+     "systems": {"ckpt-1000": {"cdsco-dev": "out/1000/dev.txt", "cdsco-test": "out/1000/test.txt"},
+                 "ckpt-2000": "out/2000/{gold}.txt", ...}}
+
+A system maps gold set names to its output files, or is a path template in which {gold} is replaced by the name
+of the gold set (gold sets for which the file does not exist are skipped). Relative paths are relative to the
+manifest. Pairs without a system file are left out.
+
+The pairs are evaluated with the instance-based evaluation on a process pool. Pairs with the same gold set form a
+task, in which the gold file is parsed once and scored against all their system files, so every file is parsed
+exactly once per task. A gold set is only split into several tasks if its share of the work is larger than that of
+a worker (see schedule); its gold file is then parsed once in the main process and shared with the workers of its
+tasks as a SharedCorpus (see shared_corpus.py) instead of being parsed again by each of them. The result matrix,
+one row per pair, can be written as CSV, JSON or Parquet (which requires pyarrow).
+
+Usage:
+
+    python matrix.py [-h] [-j JOBS] [-t] [-o OUTPUT] [--format {csv,json,parquet}] MANIFEST
+"""
+
+import argparse
+import csv
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import zip_longest
+
+import myconll
+from eval_utils import EvaluationCounts, format_result_table
+from negation_instance import read_negation_instances_from_corpus
+from shared_corpus import SharedCorpus, SharedCorpusHandle
+
+# Columns of the result matrix after the system and gold set name
+METRICS = ("cue_precision", "cue_recall", "cue_f1", "scope_precision", "scope_recall", "scope_f1",
+           "event_precision", "event_recall", "event_f1")
+FORMATS = ("csv", "json", "parquet")
+
+
+class Manifest:
+    """The gold sets and systems of an evaluation matrix."""
+    def __init__(self, gold, systems):
+        """
+        Args:
+            gold: A dict from gold set name to the path of its file.
+            systems: A dict from system name to a dict from gold set name to the path of the system file.
+
+        Raises:
+            ValueError: If a system refers to an unknown gold set.
+        """
+        for system, files in systems.items():
+            unknown = set(files) - set(gold)
+            if unknown:
+                raise ValueError("System {} refers to unknown gold sets: {}".format(system, ", ".join(sorted(unknown))))
+        self.gold = gold
+        self.systems = systems
+
+    @classmethod
+    def from_file(cls, path):
+        """Read a manifest from a JSON file (see the module documentation).
+
+        Raises:
+            ValueError: If the manifest is invalid, or a gold file or a system file given by its path (rather than
+              by a template) does not exist.
+        """
+        with open(path) as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError("Invalid manifest {}: {}".format(path, e))
+        if not isinstance(data, dict) or not isinstance(data.get("gold"), dict) \
+                or not isinstance(data.get("systems"), dict):
+            raise ValueError("Invalid manifest {}: expected an object with 'gold' and 'systems' objects".format(path))
+
+        base_dir = os.path.dirname(os.path.abspath(path))
+        gold = {name: os.path.join(base_dir, gold_path) for name, gold_path in data["gold"].items()}
+        systems = {}
+        for system, files in data["systems"].items():
+            if isinstance(files, str):
+                # Only the gold sets for which the system has an output file
+                template = os.path.join(base_dir, files)
+                systems[system] = {name: template.format(gold=name) for name in gold
+                                   if os.path.exists(template.format(gold=name))}
+            else:
+                systems[system] = {name: os.path.join(base_dir, system_path) for name, system_path in files.items()}
+                missing = [system_path for system_path in systems[system].values() if not os.path.exists(system_path)]
+                if missing:
+                    raise ValueError("Invalid manifest {}: missing files of system {}: {}".format(
+                        path, system, ", ".join(missing)))
+
+        missing = [gold_path for gold_path in gold.values() if not os.path.exists(gold_path)]
+        if missing:
+            raise ValueError("Invalid manifest {}: missing gold files: {}".format(path, ", ".join(missing)))
+        return cls(gold, systems)
+
+    def pairs(self):
+        """Return the (system name, gold set name) pairs to evaluate, in the order of the manifest."""
+        return [(system, name) for system, files in self.systems.items() for name in self.gold if name in files]
+
+
+def schedule(manifest, jobs):
+    """Split the pairs of a manifest into tasks for a pool of workers.
+
+    The pairs of a gold set are kept in one task, so that the gold file is parsed once, unless the work of the
+    gold set (the size of its gold file and system files) is larger than that of a worker (the total work divided
+    by the number of workers): then its pairs are split into as many tasks as needed to balance the workers,
+    each balanced by the size of the system files, which share the parsed gold file (see evaluate_matrix).
+
+    Args:
+        manifest: The Manifest.
+        jobs: The number of workers.
+
+    Returns: A list of (gold set name, [system names]) tasks, the largest ones first.
+    """
+    file_size = _file_sizer()
+    pairs_by_gold = {}
+    for system, name in manifest.pairs():
+        pairs_by_gold.setdefault(name, []).append(system)
+
+    work = {name: file_size(manifest.gold[name]) + sum(file_size(manifest.systems[system][name])
+                                                        for system in systems)
+            for name, systems in pairs_by_gold.items()}
+    work_per_job = sum(work.values()) / jobs if jobs else 0
+
+    tasks = []
+    for name, systems in pairs_by_gold.items():
+        num_tasks = min(len(systems), max(1, round(work[name] / work_per_job))) if work_per_job else 1
+        # Largest system files first, each to the task with the least work so far
+        chunks = [[] for _ in range(num_tasks)]
+        chunk_work = [0] * num_tasks
+        for system in sorted(systems, key=lambda system: -file_size(manifest.systems[system][name])):
+            idx = chunk_work.index(min(chunk_work))
+            chunks[idx].append(system)
+            chunk_work[idx] += file_size(manifest.systems[system][name])
+        tasks.extend((chunk_work[idx], name, chunk) for idx, chunk in enumerate(chunks))
+
+    tasks.sort(key=lambda task: -task[0])
+    return [(name, systems) for _, name, systems in tasks]
+
+
+def _file_sizer():
+    sizes = {}
+
+    def file_size(path):
+        if path not in sizes:
+            sizes[path] = os.path.getsize(path) if os.path.exists(path) else 0
+        return sizes[path]
+    return file_size
+
+
+def evaluate_task(gold, system_paths, normalize_scopes=True):
+    """Evaluate several system files against the same gold file, which is parsed only once.
+
+    Args:
+        gold: Path to the gold corpus file, or the SharedCorpusHandle of the already parsed gold corpus.
+        system_paths: Paths to the system corpus files.
+        normalize_scopes: Whether to normalize scope length when calculating scope metrics. Default: True.
+
+    Returns: The EvaluationResult of every system file, in the same order.
+    """
+    if isinstance(gold, SharedCorpusHandle):
+        # The instances are decoded from the shared arrays for every system file, not kept in this process
+        with SharedCorpus.attach(gold) as shared_gold:
+            return [_evaluate_system(shared_gold, system_path, normalize_scopes) for system_path in system_paths]
+
+    neg_sents_gold = read_negation_instances_from_corpus(myconll.iter_from_file(gold), compact=True)
+    return [_evaluate_system(neg_sents_gold, system_path, normalize_scopes) for system_path in system_paths]
+
+
+def _evaluate_system(neg_sents_gold, system_path, normalize_scopes):
+    counts = EvaluationCounts(normalize_scopes=normalize_scopes)
+    # As in evaluate_sents, sentences without a counterpart have no negation instances on the other side
+    neg_sents_system = read_negation_instances_from_corpus(myconll.iter_from_file(system_path), compact=True)
+    for gold_sent, system_sent in zip_longest(neg_sents_gold, neg_sents_system, fillvalue=[]):
+        counts.add_sentence(gold_sent, system_sent)
+    return counts.to_result(allow_empty=True)
+
+
+def _evaluate_task(args):
+    return evaluate_task(*args)
+
+
+def evaluate_matrix(manifest, jobs=None, normalize_scopes=True):
+    """Evaluate all pairs of systems and gold sets of a manifest.
+
+    Args:
+        manifest: The Manifest.
+        jobs: Number of worker processes. Default: number of CPUs. With 1 job (or a single task), the tasks run in
+          the calling process. The gold files of gold sets that are split into several tasks are parsed in the
+          calling process and shared with the workers as SharedCorpus.
+        normalize_scopes: Whether to normalize scope length when calculating scope metrics. Default: True.
+
+    Returns: A dict from (system name, gold set name) to EvaluationResult, in the order of the manifest.
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    tasks = schedule(manifest, jobs)
+
+    if jobs > 1 and len(tasks) > 1:
+        # Gold sets split into several tasks are parsed once here and shared with the workers
+        num_tasks = Counter(name for name, _ in tasks)
+        shared_gold = {}
+        try:
+            for name in num_tasks:
+                if num_tasks[name] > 1:
+                    shared_gold[name] = SharedCorpus.from_file(manifest.gold[name])
+            task_args = [(shared_gold[name].handle if name in shared_gold else manifest.gold[name],
+                          [manifest.systems[system][name] for system in systems], normalize_scopes)
+                         for name, systems in tasks]
+            with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+                task_results = list(executor.map(_evaluate_task, task_args))
+        finally:
+            for corpus in shared_gold.values():
+                corpus.unlink()
+    else:
+        task_results = [evaluate_task(manifest.gold[name], [manifest.systems[system][name] for system in systems],
+                                      normalize_scopes)
+                        for name, systems in tasks]
+
+    results = {}
+    for (name, systems), system_results in zip(tasks, task_results):
+        for system, result in zip(systems, system_results):
+            results[(system, name)] = result
+    return {pair: results[pair] for pair in manifest.pairs()}
+
+
+def matrix_rows(results):
+    """Return the rows of the result matrix: a dict with the system and gold set name and all METRICS per pair."""
+    return [dict({"system": system, "gold": name}, **{metric: float(getattr(result, metric)) for metric in METRICS})
+            for (system, name), result in results.items()]
+
+
+def check_output_format(path, output_format=None):
+    """Return the format of an output file, checking that it can be written.
+
+    Args:
+        path: Path of the output file.
+        output_format: "csv", "json" or "parquet". Default: the extension of path.
+
+    Raises:
+        ValueError: If the format is unknown, or pyarrow is missing for Parquet.
+    """
+    if output_format is None:
+        output_format = os.path.splitext(path)[1][1:].lower()
+    if output_format not in FORMATS:
+        raise ValueError("Unknown output format {} (expected one of {})".format(output_format, ", ".join(FORMATS)))
+    if output_format == "parquet":
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError("Writing Parquet files requires pyarrow")
+    return output_format
+
+
+def write_matrix(results, path, output_format=None):
+    """Write the result matrix to a file.
+
+    Args:
+        results: The results as returned by evaluate_matrix.
+        path: Path of the output file.
+        output_format: "csv", "json" or "parquet". Default: the extension of path.
+
+    Raises:
+        ValueError: If the format is unknown, or pyarrow is missing for Parquet.
+    """
+    output_format = check_output_format(path, output_format)
+
+    rows = matrix_rows(results)
+    if output_format == "csv":
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=("system", "gold") + METRICS)
+            writer.writeheader()
+            writer.writerows(rows)
+    elif output_format == "json":
+        with open(path, "w") as f:
+            json.dump(rows, f, indent=2)
+    else:
+        import pyarrow
+        import pyarrow.parquet
+        table = pyarrow.table({column: [row[column] for row in rows] for column in ("system", "gold") + METRICS})
+        pyarrow.parquet.write_table(table, path)
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Evaluate several systems against several gold sets")
+    argparser.add_argument("manifest", type=str, help="path to the JSON manifest of gold sets and systems (required)")
+    argparser.add_argument("-j", "--jobs", type=int, default=None,
+                           help="number of worker processes, default: number of CPUs")
+    argparser.add_argument("-t", "--token-eval", dest="normalize_scopes", action="store_false",
+                           help="evaluate scopes on a per-token basis (i.e., do not normalize scope lengths)")
+    argparser.add_argument("-o", "--output", type=str, metavar="PATH",
+                           help="write the result matrix to PATH (format given by --format or the extension)")
+    argparser.add_argument("--format", choices=FORMATS, default=None, help="format of the output file")
+    argparser.set_defaults(normalize_scopes=True)
+    args = argparser.parse_args()
+
+    try:
+        manifest = Manifest.from_file(args.manifest)
+    except ValueError as e:
+        argparser.error(str(e))
+    if args.output:
+        if args.format is None and os.path.splitext(args.output)[1][1:].lower() not in FORMATS:
+            argparser.error("cannot infer the output format from {}, use --format".format(args.output))
+        # Before the evaluation, which may take long
+        try:
+            check_output_format(args.output, output_format=args.format)
+        except ValueError as e:
+            argparser.error(str(e))
+
+    results = evaluate_matrix(manifest, jobs=args.jobs, normalize_scopes=args.normalize_scopes)
+    print(format_result_table("System / gold set", [("{} / {}".format(system, name), None, None, result)
+                                                    for (system, name), result in results.items()]), end="")
+    if args.output:
+        try:
+            write_matrix(results, args.output, output_format=args.format)
+        except ValueError as e:
+            argparser.error(str(e))
@@ -4,7 +4,7 @@ Sentence objects from an iterator that returns CoNLL source lines. This logic
 can then be used in the Conll class or in pyconll.load.
 """
 
-from typing import Iterable, Iterator
+from typing import Iterable, Iterator, List
 
 from myconll.unit.sentence import Sentence
 
@@ -28,22 +28,18 @@ def _create_sentence(sent_lines: Iterable[str]) -> Sentence:
     return sentence
 
 
-def iter_sentences(lines_it: Iterable[str]) -> Iterator[Sentence]:
+def iter_sentence_lines(lines_it: Iterable[str]) -> Iterator[List[str]]:
     """
-    Iterate over the constructed sentences in the given lines.
-
-    This method correctly takes into account newpar and newdoc comments as well.
+    Iterate over the raw line blocks that make up the sentences in the given
+    lines, without parsing them.
 
     Args:
-        lines_it: An iterator over the lines to parse.
+        lines_it: An iterator over the lines to split into sentences.
 
     Yields:
-        An iterator over the constructed Sentence objects found in the source.
-
-    Raises:
-        ValueError: If there is an error constructing the Sentence.
+        The stripped, non-empty lines of each sentence as a list.
     """
-    sent_lines = []
+    sent_lines: List[str] = []
     for line in lines_it:
         line = line.strip()
 
@@ -52,11 +48,27 @@ def iter_sentences(lines_it: Iterable[str]) -> Iterator[Sentence]:
         if line:
             sent_lines.append(line)
         elif sent_lines:
-            sentence = _create_sentence(sent_lines)
-            sent_lines.clear()
-
-            yield sentence
+            yield sent_lines
+            sent_lines = []
 
     if sent_lines:
-        sentence = _create_sentence(sent_lines)
-        yield sentence
+        yield sent_lines
+
+
+def iter_sentences(lines_it: Iterable[str]) -> Iterator[Sentence]:
+    """
+    Iterate over the constructed sentences in the given lines.
+
+    This method correctly takes into account newpar and newdoc comments as well.
+
+    Args:
+        lines_it: An iterator over the lines to parse.
+
+    Yields:
+        An iterator over the constructed Sentence objects found in the source.
+
+    Raises:
+        ValueError: If there is an error constructing the Sentence.
+    """
+    for sent_lines in iter_sentence_lines(lines_it):
+        yield _create_sentence(sent_lines)
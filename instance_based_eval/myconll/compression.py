@@ -0,0 +1,194 @@
+"""
+Transparent reading of compressed CoNLL files. Compression is detected from
+the magic bytes at the start of the file (not from the file extension) and the
+data is decompressed in a streaming fashion through the standard library
+codecs, so that no temporary decompressed copy is ever written to disk.
+
+For compressed input, reading and decompressing happens on a background
+thread which feeds fixed-size chunks into a bounded queue. This way file I/O
+and decompression overlap with whatever the consumer (usually the parser) does
+with the data.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import queue
+import threading
+from typing import IO, Optional
+
+# Magic bytes of the supported compression formats, mapped to the stdlib
+# opener that can decompress them.
+_MAGIC_BYTES = (
+    (b'\x1f\x8b', 'gzip', gzip.open),
+    (b'\xfd7zXZ\x00', 'xz', lzma.open),
+    (b'BZh', 'bz2', bz2.open),
+)
+
+_MAX_MAGIC_LEN = max(len(magic) for magic, _, _ in _MAGIC_BYTES)
+
+CHUNK_SIZE = 1 << 20
+QUEUE_SIZE = 8
+
+
+def detect_compression(filename: str) -> Optional[str]:
+    """
+    Detect the compression format of a file from its magic bytes.
+
+    Args:
+        filename: The location of the file.
+
+    Returns:
+        The name of the compression format ('gzip', 'xz' or 'bz2'), or None if
+        the file is not compressed in any of the supported formats.
+
+    Raises:
+        IOError: If there is an error opening the given filename.
+    """
+    with open(filename, 'rb') as f:
+        head = f.read(_MAX_MAGIC_LEN)
+
+    for magic, name, _ in _MAGIC_BYTES:
+        if head.startswith(magic):
+            return name
+
+    return None
+
+
+def open_text(filename: str, encoding: str = 'utf-8') -> IO[str]:
+    """
+    Open a possibly compressed file for reading in text mode.
+
+    Uncompressed files are opened directly. Compressed files are decompressed
+    on a background thread while the returned stream is being consumed.
+
+    Args:
+        filename: The location of the file.
+        encoding: The text encoding of the (decompressed) file contents.
+
+    Returns:
+        A text stream over the decompressed file contents. It should be closed
+        after use, preferably by using it as a context manager.
+
+    Raises:
+        IOError: If there is an error opening the given filename.
+    """
+    compression = detect_compression(filename)
+    if compression is None:
+        return open(filename, encoding=encoding)
+
+    opener = next(op for _, name, op in _MAGIC_BYTES if name == compression)
+    raw = _ThreadedDecompressor(opener, filename)
+
+    return io.TextIOWrapper(io.BufferedReader(raw, CHUNK_SIZE),
+                            encoding=encoding)
+
+
+def read_text(filename: str, encoding: str = 'utf-8') -> str:
+    """
+    Read the full contents of a possibly compressed file as a string.
+
+    Args:
+        filename: The location of the file.
+        encoding: The text encoding of the (decompressed) file contents.
+
+    Returns:
+        The decompressed contents of the file.
+
+    Raises:
+        IOError: If there is an error opening the given filename.
+    """
+    with open_text(filename, encoding=encoding) as f:
+        return f.read()
+
+
+class _ThreadedDecompressor(io.RawIOBase):
+    """
+    A raw binary stream whose data is read and decompressed by a background
+    thread. The thread pushes chunks of decompressed bytes into a bounded
+    queue, from which readinto pulls. Errors raised on the background thread
+    are re-raised in the consuming thread.
+    """
+    def __init__(self, opener, filename: str) -> None:
+        """
+        Start decompressing the given file on a background thread.
+
+        Args:
+            opener: The stdlib open function of the compression format.
+            filename: The location of the compressed file.
+        """
+        super().__init__()
+        self._queue: 'queue.Queue' = queue.Queue(maxsize=QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._pending = b''
+        self._eof = False
+
+        # Open in the calling thread so that errors such as a missing file
+        # surface immediately.
+        self._source = opener(filename, 'rb')
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+
+    def _produce(self) -> None:
+        """
+        Background thread: read decompressed chunks until EOF or until stopped.
+        """
+        try:
+            while not self._stop.is_set():
+                chunk = self._source.read(CHUNK_SIZE)
+                self._put(chunk)
+                if not chunk:
+                    break
+        except Exception as e:  # pylint: disable=broad-except
+            self._put(e)
+        finally:
+            self._source.close()
+
+    def _put(self, item) -> None:
+        """
+        Put an item in the queue, giving up if the consumer closed the stream.
+        """
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        """
+        Fill the provided buffer with decompressed data.
+
+        Args:
+            b: The writable buffer to fill.
+
+        Returns:
+            The number of bytes written into the buffer, 0 on EOF.
+        """
+        if not self._pending and not self._eof:
+            item = self._queue.get()
+            if isinstance(item, Exception):
+                self._eof = True
+                raise item
+            if not item:
+                self._eof = True
+            self._pending = memoryview(item)
+
+        n = min(len(b), len(self._pending))
+        b[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+
+        return n
+
+    def close(self) -> None:
+        """
+        Close the stream and stop the background thread.
+        """
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+        super().close()
@@ -0,0 +1,321 @@
+"""
+Sentence index for random access into (uncompressed) CoNLL files.
+
+The index holds, for every sentence of a file, the byte offset and length of
+its block of lines, its number of tokens, its document id (first column of the
+first token line) and whether it is annotated with negation (in the *SEM format,
+sentences without negation have '***' in the eighth column). It is built in a
+single streaming pass over the file and stored next to it, so that later runs
+only need to read the index. A stored index is only used if the size and
+modification time of the file still match the ones recorded in the index.
+"""
+
+import json
+import os
+import sys
+from array import array
+from typing import Iterator, List, Optional
+
+from myconll.compression import detect_compression
+from myconll.unit.token import Token
+
+INDEX_SUFFIX = '.sentidx'
+FORMAT_VERSION = 1
+
+_COMMENT_MARKER = b'#'
+_NO_NEGATION = b'***'
+_NEGATION_COLUMN = 7
+
+
+class SentenceIndex:
+    """
+    The sentence index of a CoNLL file. Sentences are numbered in file order,
+    as in Conll and iter_sentences.
+    """
+    def __init__(self, source_size: int, source_mtime_ns: int) -> None:
+        """
+        Create an empty index.
+
+        Args:
+            source_size: The size of the indexed file in bytes.
+            source_mtime_ns: The modification time of the indexed file in ns.
+        """
+        self.source_size = source_size
+        self.source_mtime_ns = source_mtime_ns
+
+        self.offsets = array('q')
+        self.lengths = array('q')
+        self.num_tokens = array('I')
+        self.has_negation = array('B')
+        self.doc_numbers = array('I')
+        self.doc_ids: List[str] = []  # Distinct document ids, in order of appearance
+
+        self._doc_numbers_by_id = {}
+
+    def __len__(self) -> int:
+        """
+        Returns:
+            The number of sentences in the index.
+        """
+        return len(self.offsets)
+
+    def add(self, offset: int, length: int, num_tokens: int, doc_id: str,
+            has_negation: bool) -> None:
+        """
+        Append a sentence to the index.
+
+        Args:
+            offset: The byte offset of the first line of the sentence.
+            length: The length of the sentence block in bytes.
+            num_tokens: The number of token lines of the sentence.
+            doc_id: The document id of the sentence.
+            has_negation: Whether the sentence is annotated with negation.
+        """
+        doc_number = self._doc_numbers_by_id.get(doc_id)
+        if doc_number is None:
+            doc_number = len(self.doc_ids)
+            self._doc_numbers_by_id[doc_id] = doc_number
+            self.doc_ids.append(doc_id)
+
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.num_tokens.append(num_tokens)
+        self.has_negation.append(has_negation)
+        self.doc_numbers.append(doc_number)
+
+    def doc_id(self, idx: int) -> str:
+        """
+        Args:
+            idx: The number of the sentence.
+
+        Returns:
+            The document id of the sentence.
+        """
+        return self.doc_ids[self.doc_numbers[idx]]
+
+    def sentences_of_doc(self, doc_id: str) -> List[int]:
+        """
+        Args:
+            doc_id: A document id.
+
+        Returns:
+            The numbers of all sentences of the document.
+        """
+        doc_number = self._doc_numbers_by_id.get(doc_id)
+        return [idx for idx, number in enumerate(self.doc_numbers)
+                if number == doc_number]
+
+    def negation_sentences(self) -> List[int]:
+        """
+        Returns:
+            The numbers of all sentences that are annotated with negation.
+        """
+        return [idx for idx, flag in enumerate(self.has_negation) if flag]
+
+    def matches(self, filename: str) -> bool:
+        """
+        Check whether the index is up to date for the given file.
+
+        Args:
+            filename: The location of the indexed file.
+
+        Returns:
+            True if size and modification time of the file match the index.
+        """
+        stat = os.stat(filename)
+        return (stat.st_size, stat.st_mtime_ns) == (self.source_size,
+                                                    self.source_mtime_ns)
+
+    def save(self, index_path: str) -> None:
+        """
+        Write the index to a file.
+
+        Args:
+            index_path: The location of the index file.
+
+        Raises:
+            IOError: If the index file cannot be written.
+        """
+        header = {
+            'format': FORMAT_VERSION,
+            'byteorder': sys.byteorder,
+            'source_size': self.source_size,
+            'source_mtime_ns': self.source_mtime_ns,
+            'num_sentences': len(self),
+            'doc_ids': self.doc_ids,
+        }
+        tmp_path = index_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            for arr in (self.offsets, self.lengths, self.num_tokens,
+                        self.has_negation, self.doc_numbers):
+                arr.tofile(f)
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def load(cls, index_path: str) -> Optional['SentenceIndex']:
+        """
+        Read an index file.
+
+        Args:
+            index_path: The location of the index file.
+
+        Returns:
+            The SentenceIndex, or None if the file does not exist or has an
+            incompatible format.
+        """
+        if not os.path.exists(index_path):
+            return None
+
+        with open(index_path, 'rb') as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                return None
+            if (header.get('format'), header.get('byteorder')) != (FORMAT_VERSION,
+                                                                   sys.byteorder):
+                return None
+
+            index = cls(header['source_size'], header['source_mtime_ns'])
+            num_sentences = header['num_sentences']
+            for arr in (index.offsets, index.lengths, index.num_tokens,
+                        index.has_negation, index.doc_numbers):
+                arr.fromfile(f, num_sentences)
+            index.doc_ids = header['doc_ids']
+            index._doc_numbers_by_id = {
+                doc_id: number for number, doc_id in enumerate(index.doc_ids)
+            }
+
+        return index
+
+
+def build_index(filename: str) -> SentenceIndex:
+    """
+    Build the sentence index of a file in one streaming pass.
+
+    Sentence boundaries are the same as in iter_sentence_lines, i.e. sentences
+    are separated by lines that are empty or only contain whitespace.
+
+    Args:
+        filename: The location of the file. It must not be compressed.
+
+    Returns:
+        The SentenceIndex of the file.
+
+    Raises:
+        IOError: If there is an error opening the given filename.
+        ValueError: If the file is compressed (compressed files cannot be
+            accessed by seeking).
+    """
+    if detect_compression(filename) is not None:
+        raise ValueError('Cannot index compressed file {}'.format(filename))
+
+    stat = os.stat(filename)
+    index = SentenceIndex(stat.st_size, stat.st_mtime_ns)
+
+    delimiter = Token.FIELD_DELIMITER.encode('utf-8')
+    with open(filename, 'rb') as f:
+        pos = 0
+        start = None  # Offset of the current sentence
+        end = 0  # End of the last line of the current sentence
+        num_tokens = 0
+        first_fields = None
+        for line in f:
+            line_start = pos
+            pos += len(line)
+            stripped = line.strip()
+
+            if not stripped:
+                if start is not None:
+                    _add_sentence(index, start, end, num_tokens, first_fields)
+                    start = None
+                continue
+
+            if start is None:
+                start = line_start
+                num_tokens = 0
+                first_fields = None
+            end = pos
+            if not stripped.startswith(_COMMENT_MARKER):
+                num_tokens += 1
+                if first_fields is None:
+                    first_fields = stripped.split(delimiter)
+
+        if start is not None:
+            _add_sentence(index, start, end, num_tokens, first_fields)
+
+    return index
+
+
+def _add_sentence(index: SentenceIndex, start: int, end: int, num_tokens: int,
+                  first_fields: Optional[List[bytes]]) -> None:
+    """
+    Add a sentence found by build_index to the index.
+    """
+    if first_fields:
+        doc_id = first_fields[0].decode('utf-8')
+        has_negation = (len(first_fields) > _NEGATION_COLUMN
+                        and first_fields[_NEGATION_COLUMN] != _NO_NEGATION)
+    else:
+        doc_id = ''
+        has_negation = False
+    index.add(start, end - start, num_tokens, doc_id, has_negation)
+
+
+def load_index(filename: str, index_path: Optional[str] = None) -> SentenceIndex:
+    """
+    Get the sentence index of a file. A stored index is used if it matches the
+    size and modification time of the file; otherwise the index is built and
+    stored (if the index file cannot be written, the index is only kept in
+    memory).
+
+    Args:
+        filename: The location of the file. It must not be compressed.
+        index_path: The location of the index file. Default: the file name
+            followed by '.sentidx'.
+
+    Returns:
+        The SentenceIndex of the file.
+
+    Raises:
+        IOError: If there is an error opening the given filename.
+        ValueError: If the file is compressed.
+    """
+    if index_path is None:
+        index_path = filename + INDEX_SUFFIX
+
+    index = SentenceIndex.load(index_path)
+    if index is not None and index.matches(filename):
+        return index
+
+    index = build_index(filename)
+    try:
+        index.save(index_path)
+    except OSError:
+        pass
+
+    return index
+
+
+def iter_index_lines(f, index: SentenceIndex,
+                     indices: Optional[List[int]] = None) -> Iterator[List[str]]:
+    """
+    Read sentences by seeking to their offsets.
+
+    Args:
+        f: The indexed file, opened in binary mode.
+        index: The SentenceIndex of the file.
+        indices: The numbers of the sentences to read, in any order. Default:
+            all sentences.
+
+    Yields:
+        The stripped, non-empty lines of each sentence as a list (as
+        iter_sentence_lines does).
+    """
+    if indices is None:
+        indices = range(len(index))
+
+    for idx in indices:
+        f.seek(index.offsets[idx])
+        block = f.read(index.lengths[idx]).decode('utf-8')
+        yield [line.strip() for line in block.split('\n') if line.strip()]
@@ -5,11 +5,13 @@ storing Conll objects in memory. This module is the main entrance to pyconll's
 functionalities.
 """
 
-from typing import Iterator
+from typing import Iterator, List
 
-from myconll._parser import iter_sentences
-from myconll.unit.conll import Conll
+from myconll._parser import iter_sentences, iter_sentence_lines
+from myconll.compression import open_text
+from myconll.unit.conll import Conll, IndexedConll
 from myconll.unit.sentence import Sentence
+from myconll.unit.token import Token
 
 
 def load_from_string(source: str) -> Conll:
@@ -35,6 +37,9 @@ def load_from_file(filename: str) -> Conll:
     """
     Load a CoNLL-U file given its location.
 
+    gzip, xz and bz2 compressed files are detected by their magic bytes and
+    decompressed on the fly.
+
     Args:
         filename: The location of the file.
 
@@ -45,12 +50,34 @@ def load_from_file(filename: str) -> Conll:
         IOError: If there is an error opening the given filename.
         ParseError: If there is an error parsing the input into a Conll object.
     """
-    with open(filename, encoding='utf-8') as f:
+    with open_text(filename) as f:
         c = Conll(f)
 
     return c
 
 
+def load_indexed(filename: str) -> IndexedConll:
+    """
+    Open an uncompressed CoNLL-U file for random access to its sentences.
+
+    A sentence index (byte offsets, token counts, document ids and negation
+    flags of all sentences) is stored next to the file and reused as long as
+    size and modification time of the file do not change. Sentences are only
+    parsed when they are accessed.
+
+    Args:
+        filename: The location of the file.
+
+    Returns:
+        An IndexedConll object for the file. It should be closed after use.
+
+    Raises:
+        IOError: If there is an error opening the given filename.
+        ValueError: If the file is compressed.
+    """
+    return IndexedConll(filename)
+
+
 def iter_from_string(source: str) -> Iterator[Sentence]:
     """
     Iterate over a CoNLL-U string's sentences.
@@ -76,6 +103,9 @@ def iter_from_file(filename: str) -> Iterator[Sentence]:
     """
     Iterate over a CoNLL-U file's sentences.
 
+    gzip, xz and bz2 compressed files are detected by their magic bytes and
+    decompressed on a background thread while the sentences are parsed.
+
     Args:
         filename: The name of the file whose sentences should be iterated over.
 
@@ -86,6 +116,29 @@ def iter_from_file(filename: str) -> Iterator[Sentence]:
         IOError if there is an error opening the file.
         ParseError: If there is an error parsing the input into a Conll object.
     """
-    with open(filename, encoding='utf-8') as f:
+    with open_text(filename) as f:
         for sentence in iter_sentences(f):
             yield sentence
+
+
+def iter_rows_from_file(filename: str) -> Iterator[List[List[str]]]:
+    """
+    Iterate over a CoNLL file's sentences as lists of token rows, without
+    creating Sentence or Token objects.
+
+    Each row holds the column values of one token line, so the same parsed
+    lines can be handed to several consumers (see Token.from_fields). Comment
+    lines are not treated specially, as in the *SEM format there are none.
+
+    Args:
+        filename: The name of the file whose sentences should be iterated over.
+
+    Yields:
+        For each sentence, the list of its token rows.
+
+    Raises:
+        IOError if there is an error opening the file.
+    """
+    with open_text(filename) as f:
+        for sent_lines in iter_sentence_lines(f):
+            yield [line.split(Token.FIELD_DELIMITER) for line in sent_lines]
@@ -2,10 +2,12 @@
 Defines the Conll type and the associated parsing and output logic.
 """
 
-from typing import Any, Iterable, Iterator, List, Union, MutableSequence, overload
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Union, MutableSequence, overload
 
 import myconll._parser
+import myconll.writer
 from myconll.conllable import Conllable
+from myconll.index import SentenceIndex, iter_index_lines, load_index
 from myconll.unit.sentence import Sentence
 
 
@@ -52,16 +54,15 @@ class Conll(MutableSequence[Sentence], Conllable):
         Write the Conll object to something that is writable.
 
         For file writing, this method is more efficient than calling conll then
-        writing since no string of the entire Conll object is created. The output
-        includes a final newline as detailed in the CoNLL-U specification.
+        writing since no string of the entire Conll object is created; the
+        output is written in chunks (see myconll.writer). The output includes a
+        final newline as detailed in the CoNLL-U specification.
 
         Args:
             writable: The writable object such as a file. Must have a write
                 method.
         """
-        for sentence in self._sentences:
-            writable.write(sentence.conll())
-            writable.write('\n\n')
+        myconll.writer.write_sentences(writable, self._sentences)
 
     def insert(self, index: int, value: Sentence) -> None:
         """
@@ -170,3 +171,134 @@ class Conll(MutableSequence[Sentence], Conllable):
             The size of the CoNLL-U file in sentences.
         """
         return len(self._sentences)
+
+
+class IndexedConll(Sequence[Sentence], Conllable):
+    """
+    A read-only view of an uncompressed CoNLL file that is backed by a sentence
+    index (see myconll.index) instead of holding all sentences in memory.
+    Sentences are parsed on access by seeking to their offset in the file, so
+    indexing is O(1) in the size of the file. The file is kept open until close
+    is called (or the object is used as a context manager).
+    """
+    def __init__(self, filename: str,
+                 index: Optional[SentenceIndex] = None) -> None:
+        """
+        Open an indexed CoNLL file.
+
+        Args:
+            filename: The location of the file. It must not be compressed.
+            index: The SentenceIndex of the file. Default: the stored index of
+                the file, which is built if it is missing or outdated.
+
+        Raises:
+            IOError: If there is an error opening the given filename.
+            ValueError: If the file is compressed.
+        """
+        self.index = index if index is not None else load_index(filename)
+        self._file = open(filename, 'rb')
+
+    def close(self) -> None:
+        """
+        Close the underlying file.
+        """
+        self._file.close()
+
+    def __enter__(self) -> 'IndexedConll':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def conll(self) -> str:
+        """
+        Output all sentences to a CoNLL-U formatted string.
+
+        Returns:
+            The sentences as a string. This string will end in a newline.
+        """
+        components = [sent.conll() for sent in self]
+        components.append('')
+
+        return '\n\n'.join(components)
+
+    def sentence_lines(self, key: int) -> List[str]:
+        """
+        Read the lines of a sentence without parsing them.
+
+        Args:
+            key: The number of the sentence (negative numbers count from the
+                end).
+
+        Returns:
+            The stripped, non-empty lines of the sentence.
+        """
+        return next(iter_index_lines(self._file, self.index,
+                                     [range(len(self))[key]]))
+
+    def iter_subset(self, indices: Iterable[int]) -> Iterator[Sentence]:
+        """
+        Iterate over the given sentences, parsing only these.
+
+        Args:
+            indices: The numbers of the sentences, in any order.
+
+        Yields:
+            The sentences, in the given order.
+        """
+        for lines in iter_index_lines(self._file, self.index, indices):
+            yield myconll._parser._create_sentence(lines)
+
+    def __iter__(self) -> Iterator[Sentence]:
+        """
+        Iterate over all sentences of the file.
+
+        Yields:
+            The sentences, in file order.
+        """
+        return self.iter_subset(range(len(self)))
+
+    @overload
+    def __getitem__(self, key: int) -> Sentence:
+        pass
+
+    @overload
+    def __getitem__(self, key: slice) -> Conll:
+        pass
+
+    def __getitem__(self, key):
+        """
+        Index a sentence by key value.
+
+        Args:
+            key: The key to index the sentence by. This key can either be a
+                numeric key, or a slice.
+
+        Returns:
+            The corresponding sentence if the key is an int or the sentences
+            if the key is a slice in the form of a (regular) Conll object.
+
+        Raises:
+            IndexError: If the key is out of range.
+            TypeError: If the key is not an integer or slice.
+        """
+        if isinstance(key, int):
+            return myconll._parser._create_sentence(self.sentence_lines(key))
+
+        if isinstance(key, slice):
+            sliced_conll = Conll([])
+            sliced_conll._sentences = list(
+                self.iter_subset(range(len(self))[key]))
+
+            return sliced_conll
+
+        raise TypeError('Conll indices must be ints or slices.')
+
+    def __len__(self) -> int:
+        """
+        Returns the number of sentences in the file.
+
+        Returns:
+            The size of the file in sentences.
+        """
+        return len(self.index)
@@ -276,8 +276,12 @@ class Sentence(Sequence[Token], Conllable):
 
             lines.append(line)
 
+        # all token lines get as many instance columns as the sentence has
+        # negation instances
+        num_neg_instances = max(
+            (token.num_neg_instances() for token in self._tokens), default=0)
         for token in self._tokens:
-            lines.append(token.conll())
+            lines.append(token.conll(num_neg_instances))
 
         return '\n'.join(lines)
 
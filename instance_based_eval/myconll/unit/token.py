@@ -7,7 +7,7 @@ import sys
 
 import functools
 import math
-from typing import Callable, ClassVar, Dict, Optional, Set, Tuple
+from typing import Callable, ClassVar, Dict, List, Optional, Set, Tuple
 
 from myconll.conllable import Conllable
 from myconll.exception import ParseError, FormatError
@@ -664,7 +664,34 @@ class Token(Conllable):
             source = source[:-1]
 
         fields = source.split(Token.FIELD_DELIMITER)
+        self._init_fields(fields, empty)
 
+    @classmethod
+    def from_fields(cls, fields: List[str], empty: bool = False) -> 'Token':
+        """
+        Construct a Token from the columns of a token line that has already been
+        split on the field delimiter, e.g. when the same lines are also read by
+        other code.
+
+        Args:
+            fields: The column values of the token line.
+            empty: See the constructor.
+
+        Returns:
+            The created Token.
+        """
+        token = cls.__new__(cls)
+        token._init_fields(fields, empty)
+        return token
+
+    def _init_fields(self, fields: List[str], empty: bool) -> None:
+        """
+        Assign the attributes of the Token from the columns of its line.
+
+        Args:
+            fields: The column values of the token line.
+            empty: See the constructor.
+        """
         # Modified: skipping this check because in the negation data, the number of cols varies
         #if len(fields) != 10:
         #    error_msg = 'The number of columns per token line must be 10. Invalid token: {}'.format(
@@ -738,13 +765,32 @@ class Token(Conllable):
         """
         return '-' in self.id
 
-    def conll(self) -> str:
+    def num_neg_instances(self) -> int:
+        """
+        Get the number of negation instances annotated on this Token's line.
+
+        Returns:
+            One more than the highest negation instance index of the cue,
+            scope and event annotations, or 0 if the token has none.
+        """
+        indices = [i for annotations in (self.cue, self.scope, self.event)
+                   if annotations for i, _ in annotations]
+        return max(indices) + 1 if indices else 0
+
+    def conll(self, num_neg_instances: Optional[int] = None) -> str:
         """
         Convert this Token to its CoNLL-U representation.
 
         A Token's CoNLL-U representation is a line. Note that this method does
         not include a newline at the end.
 
+        Args:
+            num_neg_instances: The number of negation instances of the sentence,
+                i.e. the number of (cue, scope, event) column triples to write.
+                If 0, the placeholder for sentences without negation is
+                written. Default: the number of instances of this token (see
+                num_neg_instances).
+
         Returns:
             A string representing the Token in CoNLL-U format.
         """
@@ -759,29 +805,19 @@ class Token(Conllable):
         xpos = _unit_conll_map(self.xpos, Token.EMPTY)
         parse = _unit_conll_map(self.parse, Token.EMPTY)
 
-        MAX_NEG_INST_PER_SENT = 4 # TODO set this globally from file instead
-        neg_inst_items = []
-        for i in range(MAX_NEG_INST_PER_SENT):
-            cue = Token.EMPTY
-            scope = Token.EMPTY
-            event = Token.EMPTY
-            if self.cue:
-                for c in self.cue:
-                    if c[0] == i:
-                        # a negation instance exists for this index
-                        cue = _unit_conll_map(c[1], Token.EMPTY)
-            if self.scope:
-                for s in self.scope:
-                    if s[0] == i:
-                        # a scope annotation exists for this index
-                        scope = _unit_conll_map(s[1], Token.EMPTY)
-            # TODO? events still broken?
-            if self.event:
-                for e in self.event:
-                    if e[0] == i:
-                        # a scope annotation exists for this index
-                        scope = _unit_conll_map(e[1], Token.EMPTY)
-            neg_inst_items += [cue, scope, event]
+        if num_neg_instances is None:
+            num_neg_instances = self.num_neg_instances()
+
+        if num_neg_instances == 0:
+            neg_inst_items = [Token.PLACEHOLDER]
+        else:
+            # cue, scope and event columns of all instances, filled in a single
+            # pass over the annotations
+            neg_inst_items = [Token.EMPTY] * (3 * num_neg_instances)
+            for offset, annotations in enumerate((self.cue, self.scope, self.event)):
+                if annotations:
+                    for i, value in annotations:
+                        neg_inst_items[3 * i + offset] = _unit_conll_map(value, Token.EMPTY)
 
         #feats = _dict_conll_map(self.feats, Token.EMPTY,
         #                        Token.COMPONENT_DELIMITER, Token.AV_SEPARATOR,
@@ -0,0 +1,170 @@
+"""
+Buffered bulk writer for corpora in the *SEM format.
+
+Sentences can be written either from parsed Sentence objects, from token rows
+(lists of column values), or directly from the tokens of a sentence and its
+negation instances, without building Token objects. Each sentence gets exactly
+as many (cue, scope, event) column triples as it has negation instances, or
+the '***' placeholder if it has none. The output is collected in memory and
+written in large chunks.
+"""
+
+from typing import Any, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from myconll.unit.sentence import Sentence
+from myconll.unit.token import Token
+
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+# The cue, scope or event of an instance: either a mapping from token index to
+# the annotated (part of the) word, or the indices of tokens that are annotated
+# with their full word form.
+Annotation = Union[Mapping[int, str], Iterable[int]]
+Instance = Tuple[Annotation, Annotation, Annotation]
+
+
+class StarsemWriter:
+    """
+    Writes sentences in the *SEM format to something that is writable (such as
+    a file), buffering the output in chunks of about buffer_size characters.
+    The buffer is flushed when the writer is closed or used as a context
+    manager; the underlying writable is not closed.
+    """
+    def __init__(self, writable: Any,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        """
+        Create a writer.
+
+        Args:
+            writable: The writable object such as a file. Must have a write
+                method.
+            buffer_size: The number of characters to collect before writing
+                them. Default: 1 MiB.
+        """
+        self._writable = writable
+        self.buffer_size = buffer_size
+        self._buffer: List[str] = []
+        self._buffered = 0
+
+    def __enter__(self) -> 'StarsemWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.flush()
+
+    def _append(self, sentence_str: str) -> None:
+        """
+        Add the string of a sentence (including its final blank line) to the
+        buffer, and write the buffer if it is full.
+        """
+        self._buffer.append(sentence_str)
+        self._buffered += len(sentence_str)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write all buffered output.
+        """
+        if self._buffer:
+            self._writable.write(''.join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+
+    def write_sentence(self, sentence: Sentence) -> None:
+        """
+        Write a parsed Sentence.
+
+        Args:
+            sentence: The sentence to write.
+        """
+        self._append(sentence.conll() + '\n\n')
+
+    def write_rows(self, rows: Iterable[Sequence[str]]) -> None:
+        """
+        Write a sentence given as token rows.
+
+        Args:
+            rows: The column values of each token line.
+        """
+        delimiter = Token.FIELD_DELIMITER
+        self._append('\n'.join(delimiter.join(cols) for cols in rows) + '\n\n')
+
+    def write_instances(self,
+                        doc_id: str,
+                        sent_id: Union[int, str],
+                        forms: Sequence[str],
+                        instances: Sequence[Instance],
+                        lemmas: Optional[Sequence[str]] = None,
+                        xpos: Optional[Sequence[str]] = None,
+                        parses: Optional[Sequence[str]] = None) -> None:
+        """
+        Write a sentence directly from its tokens and negation instances.
+
+        Args:
+            doc_id: The document id of the sentence.
+            sent_id: The sentence id within the document.
+            forms: The word forms of the tokens.
+            instances: The negation instances of the sentence, each a triple
+                (cue, scope, event). Each of them is either a mapping from
+                token index to the annotated (part of the) word, e.g. for
+                affixal cues, or an iterable of token indices annotated with
+                their full word form.
+            lemmas: The lemmas of the tokens. Default: the lowercased forms.
+            xpos: The POS tags of the tokens. Default: empty ('_').
+            parses: The syntax column of the tokens. Default: empty ('_').
+        """
+        num_tokens = len(forms)
+        empty = Token.EMPTY
+
+        # one column per instance part, filled from the (sparse) annotations
+        if instances:
+            columns = []
+            for instance in instances:
+                for annotation in instance:
+                    column = [empty] * num_tokens
+                    if isinstance(annotation, Mapping):
+                        for token_idx, value in annotation.items():
+                            column[token_idx] = value
+                    else:
+                        for token_idx in annotation:
+                            column[token_idx] = forms[token_idx]
+                    columns.append(column)
+            instance_cols = [
+                Token.FIELD_DELIMITER.join(values) for values in zip(*columns)
+            ]
+        else:
+            instance_cols = [Token.PLACEHOLDER] * num_tokens
+
+        if lemmas is None:
+            lemmas = [form.lower() for form in forms]
+        if xpos is None:
+            xpos = [empty] * num_tokens
+        if parses is None:
+            parses = [empty] * num_tokens
+
+        delimiter = Token.FIELD_DELIMITER
+        doc_id = str(doc_id)
+        sent_id = str(sent_id)
+        lines = [
+            delimiter.join((doc_id, sent_id, str(token_idx), forms[token_idx],
+                            lemmas[token_idx], xpos[token_idx],
+                            parses[token_idx], instance_cols[token_idx]))
+            for token_idx in range(num_tokens)
+        ]
+        self._append('\n'.join(lines) + '\n\n')
+
+
+def write_sentences(writable: Any, sentences: Iterable[Sentence],
+                    buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+    """
+    Write sentences in the *SEM format with a buffered StarsemWriter.
+
+    Args:
+        writable: The writable object such as a file. Must have a write method.
+        sentences: The sentences to write.
+        buffer_size: The number of characters to collect before writing them.
+    """
+    with StarsemWriter(writable, buffer_size=buffer_size) as writer:
+        for sentence in sentences:
+            writer.write_sentence(sentence)
@@ -0,0 +1,232 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Evaluation of N-best system output: k candidate annotations (hypotheses) per sentence, e.g. from beam search.
+
+The hypotheses are given as k aligned system files or as k column groups of one system file (see layers.py), in
+rank order. In one pass over the sentences, the sufficient statistics of the instance-based evaluation (see
+EvaluationCounts.STATS_FIELDS) are computed for every hypothesis of a sentence, as a k x STATS_FIELDS array, and
+added up into
+  * the totals of every hypothesis (hypothesis 1 being the first-best output);
+  * the oracle totals: per sentence, the statistics of the hypothesis with the best sentence-level scope F1
+    (ties are broken by cue F1, then by rank);
+  * the expected totals: per sentence, the statistics of all hypotheses weighted by their probability. The
+    probabilities are the softmax of the hypothesis scores (log-probabilities, one line of k scores per sentence
+    in a score file), or uniform without a score file. The expected metrics are computed from the expected counts.
+"""
+
+import numpy as np
+
+from eval_utils import EvaluationCounts, format_result_table
+from layers import AnnotationLayer, iter_layer_rows
+from myconll.compression import open_text
+from myconll.unit.token import Token
+from negation_instance import build_sentence_instances
+
+FIELDS = EvaluationCounts.STATS_FIELDS
+NUM_GOLD = FIELDS.index("num_instances_gold")
+NUM_SYSTEM = FIELDS.index("num_instances_system")
+NUM_MATCHED = FIELDS.index("num_instances_matched")
+SCOPE_PRECISION_NUM = FIELDS.index("scope_precision_numerator")
+SCOPE_RECALL_NUM = FIELDS.index("scope_recall_numerator")
+NUM_SCOPE_TOKENS_GOLD = FIELDS.index("num_scope_tokens_gold")
+NUM_SCOPE_TOKENS_SYSTEM = FIELDS.index("num_scope_tokens_system")
+
+
+class NBestCounts:
+    """Sufficient statistics of an N-best evaluation run, accumulated sentence by sentence."""
+    def __init__(self, num_hypotheses, normalize_scopes=True):
+        """
+        Args:
+            num_hypotheses: The number k of hypotheses per sentence.
+            normalize_scopes: Whether scope metrics are normalized by scope length. Default: True.
+        """
+        self.num_hypotheses = num_hypotheses
+        self.normalize_scopes = normalize_scopes
+
+        self.hypotheses = np.zeros((num_hypotheses, len(FIELDS)))  # Totals of every hypothesis
+        self.oracle = np.zeros(len(FIELDS))
+        self.expected = np.zeros(len(FIELDS))
+        self.oracle_choices = np.zeros(num_hypotheses, dtype=np.int64)  # How often each hypothesis was the oracle
+
+    def sentence_stats(self, gold_sent, system_sents):
+        """Return the statistics of every hypothesis of a sentence as a k x STATS_FIELDS array.
+
+        Args:
+            gold_sent: The gold NegationInstances of the sentence.
+            system_sents: For every hypothesis, its NegationInstances of the sentence.
+        """
+        stats = np.empty((self.num_hypotheses, len(FIELDS)))
+        for row, system_sent in zip(stats, system_sents):
+            counts = EvaluationCounts(normalize_scopes=self.normalize_scopes)
+            counts.add_sentence(gold_sent, system_sent)
+            row[:] = counts.to_stats()
+        return stats
+
+    def add_sentence(self, gold_sent, system_sents, scores=None):
+        """Add the counts for a single sentence.
+
+        Args:
+            gold_sent: The gold NegationInstances of the sentence.
+            system_sents: For every hypothesis, its NegationInstances of the sentence.
+            scores: The scores (log-probabilities) of the hypotheses, or None for uniform weights. Default: None.
+        """
+        stats = self.sentence_stats(gold_sent, system_sents)
+        self.hypotheses += stats
+
+        best = oracle_choice(stats, self.normalize_scopes)
+        self.oracle += stats[best]
+        self.oracle_choices[best] += 1
+
+        self.expected += hypothesis_weights(scores, self.num_hypotheses) @ stats
+
+    def to_results(self):
+        """Compute the evaluation metrics of every hypothesis, the oracle and the expected counts.
+
+        Returns: A dict from name ("hypothesis 1", ..., "oracle", "expected") to EvaluationResult.
+        """
+        results = {"hypothesis {}".format(rank + 1): self._result(stats)
+                   for rank, stats in enumerate(self.hypotheses)}
+        results["oracle"] = self._result(self.oracle)
+        results["expected"] = self._result(self.expected)
+        return results
+
+    def _result(self, stats):
+        # Not EvaluationCounts.from_stats, which rounds the integer counters (the expected counts are fractional)
+        counts = EvaluationCounts(normalize_scopes=self.normalize_scopes)
+        for field, value in zip(FIELDS, stats):
+            setattr(counts, field, float(value))
+        return counts.to_result(allow_empty=True)
+
+    def __str__(self):
+        rows = [(name, stats[NUM_GOLD], stats[NUM_SYSTEM], result)
+                for (name, result), stats in zip(self.to_results().items(),
+                                                 list(self.hypotheses) + [self.oracle, self.expected])]
+        rows[0] = ("hypothesis 1 (first-best)",) + rows[0][1:]
+        res = format_result_table("Hypothesis", rows)
+        res += "Oracle choices: " + ", ".join("{}: {}".format(rank + 1, int(num))
+                                              for rank, num in enumerate(self.oracle_choices)) + "\n"
+        return res
+
+
+def oracle_choice(stats, normalize_scopes=True):
+    """Return the index of the best hypothesis of a sentence: the one with the highest sentence-level scope F1,
+    then cue F1, then the lowest index. A metric without gold or system instances counts as correct on that side
+    (e.g. a hypothesis without instances is perfect for a sentence without gold instances).
+
+    Args:
+        stats: The k x STATS_FIELDS statistics of the hypotheses of the sentence.
+        normalize_scopes: Whether the statistics have normalized scope counts. Default: True.
+    """
+    if normalize_scopes:
+        scope_precision_denominator, scope_recall_denominator = stats[:, NUM_SYSTEM], stats[:, NUM_GOLD]
+    else:
+        scope_precision_denominator = stats[:, NUM_SCOPE_TOKENS_SYSTEM]
+        scope_recall_denominator = stats[:, NUM_SCOPE_TOKENS_GOLD]
+
+    scope_f1 = _sentence_f1(stats[:, SCOPE_PRECISION_NUM], scope_precision_denominator,
+                            stats[:, SCOPE_RECALL_NUM], scope_recall_denominator)
+    cue_f1 = _sentence_f1(stats[:, NUM_MATCHED], stats[:, NUM_SYSTEM], stats[:, NUM_MATCHED], stats[:, NUM_GOLD])
+    # lexsort sorts by the last key first; the stable sort keeps the lowest index among ties first
+    return int(np.lexsort((-cue_f1, -scope_f1))[0])
+
+
+def _sentence_f1(precision_numerator, precision_denominator, recall_numerator, recall_denominator):
+    precision = np.divide(precision_numerator, precision_denominator, out=np.ones(len(precision_numerator)),
+                          where=precision_denominator > 0)
+    recall = np.divide(recall_numerator, recall_denominator, out=np.ones(len(recall_numerator)),
+                       where=recall_denominator > 0)
+    return np.divide(2 * precision * recall, precision + recall, out=np.zeros(len(precision)),
+                     where=precision + recall > 0)
+
+
+def hypothesis_weights(scores, num_hypotheses):
+    """Return the probabilities of the hypotheses of a sentence: the softmax of their scores (log-probabilities),
+    or uniform weights if scores is None.
+    """
+    if scores is None:
+        return np.full(num_hypotheses, 1.0 / num_hypotheses)
+    scores = np.asarray(scores, dtype=float)
+    weights = np.exp(scores - scores.max())
+    return weights / weights.sum()
+
+
+def iter_hypothesis_scores(path, num_hypotheses):
+    """Iterate over the hypothesis scores of the sentences in a score file (one line of whitespace-separated
+    scores per sentence; blank lines are skipped).
+
+    Raises:
+        ValueError: If a line does not have num_hypotheses scores.
+    """
+    with open_text(path) as f:
+        for line_num, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            scores = [float(score) for score in line.split()]
+            if len(scores) != num_hypotheses:
+                raise ValueError("Line {} of {} has {} scores instead of {}".format(line_num, path, len(scores),
+                                                                                  num_hypotheses))
+            yield scores
+
+
+def hypothesis_layers(gold_path, system_paths=None, system_path=None, column_groups=None):
+    """Return the hypotheses of an N-best evaluation as AnnotationLayers (see layers.py), in rank order.
+
+    Args:
+        gold_path: Path to the gold corpus file.
+        system_paths: The paths of k aligned system files, one per hypothesis.
+        system_path: The path of one system file with k column groups (only used if system_paths is not given).
+        column_groups: The (first, last) columns of every hypothesis in system_path. They only apply to the system
+          file: every hypothesis is evaluated against all instances of the gold file.
+    """
+    if system_paths:
+        return [AnnotationLayer(str(rank + 1), gold_path=gold_path, system_path=path)
+                for rank, path in enumerate(system_paths)]
+    return [AnnotationLayer(str(rank + 1), columns=columns, gold_path=gold_path, system_path=system_path,
+                            all_gold_columns=True)
+            for rank, columns in enumerate(column_groups)]
+
+
+def evaluate_nbest(layers, scores_path=None, normalize_scopes=True):
+    """Run the N-best evaluation in one pass over the gold file and all hypotheses.
+
+    Args:
+        layers: The hypotheses as AnnotationLayers, in rank order, all with the same gold file
+          (see hypothesis_layers).
+        scores_path: Path to a file with the scores of the hypotheses of every sentence, or None for uniform
+          weights. Default: None.
+        normalize_scopes: Whether to normalize scope length when calculating scope metrics. Default: True.
+
+    Returns: An NBestCounts object.
+
+    Raises:
+        ValueError: If the score file does not have exactly one line for every sentence.
+    """
+    counts = NBestCounts(len(layers), normalize_scopes=normalize_scopes)
+    scores_it = iter_hypothesis_scores(scores_path, len(layers)) if scores_path else None
+
+    for sent_idx, sentence_layers in enumerate(iter_layer_rows(layers)):
+        hypotheses = [sentence_layers[layer.name] for layer in layers]
+        # All hypotheses share the (uncut) rows of the gold file, which are only parsed once
+        gold_rows = hypotheses[0][0]
+        gold_sent = build_sentence_instances([Token.from_fields(row) for row in gold_rows], compact=True,
+                                             sent_idx=sent_idx) if gold_rows is not None else []
+        # As in evaluate_sents, a sentence without a counterpart has no instances on the other side
+        system_sents = [build_sentence_instances([Token.from_fields(row) for row in system_rows], compact=True,
+                                                 sent_idx=sent_idx) if system_rows is not None else []
+                        for _, system_rows in hypotheses]
+
+        scores = None
+        if scores_it is not None:
+            scores = next(scores_it, None)
+            if scores is None:
+                raise ValueError("The score file {} has fewer lines than there are sentences".format(scores_path))
+        counts.add_sentence(gold_sent, system_sents, scores)
+
+    if scores_it is not None and next(scores_it, None) is not None:
+        raise ValueError("The score file {} has more lines than there are sentences".format(scores_path))
+
+    return counts
@@ -7,6 +7,11 @@
 #  Author: Stefan Grünewald
 
 import re
+from operator import itemgetter
+
+# Label of tokens that are not part of a cue, scope or event. (Tokens are parsed with all their columns,
+# so the spans of an instance may also contain such tokens.)
+NO_LABEL = "_"
 
 
 class NegationInstance:
@@ -16,33 +21,61 @@ class NegationInstance:
     """
     
     def __init__(self, i, sentence):
-        self.id = i
-        self.sentence = sentence
-        
         # Collect tokens involved in the negation instance (cue, scope, event)
-        self.cue = []
-        self.affix_cue = False  # 
-        self.scope = []
-        self.event = []
+        cue = []
+        affix_cue = False
+        scope = []
+        event = []
 
         for token in sentence:
             for cue_neg_inst_id, cue_form in token.cue:
-                if cue_neg_inst_id == self.id:
-                    self.cue.append((token.id, cue_form))
-                    if cue_form != token._form:  # affix negation!
-                        self.affix_cue = True
+                if cue_neg_inst_id == i:
+                    cue.append((token.id, cue_form))
+                    if cue_form != token._form and cue_form != NO_LABEL:  # affix negation!
+                        affix_cue = True
             for scope_neg_inst_id, scope_form in token.scope:
-                if scope_neg_inst_id == self.id and not ispunct(scope_form):
-                    self.scope.append((token.id, scope_form))
+                if scope_neg_inst_id == i and not ispunct(scope_form):
+                    scope.append((token.id, scope_form))
             for event_neg_inst_id, event_form in token.event:
-                if event_neg_inst_id == self.id:
-                    self.event.append((token.id, event_form))
-                
+                if event_neg_inst_id == i:
+                    event.append((token.id, event_form))
+
+        self._set_spans(i, sentence, cue, scope, event, affix_cue)
+
+    @classmethod
+    def from_spans(cls, i, sentence, cue, scope, event, affix_cue):
+        """Create a NegationInstance from already collected cue, scope and event tokens
+        (without scanning the sentence again).
+
+        Args:
+            i: The ID of the negation instance within the sentence.
+            sentence: The sentence the instance belongs to.
+            cue: List of (index, word_form) of the cue tokens.
+            scope: List of (index, word_form) of the (non-punctuation) scope tokens.
+            event: List of (index, word_form) of the event tokens.
+            affix_cue: Whether any cue token is an affix.
+
+        Returns: The new NegationInstance.
+        """
+        inst = cls.__new__(cls)
+        inst._set_spans(i, sentence, cue, scope, event, affix_cue)
+        return inst
+
+    def _set_spans(self, i, sentence, cue, scope, event, affix_cue):
+        self.id = i
+        self.sentence = sentence
+
+        self.cue = cue
+        self.affix_cue = affix_cue
+        self.scope = scope
+        self.event = event
+
         # Compute some characteristics of the negation instance
-        self.multiword_cue = len(self.cue) > 1
-        self.multiword_event = len(self.event) > 1
+        self.multiword_cue = num_labelled(self.cue) > 1
+        self.multiword_event = num_labelled(self.event) > 1
         self.scope_length = len(self.scope)
-        self.has_event = bool(self.event)
+        self.event_length = num_labelled(self.event)
+        self.has_event = self.event_length > 0
         
         assert self.cue
         # assert not (self.affix_cue and self.multiword_cue)
@@ -66,42 +99,198 @@ class NegationInstance:
         return s
 
 
-def read_negation_instances_from_corpus(conll_data):
+class CompactNegationInstance:
+    """Memory-efficient variant of NegationInstance that only stores what is needed for scoring.
+
+    Cues, scopes and events are tuples of (index, word_form). Instead of a reference to the
+    sentence (which would keep all tokens of the corpus alive), only the index of the sentence
+    is stored; its text can be looked up in a SentenceTextIndex if one was filled while reading.
+    """
+    __slots__ = ['id', 'sent_idx', 'cue', 'scope', 'event', 'affix_cue', 'num_neg_instances_in_sent']
+
+    def __init__(self, i, sent_idx, cue, scope, event, affix_cue, num_neg_instances_in_sent):
+        self.id = i
+        self.sent_idx = sent_idx
+        self.cue = tuple(cue)
+        self.scope = tuple(scope)
+        self.event = tuple(event)
+        self.affix_cue = affix_cue
+        self.num_neg_instances_in_sent = num_neg_instances_in_sent
+
+        assert self.cue
+
+    @property
+    def multiword_cue(self):
+        return num_labelled(self.cue) > 1
+
+    @property
+    def multiword_event(self):
+        return num_labelled(self.event) > 1
+
+    @property
+    def scope_length(self):
+        return len(self.scope)
+
+    @property
+    def event_length(self):
+        return num_labelled(self.event)
+
+    @property
+    def has_event(self):
+        return self.event_length > 0
+
+    def sentence_text(self, text_index):
+        """Look up the text of the sentence this instance belongs to.
+
+        Args:
+            text_index: The SentenceTextIndex that was filled while reading the instances.
+
+        Returns: The word forms of the sentence, separated by spaces.
+        """
+        return text_index[self.sent_idx]
+
+    def __str__(self):
+        s = '*** NEGATION INSTANCE ***'
+        s += '\n* sentence: #' + str(self.sent_idx)
+        s += '\n* cue:      ' + " ".join([c[1] for c in self.cue])
+        if self.multiword_cue:
+            s += ' (multiword cue)'
+        if self.affix_cue:
+            s += ' (affix cue)'
+        s += '\n* scope:    ' + " ".join([s[1] for s in self.scope])
+        if self.event:
+            s += '\n* event:    ' + " ".join([e[1] for e in self.event])
+            if self.multiword_event:
+                s += ' (multiword event)'
+        s += "\n* Some stats:"
+        s += "\n* scope length: " + str(self.scope_length)
+        return s
+
+
+class SentenceTextIndex:
+    """Sentence texts (word forms separated by spaces) by sentence index.
+
+    Lets CompactNegationInstances reach the text of their sentence on demand
+    without keeping the parsed sentences alive.
+    """
+    __slots__ = ['_texts']
+
+    def __init__(self):
+        self._texts = []
+
+    def add(self, sentence):
+        """Add the text of a sentence to the index.
+
+        Args:
+            sentence: The sentence.
+
+        Returns: The index of the sentence.
+        """
+        self._texts.append(" ".join([t._form for t in sentence]))
+        return len(self._texts) - 1
+
+    def __getitem__(self, sent_idx):
+        return self._texts[sent_idx]
+
+    def __len__(self):
+        return len(self._texts)
+
+
+def read_negation_instances_from_corpus(conll_data, compact=False, text_index=None):
     """Method for reading in negation instances from a corpus file.
     
     Args:
-        conll_data: PyConll representation of the given corpus.
+        conll_data: PyConll representation of the given corpus, or any other iterable of sentences.
+        compact: Whether to create CompactNegationInstances instead of NegationInstances. Default: False.
+        text_index: Optional SentenceTextIndex to which the texts of all sentences are added
+          (only used if compact is True).
 
     Returns: A list of lists, each of which contains the NegationInstances
       for the corresponding sentence. (The lists may also be empty if the corresponding
       sentence does not have a negation instance.)
     """
-    all_neg_instances = []  # Negation instances, grouped into lists by sentence
+    return list(iter_negation_instances(conll_data, compact=compact, text_index=text_index))
 
-    for sentence in conll_data:
-        # Collect negation instance IDs
-        neg_inst_ids = set()
-        for token in sentence:
-            if token.cue:
-                for i, _ in token.cue:
-                    neg_inst_ids.add(i)
 
-        # Create actual negation instances
-        curr_neg_instances = []
-        for i in sorted(neg_inst_ids):
-            curr_neg_instances.append(NegationInstance(i, sentence))
+def iter_negation_instances(sentences, compact=False, text_index=None):
+    """Lazily build the negation instances of a stream of sentences, e.g. from myconll.iter_from_file.
+
+    Args:
+        sentences: An iterable of sentences.
+        compact: Whether to create CompactNegationInstances instead of NegationInstances. Default: False.
+        text_index: Optional SentenceTextIndex to which the texts of all sentences are added
+          (only used if compact is True).
+
+    Yields: For each sentence, a list of its NegationInstances (possibly empty).
+    """
+    for sent_idx, sentence in enumerate(sentences):
+        if compact and text_index is not None:
+            sent_idx = text_index.add(sentence)
+        yield build_sentence_instances(sentence, compact=compact, sent_idx=sent_idx)
+
+
+def build_sentence_instances(sentence, compact=False, sent_idx=None):
+    """Build all negation instances of a sentence in a single pass over its tokens.
+
+    Cue, scope and event tokens of all instances are collected in the same sweep, instead of
+    scanning the whole sentence once per instance. Derived fields (including
+    num_neg_instances_in_sent) are set right away.
+
+    Args:
+        sentence: The sentence.
+        compact: Whether to create CompactNegationInstances instead of NegationInstances. Default: False.
+        sent_idx: The index of the sentence in its corpus (stored in CompactNegationInstances).
+
+    Returns: The NegationInstances of the sentence, sorted by instance ID.
+    """
+    cues = {}
+    scopes = {}
+    events = {}
+    affix_cue_ids = set()
+
+    for token in sentence:
+        if token.cue:
+            for i, cue_form in token.cue:
+                cues.setdefault(i, []).append((token.id, cue_form))
+                if cue_form != token._form and cue_form != NO_LABEL:  # affix negation!
+                    affix_cue_ids.add(i)
+        if token.scope:
+            for i, scope_form in token.scope:
+                if not ispunct(scope_form):
+                    scopes.setdefault(i, []).append((token.id, scope_form))
+        if token.event:
+            for i, event_form in token.event:
+                events.setdefault(i, []).append((token.id, event_form))
+
+    # Only IDs with at least one cue token constitute negation instances
+    if compact:
+        return [CompactNegationInstance(i, sent_idx, cues[i], scopes.get(i, ()), events.get(i, ()),
+                                        i in affix_cue_ids, len(cues))
+                for i in sorted(cues)]
+
+    neg_instances = [NegationInstance.from_spans(i, sentence, cues[i], scopes.get(i, []), events.get(i, []),
+                                                 i in affix_cue_ids)
+                     for i in sorted(cues)]
 
-        all_neg_instances.append(curr_neg_instances)
-    
     # Single negation instance in the sentence or several?
-    for sentence_neg_instances in all_neg_instances:
-        num_neg_instances_in_sent = len(sentence_neg_instances)
-        for neg_instance in sentence_neg_instances:
-            neg_instance.num_neg_instances_in_sent = num_neg_instances_in_sent
-    
-    return all_neg_instances
+    for neg_instance in neg_instances:
+        neg_instance.num_neg_instances_in_sent = len(neg_instances)
+
+    return neg_instances
+
+
+def labelled(span):
+    """Return the (index, word_form) pairs of a cue, scope or event that are actually labelled, i.e. without
+    tokens whose label is NO_LABEL.
+    """
+    return [(idx, form) for idx, form in span if form != NO_LABEL]
+
+
+def num_labelled(span):
+    """Return the number of tokens of a cue, scope or event that are actually labelled (see labelled)."""
+    return sum(map(NO_LABEL.__ne__, map(itemgetter(1), span)))
 
 
 def ispunct(token):
-    return not bool(re.search("\w", token))
+    return not bool(re.search(r"\w", token))
 
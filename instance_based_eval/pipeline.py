@@ -0,0 +1,271 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Threaded producer/consumer pipeline for the instance-based evaluation.
+
+Instead of reading and parsing the gold file, then the system file, then building instances and
+finally scoring, the pipeline runs these steps concurrently, connected by bounded queues:
+
+  * two reader threads (gold, system) split their file into raw sentence blocks;
+  * parser threads pair up gold and system blocks and build the NegationInstances of both;
+  * the scorer (the calling thread) accumulates the evaluation counts in corpus order.
+
+This mainly pays off when reading is slow (e.g. on network file systems or for compressed input),
+since the CPU work is then done while waiting for the next blocks to arrive.
+"""
+
+import queue
+import threading
+import time
+
+from myconll._parser import iter_sentence_lines, _create_sentence
+from myconll.compression import open_text
+
+from negation_instance import build_sentence_instances
+from eval_utils import EvaluationCounts
+
+NUM_PARSERS = 2
+QUEUE_SIZE = 256
+
+_DONE = object()  # Sentinel marking the end of a stream
+
+
+class QueueStats:
+    """Depth statistics of a bounded queue, sampled every time an item is put into it."""
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self.num_samples = 0
+        self.depth_sum = 0
+        self.max_depth = 0
+
+    def sample(self, depth):
+        self.num_samples += 1
+        self.depth_sum += depth
+        self.max_depth = max(self.max_depth, depth)
+
+    @property
+    def mean_depth(self):
+        return self.depth_sum / self.num_samples if self.num_samples else 0.0
+
+
+class StageStats:
+    """Number of processed items and busy time (i.e., not waiting on a queue) of a pipeline stage."""
+    def __init__(self, name, num_workers=1):
+        self.name = name
+        self.num_workers = num_workers
+        self.items = 0
+        self.busy_time = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items, busy_time):
+        with self._lock:
+            self.items += items
+            self.busy_time += busy_time
+
+
+class PipelineStats:
+    """Queue depth and stage throughput statistics of a pipeline run, for sizing queues and worker counts."""
+    def __init__(self, queues, stages):
+        self.queues = queues
+        self.stages = stages
+        self.wall_time = 0.0
+
+    def __str__(self):
+        res = "Pipeline statistics (wall time: {:.2f}s)\n".format(self.wall_time)
+        res += "  {:<16} {:>8} {:>12} {:>14}\n".format("stage", "items", "items/s", "utilization")
+        for stage in self.stages:
+            throughput = stage.items / self.wall_time if self.wall_time else 0.0
+            utilization = stage.busy_time / (self.wall_time * stage.num_workers) if self.wall_time else 0.0
+            res += "  {:<16} {:>8d} {:>12.1f} {:>13.1f}%\n".format(stage.name, stage.items, throughput,
+                                                                  utilization * 100)
+        res += "  {:<16} {:>8} {:>12} {:>14}\n".format("queue", "maxsize", "mean depth", "max depth")
+        for q in self.queues:
+            res += "  {:<16} {:>8d} {:>12.1f} {:>14d}\n".format(q.name, q.maxsize, q.mean_depth, q.max_depth)
+        return res
+
+
+class _Pipeline:
+    """A single run of the evaluation pipeline. See run_evaluation_pipelined."""
+    def __init__(self, gold_path, system_path, normalize_scopes, num_parsers, queue_size):
+        self.paths = {"gold": gold_path, "system": system_path}
+        self.normalize_scopes = normalize_scopes
+        self.num_parsers = num_parsers
+
+        self.block_queues = {side: queue.Queue(maxsize=queue_size) for side in self.paths}
+        self.result_queue = queue.Queue(maxsize=queue_size)
+
+        self.queue_stats = {"gold": QueueStats("gold blocks", queue_size),
+                            "system": QueueStats("system blocks", queue_size),
+                            "result": QueueStats("instances", queue_size)}
+        self.stage_stats = {"gold": StageStats("read gold"),
+                            "system": StageStats("read system"),
+                            "parse": StageStats("parse", num_workers=num_parsers),
+                            "score": StageStats("score")}
+
+        # Parser threads take gold and system blocks in lockstep
+        self.pair_lock = threading.Lock()
+        self.exhausted = {side: False for side in self.paths}
+        self.next_idx = 0
+
+        self.failed = threading.Event()
+        self.errors = []
+
+    def _put(self, q, stats, item):
+        """Put an item into a queue; give up if another thread failed."""
+        while not self.failed.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                stats.sample(q.qsize())
+                return
+            except queue.Full:
+                continue
+        raise _Aborted()
+
+    def _get(self, q):
+        """Get an item from a queue; give up if another thread failed."""
+        while not self.failed.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        raise _Aborted()
+
+    def _guarded(self, target, *args):
+        """Run a thread target, recording any exception and stopping all other threads."""
+        try:
+            target(*args)
+        except _Aborted:
+            pass
+        except Exception as e:  # pylint: disable=broad-except
+            self.errors.append(e)
+            self.failed.set()
+
+    def _read(self, side):
+        """Reader stage: split a corpus file into raw sentence blocks."""
+        q = self.block_queues[side]
+        stats = self.stage_stats[side]
+        with open_text(self.paths[side]) as f:
+            start = time.perf_counter()
+            for sent_lines in iter_sentence_lines(f):
+                stats.add(1, time.perf_counter() - start)
+                self._put(q, self.queue_stats[side], sent_lines)
+                start = time.perf_counter()
+        self._put(q, self.queue_stats[side], _DONE)
+
+    def _next_pair(self):
+        """Take the next (index, gold block, system block) triple, or None if both files are exhausted.
+        If one file has more sentences than the other, the missing blocks are empty.
+        """
+        with self.pair_lock:
+            blocks = {}
+            for side in self.paths:
+                blocks[side] = None
+                if not self.exhausted[side]:
+                    block = self._get(self.block_queues[side])
+                    if block is _DONE:
+                        self.exhausted[side] = True
+                    else:
+                        blocks[side] = block
+            if all(block is None for block in blocks.values()):
+                return None
+            idx = self.next_idx
+            self.next_idx += 1
+        return idx, blocks["gold"], blocks["system"]
+
+    def _parse(self):
+        """Parser stage: build the NegationInstances of paired gold and system sentences."""
+        stats = self.stage_stats["parse"]
+        while True:
+            pair = self._next_pair()
+            if pair is None:
+                break
+            start = time.perf_counter()
+            idx, gold_lines, system_lines = pair
+            instances = []
+            for lines in (gold_lines, system_lines):
+                if lines is None:
+                    instances.append([])
+                else:
+                    instances.append(build_sentence_instances(_create_sentence(lines), compact=True, sent_idx=idx))
+            stats.add(1, time.perf_counter() - start)
+            self._put(self.result_queue, self.queue_stats["result"], (idx, instances[0], instances[1]))
+        self._put(self.result_queue, self.queue_stats["result"], _DONE)
+
+    def _score(self):
+        """Scorer stage: accumulate counts in corpus order (so that results are identical
+        to the sequential evaluation, down to floating point summation order)."""
+        counts = EvaluationCounts(normalize_scopes=self.normalize_scopes)
+        stats = self.stage_stats["score"]
+
+        pending = {}  # Results that arrived before their predecessors
+        next_idx = 0
+        num_done = 0
+        while num_done < self.num_parsers:
+            item = self._get(self.result_queue)
+            if item is _DONE:
+                num_done += 1
+                continue
+
+            start = time.perf_counter()
+            pending[item[0]] = item
+            while next_idx in pending:
+                _, gold_sent, system_sent = pending.pop(next_idx)
+                counts.add_sentence(gold_sent, system_sent)
+                next_idx += 1
+            stats.add(1, time.perf_counter() - start)
+
+        return counts
+
+    def run(self):
+        start = time.perf_counter()
+
+        threads = [threading.Thread(target=self._guarded, args=(self._read, side), daemon=True)
+                   for side in self.paths]
+        threads += [threading.Thread(target=self._guarded, args=(self._parse,), daemon=True)
+                    for _ in range(self.num_parsers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            counts = self._score()
+        except _Aborted:
+            counts = None
+        except Exception:
+            self.failed.set()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+
+        if self.errors:
+            raise self.errors[0]
+
+        stats = PipelineStats(list(self.queue_stats.values()), list(self.stage_stats.values()))
+        stats.wall_time = time.perf_counter() - start
+
+        return counts.to_result(), stats
+
+
+class _Aborted(Exception):
+    """Raised in pipeline threads when another thread failed."""
+
+
+def run_evaluation_pipelined(gold_path, system_path, normalize_scopes=True, num_parsers=NUM_PARSERS,
+                             queue_size=QUEUE_SIZE):
+    """Run evaluation on a pair of (gold, system) corpora, overlapping reading, parsing and scoring.
+
+    Args:
+        gold_path: Path to the gold corpus file.
+        system_path: Path to the system corpus file.
+        normalize_scopes: Whether to normalize scope length when calculating scope metrics. Default: True.
+        num_parsers: Number of parser threads. Default: NUM_PARSERS (2).
+        queue_size: Maximum number of sentences buffered in each queue. Default: QUEUE_SIZE (256).
+    Returns: A pair of an EvaluationResult object (identical to the one of the sequential evaluation)
+      and a PipelineStats object.
+    """
+    pipeline = _Pipeline(gold_path, system_path, normalize_scopes, num_parsers, queue_size)
+    return pipeline.run()
@@ -0,0 +1,184 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Content-addressed cache for evaluation results, shared by run_evaluation.py and the *SEM scripts.
+
+A result is stored under a key derived from
+  * the SHA-256 of the raw bytes of the gold and of the system file,
+  * the name and version of the evaluator, where the version is a hash of the evaluator's source
+    files (so that any change to the evaluation code invalidates its cached results), and
+  * the options that influence the result (e.g. scope normalization, task, rounding).
+
+Cached values are strings (a printed report or a serialized result). The cache is a single SQLite
+database; once its total size exceeds the configured limit, the least recently used entries are evicted.
+File digests are remembered together with size, mtime and inode of the file, so that on a cache hit
+unchanged files do not have to be read and hashed again.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+                                  "negation_evaluation", "results.sqlite")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_digests (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+
+def hash_file(path):
+    """Compute the SHA-256 hex digest of the raw bytes of a file."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def source_version(*paths):
+    """Compute a version string for an evaluator from its source code.
+
+    Args:
+        *paths: Source files and/or directories. Directories are searched recursively for .py files.
+
+    Returns: A hex digest over the relative names and contents of all source files.
+    """
+    sha = hashlib.sha256()
+    for path in paths:
+        if os.path.isdir(path):
+            source_files = sorted(os.path.join(dir_path, file_name)
+                                  for dir_path, _, file_names in os.walk(path)
+                                  for file_name in file_names if file_name.endswith(".py"))
+        else:
+            source_files = [path]
+        for source_file in source_files:
+            sha.update(os.path.relpath(source_file, os.path.dirname(path)).encode("utf-8"))
+            with open(source_file, "rb") as f:
+                sha.update(f.read())
+    return sha.hexdigest()[:16]
+
+
+class ResultCache:
+    """Size-bounded LRU cache of evaluation results, stored in an SQLite database.
+
+    Several processes may use the same cache file at the same time; SQLite takes care of locking.
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            path: Location of the database file. Missing parent directories are created.
+            max_bytes: Maximum total size of the cached values. Default: 64 MiB.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+
+        cache_dir = os.path.dirname(os.path.abspath(path))
+        os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30.0)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def file_digest(self, path):
+        """Return the SHA-256 digest of a file, re-hashing it only if size, mtime or inode have changed."""
+        abs_path = os.path.abspath(path)
+        stat = os.stat(abs_path)
+        row = self._conn.execute("SELECT size, mtime_ns, inode, digest FROM file_digests WHERE path = ?",
+                                 (abs_path,)).fetchone()
+        if row is not None and row[:3] == (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            return row[3]
+
+        digest = hash_file(abs_path)
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO file_digests VALUES (?, ?, ?, ?, ?)",
+                               (abs_path, stat.st_size, stat.st_mtime_ns, stat.st_ino, digest))
+        return digest
+
+    def make_key(self, gold_path, system_path, evaluator, version, options):
+        """Build the cache key of an evaluation.
+
+        Args:
+            gold_path: Path to the gold corpus file.
+            system_path: Path to the system corpus file.
+            evaluator: Name of the evaluator (e.g. "instance_based").
+            version: Version of the evaluator (see source_version).
+            options: Dict of all options that influence the result. Must be JSON-serializable.
+
+        Returns: A hex digest identifying the evaluation.
+        """
+        key_data = {
+            "gold": self.file_digest(gold_path),
+            "system": self.file_digest(system_path),
+            "evaluator": evaluator,
+            "version": version,
+            "options": options,
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached value for the given key (marking it as recently used), or None."""
+        with self._conn:
+            row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key, value):
+        """Store a value, then evict least recently used entries until the cache fits into max_bytes.
+        Values larger than max_bytes are not stored at all.
+        """
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (key, value, size, time.time()))
+
+            total_size = self._conn.execute("SELECT SUM(size) FROM results").fetchone()[0]
+            if total_size > self.max_bytes:
+                lru_entries = self._conn.execute("SELECT key, size FROM results ORDER BY last_used").fetchall()
+                evicted = []
+                for lru_key, lru_size in lru_entries:
+                    if total_size <= self.max_bytes:
+                        break
+                    evicted.append((lru_key,))
+                    total_size -= lru_size
+                self._conn.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for the given key; on a miss, call compute() and cache its return value."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
@@ -7,36 +7,413 @@
 #  Author: Stefan Grünewald
 
 import argparse
+import json
+import os
+import sys
 import myconll
 
+from itertools import zip_longest
+
 import numpy as np
 
 import code
 
-from negation_instance import NegationInstance, read_negation_instances_from_corpus
-from eval_utils import EvaluationResult, get_matching_instances, scope_match_normalized, scope_match_tokens
+from negation_instance import NegationInstance, read_negation_instances_from_corpus, build_sentence_instances
+from eval_utils import EvaluationCounts, EvaluationResult
+from pipeline import NUM_PARSERS, QUEUE_SIZE, run_evaluation_pipelined
+from result_cache import ResultCache, source_version, DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES
+from sentence_stats import rescore_changed_sentences
+from alignment import align_by_key, sentence_key
+from slices import SliceCounts, DEFAULT_DIMENSIONS, format_average_slices
+from grouping import DocumentGrouping, GroupCounts
+from layers import AnnotationLayer, iter_layer_rows
+from threshold_sweep import sweep_thresholds
+from nbest import evaluate_nbest, hypothesis_layers
+from scheduling import split_sentences, schedule_chunks, run_chunks
+from myconll.compression import read_text
+from myconll.unit.token import Token
+from myconll._parser import _create_sentence
+
+EVALUATOR_NAME = "instance_based"
 
-def run_evaluation_single(gold_path, system_path, normalize_scopes=True):
+def run_evaluation_single(gold_path, system_path, normalize_scopes=True, pipelined=False, pipeline_stats=False,
+                          cache=None, sentence_stats=None, sentences=None, align_keys=False, jobs=None,
+                          schedule_stats=False, pipeline_parsers=NUM_PARSERS, pipeline_queue_size=QUEUE_SIZE):
     """Run evaluation on a single pair of (gold, system) corpora and return results as an EvaluationResult object.
 
     Args:
         gold_path: Path to the gold corpus file.
         system_path: Path to the system corpus file.
         normalize_scopes: Whether to normalize scope length when calculating scope metrics. Default: True.
+        pipelined: Whether to overlap reading, parsing and scoring in a threaded pipeline
+          (see pipeline.py) instead of running these phases one after another. Default: False.
+        pipeline_stats: Whether to print queue depth and stage throughput statistics of the
+          pipeline to stderr. Only used if pipelined is True. Default: False.
+        cache: A ResultCache in which results are looked up and stored (see result_cache.py).
+          Default: None (no caching).
+        sentence_stats: Path to a file with per-sentence statistics of a previous evaluation of the same
+          gold file. If given, only sentences that changed since then are re-scored (see sentence_stats.py),
+          and the file is updated. Default: None.
+        sentences: Numbers of the sentences to evaluate (see run_evaluation_subset). Default: None (all sentences).
+        align_keys: Whether to pair gold and system sentences by their (doc_id, sent_id) key instead of their
+          position (see run_evaluation_aligned). The alignment report is printed to stderr. Default: False.
+        jobs: Number of worker processes to evaluate chunks of sentences on (see run_evaluation_parallel).
+          Default: None (evaluate in the calling process).
+        schedule_stats: Whether to print the scheduling report of the parallel evaluation to stderr. Only used if
+          jobs is greater than 1. Default: False.
+        pipeline_parsers: Number of parser threads of the pipeline. Only used if pipelined is True.
+          Default: NUM_PARSERS (see pipeline.py).
+        pipeline_queue_size: Maximum number of sentences buffered in each queue of the pipeline. Only used if
+          pipelined is True. Default: QUEUE_SIZE (see pipeline.py).
     Returns: An EvaluationResult object containing the results of the evaluation.
+
+    Raises:
+        ValueError: If more than one of align_keys, sentences, sentence_stats, pipelined and jobs is given, or if a
+          cache is combined with an option that prints a report to stderr or updates sentence_stats (neither would
+          happen on a cache hit).
     """
-    gold_data = myconll.load_from_file(gold_path)
-    system_data = myconll.load_from_file(system_path)
+    modes = [name for name, value in [("align_keys", align_keys), ("sentences", sentences is not None),
+                                      ("sentence_stats", sentence_stats is not None), ("pipelined", pipelined),
+                                      ("jobs", jobs is not None and jobs > 1)] if value]
+    if len(modes) > 1:
+        raise ValueError("{} cannot be combined".format(" and ".join(modes)))
+
+    if cache is not None:
+        if align_keys or pipeline_stats or sentence_stats is not None or schedule_stats:
+            raise ValueError("a cache cannot be combined with align_keys, pipeline_stats, sentence_stats "
+                             "or schedule_stats")
+        # Only the scope normalization setting and the sentence subset influence the result;
+        # pipelining (with any number of parsers and queue size) and parallel evaluation do not
+        version = source_version(os.path.dirname(os.path.abspath(__file__)))
+        key = cache.make_key(gold_path, system_path, EVALUATOR_NAME, version,
+                             {"normalize_scopes": normalize_scopes, "sentences": sentences})
+        cached_result = cache.get(key)
+        if cached_result is not None:
+            return EvaluationResult(**json.loads(cached_result))
+
+        eval_result = run_evaluation_single(gold_path, system_path, normalize_scopes=normalize_scopes,
+                                            pipelined=pipelined, sentences=sentences, jobs=jobs,
+                                            pipeline_parsers=pipeline_parsers, pipeline_queue_size=pipeline_queue_size)
+        cache.put(key, json.dumps(vars(eval_result)))
+        return eval_result
+
+    if align_keys:
+        eval_result, alignment_report = run_evaluation_aligned(gold_path, system_path,
+                                                               normalize_scopes=normalize_scopes)
+        print(alignment_report, file=sys.stderr)
+        return eval_result
+
+    if sentences is not None:
+        return run_evaluation_subset(gold_path, system_path, sentences, normalize_scopes=normalize_scopes)
+
+    if sentence_stats is not None:
+        eval_result, rescoring_stats = run_evaluation_incremental(gold_path, system_path, sentence_stats,
+                                                                  normalize_scopes=normalize_scopes)
+        print(rescoring_stats, file=sys.stderr)
+        return eval_result
 
-    neg_sents_gold = read_negation_instances_from_corpus(gold_data)
-    neg_sents_system = read_negation_instances_from_corpus(system_data)
+    if pipelined:
+        eval_result, stats = run_evaluation_pipelined(gold_path, system_path, normalize_scopes=normalize_scopes,
+                                                      num_parsers=pipeline_parsers, queue_size=pipeline_queue_size)
+        if pipeline_stats:
+            print(stats, file=sys.stderr)
+        return eval_result
+
+    if jobs is not None and jobs > 1:
+        eval_result, report = run_evaluation_parallel(gold_path, system_path, jobs, normalize_scopes=normalize_scopes)
+        if schedule_stats:
+            print(report, file=sys.stderr)
+        return eval_result
+
+    neg_sents_gold = read_negation_instances_from_corpus(myconll.iter_from_file(gold_path), compact=True)
+    neg_sents_system = read_negation_instances_from_corpus(myconll.iter_from_file(system_path), compact=True)
 
     eval_result = evaluate_sents(neg_sents_gold, neg_sents_system, normalize_scopes=normalize_scopes)
 
     return eval_result
 
 
-def run_evaluation_multiple(gold_path, system_paths, normalize_scopes=True):
+def run_evaluation_parallel(gold_path, system_path, jobs, normalize_scopes=True):
+    """Run evaluation on a single pair of (gold, system) corpora on a pool of worker processes.
+
+    The sentences are packed into chunks of about equal estimated cost (from their number of tokens and
+    instances), which the workers evaluate largest first (see scheduling.py); the counts of all chunks are
+    added up.
+
+    Args:
+        gold_path: Path to the gold corpus file.
+        system_path: Path to the system corpus file.
+        jobs: Number of worker processes.
+        normalize_scopes: Whether to normalize scope length when calculating scope metrics. Default: True.
+    Returns: An EvaluationResult object and a SchedulingReport.
+    """
+    gold_sentences = split_sentences(read_text(gold_path))
+    system_sentences = split_sentences(read_text(system_path))
+    costs, chunks = schedule_chunks(gold_sentences, system_sentences, jobs)
+
+    chunk_args = [("\n\n".join(gold_sentences[start:end]), "\n\n".join(system_sentences[start:end]),
+                   normalize_scopes)
+                  for start, end in chunks]
+    chunk_stats, report = run_chunks(evaluate_chunk, chunk_args, costs, chunks, jobs)
+
+    counts = EvaluationCounts(normalize_scopes=normalize_scopes)
+    for stats in chunk_stats:
+        counts.merge(EvaluationCounts.from_stats(stats, normalize_scopes=normalize_scopes))
+    return counts.to_result(), report
+
+
+def evaluate_chunk(gold_text, system_text, normalize_scopes=True):
+    """Evaluate the aligned sentences of a chunk of the gold and the system corpus.
+
+    Returns: The counts of the chunk, as returned by EvaluationCounts.to_stats.
+    """
+    counts = EvaluationCounts(normalize_scopes=normalize_scopes)
+    # As in evaluate_sents, sentences without a counterpart have no negation instances on the other side
+    for gold_sent, system_sent in zip_longest(myconll.iter_from_string(gold_text),
+                                              myconll.iter_from_string(system_text)):
+        counts.add_sentence(build_sentence_instances(gold_sent, compact=True) if gold_sent is not None else [],
+                            build_sentence_instances(system_sent, compact=True) if system_sent is not None else [])
+    return counts.to_stats()
+
+
+def run_evaluation_incremental(gold_path, system_path, stats_path, normalize_scopes=True):
+    """Run evaluation on a single pair of (gold, system) corpora, re-scoring only the sentences that changed
+    since the evaluation that wrote the given per-sentence statistics file (see sentence_stats.py).
+
+    Args:
+        gold_path: Path to the gold corpus file.
+        system_path: Path to the system corpus file.
+        stats_path: Path to the per-sentence statistics file. It is created or updated.
+        normalize_scopes: Whether to normalize scope length when calculating scope metrics. Default: True.
+    Returns: A pair of an EvaluationResult object and a RescoringStats object.
+    """
+    def score_sentence(gold_lines, system_lines, sent_idx, line_num):
+        counts = EvaluationCounts(normalize_scopes=normalize_scopes)
+        gold_sent = build_sentence_instances(_create_sentence(gold_lines), compact=True, sent_idx=sent_idx) \
+            if gold_lines is not None else []
+        system_sent = build_sentence_instances(_create_sentence(system_lines), compact=True, sent_idx=sent_idx) \
+            if system_lines is not None else []
+        counts.add_sentence(gold_sent, system_sent)
+        return counts.to_int_stats()
+
+    meta = {"evaluator": EVALUATOR_NAME,
+            "version": source_version(os.path.dirname(os.path.abspath(__file__))),
+            "options": {"normalize_scopes": normalize_scopes}}
+    totals, rescoring_stats = rescore_changed_sentences(gold_path, system_path, stats_path, score_sentence,
+                                                        len(EvaluationCounts.STATS_FIELDS), meta)
+    eval_result = EvaluationCounts.from_int_stats(totals, normalize_scopes=normalize_scopes).to_result()
+
+    return eval_result, rescoring_stats
+
+
+def run_evaluation_subset(gold_path, system_path, sentences, normalize_scopes=True):
+    """Run evaluation on a subset of the sentences of a pair of (gold, system) corpora. Only these sentences
+    are read and parsed; they are found through the sentence index of each file (see myconll/index.py),
+    which is built and stored next to the file if necessary.
+
+    Args:
+        gold_path: Path to the gold corpus file (must not be compressed).
+        system_path: Path to the system corpus file (must not be compressed).
+        sentences: Numbers of the sentences to evaluate (0-based, in any order). A sentence that is given
+          more than once is counted more than once.
+        normalize_scopes: Whether to normalize scope length when calculating scope metrics. Default: True.
+    Returns: An EvaluationResult object containing the results of the evaluation (all metrics are 0 if the
+      sentences contain no negation instances).
+
+    Raises:
+        ValueError: If a sentence number is not a sentence of either file.
+    """
+    counts = EvaluationCounts(normalize_scopes=normalize_scopes)
+
+    with myconll.load_indexed(gold_path) as gold_conll, myconll.load_indexed(system_path) as system_conll:
+        num_sentences = max(len(gold_conll), len(system_conll))
+        for sent_idx in sentences:
+            if not 0 <= sent_idx < num_sentences:
+                raise ValueError("sentence {} is out of range: the files have {} sentences".format(
+                    sent_idx, num_sentences))
+
+        for sent_idx in sentences:
+            # As in evaluate_sents, a sentence without a counterpart has no negation instances on the other side
+            gold_sent = build_sentence_instances(gold_conll[sent_idx], compact=True, sent_idx=sent_idx) \
+                if sent_idx < len(gold_conll) else []
+            system_sent = build_sentence_instances(system_conll[sent_idx], compact=True, sent_idx=sent_idx) \
+                if sent_idx < len(system_conll) else []
+            counts.add_sentence(gold_sent, system_sent)
+
+    return counts.to_result(allow_empty=True)
+
+
+def run_evaluation_aligned(gold_path, system_path, normalize_scopes=True):
+    """Run evaluation on a single pair of (gold, system) corpora whose sentences are paired by their
+    (doc_id, sent_id) key (see alignment.py), so that the system file may contain the sentences in any order.
+    A gold sentence that is missing in the system file counts as a sentence without system instances,
+    and an extra system sentence as a sentence without gold instances.
+
+    Args:
+        gold_path: Path to the gold corpus file.
+        system_path: Path to the system corpus file.
+        normalize_scopes: Whether to normalize scope length when calculating scope metrics. Default: True.
+    Returns: A pair of an EvaluationResult object and an AlignmentReport object.
+    """
+    sent_pairs, alignment_report = align_by_key(myconll.iter_from_file(gold_path),
+                                                myconll.iter_from_file(system_path), key=sentence_key)
+
+    counts = EvaluationCounts(normalize_scopes=normalize_scopes)
+    for sent_idx, (gold_sent, system_sent) in enumerate(sent_pairs):
+        gold_insts = build_sentence_instances(gold_sent, compact=True, sent_idx=sent_idx) \
+            if gold_sent is not None else []
+        system_insts = build_sentence_instances(system_sent, compact=True, sent_idx=sent_idx) \
+            if system_sent is not None else []
+        counts.add_sentence(gold_insts, system_insts)
+
+    return counts.to_result(), alignment_report
+
+
+def run_evaluation_grouped(gold_path, system_path, grouping, normalize_scopes=True):
+    """Run evaluation on a single pair of (gold, system) corpora, with the counts accumulated per group of
+    documents (see grouping.py). The document id of a sentence is taken from the gold file (or from the
+    system file if the gold file has fewer sentences).
+
+    Args:
+        gold_path: Path to the gold corpus file.
+        system_path: Path to the system corpus file.
+        grouping: A DocumentGrouping that maps document ids to groups.
+        normalize_scopes: Whether to normalize scope length when calculating scope metrics. Default: True.
+    Returns: A GroupCounts object, which gives the results per group as well as micro and macro totals.
+    """
+    group_counts = GroupCounts(grouping, normalize_scopes=normalize_scopes)
+
+    # As in evaluate_sents, a sentence without a counterpart has no negation instances on the other side
+    for sent_idx, (gold_sent, system_sent) in enumerate(zip_longest(myconll.iter_from_file(gold_path),
+                                                                    myconll.iter_from_file(system_path))):
+        gold_insts = build_sentence_instances(gold_sent, compact=True, sent_idx=sent_idx) \
+            if gold_sent is not None else []
+        system_insts = build_sentence_instances(system_sent, compact=True, sent_idx=sent_idx) \
+            if system_sent is not None else []
+        doc_id = (gold_sent if gold_sent is not None else system_sent)[0].doc_id
+        group_counts.add_sentence(doc_id, gold_insts, system_insts)
+
+    return group_counts
+
+
+def run_evaluation_layers(layers, normalize_scopes=True):
+    """Run evaluation on several annotation layers (e.g. negation and speculation) over the same tokens in one
+    pass (see layers.py). Every file is read and split into token rows only once, however many layers it holds.
+
+    Args:
+        layers: The AnnotationLayers to evaluate, all with a gold and a system file.
+        normalize_scopes: Whether to normalize scope length when calculating scope metrics. Default: True.
+    Returns: A dict from layer name to the EvaluationResult of the layer, in the order of the layers (all metrics
+      of a layer without instances are 0).
+    """
+    counts = {layer.name: EvaluationCounts(normalize_scopes=normalize_scopes) for layer in layers}
+
+    for sent_idx, sentence_layers in enumerate(iter_layer_rows(layers)):
+        for name, (gold_rows, system_rows) in sentence_layers.items():
+            # As in evaluate_sents, a sentence without a counterpart has no instances on the other side
+            gold_insts = build_sentence_instances([Token.from_fields(row) for row in gold_rows],
+                                                  compact=True, sent_idx=sent_idx) if gold_rows is not None else []
+            system_insts = build_sentence_instances([Token.from_fields(row) for row in system_rows],
+                                                    compact=True, sent_idx=sent_idx) \
+                if system_rows is not None else []
+            counts[name].add_sentence(gold_insts, system_insts)
+
+    return {name: layer_counts.to_result(allow_empty=True) for name, layer_counts in counts.items()}
+
+
+def parse_column_groups(groups):
+    """Parse a comma-separated list of column groups (e.g. "7-15,16-24").
+
+    Args:
+        groups: The string to parse. Each group is a (0-based, inclusive) column range (see layers.AnnotationLayer).
+    Returns: A list of (first, last) column pairs.
+    """
+    column_groups = []
+    for group in groups.split(","):
+        first, last = (int(column) for column in group.strip().split("-"))
+        column_groups.append((first, last))
+    return column_groups
+
+
+def parse_sentence_ranges(ranges):
+    """Parse a comma-separated list of sentence numbers and ranges (e.g. "0-99,250,300-399").
+
+    Args:
+        ranges: The string to parse. Ranges include both ends.
+    Returns: A list of sentence numbers, in the given order; a sentence that is included more than once
+      (e.g. by overlapping ranges) is only listed the first time.
+
+    Raises:
+        ValueError: If a part is not a number or range, or a range ends before it starts.
+    """
+    sentences = []
+    for part in ranges.split(","):
+        start, _, end = part.strip().partition("-")
+        start, end = int(start), int(end if end else start)
+        if end < start:
+            raise ValueError("empty range: {}".format(part.strip()))
+        sentences.extend(range(start, end + 1))
+    return list(dict.fromkeys(sentences))
+
+
+# The ways of evaluating of the command line interface; at most one of them can be used at a time
+# {argument name: option}
+EVALUATION_MODES = {"pipelined": "--pipeline", "jobs": "--jobs", "sentence_stats": "--sentence-stats",
+                    "sentences": "--sentences", "align_keys": "--align-keys", "slices": "--slices",
+                    "group_by": "--group-by", "layers": "--layer", "sweep": "--sweep", "nbest": "--nbest"}
+# Options that only apply to one of the modes: {argument name: (option, argument name of the mode)}
+MODE_OPTIONS = {"pipeline_stats": ("--pipeline-stats", "pipelined"),
+                "pipeline_parsers": ("--pipeline-parsers", "pipelined"),
+                "pipeline_queue_size": ("--pipeline-queue-size", "pipelined"),
+                "schedule_stats": ("--schedule-stats", "jobs"),
+                "curves": ("--curves", "sweep"), "nbest_columns": ("--nbest-columns", "nbest"),
+                "nbest_scores": ("--nbest-scores", "nbest")}
+# Modes whose results can be cached (the reports of the others would be skipped on a cache hit, see
+# run_evaluation_single), and options that need a single system file
+CACHED_MODES = ("pipelined", "jobs", "sentences")
+# Mode options that do not print a report, and thus can be combined with --cache
+CACHED_MODE_OPTIONS = ("pipeline_parsers", "pipeline_queue_size")
+SINGLE_SYSTEM_OPTIONS = {"sentence_stats": "--sentence-stats", "curves": "--curves",
+                         "nbest_columns": "--nbest-columns"}
+
+
+def check_options(args):
+    """Check whether the options of the command line interface can be combined.
+
+    Args:
+        args: The parsed command line arguments.
+    Returns: An error message, or None if the options can be combined.
+    """
+    def is_set(name):
+        return getattr(args, name) not in (None, False)
+
+    modes = [name for name in EVALUATION_MODES if is_set(name)]
+    if len(modes) > 1:
+        return "{} cannot be combined with {}".format(EVALUATION_MODES[modes[0]],
+                                                      ", ".join(EVALUATION_MODES[mode] for mode in modes[1:]))
+
+    for name, (option, mode) in MODE_OPTIONS.items():
+        if is_set(name) and mode not in modes:
+            return "{} requires {}".format(option, EVALUATION_MODES[mode])
+
+    if args.cache:
+        uncached = [EVALUATION_MODES[mode] for mode in modes if mode not in CACHED_MODES]
+        uncached += [option for name, (option, _) in MODE_OPTIONS.items()
+                     if is_set(name) and name not in CACHED_MODE_OPTIONS]
+        if uncached:
+            return "--cache cannot be combined with {}".format(", ".join(uncached))
+
+    if len(args.system_files) > 1:
+        for name, option in SINGLE_SYSTEM_OPTIONS.items():
+            if is_set(name):
+                return "{} requires a single system file".format(option)
+
+    return None
+
+
+def run_evaluation_multiple(gold_path, system_paths, normalize_scopes=True, pipelined=False, pipeline_stats=False,
+                            cache=None, sentences=None, align_keys=False, jobs=None, schedule_stats=False,
+                            pipeline_parsers=NUM_PARSERS, pipeline_queue_size=QUEUE_SIZE):
     """Run evaluations on a single gold corpus and multiple prediction files on the same data.
     Output results for individual evaluations as well as the average.
 
@@ -44,11 +421,27 @@ def run_evaluation_multiple(gold_path, system_paths, normalize_scopes=True):
         gold_path: Path to the gold corpus file.
         system_paths: List of paths to system corpus files.
         normalize_scopes: Whether to normalize scope length when calculating scope metrics. Default: True.
+        pipelined: Whether to use the threaded pipeline for each evaluation. Default: False.
+        pipeline_stats: Whether to print pipeline statistics to stderr. Default: False.
+        cache: A ResultCache for the individual evaluations. Default: None (no caching).
+        sentences: Numbers of the sentences to evaluate. Default: None (all sentences).
+        align_keys: Whether to pair sentences by their (doc_id, sent_id) key. Default: False.
+        jobs: Number of worker processes for each evaluation. Default: None (no worker processes).
+        schedule_stats: Whether to print the scheduling report of each parallel evaluation to stderr.
+          Default: False.
+        pipeline_parsers: Number of parser threads of each pipeline. Default: NUM_PARSERS (see pipeline.py).
+        pipeline_queue_size: Maximum number of sentences buffered in each queue of each pipeline.
+          Default: QUEUE_SIZE (see pipeline.py).
     """
     # Run individual evaluations on all provided system files
     eval_results = []
     for system_file in system_paths:
-        curr_eval_results = run_evaluation_single(args.gold_file, system_file, normalize_scopes=normalize_scopes)
+        curr_eval_results = run_evaluation_single(gold_path, system_file, normalize_scopes=normalize_scopes,
+                                                  pipelined=pipelined, pipeline_stats=pipeline_stats,
+                                                  cache=cache, sentences=sentences, align_keys=align_keys,
+                                                  jobs=jobs, schedule_stats=schedule_stats,
+                                                  pipeline_parsers=pipeline_parsers,
+                                                  pipeline_queue_size=pipeline_queue_size)
         eval_results.append(curr_eval_results)
         print(system_file)
         print(curr_eval_results)
@@ -60,48 +453,47 @@ def run_evaluation_multiple(gold_path, system_paths, normalize_scopes=True):
         print(pooled_eval_results)
 
 
-def evaluate_sents(neg_sents_gold, neg_sents_system, normalize_scopes=True):
+def evaluate_sents(neg_sents_gold, neg_sents_system, normalize_scopes=True, slices=None):
     """Core function for evaluating one set of negation instances against another.
 
     Args:
         neg_sents_gold: List of negation sentences, each one being a list of gold NegationInstances.
         neg_sents_system: List of negation sentences, each one being a list of system-produced NegationInstances.
         normalize_scopes: Whether to normalize scope length when calculating scope metrics. Default: True.
+        slices: Optional SliceCounts object (see slices.py, with the same normalize_scopes) to which the counts
+          of every slice are added in the same pass. Default: None.
     Returns: An EvaluationResult object containing the results of the evaluation.
     """
-    num_instances_gold = len([inst for sent in neg_sents_gold for inst in sent])
-    num_instances_system = len([inst for sent in neg_sents_system for inst in sent])
-
-    num_instances_matched = 0
+    counts = EvaluationCounts(normalize_scopes=normalize_scopes)
 
-    scope_precision_numerator = 0.0
-    scope_recall_numerator = 0.0
+    # Sentences without a counterpart (if the corpora differ in length) are treated as
+    # having no negation instances on the other side.
+    for gold_sent, system_sent in zip_longest(neg_sents_gold, neg_sents_system, fillvalue=[]):
+        scored_matches = counts.add_sentence(gold_sent, system_sent)
+        if slices is not None:
+            slices.add_sentence(gold_sent, system_sent, scored_matches)
 
-    for gold_sent, system_sent in zip(neg_sents_gold, neg_sents_system):
-        for m_gold_inst, m_sys_inst in get_matching_instances(gold_sent, system_sent):
-            num_instances_matched += 1
+    return counts.to_result()
 
-            if normalize_scopes:
-                p, r, _ = scope_match_normalized(m_gold_inst, m_sys_inst)
-                scope_precision_numerator += p
-                scope_recall_numerator += r
-            else:
-                _, _, num_correct_tok = scope_match_tokens(m_gold_inst, m_sys_inst)
-                scope_precision_numerator += num_correct_tok
-                scope_recall_numerator += num_correct_tok
 
-    if normalize_scopes:
-        scope_precision_denominator = num_instances_system
-        scope_recall_denominator = num_instances_gold
-    else:
-        scope_precision_denominator = sum([inst.scope_length for sent in neg_sents_system for inst in sent])
-        scope_recall_denominator = sum([inst.scope_length for sent in neg_sents_gold for inst in sent])
+def run_evaluation_slices(gold_path, system_path, slices=DEFAULT_DIMENSIONS, normalize_scopes=True):
+    """Run evaluation on a single pair of (gold, system) corpora, broken down by properties of the negation
+    instances (see slices.py).
 
-    eval_result = EvaluationResult.from_counts(num_instances_gold, num_instances_system, num_instances_matched,
-                                               scope_precision_numerator, scope_precision_denominator,
-                                               scope_recall_numerator, scope_recall_denominator)
+    Args:
+        gold_path: Path to the gold corpus file.
+        system_path: Path to the system corpus file.
+        slices: The SliceDimensions to break the evaluation down by. Default: DEFAULT_DIMENSIONS (cue type,
+          cue length, scope length, single vs. multiple negations in the sentence).
+        normalize_scopes: Whether to normalize scope length when calculating scope metrics. Default: True.
+    Returns: A pair of an EvaluationResult object (for all instances) and a SliceCounts object.
+    """
+    neg_sents_gold = read_negation_instances_from_corpus(myconll.iter_from_file(gold_path), compact=True)
+    neg_sents_system = read_negation_instances_from_corpus(myconll.iter_from_file(system_path), compact=True)
 
-    return eval_result
+    slice_counts = SliceCounts(slices, normalize_scopes=normalize_scopes)
+    result = evaluate_sents(neg_sents_gold, neg_sents_system, normalize_scopes=normalize_scopes, slices=slice_counts)
+    return result, slice_counts
 
 
 if __name__ == "__main__":
@@ -114,16 +506,164 @@ if __name__ == "__main__":
     # Optional arguments  
     argparser.add_argument('-t', '--token-eval', dest='normalize_scopes', action='store_false',
                            help='Evaluate scopes on a per-token basis (i.e., do not normalize scope lengths)')
+    argparser.add_argument('-p', '--pipeline', dest='pipelined', action='store_true',
+                           help='Overlap reading, parsing and scoring in a threaded pipeline')
+    argparser.add_argument('--pipeline-stats', action='store_true',
+                           help='Print queue depth and stage throughput statistics of the pipeline to stderr')
+    argparser.add_argument('--pipeline-parsers', type=int, default=None, metavar='N',
+                           help='With --pipeline: number of parser threads, default: {}'.format(NUM_PARSERS))
+    argparser.add_argument('--pipeline-queue-size', type=int, default=None, metavar='N',
+                           help='With --pipeline: maximum number of sentences buffered in each queue, '
+                                'default: {}'.format(QUEUE_SIZE))
+    argparser.add_argument('-j', '--jobs', type=int, default=None, metavar='N',
+                           help='Evaluate on N worker processes; the sentences are packed into chunks of about equal '
+                                'estimated cost (tokens x negation instances), which idle workers take largest first')
+    argparser.add_argument('--schedule-stats', action='store_true',
+                           help='With --jobs: print how evenly the chunks were spread over the workers to stderr')
+    argparser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_PATH, default=None, metavar='PATH',
+                           help='Look up results in (and add them to) a result cache; '
+                                'default location: {}'.format(DEFAULT_CACHE_PATH))
+    argparser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), metavar='MB',
+                           help='Maximum size of the result cache in MiB (least recently used results are evicted), '
+                                'default: %(default)s')
+    argparser.add_argument('--sentence-stats', metavar='PATH',
+                           help='Keep per-sentence statistics in PATH and only re-score sentences that changed '
+                                'since the last evaluation with the same file (one system file only)')
+    argparser.add_argument('--sentences', type=parse_sentence_ranges, metavar='RANGES',
+                           help='Only evaluate the given sentences (0-based numbers and ranges, e.g. 0-99,250); '
+                                'they are read through a sentence index stored next to each (uncompressed) file')
+    argparser.add_argument('-a', '--align-keys', action='store_true',
+                           help='Pair gold and system sentences by their (doc_id, sent_id) columns instead of their '
+                                'position; missing and extra system sentences are reported on stderr')
+    argparser.add_argument('--slices', action='store_true',
+                           help='Also report the results per slice of instances (affix vs. word cues, single vs. '
+                                'multiword cues, scope length bins, single vs. multiple negations per sentence)')
+    argparser.add_argument('--group-by', type=DocumentGrouping, metavar='SPEC',
+                           help='Report the results per group of documents (first column) with micro and macro '
+                                'totals; SPEC is doc (one group per document), prefix:P1,P2,... or regex:PATTERN')
+    argparser.add_argument('--layer', dest='layers', type=AnnotationLayer.from_spec, action='append',
+                           metavar='SPEC',
+                           help='Evaluate an annotation layer (can be given several times; all layers are evaluated '
+                                'in one pass); SPEC is NAME[:FIRST-LAST][=GOLD,SYSTEM], e.g. speculation:16-24 for '
+                                'the columns 16-24 of the given files or speculation=GOLD,SYSTEM for other files')
+    argparser.add_argument('--sweep', action='store_true',
+                           help='The system files are token score files (per-token cue and scope scores, see '
+                                'threshold_sweep.py); report token-level cue and scope scores for all thresholds')
+    argparser.add_argument('--curves', metavar='PATH',
+                           help='With --sweep: write the precision-recall curves of all thresholds to PATH '
+                                '(tab-separated; one score file only)')
+    argparser.add_argument('--nbest', action='store_true',
+                           help='The system files are the k hypotheses of an N-best output, in rank order; report '
+                                'every hypothesis, the oracle-best and the expected scores in one pass')
+    argparser.add_argument('--nbest-columns', type=parse_column_groups, metavar='GROUPS',
+                           help='With --nbest: the hypotheses are column groups of a single system file, e.g. '
+                                '7-15,16-24,25-33')
+    argparser.add_argument('--nbest-scores', metavar='PATH',
+                           help='With --nbest: file with the scores (log-probabilities) of the k hypotheses of every '
+                                'sentence, one line per sentence; default: uniform weights')
     argparser.set_defaults(normalize_scopes=True)
 
     args = argparser.parse_args()
+    for option, value in (('--jobs', args.jobs), ('--pipeline-parsers', args.pipeline_parsers),
+                          ('--pipeline-queue-size', args.pipeline_queue_size)):
+        if value is not None and value < 1:
+            argparser.error('{} must be at least 1'.format(option))
+    options_error = check_options(args)
+    if options_error:
+        argparser.error(options_error)
+    if args.layers and len({layer.name for layer in args.layers}) < len(args.layers):
+        argparser.error('the names of the layers must be unique')
+
+    if args.nbest:
+        try:
+            if args.nbest_columns:
+                layers = hypothesis_layers(args.gold_file, system_path=args.system_files[0],
+                                           column_groups=args.nbest_columns)
+            else:
+                layers = hypothesis_layers(args.gold_file, system_paths=args.system_files)
+            nbest_counts = evaluate_nbest(layers, scores_path=args.nbest_scores,
+                                          normalize_scopes=args.normalize_scopes)
+        except ValueError as e:
+            argparser.error(str(e))
+        print(nbest_counts)
+        exit()
+
+    if args.sweep:
+        for scores_file in args.system_files:
+            try:
+                sweep_result = sweep_thresholds(args.gold_file, scores_file)
+            except ValueError as e:
+                argparser.error('{}: {}'.format(scores_file, e))
+            if len(args.system_files) > 1:
+                print(scores_file)
+            print(sweep_result)
+            if args.curves:
+                sweep_result.write_curves(args.curves)
+        exit()
+
+    if args.layers:
+        for system_file in args.system_files:
+            layer_results = run_evaluation_layers([layer.with_paths(args.gold_file, system_file)
+                                                   for layer in args.layers],
+                                                  normalize_scopes=args.normalize_scopes)
+            if len(args.system_files) > 1:
+                print(system_file)
+            for name, eval_result in layer_results.items():
+                print("Layer: {}".format(name))
+                print(eval_result)
+        exit()
+
+    if args.group_by:
+        for system_file in args.system_files:
+            group_counts = run_evaluation_grouped(args.gold_file, system_file, args.group_by,
+                                                  normalize_scopes=args.normalize_scopes)
+            if len(args.system_files) > 1:
+                print(system_file)
+            print(group_counts)
+        exit()
+
+    if args.slices:
+        eval_results, all_slice_counts = [], []
+        for system_file in args.system_files:
+            eval_result, slice_counts = run_evaluation_slices(args.gold_file, system_file,
+                                                              normalize_scopes=args.normalize_scopes)
+            eval_results.append(eval_result)
+            all_slice_counts.append(slice_counts)
+            if len(args.system_files) > 1:
+                print(system_file)
+            print(eval_result)
+            print(slice_counts)
+        # As in run_evaluation_multiple, the results of several system files are also averaged
+        if len(args.system_files) > 1:
+            print("AVERAGE")
+            print(EvaluationResult.average(eval_results))
+            print(format_average_slices(all_slice_counts))
+        exit()
+
+    cache = ResultCache(args.cache, max_bytes=args.cache_size * 1024 * 1024) if args.cache else None
+    pipeline_options = {"pipeline_parsers": args.pipeline_parsers or NUM_PARSERS,
+                        "pipeline_queue_size": args.pipeline_queue_size or QUEUE_SIZE}
 
     if len(args.system_files) == 1:  # Evaluate exactly one system file
         system_file = args.system_files[0]
-        eval_result = run_evaluation_single(args.gold_file, system_file, normalize_scopes=args.normalize_scopes)
+        try:
+            eval_result = run_evaluation_single(args.gold_file, system_file, normalize_scopes=args.normalize_scopes,
+                                                pipelined=args.pipelined, pipeline_stats=args.pipeline_stats,
+                                                cache=cache, sentence_stats=args.sentence_stats,
+                                                sentences=args.sentences, align_keys=args.align_keys,
+                                                jobs=args.jobs, schedule_stats=args.schedule_stats,
+                                                **pipeline_options)
+        except ValueError as e:
+            argparser.error(str(e))
         print(eval_result)
         exit()
     else:  # Evaluate multiple system files and average
-        run_evaluation_multiple(args.gold_file, args.system_files,  normalize_scopes=args.normalize_scopes)
+        try:
+            run_evaluation_multiple(args.gold_file, args.system_files,  normalize_scopes=args.normalize_scopes,
+                                    pipelined=args.pipelined, pipeline_stats=args.pipeline_stats, cache=cache,
+                                    sentences=args.sentences, align_keys=args.align_keys, jobs=args.jobs,
+                                    schedule_stats=args.schedule_stats, **pipeline_options)
+        except ValueError as e:
+            argparser.error(str(e))
         exit()
 
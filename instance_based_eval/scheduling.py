@@ -0,0 +1,247 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Length-aware chunk scheduling for evaluating a corpus on a pool of worker processes.
+
+The cost of a sentence varies widely: it grows with its number of tokens times its number of negation
+instances, so a few very long sentences can stall chunks of an equal number of sentences. Instead:
+  * the cost of every sentence is estimated from a cheap pre-scan of its text: its number of token lines and
+    the number of instance columns of its first line, in the gold and the system file, weighted by the
+    CostModel of the evaluation (estimate_costs);
+  * the sentences are packed into contiguous chunks of about equal estimated cost, several per worker; a
+    sentence that is more expensive than a chunk forms a chunk of its own (pack_chunks);
+  * the chunks wait in a single queue, the most expensive ones first, and every idle worker takes the next one,
+    so no worker is assigned work in advance and workers that finish early pick up what is left (run_chunks).
+The results come back in chunk (i.e. corpus) order, together with a SchedulingReport on how well the work was
+spread over the workers.
+"""
+
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Number of token columns before the (cue, scope, event) triples
+NUM_TOKEN_COLUMNS = 7
+
+CostModel = namedtuple("CostModel", ["sentence", "token", "instance", "token_instance"])
+CostModel.__doc__ = """Estimated cost of evaluating a sentence: per sentence, per token, per (gold or system) instance
+and per token and instance."""
+
+# Fitted on the per-sentence times of corpora of benchmarks/synthetic_corpus.py with up to 2,000 tokens and
+# 80 instances per sentence (in units of the cost of a token). An additional term for the pairs of gold and
+# system instances did not improve the fit of either evaluation.
+INSTANCE_BASED_COSTS = CostModel(sentence=3.6, token=1.0, instance=0.0, token_instance=0.74)
+EXTENDED_COSTS = CostModel(sentence=0.4, token=1.0, instance=4.9, token_instance=0.17)
+
+# Chunks per worker: more chunks balance the load better, fewer chunks have less overhead
+DEFAULT_CHUNKS_PER_JOB = 4
+
+_BLANK_LINES = re.compile(r"\n\s*\n")
+
+
+def split_sentences(text):
+    """Split the text of a *SEM file into the texts of its sentences, without parsing them (as myconll does:
+    sentences are separated by one or more blank lines).
+    """
+    return [sentence for sentence in _BLANK_LINES.split(text.strip()) if sentence.strip()]
+
+
+def sentence_shape(sentence):
+    """Return the number of tokens and the number of instances (column triples) of the text of a sentence."""
+    first_line = sentence.split("\n", 1)[0]
+    num_instances = (first_line.count("\t") + 1 - NUM_TOKEN_COLUMNS) // 3
+    return sentence.count("\n") + 1, max(num_instances, 0)
+
+
+def estimate_costs(gold_sentences, system_sentences, cost_model=INSTANCE_BASED_COSTS):
+    """Estimate the cost of evaluating every sentence from the pre-scan of its gold and system text.
+
+    Args:
+        gold_sentences: The texts of the gold sentences (see split_sentences).
+        system_sentences: The texts of the system sentences, at the same positions; a sentence missing on one
+          side has no instances there.
+        cost_model: The CostModel of the evaluation. Default: INSTANCE_BASED_COSTS.
+
+    Returns: The estimated cost of every sentence, as a numpy array.
+    """
+    num_sentences = max(len(gold_sentences), len(system_sentences))
+    shapes = np.zeros((2, num_sentences, 2))
+    for side, sentences in enumerate((gold_sentences, system_sentences)):
+        if sentences:
+            shapes[side, :len(sentences)] = [sentence_shape(sentence) for sentence in sentences]
+
+    num_tokens = np.maximum(shapes[0, :, 0], shapes[1, :, 0])
+    num_instances = shapes[0, :, 1] + shapes[1, :, 1]
+    return (cost_model.sentence + cost_model.token * num_tokens + cost_model.instance * num_instances
+            + cost_model.token_instance * num_tokens * num_instances)
+
+
+def pack_chunks(costs, num_chunks):
+    """Pack consecutive sentences into chunks of about equal estimated cost.
+
+    Args:
+        costs: The estimated cost of every sentence.
+        num_chunks: The desired number of chunks. There may be more (if single sentences are more expensive
+          than a chunk, they form chunks of their own) or fewer (if there are fewer sentences).
+
+    Returns: A list of (start, end) sentence ranges (end exclusive), in corpus order.
+    """
+    costs = np.asarray(costs, dtype=float)
+    if not len(costs):
+        return []
+    target = costs.sum() / max(num_chunks, 1)
+
+    chunks = []
+    start, chunk_cost = 0, 0.0
+    for idx, cost in enumerate(costs.tolist()):
+        # A sentence starts a new chunk if the current one would overshoot the target by more than half of it,
+        # or if it is too expensive to share a chunk
+        if idx > start and (chunk_cost + cost / 2 > target or cost >= target):
+            chunks.append((start, idx))
+            start, chunk_cost = idx, 0.0
+        chunk_cost += cost
+    chunks.append((start, len(costs)))
+    return chunks
+
+
+def equal_chunks(num_sentences, num_chunks):
+    """Split the sentences into chunks of (about) equal numbers of sentences, for comparison with pack_chunks."""
+    bounds = np.linspace(0, num_sentences, min(num_chunks, num_sentences) + 1).round().astype(int).tolist()
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def simulate_makespan(chunk_costs, jobs):
+    """Return the makespan (total cost of the busiest worker) when the chunks are taken, in the given order, by
+    whichever of the workers is idle first.
+    """
+    loads = np.zeros(max(jobs, 1))
+    for cost in chunk_costs:
+        loads[np.argmin(loads)] += cost
+    return loads.max()
+
+
+class SchedulingReport:
+    """How evenly the chunks of a run were spread over the workers, estimated and measured."""
+    def __init__(self, jobs, chunks, chunk_costs, sentence_costs):
+        """
+        Args:
+            jobs: The number of workers.
+            chunks: The (start, end) sentence ranges of the chunks.
+            chunk_costs: The estimated cost of every chunk.
+            sentence_costs: The estimated cost of every sentence.
+        """
+        self.jobs = jobs
+        self.chunks = chunks
+        self.chunk_costs = np.asarray(chunk_costs, dtype=float)
+        self.sentence_costs = np.asarray(sentence_costs, dtype=float)
+        self.chunk_times = np.zeros(len(chunks))  # Measured time of every chunk
+        self.chunk_workers = [None] * len(chunks)  # Process id of the worker of every chunk
+        self.wall_time = 0.0
+
+    def estimated_efficiency(self, chunk_costs, largest_first=True):
+        """Return the estimated efficiency (total cost / (workers x makespan)) of a set of chunks.
+
+        Args:
+            chunk_costs: The estimated cost of every chunk, in corpus order.
+            largest_first: Whether the workers take the chunks largest first (as in run_chunks) or in corpus
+              order. Default: True.
+        """
+        total = float(np.sum(chunk_costs))
+        if not total:
+            return 1.0
+        makespan = simulate_makespan(sorted(chunk_costs, reverse=True) if largest_first else chunk_costs, self.jobs)
+        return total / (self.jobs * makespan)
+
+    def worker_times(self):
+        """Return the busy time of every worker, as a dict from process id to seconds."""
+        times = {}
+        for worker, chunk_time in zip(self.chunk_workers, self.chunk_times.tolist()):
+            times[worker] = times.get(worker, 0.0) + chunk_time
+        return times
+
+    @property
+    def efficiency(self):
+        """Measured efficiency: the busy time of all workers over workers x wall time (1 is perfect)."""
+        if not self.wall_time:
+            return 1.0
+        return float(self.chunk_times.sum()) / (self.jobs * self.wall_time)
+
+    def __str__(self):
+        sizes = [end - start for start, end in self.chunks]
+        equal_costs = [self.sentence_costs[start:end].sum()
+                       for start, end in equal_chunks(len(self.sentence_costs), len(self.chunks))]
+        worker_times = sorted(self.worker_times().values(), reverse=True)
+
+        res = "Scheduling: {} chunks ({}-{} sentences) on {} workers\n".format(
+            len(self.chunks), min(sizes, default=0), max(sizes, default=0), self.jobs)
+        if len(self.sentence_costs):
+            res += "  most expensive sentence: {:.2f}% of the estimated cost\n".format(
+                100 * self.sentence_costs.max() / max(self.sentence_costs.sum(), 1e-12))
+        res += "  estimated efficiency: {:.1f}% (chunks of equal numbers of sentences in corpus order: " \
+               "{:.1f}%)\n".format(100 * self.estimated_efficiency(self.chunk_costs),
+                                   100 * self.estimated_efficiency(equal_costs, largest_first=False))
+        res += "  measured efficiency: {:.1f}% (wall time {:.2f}s, busy time per worker: {})\n".format(
+            100 * self.efficiency, self.wall_time, ", ".join("{:.2f}s".format(t) for t in worker_times))
+        # (Only meaningful if the chunks differ in cost)
+        if len(self.chunks) > 2 and self.chunk_costs.std() > 0.1 * self.chunk_costs.mean() \
+                and self.chunk_times.std():
+            res += "  correlation of estimated cost and time per chunk: {:.2f}\n".format(
+                np.corrcoef(self.chunk_costs, self.chunk_times)[0, 1])
+        return res
+
+
+def _run_timed(func, args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, os.getpid(), time.perf_counter() - start
+
+
+def run_chunks(func, chunk_args, sentence_costs, chunks, jobs):
+    """Run a function on every chunk, on a pool of workers, the chunks with the highest estimated cost first.
+
+    Args:
+        func: A function (defined at module level, so that it can be sent to the workers) that evaluates a chunk.
+        chunk_args: The arguments of func for every chunk (tuples).
+        sentence_costs: The estimated cost of every sentence.
+        chunks: The (start, end) sentence ranges of the chunks (see pack_chunks).
+        jobs: Number of worker processes. With 1 job (or a single chunk), the chunks are evaluated in the calling
+          process.
+
+    Returns: The results of func for every chunk, in chunk order, and a SchedulingReport.
+    """
+    chunk_costs = [float(np.sum(sentence_costs[start:end])) for start, end in chunks]
+    num_workers = min(jobs, len(chunks)) if jobs > 1 and len(chunks) > 1 else 1
+    report = SchedulingReport(num_workers, chunks, chunk_costs, sentence_costs)
+    order = sorted(range(len(chunks)), key=lambda idx: -chunk_costs[idx])
+
+    results = [None] * len(chunks)
+    start_time = time.perf_counter()
+    if num_workers > 1:
+        # All chunks are queued at once; the pool hands the next one to whichever worker is idle
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = {idx: executor.submit(_run_timed, func, chunk_args[idx]) for idx in order}
+            for idx, future in futures.items():
+                results[idx], report.chunk_workers[idx], report.chunk_times[idx] = future.result()
+    else:
+        for idx in order:
+            results[idx], report.chunk_workers[idx], report.chunk_times[idx] = _run_timed(func, chunk_args[idx])
+    report.wall_time = time.perf_counter() - start_time
+
+    return results, report
+
+
+def schedule_chunks(gold_sentences, system_sentences, jobs, cost_model=INSTANCE_BASED_COSTS,
+                    chunks_per_job=DEFAULT_CHUNKS_PER_JOB):
+    """Estimate the sentence costs and pack the sentences into chunks for a pool of jobs workers.
+
+    Returns: The estimated cost of every sentence and the (start, end) sentence ranges of the chunks.
+    """
+    costs = estimate_costs(gold_sentences, system_sentences, cost_model=cost_model)
+    return costs, pack_chunks(costs, jobs * chunks_per_job)
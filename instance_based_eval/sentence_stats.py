@@ -0,0 +1,247 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Incremental re-scoring with persisted per-sentence sufficient statistics.
+
+An evaluator that accumulates additive counts sentence by sentence (EvaluationCounts of the
+instance-based evaluation, the counters of the extended *SEM evaluation) can keep the contribution
+of every sentence in a stats file, together with a hash of the (gold, system) sentence block pair.
+When the evaluation is repeated (e.g. after a small post-processing fix of the system output), only
+sentences whose blocks changed are parsed and scored again; the totals stored in the file are patched
+by subtracting the old and adding the new contributions of these sentences. The counters are integers
+(fractional counters have to be stored in fixed point, see EvaluationCounts.to_int_stats), so that the
+patched totals are exact, however often the file is updated.
+
+The stats file is tied to an evaluator, its version and its options; if any of them differ, the file
+is ignored and all sentences are scored. Sentences are compared by position, so inserting or deleting
+a sentence causes all following sentences to be re-scored.
+
+File layout: one line of JSON metadata (including the totals), followed by the sentence keys
+(16 bytes each), the number of non-zero counters per sentence (uint32), their positions (uint32)
+and their values (int64), all in native byte order. Only the non-zero counters of a sentence are
+stored, since most sentences only touch a few of them.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+from array import array
+from itertools import accumulate, zip_longest
+
+from myconll.compression import read_text
+
+FORMAT_VERSION = 2
+KEY_SIZE = 16
+
+_BLANK_LINES = re.compile(r"\n\s*\n")
+
+
+def iter_sentence_blocks(text):
+    """Split the text of a CoNLL file into its raw sentence blocks (without parsing them).
+
+    Blank lines (including lines that only consist of whitespace) separate the blocks,
+    just as in myconll's iter_sentence_lines.
+    """
+    for block in _BLANK_LINES.split(text.strip()):
+        if block:
+            yield block
+
+
+def block_lines(block):
+    """Return the stripped lines of a sentence block, as given by myconll's iter_sentence_lines."""
+    return [line.strip() for line in block.split("\n")]
+
+
+def sentence_key(gold_block, system_block):
+    """Hash a pair of (gold, system) sentence blocks. A missing block (None) is hashed differently
+    from an empty one.
+    """
+    if gold_block is None or system_block is None:
+        data = (gold_block or "").encode("utf-8") + (b"\x01" if gold_block is None else b"\x02") \
+            + (system_block or "").encode("utf-8")
+    else:
+        data = (gold_block + "\x00" + system_block).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=KEY_SIZE).digest()
+
+
+class SentenceStats:
+    """The per-sentence contributions to the counters of an evaluation, and their totals."""
+    def __init__(self, width):
+        """
+        Args:
+            width: Number of counters of the evaluation.
+        """
+        self.width = width
+        self.keys = bytearray()
+        self.lengths = array("I")  # Number of non-zero counters of each sentence
+        self.positions = array("I")
+        self.values = array("q")
+        self.totals = [0] * width
+
+        self._offsets = None  # Start of each sentence in positions/values (computed on demand)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def key(self, idx):
+        return bytes(self.keys[idx * KEY_SIZE:(idx + 1) * KEY_SIZE])
+
+    def offset(self, idx):
+        if self._offsets is None:
+            self._offsets = array("q", accumulate(self.lengths, initial=0))
+        return self._offsets[idx]
+
+    def add(self, key, contribution):
+        """Append a sentence with the given contribution (a sequence of width integer counters) and add it to the
+        totals.
+        """
+        assert len(contribution) == self.width
+        self.keys += key
+        num_values = 0
+        for pos, value in enumerate(contribution):
+            if value:
+                self.positions.append(pos)
+                self.values.append(value)
+                self.totals[pos] += value
+                num_values += 1
+        self.lengths.append(num_values)
+
+    def copy_range(self, other, start, end):
+        """Append the sentences [start, end) of another SentenceStats (whose contributions are already
+        included in the totals).
+        """
+        self.keys += other.keys[start * KEY_SIZE:end * KEY_SIZE]
+        self.lengths.extend(other.lengths[start:end])
+        self.positions.extend(other.positions[other.offset(start):other.offset(end)])
+        self.values.extend(other.values[other.offset(start):other.offset(end)])
+
+    def subtract_sentence(self, idx):
+        """Subtract the contribution of a sentence from the totals (without removing the sentence)."""
+        for i in range(self.offset(idx), self.offset(idx + 1)):
+            self.totals[self.positions[i]] -= self.values[i]
+
+    def save(self, path, meta):
+        """Write the stats to a file (atomically, via a temporary file).
+
+        Args:
+            path: Location of the stats file.
+            meta: Dict identifying the evaluation (evaluator, version, options).
+        """
+        header = dict(meta, format=FORMAT_VERSION, byteorder=sys.byteorder, width=self.width,
+                      num_sentences=len(self), num_values=len(self.values), totals=self.totals)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            f.write(self.keys)
+            self.lengths.tofile(f)
+            self.positions.tofile(f)
+            self.values.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, meta, width):
+        """Read a stats file.
+
+        Args:
+            path: Location of the stats file.
+            meta: Dict identifying the evaluation (evaluator, version, options).
+            width: Number of counters of the evaluation.
+
+        Returns: The SentenceStats, or None if the file does not exist or belongs to a different evaluation.
+        """
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "rb") as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                return None
+            expected = dict(meta, format=FORMAT_VERSION, byteorder=sys.byteorder, width=width)
+            if any(header.get(name) != value for name, value in expected.items()):
+                return None
+
+            stats = cls(width)
+            stats.totals = header["totals"]
+            stats.keys = bytearray(f.read(header["num_sentences"] * KEY_SIZE))
+            stats.lengths.fromfile(f, header["num_sentences"])
+            stats.positions.fromfile(f, header["num_values"])
+            stats.values.fromfile(f, header["num_values"])
+        return stats
+
+
+class RescoringStats:
+    """Number of sentences of an incremental evaluation, and how many of them had to be scored."""
+    def __init__(self, num_sentences, num_rescored):
+        self.num_sentences = num_sentences
+        self.num_rescored = num_rescored
+
+    def __str__(self):
+        return "Re-scored {} of {} sentences".format(self.num_rescored, self.num_sentences)
+
+
+def rescore_changed_sentences(gold_path, system_path, stats_path, score_sentence, width, meta):
+    """Evaluate a system file against a gold file, re-scoring only sentences that changed since the
+    evaluation that wrote the stats file. The stats file is then updated.
+
+    Args:
+        gold_path: Path to the gold corpus file (may be gzip/xz/bz2 compressed).
+        system_path: Path to the system corpus file (may be gzip/xz/bz2 compressed).
+        stats_path: Location of the stats file. It is created if it does not exist.
+        score_sentence: Function that scores a single sentence pair. It is called as
+          score_sentence(gold_lines, system_lines, sent_idx, line_num), where the lines are the stripped
+          lines of the sentence blocks (None if one file has fewer sentences than the other) and line_num
+          is the (approximate) line number of the sentence start, and returns width integer counters.
+        width: Number of counters of the evaluation.
+        meta: Dict identifying the evaluation (evaluator, version, options). Must be JSON-serializable.
+
+    Returns: A pair of the totals of all counters (a list) and a RescoringStats object.
+    """
+    old_stats = SentenceStats.load(stats_path, meta, width)
+    new_stats = SentenceStats(width)
+    if old_stats is not None:
+        new_stats.totals = old_stats.totals
+    num_old = len(old_stats) if old_stats is not None else 0
+
+    gold_blocks = iter_sentence_blocks(read_text(gold_path))
+    system_blocks = iter_sentence_blocks(read_text(system_path))
+
+    num_rescored = 0
+    reuse_start = 0  # Start of the current run of unchanged sentences
+    line_num = 1
+    sent_idx = -1
+    for sent_idx, (gold_block, system_block) in enumerate(zip_longest(gold_blocks, system_blocks)):
+        key = sentence_key(gold_block, system_block)
+        if sent_idx < num_old and old_stats.key(sent_idx) == key:
+            pass
+        else:
+            # Copy the preceding run of unchanged sentences, then replace this one
+            if reuse_start < min(sent_idx, num_old):
+                new_stats.copy_range(old_stats, reuse_start, min(sent_idx, num_old))
+            reuse_start = sent_idx + 1
+            if sent_idx < num_old:
+                old_stats.subtract_sentence(sent_idx)
+
+            gold_lines = block_lines(gold_block) if gold_block is not None else None
+            system_lines = block_lines(system_block) if system_block is not None else None
+            new_stats.add(key, score_sentence(gold_lines, system_lines, sent_idx, line_num))
+            num_rescored += 1
+
+        line_num += (gold_block or system_block).count("\n") + 2  # +1 for the last line, +1 for the blank line
+
+    num_sentences = sent_idx + 1
+    if reuse_start < min(num_sentences, num_old):
+        new_stats.copy_range(old_stats, reuse_start, min(num_sentences, num_old))
+
+    # Sentences that no longer exist
+    for idx in range(num_sentences, num_old):
+        old_stats.subtract_sentence(idx)
+
+    new_stats.save(stats_path, meta)
+
+    return new_stats.totals, RescoringStats(num_sentences, num_rescored)
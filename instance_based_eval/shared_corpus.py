@@ -0,0 +1,311 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Encoded gold corpus in shared memory, for evaluations on a pool of worker processes.
+
+Instead of pickling the parsed corpus into every worker, or parsing the gold file again in each of them, the
+corpus is encoded once as flat arrays in a single multiprocessing.shared_memory block:
+  * sentence_offsets: the index of the first token of every sentence (plus the total number of tokens);
+  * sentence_docs: the document id of every sentence (a string id);
+  * token_ids, forms: the token id and word form of every token (string ids);
+  * cue_masks, scope_masks, event_masks: for every token, a bitmask of the instances whose cue, scope or event
+    it is part of (bit i for the i-th column triple; several 64-bit words per token for sentences with more
+    than 64 triples);
+  * cue_unlabelled_masks, scope_unlabelled_masks, event_unlabelled_masks: the same for the labels that are
+    NO_LABEL (which the parsed tokens keep as part of the spans);
+  * label_tokens, label_keys, labels: the other labels that differ from the word form of their token (e.g. affix
+    cues), by token, with the layer and instance they belong to;
+  * the strings (word forms, labels, token and document ids), interned once, as one UTF-8 blob with offsets.
+
+Workers attach to the block by its handle (a small picklable SharedCorpusHandle) and read the arrays in place,
+so adding workers neither copies the corpus nor parses it again. The negation instances of a sentence are decoded
+on demand and are the same as those of build_sentence_instances(..., compact=True).
+
+The process that creates the corpus owns the block and must release it with unlink (or use the corpus as a
+context manager); workers only close their view of it.
+"""
+
+import sys
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import myconll
+from negation_instance import CompactNegationInstance, ispunct, NO_LABEL
+
+# Layers of the bitmasks and the label table
+CUE, SCOPE, EVENT = 0, 1, 2
+_LAYERS = ("cue", "scope", "event")
+# A label key holds the layer in its lowest two bits and the instance id above them
+_LAYER_BITS = 2
+_ALIGNMENT = 8
+_WORD = (1 << 64) - 1
+
+SharedCorpusHandle = namedtuple("SharedCorpusHandle", ["name", "layout"])
+SharedCorpusHandle.__doc__ = """Picklable reference to a SharedCorpus: the name of its shared memory block and the
+(name, offset, dtype, shape) of every array in it."""
+
+
+class SharedCorpus:
+    """Gold corpus encoded as flat arrays in shared memory (see the module documentation)."""
+    def __init__(self, shm, layout, owner=False):
+        """Use SharedCorpus.from_file, from_sentences or attach instead.
+
+        Args:
+            shm: The SharedMemory block holding the arrays.
+            layout: The (name, offset, dtype, shape) of every array in the block.
+            owner: Whether this process created the block (and has to unlink it). Default: False.
+        """
+        self._shm = shm
+        self._layout = layout
+        self.owner = owner
+        self._arrays = {name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+                        for name, offset, dtype, shape in layout}
+        self._strings = {}  # Decoded strings of this process, by id
+
+    @classmethod
+    def from_file(cls, path):
+        """Parse a gold corpus file and encode it in a new shared memory block."""
+        return cls.from_sentences(myconll.iter_from_file(path))
+
+    @classmethod
+    def from_sentences(cls, sentences):
+        """Encode a corpus in a new shared memory block.
+
+        Args:
+            sentences: An iterable of sentences (e.g. from myconll.iter_from_file).
+
+        Returns: The new SharedCorpus, owned by this process.
+        """
+        encoder = _CorpusEncoder()
+        for sentence in sentences:
+            encoder.add(sentence)
+        return cls._create(encoder.arrays())
+
+    @classmethod
+    def _create(cls, arrays):
+        layout = []
+        size = 0
+        for name, array in arrays.items():
+            layout.append((name, size, array.dtype.str, array.shape))
+            size += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        corpus = cls(shm, tuple(layout), owner=True)
+        for name, array in arrays.items():
+            corpus._arrays[name][...] = array
+        return corpus
+
+    @classmethod
+    def attach(cls, handle):
+        """Attach to the shared corpus of another process (without copying it)."""
+        if sys.version_info >= (3, 13):
+            # The creating process alone is responsible for unlinking the block
+            shm = shared_memory.SharedMemory(name=handle.name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=handle.name)
+        return cls(shm, handle.layout)
+
+    @property
+    def handle(self):
+        """The SharedCorpusHandle with which worker processes can attach to the corpus."""
+        return SharedCorpusHandle(self._shm.name, self._layout)
+
+    @property
+    def nbytes(self):
+        """Size of the encoded corpus in bytes."""
+        return self._shm.size
+
+    def __len__(self):
+        return len(self._arrays["sentence_offsets"]) - 1
+
+    def string(self, string_id):
+        """Return the string with the given id."""
+        string = self._strings.get(string_id)
+        if string is None:
+            offsets = self._arrays["string_offsets"]
+            start, end = int(offsets[string_id]), int(offsets[string_id + 1])
+            string = self._strings[string_id] = bytes(self._arrays["string_data"][start:end]).decode("utf-8")
+        return string
+
+    def doc_id(self, sent_idx):
+        """Return the document id of a sentence."""
+        return self.string(int(self._arrays["sentence_docs"][sent_idx]))
+
+    def sentence_instances(self, sent_idx):
+        """Decode the negation instances of a sentence.
+
+        Returns: The CompactNegationInstances of the sentence, sorted by instance id, as
+          build_sentence_instances(sentence, compact=True, sent_idx=sent_idx) would return them.
+        """
+        offsets = self._arrays["sentence_offsets"]
+        start, end = int(offsets[sent_idx]), int(offsets[sent_idx + 1])
+        cue_masks = self._arrays["cue_masks"][start:end]
+        if not cue_masks.any():
+            return []
+
+        scope_masks = self._arrays["scope_masks"][start:end]
+        event_masks = self._arrays["event_masks"][start:end]
+        # Only the tokens that are part of any instance
+        positions = np.flatnonzero((cue_masks | scope_masks | event_masks).any(axis=1))
+        token_ids = [self.string(string_id) for string_id in self._arrays["token_ids"][start + positions].tolist()]
+        forms = [self.string(string_id) for string_id in self._arrays["forms"][start + positions].tolist()]
+        labels = self._sentence_labels(start, end)
+
+        spans = ({}, {}, {})
+        affix_cue_ids = set()
+        for layer, layer_masks in enumerate((cue_masks, scope_masks, event_masks)):
+            layer_spans = spans[layer]
+            unlabelled_masks = _mask_ints(self._arrays[_LAYERS[layer] + "_unlabelled_masks"][start + positions])
+            for n, (pos, mask) in enumerate(zip(positions.tolist(), _mask_ints(layer_masks[positions]))):
+                unlabelled = unlabelled_masks[n]
+                while mask:
+                    bit = mask & -mask
+                    mask ^= bit
+                    i = bit.bit_length() - 1
+                    if unlabelled & bit:
+                        form = NO_LABEL
+                    else:
+                        label_id = labels.get((pos, (i << _LAYER_BITS) | layer)) if labels else None
+                        if label_id is None:
+                            form = forms[n]
+                        else:
+                            form = self.string(label_id)
+                            if layer == CUE:  # affix negation!
+                                affix_cue_ids.add(i)
+                        if layer == SCOPE and ispunct(form):
+                            continue
+                    layer_spans.setdefault(i, []).append((token_ids[n], form))
+
+        cues, scopes, events = spans
+        # Only IDs with at least one cue token constitute negation instances
+        return [CompactNegationInstance(i, sent_idx, cues[i], scopes.get(i, ()), events.get(i, ()),
+                                        i in affix_cue_ids, len(cues))
+                for i in sorted(cues)]
+
+    def _sentence_labels(self, start, end):
+        label_tokens = self._arrays["label_tokens"]
+        first, last = np.searchsorted(label_tokens, (start, end))
+        if first == last:
+            return {}
+        return {(token - start, key): label_id
+                for token, key, label_id in zip(label_tokens[first:last].tolist(),
+                                                self._arrays["label_keys"][first:last].tolist(),
+                                                self._arrays["labels"][first:last].tolist())}
+
+    def __iter__(self):
+        """Iterate over the negation instances of all sentences (see sentence_instances)."""
+        return (self.sentence_instances(sent_idx) for sent_idx in range(len(self)))
+
+    def close(self):
+        """Close the view of this process on the shared memory block."""
+        if self._shm is not None:
+            # The arrays are views on the block and have to be released first
+            self._arrays = {}
+            self._shm.close()
+
+    def unlink(self):
+        """Close the block and free it if this process created it (otherwise only close it)."""
+        shm = self._shm
+        self.close()
+        self._shm = None
+        if shm is not None and self.owner:
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.unlink()
+
+
+def _mask_ints(masks):
+    """Combine the 64-bit words of the bitmasks of some tokens into one Python int per token."""
+    if masks.shape[1] == 1:
+        return masks[:, 0].tolist()
+    return [sum(word << (64 * k) for k, word in enumerate(words)) for words in masks.tolist()]
+
+
+class _CorpusEncoder:
+    """Collects the flat arrays of a corpus sentence by sentence."""
+    def __init__(self):
+        self.string_ids = {}
+        self.sentence_offsets = [0]
+        self.sentence_docs = []
+        self.token_ids = []
+        self.forms = []
+        # Per layer, the bitmasks (as Python ints) of every token: of all its labels and of its NO_LABEL labels
+        self.masks = ([], [], [])
+        self.unlabelled_masks = ([], [], [])
+        self.label_tokens = []
+        self.label_keys = []
+        self.labels = []
+        self.num_words = 1
+
+    def intern(self, string):
+        string_id = self.string_ids.get(string)
+        if string_id is None:
+            string_id = self.string_ids[string] = len(self.string_ids)
+        return string_id
+
+    def add(self, sentence):
+        """Add the tokens and instances of a sentence."""
+        doc_id = None
+        for token in sentence:
+            if doc_id is None:
+                doc_id = token.doc_id
+            pos = len(self.token_ids)
+            self.token_ids.append(self.intern(token.id))
+            # Tokens without a form have a label that differs from their form for every instance
+            self.forms.append(self.intern(token._form if token._form is not None else NO_LABEL))
+
+            for layer, annotations in enumerate((token.cue, token.scope, token.event)):
+                mask = unlabelled_mask = 0
+                for i, label in annotations or ():
+                    mask |= 1 << i
+                    if label == NO_LABEL:
+                        unlabelled_mask |= 1 << i
+                    elif label != token._form:
+                        self.label_tokens.append(pos)
+                        self.label_keys.append((i << _LAYER_BITS) | layer)
+                        self.labels.append(self.intern(label))
+                self.masks[layer].append(mask)
+                self.unlabelled_masks[layer].append(unlabelled_mask)
+                self.num_words = max(self.num_words, -(-mask.bit_length() // 64))
+
+        self.sentence_docs.append(self.intern(doc_id if doc_id is not None else ""))
+        self.sentence_offsets.append(len(self.token_ids))
+
+    def arrays(self):
+        """Return the encoded corpus as a dict from array name to numpy array."""
+        strings = [string.encode("utf-8") for string in self.string_ids]
+        string_offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+        np.cumsum([len(string) for string in strings], out=string_offsets[1:])
+
+        arrays = {
+            "sentence_offsets": np.asarray(self.sentence_offsets, dtype=np.int64),
+            "sentence_docs": np.asarray(self.sentence_docs, dtype=np.int32),
+            "token_ids": np.asarray(self.token_ids, dtype=np.int32),
+            "forms": np.asarray(self.forms, dtype=np.int32),
+        }
+        for layer, masks in zip(_LAYERS, self.masks):
+            arrays[layer + "_masks"] = self._mask_array(masks)
+        for layer, masks in zip(_LAYERS, self.unlabelled_masks):
+            arrays[layer + "_unlabelled_masks"] = self._mask_array(masks)
+        arrays.update({
+            "label_tokens": np.asarray(self.label_tokens, dtype=np.int64),
+            "label_keys": np.asarray(self.label_keys, dtype=np.int64),
+            "labels": np.asarray(self.labels, dtype=np.int32),
+            "string_offsets": string_offsets,
+            "string_data": np.frombuffer(b"".join(strings), dtype=np.uint8),
+        })
+        return arrays
+
+    def _mask_array(self, masks):
+        if self.num_words > 1:
+            masks = [[(mask >> (64 * k)) & _WORD for k in range(self.num_words)] for mask in masks]
+        return np.array(masks, dtype=np.uint64).reshape(len(masks), self.num_words)
@@ -0,0 +1,205 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Breakdown of the instance-based evaluation by properties of the negation instances (slices).
+
+A slice dimension assigns every negation instance to one of its bins, e.g. affixal vs. word cues or a range
+of scope lengths. The counts of all bins of all dimensions are accumulated in the same pass over the
+sentences as the overall counts, in one counter tensor with a row per slice (see SliceCounts.tensor).
+
+Gold instances are counted in the slice of their own properties and system instances in the slice of theirs.
+A matched pair counts towards recall in the slice of the gold instance and towards precision in the slice of
+the system instance. (Matched instances have the same cue, so they fall into the same cue slices; they may
+differ e.g. in scope length.)
+"""
+
+from bisect import bisect_right
+
+import numpy as np
+
+from eval_utils import EvaluationResult, f1, safe_divide, format_result_table
+
+
+class SliceDimension:
+    """A partition of negation instances into named bins."""
+    def __init__(self, name, labels, key):
+        """
+        Args:
+            name: Name of the dimension.
+            labels: Names of the bins.
+            key: Function returning the number of the bin of a NegationInstance (or CompactNegationInstance).
+        """
+        self.name = name
+        self.labels = tuple(labels)
+        self.key = key
+
+
+def scope_length_dimension(edges=(1, 6, 11, 21)):
+    """Create a dimension with bins of scope lengths. The scope length of an instance is its scope_length, the
+    number of scope tokens by which the token-level scope metric (-t) divides, so that the token counts of the
+    slices add up to those of the whole evaluation.
+
+    Args:
+        edges: The increasing lower bounds of all bins but the first one (which starts at 0).
+          Default: bins 0, 1-5, 6-10, 11-20 and 21+.
+    """
+    lows = (0,) + tuple(edges)
+    labels = [str(low) if high - 1 == low else "{}-{}".format(low, high - 1) for low, high in zip(lows, edges)]
+    labels.append("{}+".format(lows[-1]))
+    return SliceDimension("scope length", labels, lambda inst: bisect_right(edges, inst.scope_length))
+
+
+CUE_TYPE = SliceDimension("cue type", ("word", "affix"), lambda inst: int(inst.affix_cue))
+CUE_LENGTH = SliceDimension("cue length", ("single-word", "multiword"), lambda inst: int(inst.multiword_cue))
+EVENT = SliceDimension("event", ("without event", "with event"), lambda inst: int(inst.has_event))
+SCOPE_LENGTH = scope_length_dimension()
+NEGATIONS_IN_SENTENCE = SliceDimension("negations in sentence", ("single", "multiple"),
+                                       lambda inst: int(inst.num_neg_instances_in_sent > 1))
+
+DEFAULT_DIMENSIONS = (CUE_TYPE, CUE_LENGTH, SCOPE_LENGTH, NEGATIONS_IN_SENTENCE)
+
+
+class SliceCounts:
+    """Sufficient statistics of an evaluation run for every slice, accumulated sentence by sentence
+    (the per-slice counterpart of EvaluationCounts).
+    """
+    # The counters of each slice, in the order of the columns of the counter tensor
+    FIELDS = ("num_instances_gold", "num_instances_system",
+              "num_matched_gold", "num_matched_system",  # Matched instances, in the slice of the gold/system side
+              "scope_precision_numerator", "scope_recall_numerator",
+              "num_scope_tokens_gold", "num_scope_tokens_system",
+              "event_precision_numerator", "event_recall_numerator",
+              "num_event_tokens_gold", "num_event_tokens_system")
+    (NUM_GOLD, NUM_SYSTEM, NUM_MATCHED_GOLD, NUM_MATCHED_SYSTEM, SCOPE_PRECISION_NUM, SCOPE_RECALL_NUM,
+     NUM_SCOPE_TOKENS_GOLD, NUM_SCOPE_TOKENS_SYSTEM, EVENT_PRECISION_NUM, EVENT_RECALL_NUM,
+     NUM_EVENT_TOKENS_GOLD, NUM_EVENT_TOKENS_SYSTEM) = range(12)
+    WIDTH = len(FIELDS)
+
+    def __init__(self, dimensions=DEFAULT_DIMENSIONS, normalize_scopes=True):
+        """
+        Args:
+            dimensions: The SliceDimensions to break the evaluation down by. Default: DEFAULT_DIMENSIONS.
+            normalize_scopes: Whether scope metrics are normalized by scope length. Default: True.
+        """
+        self.dimensions = tuple(dimensions)
+        self.normalize_scopes = normalize_scopes
+
+        # First slice of each dimension
+        self._offsets = []
+        self.slice_names = []  # (dimension name, bin label) of each slice
+        for dimension in self.dimensions:
+            self._offsets.append(len(self.slice_names))
+            self.slice_names.extend((dimension.name, label) for label in dimension.labels)
+
+        # Flat counters (slice-major), see tensor
+        self._counts = [0.0] * (len(self.slice_names) * self.WIDTH)
+
+    @property
+    def tensor(self):
+        """The counters as an array of shape (number of slices, WIDTH)."""
+        return np.array(self._counts).reshape(len(self.slice_names), self.WIDTH)
+
+    def _rows(self, inst):
+        """Return the offsets of the counter rows of all slices of an instance."""
+        width = self.WIDTH
+        return [(offset + dimension.key(inst)) * width for offset, dimension in zip(self._offsets, self.dimensions)]
+
+    def add_sentence(self, gold_sent, system_sent, scored_matches):
+        """Add the counts for a single sentence.
+
+        Args:
+            gold_sent: The gold NegationInstances of the sentence.
+            system_sent: The system NegationInstances of the sentence.
+            scored_matches: The matched (gold instance, system instance, scope precision numerator, scope recall
+              numerator, event precision numerator, event recall numerator) tuples of the sentence, as returned
+              by EvaluationCounts.add_sentence.
+        """
+        counts = self._counts
+        gold_rows = [self._rows(inst) for inst in gold_sent]
+        system_rows = [self._rows(inst) for inst in system_sent]
+        for inst, rows in zip(gold_sent, gold_rows):
+            for row in rows:
+                counts[row + self.NUM_GOLD] += 1
+                counts[row + self.NUM_SCOPE_TOKENS_GOLD] += inst.scope_length
+                counts[row + self.NUM_EVENT_TOKENS_GOLD] += inst.event_length
+        for inst, rows in zip(system_sent, system_rows):
+            for row in rows:
+                counts[row + self.NUM_SYSTEM] += 1
+                counts[row + self.NUM_SCOPE_TOKENS_SYSTEM] += inst.scope_length
+                counts[row + self.NUM_EVENT_TOKENS_SYSTEM] += inst.event_length
+
+        if scored_matches:
+            # Instances are identified by their position in the sentence
+            gold_positions = {id(inst): pos for pos, inst in enumerate(gold_sent)}
+            system_positions = {id(inst): pos for pos, inst in enumerate(system_sent)}
+            for gold_inst, system_inst, precision_num, recall_num, event_precision_num, event_recall_num \
+                    in scored_matches:
+                for row in gold_rows[gold_positions[id(gold_inst)]]:
+                    counts[row + self.NUM_MATCHED_GOLD] += 1
+                    counts[row + self.SCOPE_RECALL_NUM] += recall_num
+                    counts[row + self.EVENT_RECALL_NUM] += event_recall_num
+                for row in system_rows[system_positions[id(system_inst)]]:
+                    counts[row + self.NUM_MATCHED_SYSTEM] += 1
+                    counts[row + self.SCOPE_PRECISION_NUM] += precision_num
+                    counts[row + self.EVENT_PRECISION_NUM] += event_precision_num
+
+    def merge(self, other):
+        """Add the counts of another SliceCounts instance (with the same dimensions) to this one."""
+        assert self.slice_names == other.slice_names and self.normalize_scopes == other.normalize_scopes
+        self._counts = [a + b for a, b in zip(self._counts, other._counts)]
+
+    def to_results(self):
+        """Compute the evaluation metrics of every slice. Metrics with a denominator of 0 (e.g. the precision of a
+        slice without system instances) are 0.
+
+        Returns: A dict from (dimension name, bin label) to EvaluationResult, in the order of the slices.
+        """
+        results = {}
+        for slice_name, row in zip(self.slice_names, self.tensor):
+            if self.normalize_scopes:
+                scope_precision_denominator = event_precision_denominator = row[self.NUM_SYSTEM]
+                scope_recall_denominator = event_recall_denominator = row[self.NUM_GOLD]
+            else:
+                scope_precision_denominator = row[self.NUM_SCOPE_TOKENS_SYSTEM]
+                scope_recall_denominator = row[self.NUM_SCOPE_TOKENS_GOLD]
+                event_precision_denominator = row[self.NUM_EVENT_TOKENS_SYSTEM]
+                event_recall_denominator = row[self.NUM_EVENT_TOKENS_GOLD]
+
+            cue_precision = safe_divide(row[self.NUM_MATCHED_SYSTEM], row[self.NUM_SYSTEM])
+            cue_recall = safe_divide(row[self.NUM_MATCHED_GOLD], row[self.NUM_GOLD])
+            scope_precision = safe_divide(row[self.SCOPE_PRECISION_NUM], scope_precision_denominator)
+            scope_recall = safe_divide(row[self.SCOPE_RECALL_NUM], scope_recall_denominator)
+            event_precision = safe_divide(row[self.EVENT_PRECISION_NUM], event_precision_denominator)
+            event_recall = safe_divide(row[self.EVENT_RECALL_NUM], event_recall_denominator)
+            results[slice_name] = EvaluationResult(cue_precision, cue_recall, f1(cue_precision, cue_recall),
+                                                   scope_precision, scope_recall, f1(scope_precision, scope_recall),
+                                                   event_precision, event_recall, f1(event_precision, event_recall))
+        return results
+
+    def __str__(self):
+        rows = [("{}: {}".format(dimension_name, label), row[self.NUM_GOLD], row[self.NUM_SYSTEM], result)
+                for (dimension_name, label), row, result in zip(self.slice_names, self.tensor,
+                                                                 self.to_results().values())]
+        return format_result_table("Slice", rows)
+
+
+def format_average_slices(slice_counts):
+    """Format the average results of every slice over several evaluations against the same gold corpus (e.g. of
+    several system files) as a table, like SliceCounts.__str__. The metrics of every slice are averaged as in
+    EvaluationResult.average.
+
+    Args:
+        slice_counts: The SliceCounts of the evaluations (with the same dimensions).
+
+    Returns: The table as a string, with the number of gold instances of every slice.
+    """
+    results = [counts.to_results() for counts in slice_counts]
+    rows = [("{}: {}".format(dimension_name, label), num_gold, None,
+             EvaluationResult.average([result[(dimension_name, label)] for result in results]))
+            for (dimension_name, label), num_gold in zip(slice_counts[0].slice_names,
+                                                         slice_counts[0].tensor[:, SliceCounts.NUM_GOLD])]
+    return format_result_table("Slice", rows)
+
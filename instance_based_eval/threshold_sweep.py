@@ -0,0 +1,208 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Threshold sweep over per-token confidence scores: precision, recall and F1 of cues and scopes for every
+decision threshold at once, instead of one *SEM file and one evaluation run per threshold.
+
+The scores of a system are given in a token score file with the same sentences and tokens as the gold file
+(sentences separated by blank lines). Each token line holds
+
+    doc_id  sent_id  token_id  cue_score  [scope_score ...]
+
+with one scope score per gold negation instance of the sentence, in the order of the instance columns of the
+gold file, i.e. the scopes are scored given the gold cues. A token is predicted as (part of) a cue or scope if its
+score is at least the threshold.
+
+Both metrics are token-level, as with the -t option of run_evaluation.py:
+  * Cue: the tokens that are part of any gold cue vs. the tokens whose cue score reaches the threshold;
+  * Scope: for every gold instance, its (non-punctuation) scope tokens vs. the tokens whose scope score for the
+    instance reaches the threshold.
+All (score, gold label) pairs are sorted once by descending score; lowering the threshold past a score only adds
+the tokens with that score, so the counts of all thresholds are cumulative sums (see PRCurve.from_scores).
+"""
+
+from itertools import zip_longest
+
+import numpy as np
+
+from myconll import iter_rows_from_file
+from myconll.unit.token import Token
+from negation_instance import build_sentence_instances, labelled, ispunct, NO_LABEL
+
+
+class PRCurve:
+    """Precision, recall and F1 of a token-level metric for every distinct threshold (in decreasing order)."""
+    def __init__(self, thresholds, num_true_positives, num_predicted, num_gold):
+        """
+        Args:
+            thresholds: The thresholds, in decreasing order.
+            num_true_positives: The number of correctly predicted tokens at each threshold.
+            num_predicted: The number of predicted tokens at each threshold.
+            num_gold: The number of gold tokens.
+        """
+        self.thresholds = np.asarray(thresholds, dtype=float)
+        self.num_true_positives = np.asarray(num_true_positives, dtype=np.int64)
+        self.num_predicted = np.asarray(num_predicted, dtype=np.int64)
+        self.num_gold = num_gold
+
+    @classmethod
+    def from_scores(cls, scores, labels):
+        """Create the curve of a set of scored tokens.
+
+        Args:
+            scores: The score of every token.
+            labels: Whether each token is a gold token.
+
+        Returns: A new PRCurve with a point for every distinct score.
+        """
+        scores = np.asarray(scores, dtype=float)
+        labels = np.asarray(labels, dtype=bool)
+
+        if not len(scores):
+            return cls([], [], [], 0)
+
+        order = np.argsort(-scores, kind="stable")
+        sorted_scores = scores[order]
+        true_positives = np.cumsum(labels[order])
+
+        # The last token with each distinct score closes the point of that threshold
+        last = np.flatnonzero(np.append(sorted_scores[1:] != sorted_scores[:-1], True))
+        return cls(sorted_scores[last], true_positives[last], last + 1, int(labels.sum()))
+
+    @property
+    def precision(self):
+        return np.divide(self.num_true_positives, self.num_predicted,
+                         out=np.zeros(len(self.thresholds)), where=self.num_predicted > 0)
+
+    @property
+    def recall(self):
+        if not self.num_gold:
+            return np.zeros(len(self.thresholds))
+        return self.num_true_positives / self.num_gold
+
+    @property
+    def f1(self):
+        precision, recall = self.precision, self.recall
+        return np.divide(2 * precision * recall, precision + recall,
+                         out=np.zeros(len(self.thresholds)), where=precision + recall > 0)
+
+    def best(self):
+        """Return the point with the highest F1 (the highest threshold among ties) as a dict, or None if the
+        curve is empty.
+        """
+        if not len(self.thresholds):
+            return None
+        return self.point(int(np.argmax(self.f1)))
+
+    def at(self, threshold):
+        """Return the point of a given threshold as a dict (with the threshold itself and the counts of the
+        highest curve threshold that is not below it).
+        """
+        # Thresholds are decreasing: the points at or above the threshold come first
+        idx = int(np.searchsorted(-self.thresholds, -threshold, side="right")) - 1
+        if idx < 0:
+            return {"threshold": threshold, "tp": 0, "predicted": 0, "gold": self.num_gold,
+                    "precision": 0.0, "recall": 0.0, "f1": 0.0}
+        return dict(self.point(idx), threshold=threshold)
+
+    def point(self, idx):
+        """Return the idx-th point of the curve as a dict."""
+        return {"threshold": float(self.thresholds[idx]), "tp": int(self.num_true_positives[idx]),
+                "predicted": int(self.num_predicted[idx]), "gold": self.num_gold,
+                "precision": float(self.precision[idx]), "recall": float(self.recall[idx]),
+                "f1": float(self.f1[idx])}
+
+    def to_rows(self):
+        """Return all points of the curve as (threshold, tp, predicted, gold, precision, recall, f1) tuples."""
+        return list(zip(self.thresholds.tolist(), self.num_true_positives.tolist(), self.num_predicted.tolist(),
+                        [self.num_gold] * len(self.thresholds), self.precision.tolist(), self.recall.tolist(),
+                        self.f1.tolist()))
+
+
+class SweepResult:
+    """PRCurves of the cue and scope metric of a threshold sweep."""
+    def __init__(self, cue_curve, scope_curve):
+        self.curves = {"Cue": cue_curve, "Scope": scope_curve}
+
+    def write_curves(self, path):
+        """Write the points of all curves to a tab-separated file."""
+        with open(path, "w") as f:
+            f.write("metric\tthreshold\ttp\tpredicted\tgold\tprecision\trecall\tf1\n")
+            for metric, curve in self.curves.items():
+                for row in curve.to_rows():
+                    f.write(metric + "\t" + "\t".join(str(value) for value in row) + "\n")
+
+    def __str__(self):
+        res = "{:<26}{:>10}{:>8}{:>10}{:>7}{:>12}{:>10}{:>8}\n".format(
+            "Operating point", "Threshold", "TP", "Predicted", "Gold", "Precision", "Recall", "F1")
+        for metric, curve in self.curves.items():
+            for name, point in (("best F1", curve.best()), ("threshold 0.5", curve.at(0.5))):
+                if point is None:
+                    continue
+                res += "{:<26}{:>10.4f}{:>8}{:>10}{:>7}{:>12.1f}{:>10.1f}{:>8.1f}\n".format(
+                    metric + " (" + name + ")", point["threshold"], point["tp"], point["predicted"],
+                    point["gold"], point["precision"] * 100, point["recall"] * 100, point["f1"] * 100)
+        return res
+
+
+def sweep_sentence(gold_rows, score_rows, cue_scores, cue_labels, scope_scores, scope_labels):
+    """Add the scored tokens of a sentence to the (score, label) lists of the cue and scope metric.
+
+    Args:
+        gold_rows: The token rows of the gold sentence.
+        score_rows: The rows of the sentence in the token score file.
+        cue_scores, cue_labels: Lists to which the cue score and gold label of every token are added.
+        scope_scores, scope_labels: Lists to which the scope score and gold label of every (instance,
+          non-punctuation token) pair are added.
+
+    Raises:
+        ValueError: If the score rows do not fit the gold sentence.
+    """
+    if len(gold_rows) != len(score_rows):
+        raise ValueError("Sentence {} {} has {} tokens in the gold file but {} in the score file".format(
+            gold_rows[0][0], gold_rows[0][1], len(gold_rows), len(score_rows)))
+
+    gold_insts = build_sentence_instances([Token.from_fields(row) for row in gold_rows], compact=True)
+    num_columns = 4 + len(gold_insts)
+    for gold_row, score_row in zip(gold_rows, score_rows):
+        if score_row[:3] != gold_row[:3] or len(score_row) != num_columns:
+            raise ValueError("Token {} expected in the score file with {} columns, found {}".format(
+                " ".join(gold_row[:3]), num_columns, "\t".join(score_row)))
+
+    cue_tokens = {idx for inst in gold_insts for idx, form in inst.cue if form != NO_LABEL}
+    for gold_row, score_row in zip(gold_rows, score_rows):
+        cue_scores.append(float(score_row[3]))
+        cue_labels.append(gold_row[2] in cue_tokens)
+
+    word_rows = [(gold_row[2], score_row) for gold_row, score_row in zip(gold_rows, score_rows)
+                 if not ispunct(gold_row[3])]
+    for inst in gold_insts:
+        scope_tokens = {idx for idx, _ in labelled(inst.scope)}
+        column = 4 + inst.id
+        for token_id, score_row in word_rows:
+            scope_scores.append(float(score_row[column]))
+            scope_labels.append(token_id in scope_tokens)
+
+
+def sweep_thresholds(gold_path, scores_path):
+    """Compute the PR curves of cues and scopes for a gold file and a token score file in one pass.
+
+    Args:
+        gold_path: Path to the gold corpus file.
+        scores_path: Path to the token score file (see the module documentation).
+
+    Returns: A SweepResult.
+
+    Raises:
+        ValueError: If the score file does not fit the gold file.
+    """
+    cue_scores, cue_labels, scope_scores, scope_labels = [], [], [], []
+    for gold_rows, score_rows in zip_longest(iter_rows_from_file(gold_path), iter_rows_from_file(scores_path)):
+        if gold_rows is None or score_rows is None:
+            raise ValueError("The gold file and the score file have a different number of sentences")
+        sweep_sentence(gold_rows, score_rows, cue_scores, cue_labels, scope_scores, scope_labels)
+
+    return SweepResult(PRCurve.from_scores(cue_scores, cue_labels), PRCurve.from_scores(scope_scores, scope_labels))
@@ -0,0 +1,415 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Format validation (linting) of *SEM files, independent of scoring.
+
+A file is scanned once and every problem is collected, together with the file and line it occurs in:
+  * column counts: 7 columns followed either by "***" (no negation instances) or by 3 columns
+    (cue, scope, event) per negation instance;
+  * column consistency: all tokens of a sentence have the same number of columns;
+  * token ids: the tokens of a sentence are numbered 0, 1, 2, ... and share document and sentence id;
+  * instances: every negation instance has a cue;
+  * gold/system agreement (if a system file is given): both files have the same sentences with the same
+    tokens (document id, sentence id, token id and word).
+
+The checks work on whole sentences and only look at individual tokens if a sentence fails them, and
+errors are stored as (code, arguments) records whose messages are only formatted when they are shown.
+The files are split into chunks of sentences that are validated in parallel by a process pool.
+
+Usage:
+
+    python validation.py [-h] [-j JOBS] [-i] [--max-errors N] GOLD [SYSTEM]
+"""
+
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import zip_longest
+
+from myconll.compression import read_text
+
+DELIMITER = "\t"
+FIRST_INSTANCE_COLUMN = 7
+NO_INSTANCES = "***"
+NO_LABEL = "_"
+
+DEFAULT_CHUNK_SENTENCES = 20000
+
+_BLANK_LINES = re.compile(r"\n\s*\n")
+
+# Messages of the error codes; they are formatted with the arguments of an error when it is shown
+MESSAGES = {
+    "too_few_columns": "{} columns, expected 7 columns followed by '***' or by 3 columns per negation instance",
+    "instance_columns": "{} columns, expected 7 columns followed by '***' or by 3 columns per negation instance "
+                        "(cue, scope, event)",
+    "no_instances_marker": "sentence has no negation instances, column 8 should be '***' but is '{}'",
+    "inconsistent_columns": "{} columns, but the first token of the sentence has {}; all tokens of a sentence "
+                            "should have the same number of columns",
+    "token_id": "token id '{}', expected '{}'",
+    "sentence_id": "document/sentence id '{}/{}' differs from the first token of the sentence ('{}/{}')",
+    "missing_cue": "negation instance {} (columns {}-{}) has no cue",
+    "token_mismatch": "token {} does not match gold token {} at line {}",
+    "sentence_length": "sentence has {} tokens, the gold sentence at line {} has {}",
+    "missing_sentence": "sentence has no counterpart in the system file",
+    "extra_sentence": "sentence has no counterpart in the gold file",
+}
+
+
+class ValidationError:
+    """A problem found in a file: the file ("gold" or "system"), line number, error code and the arguments of
+    its message.
+    """
+    __slots__ = ("source", "line", "code", "args")
+
+    def __init__(self, source, line, code, args=()):
+        self.source = source
+        self.line = line
+        self.code = code
+        self.args = args
+
+    @property
+    def message(self):
+        return MESSAGES[self.code].format(*self.args)
+
+    def __str__(self):
+        return "{} file, line {}: {}".format(self.source, self.line, self.message)
+
+    def __repr__(self):
+        return "ValidationError({!r}, {!r}, {!r}, {!r})".format(self.source, self.line, self.code, self.args)
+
+
+class ValidationReport:
+    """All errors found in a gold file (and a system file), in file order, and the number of checked sentences
+    and tokens of the gold file.
+    """
+    MAX_LISTED_ERRORS = 50
+
+    def __init__(self):
+        self.errors = []
+        self.num_sentences = 0
+        self.num_tokens = 0
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def counts(self):
+        """Return the number of errors per error code."""
+        counts = {}
+        for error in self.errors:
+            counts[error.code] = counts.get(error.code, 0) + 1
+        return counts
+
+    def to_str(self, max_errors=MAX_LISTED_ERRORS):
+        """Return the summary and the first max_errors errors (all errors if max_errors is None)."""
+        res = "Checked {} sentences ({} tokens): {} errors\n".format(self.num_sentences, self.num_tokens,
+                                                                   len(self.errors))
+        listed = self.errors if max_errors is None else self.errors[:max_errors]
+        for error in listed:
+            res += "  {}\n".format(error)
+        if len(listed) < len(self.errors):
+            res += "  ... ({} more)\n".format(len(self.errors) - len(listed))
+            for code, count in sorted(self.counts().items()):
+                res += "  {:<22}{}\n".format(code + ":", count)
+        return res
+
+    def __str__(self):
+        return self.to_str()
+
+
+def _content_start(text):
+    """Return the offset and line number of the first line of text that is not blank."""
+    stripped = text.lstrip()
+    if not stripped:
+        return len(text), 1
+    start = text.rfind("\n", 0, len(text) - len(stripped)) + 1
+    return start, text.count("\n", 0, start) + 1
+
+
+def split_chunks(text, chunk_sentences=DEFAULT_CHUNK_SENTENCES):
+    """Split the text of a file into chunks of (at most) chunk_sentences sentences, without parsing them.
+
+    Returns: A list of (chunk text, line number of its first line) pairs.
+    """
+    pos, line = _content_start(text)
+    chunks = []
+    num_sentences = 0
+    chunk_start, chunk_line = pos, line
+    for match in _BLANK_LINES.finditer(text, pos):
+        num_sentences += 1
+        if num_sentences % chunk_sentences == 0:
+            line += text.count("\n", pos, match.end())
+            pos = match.end()
+            chunks.append((text[chunk_start:pos], chunk_line))
+            chunk_start, chunk_line = pos, line
+    if text[chunk_start:].strip():
+        chunks.append((text[chunk_start:], chunk_line))
+    return chunks
+
+
+def iter_sentences(text, first_line=1):
+    """Split the text of a chunk into sentences.
+
+    Yields: For each sentence, the line number of its first token and its token rows (lists of columns).
+    """
+    pos, line = _content_start(text)
+    line += first_line - 1
+    for match in _BLANK_LINES.finditer(text, pos):
+        yield line, [row.strip().split(DELIMITER) for row in text[pos:match.start()].split("\n")]
+        line += text.count("\n", pos, match.end())
+        pos = match.end()
+    if text[pos:].strip():
+        yield line, [row.strip().split(DELIMITER) for row in text[pos:].rstrip().split("\n")]
+
+
+_token_ids = ()
+
+
+def token_ids(num_tokens):
+    """Return the expected token ids ("0", "1", ...) of a sentence with num_tokens tokens, as a tuple."""
+    global _token_ids
+    if len(_token_ids) < num_tokens:
+        _token_ids = tuple(str(idx) for idx in range(max(num_tokens, 2 * len(_token_ids))))
+    return _token_ids[:num_tokens]
+
+
+def check_sentence(rows, line, source, errors):
+    """Check the format of a sentence and add the problems to errors as (source, line, code, args) tuples.
+
+    The checks compare whole columns of the sentence; the tokens are only looked at one by one to locate
+    a problem.
+
+    Returns: The columns of the sentence (as tuples, up to the smallest number of columns of its tokens),
+      or None if the sentence lacks the columns needed for the gold/system comparison.
+    """
+    num_tokens = len(rows)
+    widths = set(map(len, rows))
+    min_width = min(widths)
+
+    # Column counts (one check per distinct number of columns)
+    if min_width <= FIRST_INSTANCE_COLUMN:
+        for idx, cols in enumerate(rows):
+            if len(cols) <= FIRST_INSTANCE_COLUMN:
+                errors.append((source, line + idx, "too_few_columns", (len(cols),)))
+        if min_width <= 3:
+            return None
+    for width in widths:
+        if width > FIRST_INSTANCE_COLUMN + 1 and (width - FIRST_INSTANCE_COLUMN) % 3:
+            for idx, cols in enumerate(rows):
+                if len(cols) == width:
+                    errors.append((source, line + idx, "instance_columns", (width,)))
+
+    columns = list(zip(*rows))
+
+    first_width = len(rows[0])
+    if len(widths) > 1:
+        for idx, cols in enumerate(rows):
+            if len(cols) != first_width:
+                errors.append((source, line + idx, "inconsistent_columns", (len(cols), first_width)))
+    elif first_width == FIRST_INSTANCE_COLUMN + 1:
+        marker_column = columns[FIRST_INSTANCE_COLUMN]
+        if marker_column.count(NO_INSTANCES) != num_tokens:
+            for idx, value in enumerate(marker_column):
+                if value != NO_INSTANCES:
+                    errors.append((source, line + idx, "no_instances_marker", (value,)))
+    elif first_width > FIRST_INSTANCE_COLUMN and (first_width - FIRST_INSTANCE_COLUMN) % 3 == 0:
+        for col in range(FIRST_INSTANCE_COLUMN, first_width, 3):
+            if columns[col].count(NO_LABEL) == num_tokens:
+                errors.append((source, line, "missing_cue",
+                               ((col - FIRST_INSTANCE_COLUMN) // 3 + 1, col + 1, col + 3)))
+
+    # Token ids, document and sentence ids
+    expected_ids = token_ids(num_tokens)
+    if columns[2] != expected_ids:
+        for idx, (token_id, expected_id) in enumerate(zip(columns[2], expected_ids)):
+            if token_id != expected_id:
+                errors.append((source, line + idx, "token_id", (token_id, expected_id)))
+                break
+    doc_id, sent_id = rows[0][0], rows[0][1]
+    if columns[0].count(doc_id) != num_tokens or columns[1].count(sent_id) != num_tokens:
+        for idx, cols in enumerate(rows):
+            if cols[0] != doc_id or cols[1] != sent_id:
+                errors.append((source, line + idx, "sentence_id", (cols[0], cols[1], doc_id, sent_id)))
+                break
+
+    return columns
+
+
+def _token_str(cols):
+    return "/".join(cols[:4])
+
+
+def _lower(words):
+    return tuple(word.lower() for word in words)
+
+
+def compare_sentences(gold_rows, gold_columns, gold_line, system_rows, system_columns, system_line, errors,
+                      ignore_case=False):
+    """Compare the tokens (columns as returned by check_sentence) of a gold and a system sentence and add the
+    first mismatch (if any) to errors.
+    """
+    if len(gold_rows) != len(system_rows):
+        errors.append(("system", system_line, "sentence_length", (len(system_rows), gold_line, len(gold_rows))))
+    elif gold_columns[:4] == system_columns[:4]:
+        return
+    elif (ignore_case and gold_columns[:3] == system_columns[:3]
+          and _lower(gold_columns[3]) == _lower(system_columns[3])):
+        return
+
+    for idx, (gold_cols, system_cols) in enumerate(zip(gold_rows, system_rows)):
+        if gold_cols[:3] != system_cols[:3] or (gold_cols[3].lower() != system_cols[3].lower() if ignore_case
+                                                else gold_cols[3] != system_cols[3]):
+            errors.append(("system", system_line + idx, "token_mismatch",
+                           (_token_str(system_cols), _token_str(gold_cols), gold_line + idx)))
+            break
+
+
+def _error_order(error):
+    """Sort key for the errors of a sentence (pair): gold before system errors, then by line."""
+    return error[0] != "gold", error[1]
+
+
+def _sort_errors(errors, start):
+    """Sort the errors that were added to errors since it had start elements."""
+    if len(errors) - start > 1:
+        errors[start:] = sorted(errors[start:], key=_error_order)
+
+
+def validate_chunk(gold_chunk, system_chunk=None, ignore_case=False, compare=True):
+    """Validate a chunk of the gold file and (if given) the corresponding chunk of the system file.
+
+    Args:
+        gold_chunk: Pair of the chunk text and the line number of its first line (as returned by
+          split_chunks); an empty text if the gold file has fewer chunks than the system file.
+        system_chunk: The corresponding chunk of the system file, or None if only the gold file is checked.
+        ignore_case: Whether to compare gold and system words case-insensitively. Default: False.
+        compare: Whether to compare the gold and system sentences (at the same position) with each other, or
+          only to check the format of both. Default: True.
+
+    Returns: A triple of the errors as (source, line, code, args) tuples, and the number of gold sentences and
+      tokens of the chunk.
+    """
+    errors = []
+    num_sentences = num_tokens = 0
+
+    gold_sents = iter_sentences(*gold_chunk)
+    if system_chunk is None or not compare:
+        for gold_line, gold_rows in gold_sents:
+            num_errors = len(errors)
+            check_sentence(gold_rows, gold_line, "gold", errors)
+            _sort_errors(errors, num_errors)
+            num_sentences += 1
+            num_tokens += len(gold_rows)
+        if system_chunk is not None:
+            for system_line, system_rows in iter_sentences(*system_chunk):
+                num_errors = len(errors)
+                check_sentence(system_rows, system_line, "system", errors)
+                _sort_errors(errors, num_errors)
+        return errors, num_sentences, num_tokens
+
+    for gold_sent, system_sent in zip_longest(gold_sents, iter_sentences(*system_chunk)):
+        num_errors = len(errors)
+        if system_sent is None:
+            gold_line, gold_rows = gold_sent
+            check_sentence(gold_rows, gold_line, "gold", errors)
+            errors.append(("gold", gold_line, "missing_sentence", ()))
+        elif gold_sent is None:
+            system_line, system_rows = system_sent
+            check_sentence(system_rows, system_line, "system", errors)
+            errors.append(("system", system_line, "extra_sentence", ()))
+        else:
+            (gold_line, gold_rows), (system_line, system_rows) = gold_sent, system_sent
+            gold_columns = check_sentence(gold_rows, gold_line, "gold", errors)
+            system_columns = check_sentence(system_rows, system_line, "system", errors)
+            if gold_columns is not None and system_columns is not None:
+                compare_sentences(gold_rows, gold_columns, gold_line, system_rows, system_columns, system_line,
+                                  errors, ignore_case=ignore_case)
+        _sort_errors(errors, num_errors)
+
+        if gold_sent is not None:
+            num_sentences += 1
+            num_tokens += len(gold_sent[1])
+
+    return errors, num_sentences, num_tokens
+
+
+def _validate_chunk_pair(args):
+    return validate_chunk(*args)
+
+
+def validate(gold_str, system_str=None, ignore_case=False, compare=True, jobs=None,
+             chunk_sentences=DEFAULT_CHUNK_SENTENCES):
+    """Validate the text of a gold file and (optionally) of a system file.
+
+    Args:
+        gold_str: The text of the gold file.
+        system_str: The text of the system file; if None, only the gold file is checked.
+        ignore_case: Whether to compare gold and system words case-insensitively. Default: False.
+        compare: Whether to compare the gold and system sentences (at the same position) with each other, or
+          only to check the format of both files (e.g. if the sentences are aligned by key). Default: True.
+        jobs: Number of worker processes. Default: number of CPUs. With 1 job (or a single chunk), the
+          validation runs in the calling process.
+        chunk_sentences: Number of sentences per chunk. Default: DEFAULT_CHUNK_SENTENCES.
+
+    Returns: A ValidationReport.
+    """
+    gold_chunks = split_chunks(gold_str, chunk_sentences)
+    system_chunks = split_chunks(system_str, chunk_sentences) if system_str is not None else []
+    if system_str is not None:
+        tasks = [(gold_chunk, system_chunk, ignore_case, compare)
+                 for gold_chunk, system_chunk in zip_longest(gold_chunks, system_chunks, fillvalue=("", 1))]
+    else:
+        tasks = [(gold_chunk, None, ignore_case, compare) for gold_chunk in gold_chunks]
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+            results = list(executor.map(_validate_chunk_pair, tasks))
+    else:
+        results = [validate_chunk(*task) for task in tasks]
+
+    report = ValidationReport()
+    for errors, num_sentences, num_tokens in results:
+        report.errors.extend(ValidationError(*error) for error in errors)
+        report.num_sentences += num_sentences
+        report.num_tokens += num_tokens
+
+    return report
+
+
+def validate_files(gold_path, system_path=None, ignore_case=False, compare=True, jobs=None,
+                   chunk_sentences=DEFAULT_CHUNK_SENTENCES):
+    """Validate a gold file and (optionally) a system file; both may be gzip/xz/bz2 compressed.
+
+    See validate for the arguments.
+
+    Returns: A ValidationReport.
+    """
+    gold_str = read_text(gold_path)
+    system_str = read_text(system_path) if system_path is not None else None
+    return validate(gold_str, system_str, ignore_case=ignore_case, compare=compare, jobs=jobs,
+                    chunk_sentences=chunk_sentences)
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Check the format of *SEM files (and whether a system file "
+                                                    "matches the gold file)")
+    argparser.add_argument("gold_file", type=str, help="path to the gold file (required)")
+    argparser.add_argument("system_file", type=str, nargs="?", help="path to a system file")
+    argparser.add_argument("-j", "--jobs", type=int, default=None,
+                           help="number of worker processes, default: number of CPUs")
+    argparser.add_argument("-i", "--ignore-case", action="store_true",
+                           help="compare gold and system words case-insensitively")
+    argparser.add_argument("--max-errors", type=int, default=ValidationReport.MAX_LISTED_ERRORS, metavar="N",
+                           help="maximum number of listed errors (0: all), default: %(default)s")
+    args = argparser.parse_args()
+
+    report = validate_files(args.gold_file, args.system_file, ignore_case=args.ignore_case, jobs=args.jobs)
+    print(report.to_str(max_errors=args.max_errors or None), end="")
+    sys.exit(0 if report.ok else 1)
@@ -0,0 +1,151 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""
+One-pass evaluation with all three metric families: the instance-based scores (instance_based_eval/run_evaluation.py),
+the translated *SEM 2012 scores (starsem2012_eval_translated.py) and the extended *SEM 2012 scores
+(starsem2012_eval_extended.py).
+
+Gold and system file are read and split into token rows only once; every sentence pair is then
+handed to all three evaluations, and all three reports are printed.
+
+With annotation layers (e.g. negation and speculation as separate column groups or files over the same
+tokens, see instance_based_eval/layers.py), every layer gets its instance-based scores and its extended
+*SEM 2012 table, again in one pass over the files.
+"""
+
+import argparse
+import os
+import sys
+from itertools import zip_longest
+
+# myconll and the instance-based evaluation live in the instance-based evaluation folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "instance_based_eval"))
+from myconll import iter_rows_from_file
+from myconll.unit.token import Token
+from negation_instance import build_sentence_instances
+from eval_utils import EvaluationCounts
+from layers import AnnotationLayer, iter_layer_rows
+
+import starsem2012_eval_translated as translated
+import starsem2012_eval_extended as extended
+
+
+def evaluate_all(gold, system, normalize_scopes=True, task="negation", starsem_exact=False):
+    """
+    gold, system - paths of the gold and system files (may be gzip/xz/bz2 compressed)
+    normalize_scopes - whether the instance-based scope metrics normalize scope length
+                       (False corresponds to the --token-eval option of run_evaluation.py)
+    task - task evaluated by the extended scores (negation/speculation)
+    starsem_exact - whether the translated scores reproduce the original script exactly
+
+    Returns a tuple of
+        - the instance-based EvaluationResult
+        - the translated results table
+        - the extended scores and overall scores (as returned by extended.evaluate)
+    """
+    nis_counts = EvaluationCounts(normalize_scopes=normalize_scopes)
+    extended_eval = extended.ExtendedEvaluation(task)
+    translated.reset_counts()
+
+    sent_pairs = zip_longest(iter_rows_from_file(gold), iter_rows_from_file(system))
+    for sent_idx, (gold_rows, system_rows) in enumerate(sent_pairs):
+        # make sure both files have the same number of sentences
+        assert_msg = "The gold and system files have a different number of sentences."
+        assert gold_rows is not None and system_rows is not None, assert_msg
+
+        # translated *SEM (the sentence is checked before it is evaluated)
+        translated.check_sentence(gold_rows, system_rows)
+        translated.evaluate_sentence(gold_rows, system_rows, starsem_exact=starsem_exact)
+
+        # extended *SEM
+        extended_eval.add_sentence(gold_rows, system_rows)
+
+        # instance-based
+        gold_insts = build_sentence_instances([Token.from_fields(row) for row in gold_rows],
+                                              compact=True, sent_idx=sent_idx)
+        system_insts = build_sentence_instances([Token.from_fields(row) for row in system_rows],
+                                                compact=True, sent_idx=sent_idx)
+        nis_counts.add_sentence(gold_insts, system_insts)
+
+    return (nis_counts.to_result(),
+            translated.get_print_str(starsem_exact=starsem_exact),
+            extended_eval.get_scores())
+
+
+
+def evaluate_layers(layers, normalize_scopes=True):
+    """
+    layers - AnnotationLayers (see instance_based_eval/layers.py), all with a gold and a system file
+    normalize_scopes - see evaluate_all
+    
+    Returns {layer name : (instance-based EvaluationResult, extended scores and overall scores)}.
+    The name of each layer is the task of its extended scores. The translated scores are not computed:
+    the translated script only evaluates negation and keeps its counts in module globals.
+    """
+    nis_counts = {layer.name: EvaluationCounts(normalize_scopes=normalize_scopes) for layer in layers}
+    extended_evals = {layer.name: extended.ExtendedEvaluation(layer.name) for layer in layers}
+
+    for sent_idx, sentence_layers in enumerate(iter_layer_rows(layers)):
+        for name, (gold_rows, system_rows) in sentence_layers.items():
+            # make sure all files have the same number of sentences
+            assert_msg = "The gold and system files of layer " + name + " have a different number of sentences."
+            assert gold_rows is not None and system_rows is not None, assert_msg
+
+            extended_evals[name].add_sentence(gold_rows, system_rows)
+
+            gold_insts = build_sentence_instances([Token.from_fields(row) for row in gold_rows],
+                                                  compact=True, sent_idx=sent_idx)
+            system_insts = build_sentence_instances([Token.from_fields(row) for row in system_rows],
+                                                    compact=True, sent_idx=sent_idx)
+            nis_counts[name].add_sentence(gold_insts, system_insts)
+
+    return {name: (nis_counts[name].to_result(), extended_evals[name].get_scores()) for name in nis_counts}
+
+
+
+if __name__ == "__main__":
+    argdesc = "Instance-based, translated *SEM 2012 and extended *SEM 2012 evaluation in one pass"
+    argparser = argparse.ArgumentParser(description=argdesc)
+    argparser.add_argument("-g", "--gold", type=str, required=True, help="gold standard file path")
+    argparser.add_argument("-s", "--system", type=str, required=True, help="system output file path")
+    argparser.add_argument("--token-eval", dest="normalize_scopes", action="store_false",
+                           help="instance-based scores: evaluate scopes on a per-token basis (i.e., do not normalize scope lengths)")
+    argparser.add_argument("-e", "--starsem-exact", default=False, action="store_true",
+                           help="translated scores: output the exact same results as the original script")
+    argparser.add_argument("-t", "--task", type=str, default="negation",
+                           help="extended scores: task to be evaluated (negation/speculation), default: negation")
+    argparser.add_argument("-o", "--rounding", type=int, default=2,
+                           help="extended scores: number of decimal points to round to, default: 2")
+    argparser.add_argument("--layer", dest="layers", type=AnnotationLayer.from_spec, action="append", metavar="SPEC",
+                           help="evaluate an annotation layer instead (can be given several times, all layers are evaluated in one pass): NAME[:FIRST-LAST][=GOLD,SYSTEM], e.g. speculation:16-24 for columns 16-24 of the gold and system file; no translated scores")
+    argparser.set_defaults(normalize_scopes=True)
+    args = argparser.parse_args()
+    if args.layers and len({layer.name for layer in args.layers}) < len(args.layers):
+        argparser.error("the names of the layers must be unique")
+    
+    if args.layers:
+        layer_results = evaluate_layers([layer.with_paths(args.gold, args.system) for layer in args.layers],
+                                        normalize_scopes=args.normalize_scopes)
+        for name, (nis_result, (scores, overall_scores)) in layer_results.items():
+            print("Layer: " + name)
+            print("Instance-based evaluation")
+            print(nis_result)
+            print("*SEM 2012 evaluation (extended)")
+            print(extended.get_print_str(scores, overall_scores, rounding=args.rounding))
+        sys.exit()
+
+    nis_result, translated_str, (scores, overall_scores) = evaluate_all(
+        args.gold, args.system, normalize_scopes=args.normalize_scopes, task=args.task,
+        starsem_exact=args.starsem_exact)
+
+    print("Instance-based evaluation")
+    print(nis_result)
+    print("*SEM 2012 evaluation (translated)")
+    print(translated_str)
+    print("*SEM 2012 evaluation (extended)")
+    print(extended.get_print_str(scores, overall_scores, rounding=args.rounding))
@@ -12,7 +12,38 @@ Re-implementation and extension of
 """
 
 import argparse  # take args from a command line
+import os
 import re        # check for punctuation
+import sys
+from collections import deque
+from itertools import product
+
+# myconll lives in the instance-based evaluation folder;
+# it is used here for reading (possibly compressed) corpus files
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "instance_based_eval"))
+from myconll.compression import read_text
+from result_cache import ResultCache, source_version, DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES
+from sentence_stats import rescore_changed_sentences
+from alignment import align_by_key, unannotated_rows, tokens_match, project_rows
+from validation import validate_files
+from grouping import DocumentGrouping
+from scheduling import schedule_chunks, run_chunks, EXTENDED_COSTS
+
+# matches tokens that are not punctuation
+WORD_CHAR = re.compile(r"\w")
+
+# sentences with at least this many (gold + predicted) instances are processed
+# with multisets instead of lists in process_independent (the two are equally
+# fast at 60 to 75 gold and as many predicted instances, and the lists are up to
+# 1.8 times faster below, see bench_process_independent.py)
+MULTISET_MIN_INSTANCES = 150
+
+
+# counters stored for every metric, in this order
+TP, FP, FP_NO_FN, FN = range(4)
+NUM_COUNTERS = 4
+COUNTER_IDS = {"tp": TP, "fp": FP, "fp_no_fn": FP_NO_FN, "fn": FN}
 
 
 class Score:
@@ -24,15 +55,37 @@ class Score:
         fp - all false positives (including elements that are also fn)
         fp_no_fn - only false positives that do not intersect with fn
     Calculates precision, recall and F1.
+    The counters are kept in a flat list that can be shared by all metrics 
+        of an evaluation (see MetricPlan); a Score is a view on the counters
+        of one metric.
     """
-    def __init__(self):
+    def __init__(self, counts=None, slot=0):
         """
-        rounding specifes the number of digits after the decimal point.
+        counts - flat list of counters (a new one is created if not given)
+        slot - position of the metric in counts
         """
-        self._tp = 0
-        self._fp = 0
-        self._fp_no_fn = 0
-        self._fn = 0
+        self._counts = counts if counts is not None else [0] * NUM_COUNTERS
+        self._offset = slot * NUM_COUNTERS
+
+
+    @property
+    def _tp(self):
+        return self._counts[self._offset + TP]
+
+
+    @property
+    def _fp(self):
+        return self._counts[self._offset + FP]
+
+
+    @property
+    def _fp_no_fn(self):
+        return self._counts[self._offset + FP_NO_FN]
+
+
+    @property
+    def _fn(self):
+        return self._counts[self._offset + FN]
 
 
     def __str__(self):
@@ -47,14 +100,8 @@ class Score:
 
 
     def update_counter(self, counter_name, update_amount):
-        if counter_name == 'tp':
-            self._tp += update_amount
-        elif counter_name == 'fp':
-            self._fp += update_amount
-        elif counter_name == 'fp_no_fn':
-            self._fp_no_fn += update_amount
-        elif counter_name == 'fn':
-            self._fn += update_amount
+        if counter_name in COUNTER_IDS:
+            self._counts[self._offset + COUNTER_IDS[counter_name]] += update_amount
 
 
     def get_gold(self):
@@ -113,10 +160,203 @@ class Score:
 
     
 
-def process_sent(gold_tokens, pred_tokens, line_num):
+def metric_layout(task="negation"):
+    """
+    Returns all metrics of the evaluation in the form:
+        {level : {metric : [details]}}
+    in the order in which they are printed.
     """
-    gold_tokens - a list of tokens from one sentence in the gold file
-    pred_tokens - a list of tokens from the same sentence in the system file
+    return {"Token-level": {"Cue": [""],
+                            "Scope": ["(full cue)",
+                                      "(partial cue)",
+                                      "(no cue)",
+                                      "(binary labels)",
+                                      "(full cue, no punct)",
+                                      "(partial cue, no punct)",
+                                      "(no cue, no punct)",
+                                      "(binary labels, no punct)"],
+                            "Event": ["(full cue)",
+                                      "(partial cue)",
+                                      "(no cue)",
+                                      "(binary labels)"]}, 
+            "Scope-level": {"Cue": [""],
+                            "Scope": ["(full cue)",
+                                      "(partial cue)",
+                                      "(no cue)",
+                                      "(full cue, no punct)",
+                                      "(partial cue, no punct)",
+                                      "(no cue, no punct)"],
+                            "Event": ["(full cue)",
+                                      "(partial cue)",
+                                      "(no cue)"], 
+                            "Full "+task: ["",
+                                           "(no punct)"]}}
+
+
+
+class MetricPlan:
+    """
+    The metrics of the evaluation compiled into one flat list of counters 
+    (counts), NUM_COUNTERS per metric.
+    The filters that decide which metrics a token or instance counts for
+    (punctuation, cue match) are applied once here: for every kind of update,
+    the plan holds a tuple of counter positions ("cells") to increment, so
+    that the evaluation itself only does integer-indexed increments.
+    scores provides the usual {level : {metric : {detail : Score}}} view 
+    on the counters.
+    """
+    def __init__(self, task="negation"):
+        self.task = task
+        self.layout = metric_layout(task)
+        
+        # assign a slot in counts to every metric
+        self.slots = {}  # {(level, metric, detail) : slot}
+        for level in self.layout:
+            for metric in self.layout[level]:
+                for detail in self.layout[level][metric]:
+                    self.slots[(level, metric, detail)] = len(self.slots)
+        
+        self.counts = [0] * (NUM_COUNTERS * len(self.slots))
+        self.scores = {level: {metric: {detail: Score(self.counts, self.slots[(level, metric, detail)])
+                                        for detail in self.layout[level][metric]}
+                               for metric in self.layout[level]}
+                       for level in self.layout}
+        
+        full_task = "Full " + task
+        
+        ## cue-dependent metrics (process_inst and update_all)
+        def cue_dependent(detail):
+            # cue-independent metrics are processed separately
+            return "no cue" not in detail and "binary labels" not in detail
+        
+        # token-level: {(metric, punct) : cells} and {(metric, punct, full_cue) : cells}
+        self.token_fn = {}
+        self.token_fp = {}
+        self.token_fp_no_fn = {}
+        self.token_match = {}
+        for metric in ["Scope", "Event"]:
+            for punct in [False, True]:
+                # no punct metrics don't count punctuation tokens
+                details = [detail for detail in self.layout["Token-level"][metric]
+                           if cue_dependent(detail) and not (punct and "punct" in detail)]
+                
+                self.token_fn[(metric, punct)] = self.cells("Token-level", metric, details, "fn")
+                self.token_fp[(metric, punct)] = self.cells("Token-level", metric, details, "fp")
+                self.token_fp_no_fn[(metric, punct)] = self.cells("Token-level", metric, details, "fp_no_fn")
+
+                for full_cue in [True, False]:
+                    # cases that do not allow partial cue match --> fp and fn
+                    no_match = [detail for detail in details if "full" in detail and not full_cue]
+                    # cases that allow partial cue match --> tp
+                    match = [detail for detail in details if detail not in no_match]
+                    self.token_match[(metric, punct, full_cue)] = (self.cells("Token-level", metric, match, "tp")
+                        + self.cells("Token-level", metric, no_match, "fp")
+                        + self.cells("Token-level", metric, no_match, "fn"))
+        
+        # scope-level, for an instance that has no counterpart: {(counter, metric) : cells}
+        self.unmatched_inst = {}
+        for metric in ["Scope", "Event", full_task]:
+            details = [detail for detail in self.layout["Scope-level"][metric] if "no cue" not in detail]
+            self.unmatched_inst[("fn", metric)] = self.cells("Scope-level", metric, details, "fn")
+            self.unmatched_inst[("fp", metric)] = (self.cells("Scope-level", metric, details, "fp")
+                                                   + self.cells("Scope-level", metric, details, "fp_no_fn"))
+        
+        # scope-level, for a gold instance and its matching prediction:
+        # {(metric, full_cue, full match, full match (no punct), gold, pred) : cells}
+        self.matched_inst = {}
+        for metric in ["Scope", "Event"]:
+            details = [detail for detail in self.layout["Scope-level"][metric] if "no cue" not in detail]
+            for full_cue, full_match, full_match_nopunct, gold, pred in product([True, False], repeat=5):
+                correct = []
+                for detail in details:
+                    # cases that do not allow partial cue match
+                    if "full" in detail and not full_cue:
+                        continue
+                    # cases that allow partial cue match and exclude punctuation
+                    elif "punct" in detail:
+                        if full_match_nopunct:
+                            correct.append(detail)
+                    # cases that allow partial cue match and include punctuation
+                    elif full_match:
+                        correct.append(detail)
+                wrong = [detail for detail in details if detail not in correct]
+                
+                cells = self.cells("Scope-level", metric, correct, "tp")
+                if gold:
+                    cells += self.cells("Scope-level", metric, wrong, "fn")
+                if pred:
+                    cells += self.cells("Scope-level", metric, wrong, "fp")
+                if not gold:
+                    cells += self.cells("Scope-level", metric, wrong, "fp_no_fn")
+                self.matched_inst[(metric, full_cue, full_match, full_match_nopunct, gold, pred)] = cells
+        
+        # full negation / speculation: {(full score, full score (no punct)) : cells}
+        self.full_inst = {}
+        for full_score, full_score_nopunct in product([True, False], repeat=2):
+            correct = {"": full_score, "(no punct)": full_score_nopunct}
+            cells = ()
+            for detail in self.layout["Scope-level"][full_task]:
+                if correct[detail]:
+                    cells += self.cells("Scope-level", full_task, [detail], "tp")
+                else:
+                    cells += (self.cells("Scope-level", full_task, [detail], "fn") 
+                              + self.cells("Scope-level", full_task, [detail], "fp"))
+            self.full_inst[(full_score, full_score_nopunct)] = cells
+        
+        ## cue-independent metrics (process_independent)
+        # {label : (tp, fn, fp, fp_no_fn)}
+        self.independent_token = {}
+        self.independent_inst = {}
+        for label in ["Cue", "Scope", "Event"]:
+            detail = "(no cue)" if label != "Cue" else ""
+            self.independent_token[label] = self.counter_cells("Token-level", label, detail)
+            self.independent_inst[label] = self.counter_cells("Scope-level", label, detail)
+        self.independent_token_nopunct = self.counter_cells("Token-level", "Scope", "(no cue, no punct)")
+        self.independent_inst_nopunct = self.counter_cells("Scope-level", "Scope", "(no cue, no punct)")
+        self.binary = {label: self.counter_cells("Token-level", label, "(binary labels)") 
+                       for label in ["Scope", "Event"]}
+        self.binary_nopunct = self.counter_cells("Token-level", "Scope", "(binary labels, no punct)")
+
+
+    def cells(self, level, metric, details, counter):
+        """
+        Returns a tuple with the position of the given counter (tp | fp | fp_no_fn | fn)
+        in counts for each of the given details of a metric.
+        """
+        return tuple(self.slots[(level, metric, detail)] * NUM_COUNTERS + COUNTER_IDS[counter]
+                     for detail in details)
+
+
+    def counter_cells(self, level, metric, detail):
+        """
+        Returns the positions of (tp, fn, fp, fp_no_fn) of a single metric in counts.
+        """
+        offset = self.slots[(level, metric, detail)] * NUM_COUNTERS
+        return offset + TP, offset + FN, offset + FP, offset + FP_NO_FN
+
+
+
+def token_mismatch_msg(line_num):
+    return "Mismatch between tokens in gold and system files at line " + str(line_num) + "."
+
+
+def column_count_msg(line_num, file_name):
+    msg = "Incorrect number of columns in line " + str(line_num)
+    msg += " of the " + file_name + " file. There should be 3 columns per negation cue."
+    return msg
+
+
+def column_consistency_msg(line_num, file_name):
+    msg = "Inconsistency detected in the number of columns in line "
+    msg += str(line_num) + " of the " + file_name + " file. All tokens in "
+    msg += "a sentence should have the same number of columns."
+    return msg
+
+
+def process_sent(gold_rows, pred_rows, line_num):
+    """
+    gold_rows - a list of token rows (lists of columns) from one sentence in the gold file
+    pred_rows - a list of token rows from the same sentence in the system file
     line_num - the number of the line the current sentence starts in both files
     
     Returns two lists of dictionaries (one for each file) in the form:
@@ -166,9 +406,9 @@ def process_sent(gold_tokens, pred_tokens, line_num):
                 instances[pos_num]["Event"].append((cols[2], event))
 
 
-    for token_idx in range(len(gold_tokens)):
-        gold_cols = gold_tokens[token_idx].split("\t")
-        pred_cols = pred_tokens[token_idx].split("\t")
+    for token_idx in range(len(gold_rows)):
+        gold_cols = gold_rows[token_idx]
+        pred_cols = pred_rows[token_idx]
         
         gold_token_num = gold_cols[2]
         pred_token_num = pred_cols[2]
@@ -176,21 +416,16 @@ def process_sent(gold_tokens, pred_tokens, line_num):
         pred_word = pred_cols[3].lower()
 
         # make sure the gold and pred tokens are the same
-        assert_msg = "Mismatch between tokens in gold and system files "
-        assert_msg += "at line " + str(line_num) + "."
-        assert gold_token_num == pred_token_num, assert_msg
-        assert gold_word == pred_word, assert_msg
+        # (the messages are only built if a check fails)
+        assert gold_token_num == pred_token_num, token_mismatch_msg(line_num)
+        assert gold_word == pred_word, token_mismatch_msg(line_num)
 
         # make sure the task information is encoded correctly
         gold_size = 0 if len(gold_cols[7:]) == 1 else len(gold_cols[7:]) / 3
-        assert_msg = "Incorrect number of columns at line " + str(line_num)
-        assert_msg += " of the gold file. There should be 3 columns per negation cue."
-        assert gold_size % 1 == 0, assert_msg
+        assert gold_size % 1 == 0, column_count_msg(line_num, "gold")
 
         pred_size = 0 if len(pred_cols[7:]) == 1 else len(pred_cols[7:]) / 3
-        assert_msg = "Incorrect number of columns in line " + str(line_num)
-        assert_msg += " of the system file. There should be 3 columns per negation cue."
-        assert pred_size % 1 == 0, assert_msg
+        assert pred_size % 1 == 0, column_count_msg(line_num, "system")
         
         # mark the number of task instances in the sents
         if token_idx == 0:
@@ -201,15 +436,8 @@ def process_sent(gold_tokens, pred_tokens, line_num):
             
         # make sure the number of task instances stays the same
         else:
-            assert_msg = "Inconsistency detected in the number of columns in line "
-            assert_msg += str(line_num) + " of the gold file. All tokens in "
-            assert_msg += "a sentence should have the same number of columns."
-            assert gold_size == gold_negspec_size, assert_msg
-
-            assert_msg = "Inconsistency detected in the number of columns in line "
-            assert_msg += str(line_num) + " of the system file. All tokens in "
-            assert_msg += "a sentence should have the same number of columns."
-            assert pred_size == pred_negspec_size, assert_msg
+            assert gold_size == gold_negspec_size, column_consistency_msg(line_num, "gold")
+            assert pred_size == pred_negspec_size, column_consistency_msg(line_num, "system")
         
         # collect all neg / spec instances
         collect_col_info(gold_instances, gold_cols, gold_negspec_size)
@@ -220,477 +448,630 @@ def process_sent(gold_tokens, pred_tokens, line_num):
     return gold_instances, pred_instances
 
 
-def evaluate(gold_str, system_str, task="negation"):
+def index_pred_cues(pred_instances):
     """
-    Main evaluation function.
+    pred_instances - a list of predicted instances (dict) of one sentence
+                     in the form: [{label : [ (token_id, word), (...), ... ] }, {...}, ...]
+
+    Returns a dictionary that maps every cue token id to a deque of the indices
+    of the predicted instances with that cue token (in ascending order), and a list
+    with the sorted cue of every predicted instance (as a tuple) for full cue matching.
     """
-    scores = {"Token-level": {"Cue": {"": Score()},
-                              "Scope": {"(full cue)": Score(),
-                                        "(partial cue)": Score(),
-                                        "(no cue)": Score(),
-                                        "(binary labels)": Score(),
-                                        "(full cue, no punct)": Score(),
-                                        "(partial cue, no punct)": Score(),
-                                        "(no cue, no punct)": Score(),
-                                        "(binary labels, no punct)": Score()},
-                              "Event": {"(full cue)": Score(),
-                                        "(partial cue)": Score(),
-                                        "(no cue)": Score(),
-                                        "(binary labels)": Score()}}, 
-              "Scope-level": {"Cue": {"": Score()},
-                              "Scope": {"(full cue)": Score(),
-                                        "(partial cue)": Score(),
-                                        "(no cue)": Score(),
-                                        "(full cue, no punct)": Score(),
-                                        "(partial cue, no punct)": Score(),
-                                        "(no cue, no punct)": Score()},
-                              "Event": {"(full cue)": Score(),
-                                        "(partial cue)": Score(),
-                                        "(no cue)": Score()}, 
-                              "Full "+task: {"": Score(),
-                                             "(no punct)": Score()}}}
-    
-    gold_sents = gold_str.strip().split("\n\n")
-    pred_sents = system_str.strip().split("\n\n")
-    
-    # the number of sentences with negation / speculation where it was predicted correctly
-    correct_negspec_sent_num = {"": 0, "(no punct)": 0}
-    # the number of sentences with negation / speculation
-    negspec_sent_num = 0
+    cue_index = {}
+    pred_cue_keys = []
+    for pred_idx, pred_inst in enumerate(pred_instances):
+        pred_cue = pred_inst.get("Cue", [])
+        pred_cue_keys.append(tuple(sorted(pred_cue)))
+        for cue_id in {cue_tuple[0] for cue_tuple in pred_cue}:
+            cue_index.setdefault(cue_id, deque()).append(pred_idx)
+    return cue_index, pred_cue_keys
 
-    # the number of sentences where negation / speculation was predicted / not predicted correctly
-    correct_sent_num = {"": 0, "(no punct)": 0}
-    # the number of sentences overall
-    all_sent_num = len(gold_sents)
-    
-    # make sure both files have the same number of sentences
-    assert_msg = "The gold and system files have a different number of sentences."
-    assert all_sent_num == len(pred_sents), assert_msg
-    
-    # keep track of lines for error messages
-    line_num = 1
-  
 
-    def update_all(counter, scores, pred_instance):
-        """
-        counter - fn | fp
-        Adds FNs / FPs (as specified in counter) for every metric 
-        in predicted instance (except for cue-independent metrics (incl. cue itself)
-        that are processed separately).
-        Adds to instance counter for every metric.
-        Modifies scores dictionary.
-        """
-        # update fp_no_fn for cue (the only cue-related part that is processed here)
-#        if counter == "fp":
-#            scores["Scope-level"]["Cue"][""].update_counter("fp_no_fn", 1)
-        
-        # update fp scores and number of predicted instances
-        for metric in ["Scope", "Event", "Full "+task]:
-            metric_tokens = pred_instance.get(metric, [])
-        
-            # token-level
-            for token in metric_tokens:
-                 for detail in scores["Token-level"].get(metric, {}):
-                     
-                     # if the current token is punctuation
-                     if "punct" in detail and not re.search("\w", token[1]):
-                         continue  # don't add fp for no punct metrics
-                     
-                     # cue-independent metrics are processed separately
-                     if "no cue" in detail or "binary labels" in detail:
-                         continue
-                    
-                     full_metric_name = scores["Token-level"][metric][detail]
-                     full_metric_name.update_counter(counter, 1)
-#                     if counter == "fn":
-#                         full_metric_name.update_counter("gold", 1)
-#                     if counter == "fp":
-##                         full_metric_name.update_counter("pred", 1)
-#                         # if tokens mismatched because of word mismatch only
-#                         # --> NOT fp_no_fn (here only the ones not present in gold)
-#                         full_metric_name.update_counter("fp_no_fn", 1)
-            
-            # scope-level
-            if metric_tokens or metric == "Full "+task:
-                for detail in scores["Scope-level"][metric]:
-                    # cue-independent metrics are [mostly] processed separately
-                    if "no cue" in detail:
-                        continue
-                    
-                    full_metric_name = scores["Scope-level"][metric][detail]
-                    full_metric_name.update_counter(counter, 1)
-#                    if counter == "fn":
-#                        full_metric_name.update_counter("gold", 1)
-                    if counter == "fp":
-#                        full_metric_name.update_counter("pred", 1)
-                        full_metric_name.update_counter("fp_no_fn", 1)
+def remove_first(counts, removed, inst):
+    """
+    counts  - a dictionary {inst : number of remaining occurrences}
+    removed - a dictionary {inst : number of removed occurrences}
 
+    Removes one occurrence of inst from a multiset of instances 
+    (the first one, see remaining_insts).
+    Returns True if inst was found, and False otherwise.
+    Modifies counts and removed.
+    """
+    count = counts.get(inst, 0)
+    if not count:
+        return False
+    counts[inst] = count - 1
+    removed[inst] = removed.get(inst, 0) + 1
+    return True
 
-    def process_inst(scores, gold_tokens, pred_tokens, metric, full_cue=True):
-        """
-        metric - Scope | Event
-        full_cue - True if the cue of the current instance was predicted correctly.
-        
-        Processes one instance of negation / speculation in gold and pred.
-        Returns a dictionary with two Booleans for including and excluding
-        punctuation metrics, which are set to True if all pred tokens matched
-        gold tokens, and False otherwise.
-        Modifies scores dictionary.
-        """
-        # flag to check if gold matches pred fully for a given metric
-        full_match = {"": True, "(no punct)": True}
-        
-        # if there are no instances in both gold and pred, return True for full match
-        if not gold_tokens and not pred_tokens:
-            return full_match
-        
-        # collect gold token ids
-        gold_ids = []
-        # flag for scope-level to see if there is an instance in the system
-        pred = True if pred_tokens else False
-        
-        ## token-level ##
-        for gold_token in gold_tokens:
-            gold_ids.append(gold_token[0]) # collect gold token id
-            
-            # check if the current token is punctuation
-            punct = False if re.search("\w", gold_token[1]) else True
-            
-            # if gold token matches system token --> tp
-            if gold_token in pred_tokens:
-                for detail in scores["Token-level"].get(metric, {}):
-                    # if the current metric is excluding punctuation
-                    if "punct" in detail and punct:
-                        continue  # don't add anything
-                    
-                    # cue-independent metrics are processed separately
-                    if "no cue" in detail or "binary labels" in detail:
-                        continue
 
-                    full_metric_name = scores["Token-level"][metric][detail]
-                    full_metric_name.update_counter("gold", 1)
-                    full_metric_name.update_counter("pred", 1)
-                
-                    # cases that do not allow partial cue match
-                    if "full" in detail and not full_cue:
-                        full_metric_name.update_counter("fp", 1)
-                        full_metric_name.update_counter("fn", 1)
-                    # cases that allow partial cue match
-                    else:
-                        full_metric_name.update_counter("tp", 1)
-                
-                pred_tokens.remove(gold_token) # get rid of the checked part
-                
-            # if not --> fn
-            else:
-                full_match[""] = False
-                if not punct:
-                    full_match["(no punct)"] = False 
+def remaining_insts(insts, removed):
+    """
+    insts   - a list of instances in their original order
+    removed - a dictionary {inst : number of removed occurrences}
 
-                for detail in scores["Token-level"].get(metric, {}):
-                    # if the current metric is excluding punctuation
-                    if "punct" in detail and punct:
-                        continue  # don't add anything
+    Returns the instances that were not removed, in their original order
+    (for every instance, its first occurrences are the removed ones).
+    """
+    if not removed:
+        return insts
+    to_skip = dict(removed)
+    remaining = []
+    for inst in insts:
+        if to_skip.get(inst, 0):
+            to_skip[inst] -= 1
+        else:
+            remaining.append(inst)
+    return remaining
 
-                    # cue-independent metrics are processed separately
-                    if "no cue" in detail or "binary labels" in detail:
-                        continue
 
-                    full_metric_name = scores["Token-level"][metric][detail]
-                    full_metric_name.update_counter("gold", 1)
-                    full_metric_name.update_counter("fn", 1)
-        
-        # if there are tokens in pred that are not in gold --> fp
-        for pred_token in pred_tokens:
-            # check if the current token is punctuation
-            punct = False if re.search("\w", pred_token[1]) else True
+def count_partial_matches(pred_insts, gold_insts):
+    """
+    pred_insts - a list of predicted instances [ [ (token_id, word), (...), ... ], ...]
+    gold_insts - a list of gold instances as lists of token ids [ [token_id, ...], ...]
 
-            full_match[""] = False
-            if not punct:
-                full_match["(no punct)"] = False 
+    Goes through the predicted instances in order, and for every instance 
+    through its tokens in order, and matches (and removes) the first remaining 
+    gold instance that includes the token.
+    Returns the number of predicted instances that partially matched a gold instance.
+    """
+    if not pred_insts or not gold_insts:
+        return 0
+    
+    # index the gold instances by token id: {token_id : deque of gold positions}
+    gold_positions = {}
+    for pos, gold_ids in enumerate(gold_insts):
+        for gold_id in dict.fromkeys(gold_ids):
+            gold_positions.setdefault(gold_id, deque()).append(pos)
+    matched_gold = set()
+
+    num_matches = 0
+    for inst in pred_insts:
+        for pred_id, pred_word in inst:
+            candidates = gold_positions.get(pred_id)
+            # drop gold instances that were already matched
+            while candidates and candidates[0] in matched_gold:
+                candidates.popleft()
+            if candidates:
+                matched_gold.add(candidates.popleft())
+                num_matches += 1
+                break
+    return num_matches
+
+
+def process_binary(plan, gold_token_sets, pred_token_sets):
+    """
+    gold_token_sets / pred_token_sets - a dictionary {label : set of (token_id, word)}
+                                        with the scope and event tokens of a sentence
+
+    Calculates the binary token-level scores (every token is counted ONCE)
+    of process_independent.
+    Modifies the counters of the plan (MetricPlan) and pred_token_sets.
+    """
+    counts = plan.counts
+    for label in gold_token_sets:
+        binary_tp, binary_fn, binary_fp, _ = plan.binary[label]
+        binary_nopunct_tp, binary_nopunct_fn, binary_nopunct_fp, _ = plan.binary_nopunct
+
+        # collect tp and fn
+        for gold_token in gold_token_sets[label]:
+            if label == "Scope":
+                punct = False if WORD_CHAR.search(gold_token[1]) else True
             
-            for detail in scores["Token-level"].get(metric, {}):
-                # if the current metric is excluding punctuation
-                if "punct" in detail and punct:
-                    continue  # don't add anything
+            if gold_token in pred_token_sets[label]:
+                counts[binary_tp] += 1
+                pred_token_sets[label].remove(gold_token)                    
+                if label == "Scope" and not punct:
+                    counts[binary_nopunct_tp] += 1
 
-                # cue-independent metrics are processed separately
-                if "no cue" in detail or "binary labels" in detail:
-                    continue
-                
-                scores["Token-level"][metric][detail].update_counter("pred", 1)
-                scores["Token-level"][metric][detail].update_counter("fp", 1)
-                
-                # don't update fp that exclude intersections with fn 
-                # if the token was predicted, but the word boundaries were wrong
-                if pred_token[0] not in gold_ids:
-                    scores["Token-level"][metric][detail].update_counter("fp_no_fn", 1)
-        
-        ## scope-level ##
-        for detail in scores["Scope-level"].get(metric, {}):
-            # cue-independent metrics are processed separately
-            if "no cue" in detail:
-                continue
+            else:
+                counts[binary_fn] += 1
+                if label == "Scope" and not punct:
+                    counts[binary_nopunct_fn] += 1
 
-            full_metric_name = scores["Scope-level"][metric][detail]
-            
-            if gold_tokens:
-                full_metric_name.update_counter("gold", 1)
-            if pred:
-                full_metric_name.update_counter("pred", 1)
-            
-            # cases that do not allow partial cue match
-            if "full" in detail and not full_cue:
-                if gold_tokens:
-                    full_metric_name.update_counter("fn", 1)
-                if pred:
-                    full_metric_name.update_counter("fp", 1)
-                if not gold_tokens:
-                    full_metric_name.update_counter("fp_no_fn", 1)
+    
+        # collect fp
+        for pred_token in pred_token_sets[label]:
+            if label == "Scope":
+                punct = False if WORD_CHAR.search(pred_token[1]) else True                
+            counts[binary_fp] += 1
+            if label == "Scope" and not punct:
+                counts[binary_nopunct_fp] += 1
+
+
+def process_independent_lists(plan, gold_insts, pred_insts):
+    """
+    gold_insts / pred_insts - a list of gold / predicted instances (dict) 
+                            in the form:
+                            [{label : [ (token_id, word), (...), ... ] }, {...}, ...]
+
+    process_independent for sentences with few instances: the predicted
+    tokens and instances are kept in lists that are searched and removed 
+    from in order, which is quadratic in the number of instances.
+    Modifies the counters of the plan (MetricPlan).
+    """
+    counts = plan.counts
+    token_nopunct_tp, token_nopunct_fn, token_nopunct_fp, _ = plan.independent_token_nopunct
+    inst_nopunct_tp, inst_nopunct_fn, inst_nopunct_fp, _ = plan.independent_inst_nopunct
+
+    # collect predicted information
+    all_pred_tokens = {"Cue": [], "Scope": [], "Event": []} # token-level
+    full_pred_insts = {"Cue": [], "Scope": [], "Event": []} # scope-level
+    nopunct_pred_insts = [] # exclude punctuation for scope's "no punct" metric
+    
+    # collect all tokens belonging to the given label from pred
+    for pred in pred_insts:
+        for label in all_pred_tokens:
+            pred_tokens = list(pred.get(label, []))
+            if not pred_tokens: # if there was no scope / no event in the instance
+                continue
             
-            # cases that allow partial cue match and exclude punctuation
-            elif "punct" in detail:
-                # if all parts were correct (excluding punctuation) --> tp
-                if full_match["(no punct)"]:
-                    full_metric_name.update_counter("tp", 1)
-                # if not --> fn | fp
-                else:
-                    if gold_tokens:
-                        full_metric_name.update_counter("fn", 1)
-                    if pred:
-                        full_metric_name.update_counter("fp", 1)
-                    if not gold_tokens:
-                        full_metric_name.update_counter("fp_no_fn", 1)                        
+            all_pred_tokens[label] += pred_tokens
+            full_pred_insts[label].append(pred_tokens)
+
+            # exclude punctuation for "no punct" scope metric
+            if label == "Scope":             
+                nopunct_pred_insts.append([token_tuple for token_tuple in pred_tokens
+                                           if WORD_CHAR.search(token_tuple[1])])
             
-            # cases that allow partial cue match and include punctuation
-            else:
-                # if all parts were correct --> tp
-                if full_match[""]:
-                    full_metric_name.update_counter("tp", 1)
-                # if not --> fn | fp
-                else:
-                    if gold_tokens:
-                        full_metric_name.update_counter("fn", 1)
-                    if pred:
-                        full_metric_name.update_counter("fp", 1)
-                    if not gold_tokens:
-                        full_metric_name.update_counter("fp_no_fn", 1)   
-        
-        # end of process_inst function
-        return full_match
+    # binary
+    pred_token_sets = {"Scope": set(all_pred_tokens["Scope"]), 
+                       "Event": set(all_pred_tokens["Event"])}
+    gold_token_sets = {"Scope": set(), 
+                       "Event": set()}
     
+    # keep track of non-tp gold (scope-level) to see later 
+    # if there was a partial match (for fp_no_fn)
+    not_tp_gold = {"Cue": [], "Scope": [], "Event": [], "no punct": []}
     
-    def process_independent(scores, gold_insts, pred_insts):
-        """
-        gold_insts / pred_insts - a list of gold / predicted instances (dict) 
-                                in the form:
-                                [{label : [ (token_id, word), (...), ... ] }, {...}, ...]
-
-        Processes all negation / speculation instances in gold and pred.
-        Calculates token- and scope-level scores for cue-independent metrics 
-            (including metrics for the cue itself).
-        Modifies scores dictionary.
-        """
-        # collect predicted information
-        all_pred_tokens = {"Cue": [], "Scope": [], "Event": []} # token-level
-        full_pred_insts = {"Cue": [], "Scope": [], "Event": []} # scope-level
-        nopunct_pred_insts = [] # exclude punctuation for scope's "no punct" metric
-        
-        # collect all tokens belonging to the given label from pred
-        for pred in pred_insts:
-            for label in all_pred_tokens:
-                pred_tokens = list(pred.get(label, []))
-                if not pred_tokens: # if there was no scope / no event in the instance
-                    continue
-                
-                all_pred_tokens[label] += pred_tokens
-                full_pred_insts[label].append(pred_tokens)
+    # iterate through gold and find matching predictions
+    for gold in gold_insts:
+        for label in all_pred_tokens:
+            token_tp, token_fn, _, _ = plan.independent_token[label]
+            inst_tp, inst_fn, _, _ = plan.independent_inst[label]
 
-                # exclude punctuation for "no punct" scope metric
-                if label == "Scope":             
-                    nopunct_pred = []
-                    for token_tuple in pred_tokens:
-                        punct = False if re.search("\w", token_tuple[1]) else True
-                        if not punct:
-                            nopunct_pred.append(token_tuple)
-                    nopunct_pred_insts.append(nopunct_pred)
-                
-        # binary
-        pred_token_sets = {"Scope": set(all_pred_tokens["Scope"]), 
-                           "Event": set(all_pred_tokens["Event"])}
-        gold_token_sets = {"Scope": set(), 
-                           "Event": set()}
-        
-        # keep track of non-tp gold (scope-level) to see later 
-        # if there was a partial match (for fp_no_fn)
-        not_tp_gold = {"Cue": [], "Scope": [], "Event": [], "no punct": []}
-        
-        # iterate through gold and find matching predictions
-        for gold in gold_insts:
-            for label in all_pred_tokens:
-                # specify the detail name in for the scores dictionary
-                detail_name = "(no cue)" if label != "Cue" else ""
-
-                gold_tokens = gold.get(label, [])
-                if not gold_tokens: # if there was no scope / no event in the instance
-                    continue
+            gold_tokens = gold.get(label, [])
+            if not gold_tokens: # if there was no scope / no event in the instance
+                continue
 
+            # exclude punctuation for "no punct" scope metric
+            if label == "Scope":
+                nopunct_gold = []
+            
+            ## token-level
+            for token_tuple in gold_tokens:
+                # add to token set
+                if label != "Cue":
+                    gold_token_sets[label].add(token_tuple)
+                
                 # exclude punctuation for "no punct" scope metric
                 if label == "Scope":
-                    nopunct_gold = []
+                    punct = False if WORD_CHAR.search(token_tuple[1]) else True
                 
-                ## token-level
-                for token_tuple in gold_tokens:
-                    # add to token set
-                    if label != "Cue":
-                        gold_token_sets[label].add(token_tuple)
-                    
-                    # exclude punctuation for "no punct" scope metric
-                    if label == "Scope":
-                        punct = False if re.search("\w", token_tuple[1]) else True
+                # if there is a predicted token matching gold --> tp
+                if token_tuple in all_pred_tokens[label]:
+                    counts[token_tp] += 1
+                    if label == "Scope" and not punct:
+                        counts[token_nopunct_tp] += 1
+                    all_pred_tokens[label].remove(token_tuple)
                     
-                    # if there is a predicted token matching gold --> tp
-                    if token_tuple in all_pred_tokens[label]:
-                        scores["Token-level"][label][detail_name].update_counter("tp", 1)
-                        if label == "Scope" and not punct:
-                            scores["Token-level"]["Scope"]["(no cue, no punct)"].update_counter("tp", 1)
-                        all_pred_tokens[label].remove(token_tuple)
-                        
-                    # if no matching prediction --> fn
-                    else:
-                        scores["Token-level"][label][detail_name].update_counter("fn", 1)
-                        if label == "Scope" and not punct:
-                            scores["Token-level"]["Scope"]["(no cue, no punct)"].update_counter("fn", 1)
-                        
-                    # append non-punctuation tuples to punctuation-free gold instances
+                # if no matching prediction --> fn
+                else:
+                    counts[token_fn] += 1
                     if label == "Scope" and not punct:
-                        nopunct_gold.append(token_tuple)
-            
+                        counts[token_nopunct_fn] += 1
+                    
+                # append non-punctuation tuples to punctuation-free gold instances
+                if label == "Scope" and not punct:
+                    nopunct_gold.append(token_tuple)
+        
+        
+            ## scope-level (incl. punct)
+            # if there is a prediction matching gold in all elements --> tp
+            if gold_tokens in full_pred_insts[label]:
+                counts[inst_tp] += 1
+                # remove the match from pred list
+                full_pred_insts[label].remove(gold_tokens)
+            # if no matching prediction --> fn
+            else:
+                counts[inst_fn] += 1
+                not_tp_gold[label].append([gold_id for gold_id, gold_word in gold_tokens])
             
-                ## scope-level (incl. punct)
-                # if there is a prediction matching gold in all elements --> tp
-                if gold_tokens in full_pred_insts[label]:
-                    scores["Scope-level"][label][detail_name].update_counter("tp", 1)
+            if label == "Scope": # scope-specific "no punct" metric
+                ## scope-level (excl. punct)
+                # if there is a prediction matching gold in all elements
+                # (not taking punctuation into account) --> tp
+                if nopunct_gold in nopunct_pred_insts:
+                    counts[inst_nopunct_tp] += 1
                     # remove the match from pred list
-                    full_pred_insts[label].remove(gold_tokens)
+                    nopunct_pred_insts.remove(nopunct_gold)
                 # if no matching prediction --> fn
                 else:
-                    scores["Scope-level"][label][detail_name].update_counter("fn", 1)
-                    not_tp_gold[label].append([gold_id for gold_id, gold_word in gold_tokens])
-                
-                if label == "Scope": # scope-specific "no punct" metric
-                    ## scope-level (excl. punct)
-                    # if there is a prediction matching gold in all elements
-                    # (not taking punctuation into account) --> tp
-                    if nopunct_gold in nopunct_pred_insts:
-                        scores["Scope-level"]["Scope"]["(no cue, no punct)"].update_counter("tp", 1)
-                        # remove the match from pred list
-                        nopunct_pred_insts.remove(nopunct_gold)
-                    # if no matching prediction --> fn
-                    else:
-                        scores["Scope-level"]["Scope"]["(no cue, no punct)"].update_counter("fn", 1)
-                        not_tp_gold["no punct"].append([gold_id for gold_id, gold_word in nopunct_gold])
-                
-        # add to fp for predicted instances that did not match to gold
+                    counts[inst_nopunct_fn] += 1
+                    not_tp_gold["no punct"].append([gold_id for gold_id, gold_word in nopunct_gold])
+            
+    # add to fp for predicted instances that did not match to gold
+    for label in all_pred_tokens:
+        _, _, token_fp, _ = plan.independent_token[label]
+        _, _, inst_fp, inst_fp_no_fn = plan.independent_inst[label]
+
+        ## token-level
+        for token_tuple in all_pred_tokens[label]:
+            # exclude punctuation for "no punct" scope metric
+            if label == "Scope" and WORD_CHAR.search(token_tuple[1]):
+                counts[token_nopunct_fp] += 1
+            
+            # metric including punct
+            counts[token_fp] += 1
+        
+        ## scope-level
+        insts_left = full_pred_insts[label]
+        if insts_left:
+            counts[inst_fp] += len(insts_left)
+            
+            # check for partial match, only add to fp_no_fn if there is no match
+            num_partial = count_partial_matches(insts_left, not_tp_gold[label])
+            counts[inst_fp_no_fn] += len(insts_left) - num_partial
+    
+    # scope-level scope that excludes punctuation --> fp
+    if nopunct_pred_insts:
+        counts[inst_nopunct_fp] += len(nopunct_pred_insts)
+
+        # check for partial match, only add to fp_no_fn if there is no match
+        # (inst_fp_no_fn is left over from the loop above, as before)
+        num_partial = count_partial_matches(nopunct_pred_insts, not_tp_gold["no punct"])
+        counts[inst_fp_no_fn] += len(nopunct_pred_insts) - num_partial
+
+    process_binary(plan, gold_token_sets, pred_token_sets)
+
+
+def process_independent_multisets(plan, gold_insts, pred_insts):
+    """
+    gold_insts / pred_insts - a list of gold / predicted instances (dict) 
+                            in the form:
+                            [{label : [ (token_id, word), (...), ... ] }, {...}, ...]
+
+    process_independent for sentences with many instances: the predicted
+    tokens and instances are kept as multisets and partial matches are found
+    through an index of the gold token ids, which is linear in the number of
+    instances (but costs a few microseconds to set up).
+    Modifies the counters of the plan (MetricPlan).
+    """
+    counts = plan.counts
+    token_nopunct_tp, token_nopunct_fn, token_nopunct_fp, _ = plan.independent_token_nopunct
+    inst_nopunct_tp, inst_nopunct_fn, inst_nopunct_fp, _ = plan.independent_inst_nopunct
+
+    # collect predicted information
+    # token-level: {label : {(token_id, word) : count}}
+    all_pred_tokens = {"Cue": {}, "Scope": {}, "Event": {}}
+    # scope-level: predicted instances as tuples, in their original order,
+    # and as multisets {label : {instance : count}} for matching
+    full_pred_insts = {"Cue": [], "Scope": [], "Event": []}
+    full_pred_counts = {"Cue": {}, "Scope": {}, "Event": {}}
+    full_pred_removed = {"Cue": {}, "Scope": {}, "Event": {}}
+    # exclude punctuation for scope's "no punct" metric
+    nopunct_pred_insts = []
+    nopunct_pred_counts = {}
+    nopunct_pred_removed = {}
+    
+    # collect all tokens belonging to the given label from pred
+    for pred in pred_insts:
         for label in all_pred_tokens:
+            pred_tokens = pred.get(label)
+            if not pred_tokens: # if there was no scope / no event in the instance
+                continue
+            pred_tokens = tuple(pred_tokens)
+            
+            label_tokens = all_pred_tokens[label]
+            for token_tuple in pred_tokens:
+                label_tokens[token_tuple] = label_tokens.get(token_tuple, 0) + 1
+            full_pred_insts[label].append(pred_tokens)
+            full_pred_counts[label][pred_tokens] = full_pred_counts[label].get(pred_tokens, 0) + 1
+
+            # exclude punctuation for "no punct" scope metric
+            if label == "Scope":             
+                nopunct_pred = tuple([token_tuple for token_tuple in pred_tokens
+                                      if WORD_CHAR.search(token_tuple[1])])
+                nopunct_pred_insts.append(nopunct_pred)
+                nopunct_pred_counts[nopunct_pred] = nopunct_pred_counts.get(nopunct_pred, 0) + 1
             
-            # specify the detail name in for the scores dictionary
-            detail_name = "(no cue)" if label != "Cue" else ""
+    # binary
+    pred_token_sets = {"Scope": set(all_pred_tokens["Scope"]), 
+                       "Event": set(all_pred_tokens["Event"])}
+    gold_token_sets = {"Scope": set(), 
+                       "Event": set()}
+    
+    # keep track of non-tp gold (scope-level) to see later 
+    # if there was a partial match (for fp_no_fn)
+    not_tp_gold = {"Cue": [], "Scope": [], "Event": [], "no punct": []}
+    
+    # iterate through gold and find matching predictions
+    for gold in gold_insts:
+        for label in all_pred_tokens:
+            token_tp, token_fn, _, _ = plan.independent_token[label]
+            inst_tp, inst_fn, _, _ = plan.independent_inst[label]
 
-            ## token-level
-            tokens_left = all_pred_tokens[label]
+            gold_tokens = gold.get(label, [])
+            if not gold_tokens: # if there was no scope / no event in the instance
+                continue
+
+            # exclude punctuation for "no punct" scope metric
+            if label == "Scope":
+                nopunct_gold = []
             
-            for token_tuple in tokens_left:
+            ## token-level
+            label_tokens = all_pred_tokens[label]
+            for token_tuple in gold_tokens:
+                # add to token set
+                if label != "Cue":
+                    gold_token_sets[label].add(token_tuple)
+                
                 # exclude punctuation for "no punct" scope metric
                 if label == "Scope":
-                    punct = False if re.search("\w", token_tuple[1]) else True   
-                    if not punct:
-                        scores["Token-level"]["Scope"]["(no cue, no punct)"].update_counter("fp", 1)                        
+                    punct = False if WORD_CHAR.search(token_tuple[1]) else True
                 
-                # metric including punct
-                scores["Token-level"][label][detail_name].update_counter("fp", 1)
+                # if there is a predicted token matching gold --> tp
+                count = label_tokens.get(token_tuple, 0)
+                if count:
+                    counts[token_tp] += 1
+                    if label == "Scope" and not punct:
+                        counts[token_nopunct_tp] += 1
+                    label_tokens[token_tuple] = count - 1
+                    
+                # if no matching prediction --> fn
+                else:
+                    counts[token_fn] += 1
+                    if label == "Scope" and not punct:
+                        counts[token_nopunct_fn] += 1
+                    
+                # append non-punctuation tuples to punctuation-free gold instances
+                if label == "Scope" and not punct:
+                    nopunct_gold.append(token_tuple)
+        
+        
+            ## scope-level (incl. punct)
+            # if there is a prediction matching gold in all elements --> tp
+            # (and remove the match from pred)
+            if remove_first(full_pred_counts[label], full_pred_removed[label], tuple(gold_tokens)):
+                counts[inst_tp] += 1
+            # if no matching prediction --> fn
+            else:
+                counts[inst_fn] += 1
+                not_tp_gold[label].append([gold_id for gold_id, gold_word in gold_tokens])
+            
+            if label == "Scope": # scope-specific "no punct" metric
+                ## scope-level (excl. punct)
+                # if there is a prediction matching gold in all elements
+                # (not taking punctuation into account) --> tp
+                # (and remove the match from pred)
+                if remove_first(nopunct_pred_counts, nopunct_pred_removed, tuple(nopunct_gold)):
+                    counts[inst_nopunct_tp] += 1
+                # if no matching prediction --> fn
+                else:
+                    counts[inst_nopunct_fn] += 1
+                    not_tp_gold["no punct"].append([gold_id for gold_id, gold_word in nopunct_gold])
             
-            ## scope-level
-            insts_left = full_pred_insts[label]
+    # add to fp for predicted instances that did not match to gold
+    for label in all_pred_tokens:
+        _, _, token_fp, _ = plan.independent_token[label]
+        _, _, inst_fp, inst_fp_no_fn = plan.independent_inst[label]
+
+        ## token-level
+        for token_tuple, count in all_pred_tokens[label].items():
+            if not count:
+                continue
+            # exclude punctuation for "no punct" scope metric
+            if label == "Scope":
+                punct = False if WORD_CHAR.search(token_tuple[1]) else True   
+                if not punct:
+                    counts[token_nopunct_fp] += count
             
-            for inst in insts_left:               
-                scores["Scope-level"][label][detail_name].update_counter("fp", 1)
-                                
-                # check for partial match, only add to fp_no_fn if there is no match
-                partial_match = False
-                for pred_id, pred_word in inst:
-                    for gold_ids in not_tp_gold[label]:
-                        if pred_id in gold_ids:
-                            partial_match = True
-                            not_tp_gold[label].remove(gold_ids)
-                            break
-                    # break the second loop when a match is found
-                    if partial_match:
-                        break
-                
-                if not partial_match:
-                    scores["Scope-level"][label][detail_name].update_counter("fp_no_fn", 1)                
+            # metric including punct
+            counts[token_fp] += count
         
-        # scope-level scope that excludes punctuation --> fp
-        for inst in nopunct_pred_insts:
-            scores["Scope-level"]["Scope"]["(no cue, no punct)"].update_counter("fp", 1)
-
-            # check for partial match, only add to fp_no_fn if there is no match
-            partial_match = False
-            for pred_id, pred_word in inst:
-                for gold_ids in not_tp_gold["no punct"]:
-                    if pred_id in gold_ids:
-                        partial_match = True
-                        not_tp_gold["no punct"].remove(gold_ids)
-                        break
-                # break the second loop when a match is found
-                if partial_match:
-                    break
+        ## scope-level
+        insts_left = remaining_insts(full_pred_insts[label], full_pred_removed[label])
+        if insts_left:
+            counts[inst_fp] += len(insts_left)
             
-            if not partial_match:
-                scores["Scope-level"][label][detail_name].update_counter("fp_no_fn", 1)
+            # check for partial match, only add to fp_no_fn if there is no match
+            num_partial = count_partial_matches(insts_left, not_tp_gold[label])
+            counts[inst_fp_no_fn] += len(insts_left) - num_partial
+    
+    # scope-level scope that excludes punctuation --> fp
+    insts_left = remaining_insts(nopunct_pred_insts, nopunct_pred_removed)
+    if insts_left:
+        counts[inst_nopunct_fp] += len(insts_left)
 
-        # binary (every token is counted ONCE)
-        for label in gold_token_sets:
-            # collect tp and fn
-            for gold_token in gold_token_sets[label]:
-                if label == "Scope":
-                    punct = False if re.search("\w", gold_token[1]) else True
-                
-                if gold_token in pred_token_sets[label]:
-                    scores["Token-level"][label]["(binary labels)"].update_counter("tp", 1)
-                    pred_token_sets[label].remove(gold_token)                    
-                    if label == "Scope" and not punct:
-                        scores["Token-level"]["Scope"]["(binary labels, no punct)"].update_counter("tp", 1)
+        # check for partial match, only add to fp_no_fn if there is no match
+        # (inst_fp_no_fn is left over from the loop above, as before)
+        num_partial = count_partial_matches(insts_left, not_tp_gold["no punct"])
+        counts[inst_fp_no_fn] += len(insts_left) - num_partial
+
+    process_binary(plan, gold_token_sets, pred_token_sets)
 
-                else:
-                    scores["Token-level"][label]["(binary labels)"].update_counter("fn", 1)
-                    if label == "Scope" and not punct:
-                        scores["Token-level"]["Scope"]["(binary labels, no punct)"].update_counter("fn", 1)
 
+def process_independent(plan, gold_insts, pred_insts):
+    """
+    gold_insts / pred_insts - a list of gold / predicted instances (dict) 
+                            in the form:
+                            [{label : [ (token_id, word), (...), ... ] }, {...}, ...]
+
+    Processes all negation / speculation instances in gold and pred.
+    Calculates token- and scope-level scores for cue-independent metrics 
+        (including metrics for the cue itself).
+    Modifies the counters of the plan (MetricPlan).
+    """
+    if len(gold_insts) + len(pred_insts) < MULTISET_MIN_INSTANCES:
+        process_independent_lists(plan, gold_insts, pred_insts)
+    else:
+        process_independent_multisets(plan, gold_insts, pred_insts)
+  
+    ### END OF process_independent FUNCTION ###
+
+
+
+def update_all(counter, plan, pred_instance):
+    """
+    counter - fn | fp
+    Adds FNs / FPs (as specified in counter) for every metric 
+    in predicted instance (except for cue-independent metrics (incl. cue itself)
+    that are processed separately).
+    Modifies the counters of the plan.
+    """
+    counts = plan.counts
+    token_cells = plan.token_fn if counter == "fn" else plan.token_fp
+    
+    # update fp scores and number of predicted instances
+    for metric in ["Scope", "Event", "Full "+plan.task]:
+        metric_tokens = pred_instance.get(metric, [])
+    
+        # token-level (no punct metrics don't count punctuation)
+        for token in metric_tokens:
+            punct = False if WORD_CHAR.search(token[1]) else True
+            for cell in token_cells[(metric, punct)]:
+                counts[cell] += 1
         
-            # collect fp
-            for pred_token in pred_token_sets[label]:
-                if label == "Scope":
-                    punct = False if re.search("\w", pred_token[1]) else True                
-                scores["Token-level"][label]["(binary labels)"].update_counter("fp", 1)        
-                if label == "Scope" and not punct:
-                    scores["Token-level"]["Scope"]["(binary labels, no punct)"].update_counter("fp", 1)
-      
-        ### END OF process_independent FUNCTION ###
+        # scope-level (cue-independent metrics are [mostly] processed separately)
+        if metric_tokens or metric == "Full "+plan.task:
+            for cell in plan.unmatched_inst[(counter, metric)]:
+                counts[cell] += 1
+
+
+def process_inst(plan, gold_tokens, pred_tokens, metric, full_cue=True):
+    """
+    metric - Scope | Event
+    full_cue - True if the cue of the current instance was predicted correctly.
+    
+    Processes one instance of negation / speculation in gold and pred.
+    Returns a dictionary with two Booleans for including and excluding
+    punctuation metrics, which are set to True if all pred tokens matched
+    gold tokens, and False otherwise.
+    Modifies the counters of the plan.
+    """
+    # flag to check if gold matches pred fully for a given metric
+    full_match = {"": True, "(no punct)": True}
+    
+    # if there are no instances in both gold and pred, return True for full match
+    if not gold_tokens and not pred_tokens:
+        return full_match
     
+    counts = plan.counts
+    
+    # collect gold token ids
+    gold_ids = []
+    # flag for scope-level to see if there is an instance in the system
+    pred = True if pred_tokens else False
+    
+    ## token-level ##
+    for gold_token in gold_tokens:
+        gold_ids.append(gold_token[0]) # collect gold token id
+        
+        # check if the current token is punctuation
+        punct = False if WORD_CHAR.search(gold_token[1]) else True
+        
+        # if gold token matches system token --> tp
+        # (or fp and fn for cases that do not allow partial cue match)
+        if gold_token in pred_tokens:
+            for cell in plan.token_match[(metric, punct, full_cue)]:
+                counts[cell] += 1
+            
+            pred_tokens.remove(gold_token) # get rid of the checked part
+            
+        # if not --> fn
+        else:
+            full_match[""] = False
+            if not punct:
+                full_match["(no punct)"] = False 
 
-    # process gold and prediction sentences
-    for sent_idx in range(all_sent_num):
-        gold_tokens = gold_sents[sent_idx].split("\n")
-        pred_tokens = pred_sents[sent_idx].split("\n")
+            for cell in plan.token_fn[(metric, punct)]:
+                counts[cell] += 1
+    
+    # if there are tokens in pred that are not in gold --> fp
+    for pred_token in pred_tokens:
+        # check if the current token is punctuation
+        punct = False if WORD_CHAR.search(pred_token[1]) else True
+
+        full_match[""] = False
+        if not punct:
+            full_match["(no punct)"] = False 
+        
+        for cell in plan.token_fp[(metric, punct)]:
+            counts[cell] += 1
+            
+        # don't update fp that exclude intersections with fn 
+        # if the token was predicted, but the word boundaries were wrong
+        if pred_token[0] not in gold_ids:
+            for cell in plan.token_fp_no_fn[(metric, punct)]:
+                counts[cell] += 1
+    
+    ## scope-level ##
+    for cell in plan.matched_inst[(metric, full_cue, full_match[""], full_match["(no punct)"], 
+                                   bool(gold_tokens), pred)]:
+        counts[cell] += 1
+    
+    # end of process_inst function
+    return full_match
+
+
+
+class ExtendedEvaluation:
+    """
+    Accumulates the scores of the evaluation sentence by sentence, 
+    so that the sentences can come from any source (see evaluate).
+    """
+    def __init__(self, task="negation", realign_tokens=False):
+        """
+        task - task to be evaluated (negation/speculation)
+        realign_tokens - if the tokens of a system sentence differ from the 
+                         gold tokens, align them and project the system 
+                         annotation onto the gold tokens (see project_rows 
+                         in alignment.py) instead of failing
+        """
+        self.task = task
+        self.plan = MetricPlan(task)
+        self.realign_tokens = realign_tokens
+        
+        # [(line number, edit distance)] of the sentences that needed token alignment
+        self.realigned_sentences = []
+        
+        # the number of sentences with negation / speculation where it was predicted correctly
+        self.correct_negspec_sent_num = {"": 0, "(no punct)": 0}
+        # the number of sentences with negation / speculation
+        self.negspec_sent_num = 0
+
+        # the number of sentences where negation / speculation was predicted / not predicted correctly
+        self.correct_sent_num = {"": 0, "(no punct)": 0}
+        # the number of sentences overall
+        self.all_sent_num = 0
+        
+        # keep track of lines for error messages
+        self.line_num = 1
+
+
+    def add_sentence(self, gold_rows, pred_rows):
+        """
+        gold_rows - the token rows (lists of columns) of one sentence in the gold file
+        pred_rows - the token rows of the same sentence in the system file
+        
+        Processes gold and prediction sentence.
+        Modifies the counters of the plan.
+        """
+        plan = self.plan
+        correct_sent_num = self.correct_sent_num
+        correct_negspec_sent_num = self.correct_negspec_sent_num
+        self.all_sent_num += 1
+        
+        if self.realign_tokens and not tokens_match(gold_rows, pred_rows):
+            pred_rows, distance = project_rows(gold_rows, pred_rows)
+            self.realigned_sentences.append((self.line_num, distance))
         
         assert_msg = "The sentences in gold file and system file starting at line " 
-        assert_msg += str(line_num) + " are of different length."
-        assert len(gold_tokens) == len(pred_tokens), assert_msg
+        assert_msg += str(self.line_num) + " are of different length."
+        assert len(gold_rows) == len(pred_rows), assert_msg
         
-        gold_instances, pred_instances = process_sent(gold_tokens, pred_tokens, 
-                                                      line_num)
+        gold_instances, pred_instances = process_sent(gold_rows, pred_rows, 
+                                                      self.line_num)
         
         # if both gold and system sentence have no neg/spec
         if gold_instances == pred_instances == []:
@@ -702,64 +1083,68 @@ def evaluate(gold_str, system_str, task="negation"):
         elif not gold_instances and pred_instances:
 
             # process instances for cue-independent metrics (incl. all cue metrics)
-            process_independent(scores, gold_instances, pred_instances)
+            process_independent(plan, gold_instances, pred_instances)
 
             for pred_inst in pred_instances:
-                update_all("fp", scores, pred_inst)
+                update_all("fp", plan, pred_inst)
         
         
         # if gold neg/spec and system doesn't  --> fn
         elif gold_instances and not pred_instances:
-            negspec_sent_num += 1
+            self.negspec_sent_num += 1
 
             # process instances for cue-independent metrics (incl. all cue metrics)
-            process_independent(scores, gold_instances, pred_instances)
+            process_independent(plan, gold_instances, pred_instances)
             
             for gold_inst in gold_instances:
-                update_all("fn", scores, gold_inst)
+                update_all("fn", plan, gold_inst)
 
 
         # if both gold and system sentence have neg/spec
         elif gold_instances and pred_instances:
-            negspec_sent_num += 1
+            self.negspec_sent_num += 1
             
             # process instances for cue-independent metrics (incl. all cue metrics)
-            process_independent(scores, gold_instances, pred_instances)
+            process_independent(plan, gold_instances, pred_instances)
             
             # check if every instance in the sentence was fully correct
             sent_correct = {"": True, "(no punct)": True}
             
+            # index predicted instances by their cue tokens
+            cue_index, pred_cue_keys = index_pred_cues(pred_instances)
+            matched_preds = set()  # indices of predicted instances that were matched to gold
+
             for gold_inst in gold_instances:
 
                 gold_cue = gold_inst.get("Cue", []) # [list of tuples (token_num, word_part)]
                 pred_match = None
                 full_cue_match = True # flag to check if the cue matches fully
 
-                
-                # find matching cue in pred
-                for pred_idx in range(len(pred_instances)):
-                    pred_inst = pred_instances[pred_idx]
-                    pred_cue = pred_inst.get("Cue", [])
-                    pred_cue_ids = [cue_tuple[0] for cue_tuple in pred_cue]
-                    
-                    # check every part of the gold cue for a match with predicted
-                    for gold_cue_part in gold_cue:
-                        if gold_cue_part[0] in pred_cue_ids:
-                            # check for a full cue match
-                            if sorted(gold_cue) != sorted(pred_cue):
-                                full_cue_match = False
-                            
-                            # remove found instance from predicted to not process it again
-                            pred_match = pred_instances.pop(pred_idx)
-                            break
-                    
-                    # if a match was found - stop looking
-                    if pred_match:
-                        break
-                
+                # find matching cue in pred: the first (remaining) predicted instance
+                # that shares at least one cue token with gold
+                pred_idx = None
+                for gold_cue_part in gold_cue:
+                    candidates = cue_index.get(gold_cue_part[0])
+                    if not candidates:
+                        continue
+                    # drop candidates that were already matched to another gold instance
+                    while candidates and candidates[0] in matched_preds:
+                        candidates.popleft()
+                    if candidates and (pred_idx is None or candidates[0] < pred_idx):
+                        pred_idx = candidates[0]
+
+                if pred_idx is not None:
+                    # check for a full cue match
+                    if tuple(sorted(gold_cue)) != pred_cue_keys[pred_idx]:
+                        full_cue_match = False
+
+                    # mark found instance to not process it again
+                    matched_preds.add(pred_idx)
+                    pred_match = pred_instances[pred_idx]
+
                 # if no match with system --> all fn
                 if not pred_match:
-                    update_all("fn", scores, gold_inst)
+                    update_all("fn", plan, gold_inst)
                     continue                  
                 
                 # flags for full neg/spec to check if everything is correct
@@ -769,7 +1154,7 @@ def evaluate(gold_str, system_str, task="negation"):
                 ## SCOPES ##
                 gold_scope = gold_inst.get("Scope", [])
                 pred_scope = pred_match.get("Scope", [])                
-                new_score = process_inst(scores, gold_scope, pred_scope, 
+                new_score = process_inst(plan, gold_scope, pred_scope, 
                                          "Scope", full_cue=full_cue_match)
                 
                 # if the scope wasn't fully correct, 
@@ -782,7 +1167,7 @@ def evaluate(gold_str, system_str, task="negation"):
                 ## EVENTS ##
                 gold_event = gold_inst.get("Event", [])
                 pred_event = pred_match.get("Event", [])                
-                new_score = process_inst(scores, gold_event, pred_event, 
+                new_score = process_inst(plan, gold_event, pred_event, 
                                          "Event", full_cue=full_cue_match)
                 
                 # if the scope wasn't fully correct, 
@@ -793,23 +1178,19 @@ def evaluate(gold_str, system_str, task="negation"):
                 
     
                 ## FULL NEG | SPEC ##
-                for detail in scores["Scope-level"]["Full "+task]:
-                    full_metric_name = scores["Scope-level"]["Full "+task][detail]
-                    full_metric_name.update_counter("gold", 1)
-                    full_metric_name.update_counter("pred", 1)
-                    
-                    # if not everything was correct --> fn / fp
+                # if not everything was correct --> fn / fp, else tp
+                for cell in plan.full_inst[(full_score[""], full_score["(no punct)"])]:
+                    plan.counts[cell] += 1
+                for detail in full_score:
                     if not full_score[detail]:
                         sent_correct[detail] =  False
-                        full_metric_name.update_counter("fn", 1)
-                        full_metric_name.update_counter("fp", 1)
-                    else:
-                        full_metric_name.update_counter("tp", 1)                
 
             # if there are predicted instances that were not in gold --> fp
-            for pred_inst in pred_instances:
+            for pred_idx, pred_inst in enumerate(pred_instances):
+                if pred_idx in matched_preds:
+                    continue
                 sent_correct = {"": False, "(no punct)": False}
-                update_all("fp", scores, pred_inst)
+                update_all("fp", plan, pred_inst)
             
             # update the info about the sentence correctness
             for detail in correct_negspec_sent_num:
@@ -819,26 +1200,329 @@ def evaluate(gold_str, system_str, task="negation"):
 
 
                 
-        line_num += len(gold_tokens) + 1  # +1 for newline
+        self.line_num += len(gold_rows) + 1  # +1 for newline
+    
+    
+    def get_realignment_str(self):
+        """
+        Returns a report of the sentences whose tokens had to be aligned.
+        """
+        res = "Sentences with re-aligned tokens: " + str(len(self.realigned_sentences)) + "\n"
+        for line_num, distance in self.realigned_sentences:
+            res += "  line " + str(line_num) + ": edit distance " + str(distance) + "\n"
+        return res
+    
+    
+    def get_state(self):
+        """
+        Returns all counters of the evaluation as a flat list: the counters 
+        of the plan followed by the sentence counters.
+        """
+        return self.plan.counts + [self.correct_negspec_sent_num[""], 
+                                   self.correct_negspec_sent_num["(no punct)"],
+                                   self.negspec_sent_num,
+                                   self.correct_sent_num[""],
+                                   self.correct_sent_num["(no punct)"],
+                                   self.all_sent_num]
+    
+    
+    def set_state(self, state):
+        """
+        state - a flat list of counters as returned by get_state
         
+        Replaces all counters of the evaluation.
+        """
+        num_counts = len(self.plan.counts)
+        # the Scores are views on plan.counts, so the list is modified in place
+        self.plan.counts[:] = [int(round(value)) for value in state[:num_counts]]
+        (self.correct_negspec_sent_num[""], self.correct_negspec_sent_num["(no punct)"],
+         self.negspec_sent_num, self.correct_sent_num[""], self.correct_sent_num["(no punct)"],
+         self.all_sent_num) = [int(round(value)) for value in state[num_counts:]]
+    
+    
+    def get_scores(self):
+        """
+        Returns scores and overall scores as returned by evaluate.
+        """
+        overall_scores = {"# sentences": self.all_sent_num,
+                          "# sentences with errors": self.all_sent_num-self.correct_sent_num[""],
+                          "% correct sentences": (self.correct_sent_num[""]/self.all_sent_num)*100,
+                          "# sentences with errors (no punct)": self.all_sent_num-self.correct_sent_num["(no punct)"],
+                          "% correct sentences (no punct)": (self.correct_sent_num["(no punct)"]/self.all_sent_num)*100,
+                          "# "+self.task+" sentences": self.negspec_sent_num,
+                          "# "+self.task+" sentences with errors": self.negspec_sent_num-self.correct_negspec_sent_num[""],
+                          "% correct negation sentences": (self.correct_negspec_sent_num[""]/self.negspec_sent_num)*100 if self.negspec_sent_num else 0,
+                          "# "+self.task+" sentences with errors (no punct)": self.negspec_sent_num-self.correct_negspec_sent_num["(no punct)"],
+                          "% correct negation sentences (no punct)": (self.correct_negspec_sent_num["(no punct)"]/self.negspec_sent_num)*100  if self.negspec_sent_num else 0}
+
+        return self.plan.scores, overall_scores
+
+
+
+def evaluate(gold_str, system_str, task="negation", realign_tokens=False):
+    """
+    Main evaluation function.
+    If realign_tokens is set, sentences whose system tokens differ from the 
+    gold tokens are aligned (see ExtendedEvaluation) and reported on stderr.
+    """
+    gold_sents = gold_str.strip().split("\n\n")
+    pred_sents = system_str.strip().split("\n\n")
+    
+    # make sure both files have the same number of sentences
+    assert_msg = "The gold and system files have a different number of sentences."
+    assert len(gold_sents) == len(pred_sents), assert_msg
+    
+    evaluation = ExtendedEvaluation(task, realign_tokens=realign_tokens)
+    
+    # process gold and prediction sentences
+    for gold_sent, pred_sent in zip(gold_sents, pred_sents):
+        gold_rows = [line.split("\t") for line in gold_sent.split("\n")]
+        pred_rows = [line.split("\t") for line in pred_sent.split("\n")]
+        evaluation.add_sentence(gold_rows, pred_rows)
+    
+    if evaluation.realigned_sentences:
+        print(evaluation.get_realignment_str(), file=sys.stderr)
+    
+    return evaluation.get_scores()
+
+
+
+def evaluate_aligned(gold_str, system_str, task="negation", realign_tokens=False):
+    """
+    Evaluation that pairs gold and system sentences by their (doc_id, sent_id)
+    columns instead of their position (see alignment.py in the instance-based 
+    evaluation folder), so that the system sentences may come in any order.
+    A gold sentence missing in the system file is evaluated against the same 
+    sentence without any instances (and vice versa for extra system sentences).
+    Returns scores and overall scores (as evaluate) and an AlignmentReport.
+    realign_tokens - see evaluate
+    """
+    gold_sents = [[line.split("\t") for line in sent.split("\n")] 
+                  for sent in gold_str.strip().split("\n\n")]
+    pred_sents = [[line.split("\t") for line in sent.split("\n")] 
+                  for sent in system_str.strip().split("\n\n")]
+    
+    sent_pairs, alignment_report = align_by_key(gold_sents, pred_sents)
+    
+    evaluation = ExtendedEvaluation(task, realign_tokens=realign_tokens)
+    for gold_rows, pred_rows in sent_pairs:
+        if gold_rows is None:
+            gold_rows = unannotated_rows(pred_rows)
+        elif pred_rows is None:
+            pred_rows = unannotated_rows(gold_rows)
+        evaluation.add_sentence(gold_rows, pred_rows)
+    
+    if evaluation.realigned_sentences:
+        print(evaluation.get_realignment_str(), file=sys.stderr)
+    
+    scores, overall_scores = evaluation.get_scores()
+    return scores, overall_scores, alignment_report
+
+
+
+def evaluate_parallel(gold_str, system_str, jobs, task="negation", realign_tokens=False):
+    """
+    Evaluation on a pool of jobs worker processes (see scheduling.py in the 
+    instance-based evaluation folder): the sentences are packed into chunks 
+    of about equal estimated cost (from their numbers of tokens and 
+    instances, see EXTENDED_COSTS), which idle workers take largest first; 
+    the states of all chunks are added up.
+    Returns scores and overall scores (as evaluate) and a SchedulingReport.
+    realign_tokens - see evaluate
+    """
+    gold_sents = gold_str.strip().split("\n\n")
+    pred_sents = system_str.strip().split("\n\n")
+    
+    # make sure both files have the same number of sentences
+    assert_msg = "The gold and system files have a different number of sentences."
+    assert len(gold_sents) == len(pred_sents), assert_msg
+    
+    costs, chunks = schedule_chunks(gold_sents, pred_sents, jobs, cost_model=EXTENDED_COSTS)
+    
+    # line number of the first line of every sentence, for the error messages
+    line_nums = [1]
+    for gold_sent in gold_sents:
+        line_nums.append(line_nums[-1] + gold_sent.count("\n") + 2)
+    
+    chunk_args = [("\n\n".join(gold_sents[start:end]), "\n\n".join(pred_sents[start:end]), 
+                   task, realign_tokens, line_nums[start])
+                  for start, end in chunks]
+    chunk_results, report = run_chunks(evaluate_chunk, chunk_args, costs, chunks, jobs)
     
-    overall_scores = {"# sentences": all_sent_num,
-                      "# sentences with errors": all_sent_num-correct_sent_num[""],
-                      "% correct sentences": (correct_sent_num[""]/all_sent_num)*100,
-                      "# sentences with errors (no punct)": all_sent_num-correct_sent_num["(no punct)"],
-                      "% correct sentences (no punct)": (correct_sent_num["(no punct)"]/all_sent_num)*100,
-                      "# "+task+" sentences": negspec_sent_num,
-                      "# "+task+" sentences with errors": negspec_sent_num-correct_negspec_sent_num[""],
-                      "% correct negation sentences": (correct_negspec_sent_num[""]/negspec_sent_num)*100 if negspec_sent_num else 0,
-                      "# "+task+" sentences with errors (no punct)": negspec_sent_num-correct_negspec_sent_num["(no punct)"],
-                      "% correct negation sentences (no punct)": (correct_negspec_sent_num["(no punct)"]/negspec_sent_num)*100  if negspec_sent_num else 0}
+    evaluation = ExtendedEvaluation(task, realign_tokens=realign_tokens)
+    totals = [0] * len(evaluation.get_state())
+    for state, realigned_sentences in chunk_results:
+        totals = [total + value for total, value in zip(totals, state)]
+        evaluation.realigned_sentences.extend(realigned_sentences)
+    evaluation.set_state(totals)
+    
+    if evaluation.realigned_sentences:
+        print(evaluation.get_realignment_str(), file=sys.stderr)
+    
+    scores, overall_scores = evaluation.get_scores()
+    return scores, overall_scores, report
+
+
+
+def evaluate_chunk(gold_str, system_str, task, realign_tokens, line_num):
+    """
+    Evaluates a chunk of sentences (see evaluate_parallel) whose first 
+    line is line line_num of the gold file.
+    Returns the state of the evaluation (see ExtendedEvaluation.get_state) 
+    and its re-aligned sentences.
+    """
+    evaluation = ExtendedEvaluation(task, realign_tokens=realign_tokens)
+    evaluation.line_num = line_num
+    for gold_sent, pred_sent in zip(gold_str.split("\n\n"), system_str.split("\n\n")):
+        gold_rows = [line.split("\t") for line in gold_sent.split("\n")]
+        pred_rows = [line.split("\t") for line in pred_sent.split("\n")]
+        evaluation.add_sentence(gold_rows, pred_rows)
+    return evaluation.get_state(), evaluation.realigned_sentences
+
+
+
+def evaluate_grouped(gold_str, system_str, grouping, task="negation", realign_tokens=False):
+    """
+    Evaluation per group of documents (see grouping.py in the instance-based 
+    evaluation folder), in the same pass over the sentences as evaluate.
+    grouping - a DocumentGrouping, maps the document id (first column) of a 
+               sentence to its group
+    Returns {group : state} (see ExtendedEvaluation.get_state), in the order 
+    in which the groups appear.
+    realign_tokens - see evaluate
+    """
+    gold_sents = gold_str.strip().split("\n\n")
+    pred_sents = system_str.strip().split("\n\n")
+    
+    # make sure both files have the same number of sentences
+    assert_msg = "The gold and system files have a different number of sentences."
+    assert len(gold_sents) == len(pred_sents), assert_msg
+    
+    # a single evaluation whose counters are swapped whenever the group changes,
+    # i.e. usually only at document boundaries
+    evaluation = ExtendedEvaluation(task, realign_tokens=realign_tokens)
+    empty_state = evaluation.get_state()
+    states = {}
+    group = None
+    for gold_sent, pred_sent in zip(gold_sents, pred_sents):
+        gold_rows = [line.split("\t") for line in gold_sent.split("\n")]
+        pred_rows = [line.split("\t") for line in pred_sent.split("\n")]
+        sent_group = grouping(gold_rows[0][0])
+        if sent_group != group:
+            if group is not None:
+                states[group] = evaluation.get_state()
+            group = sent_group
+            evaluation.set_state(states.get(group, empty_state))
+        evaluation.add_sentence(gold_rows, pred_rows)
+    if group is not None:
+        states[group] = evaluation.get_state()
+    
+    if evaluation.realigned_sentences:
+        print(evaluation.get_realignment_str(), file=sys.stderr)
+    
+    return states
+
+
 
-    return scores, overall_scores
+def get_group_print_str(states, grouping, task="negation", rounding=2):
+    """
+    states - {group : state} as returned by evaluate_grouped
+    grouping - the DocumentGrouping the states were computed with
+    Returns a table with the scope-level F1 of the headline metrics for every 
+    group, the micro totals (counters of all groups added up) and the macro 
+    totals (average over the groups with any "task" sentences), followed by 
+    the full results table of the micro totals.
+    """
+    metrics = [("Cue", ""), ("Scope", "(full cue)"), ("Event", "(full cue)"), ("Full "+task, "")]
+    evaluation = ExtendedEvaluation(task)
+    titles = [(metric + " " + detail).strip() + " F1" for metric, detail in metrics]
+    f1_strs = [" {:>" + str(len(title)) + "." + str(rounding) + "f} |" for title in titles]
+    
+    header = " {:<30} | {:>9} | {:>9} |".format("Group (" + grouping.spec + ")", "sentences", "gold cues")
+    header += "".join(" " + title + " |" for title in titles)
+    line = "-" * len(header) + "\n"
+    
+    def group_row(name, state):
+        evaluation.set_state(state)
+        scores, overall_scores = evaluation.get_scores()
+        row = " {:<30} | {:>9d} | {:>9d} |".format(name, overall_scores["# sentences"], 
+                                                 scores["Scope-level"]["Cue"][""].get_gold())
+        f1s = [scores["Scope-level"][metric][detail].get_f1()*100 for metric, detail in metrics]
+        row += "".join(f1_str.format(f1) for f1_str, f1 in zip(f1_strs, f1s))
+        return row + "\n", f1s, overall_scores["# "+task+" sentences"]
+    
+    print_str = line + header + "\n" + line
+    macro_f1s = []
+    for group, state in states.items():
+        row, f1s, num_task_sents = group_row(group, state)
+        print_str += row
+        if num_task_sents:
+            macro_f1s.append(f1s)
+    print_str += line
+    
+    micro_state = [sum(values) for values in zip(*states.values())]
+    row, _, _ = group_row("MICRO", micro_state)
+    print_str += row
+    if macro_f1s:
+        print_str += " {:<30} | {:>9} | {:>9} |".format("MACRO", "", "")
+        print_str += "".join(f1_str.format(sum(f1s)/len(f1s)) for f1_str, f1s in zip(f1_strs, zip(*macro_f1s))) + "\n"
+    print_str += line + "\n"
+    
+    # full table of the micro totals
+    evaluation.set_state(micro_state)
+    scores, overall_scores = evaluation.get_scores()
+    return print_str + get_print_str(scores, overall_scores, rounding=rounding)
+
+
+
+def evaluate_incremental(gold, system, stats_path, task="negation", realign_tokens=False):
+    """
+    gold, system - paths of the gold and system files (may be gzip/xz/bz2 compressed)
+    stats_path - path of the per-sentence statistics file (created or updated)
+    
+    Evaluation that only re-scores the sentences that changed since the 
+    evaluation that wrote the statistics file (see sentence_stats.py in 
+    the instance-based evaluation folder).
+    Returns scores and overall scores (as evaluate) and the number of 
+    re-scored sentences (RescoringStats).
+    realign_tokens - see evaluate (only re-scored sentences are reported)
+    """
+    # the sentences are scored one at a time by the same evaluation;
+    # the contribution of a sentence is the difference of the counters
+    scratch = ExtendedEvaluation(task, realign_tokens=realign_tokens)
+    
+    def score_sentence(gold_lines, pred_lines, sent_idx, line_num):
+        # make sure both files have the same number of sentences
+        assert_msg = "The gold and system files have a different number of sentences."
+        assert gold_lines is not None and pred_lines is not None, assert_msg
+        
+        before = scratch.get_state()
+        scratch.line_num = line_num
+        scratch.add_sentence([line.split("\t") for line in gold_lines],
+                             [line.split("\t") for line in pred_lines])
+        return [new - old for new, old in zip(scratch.get_state(), before)]
+    
+    meta = {"evaluator": "starsem2012_extended",
+            "version": source_version(os.path.abspath(__file__), 
+                                      os.path.join(os.path.dirname(os.path.abspath(__file__)), 
+                                                   "..", "instance_based_eval")),
+            "options": {"task": task, "realign_tokens": realign_tokens}}
+    totals, rescoring_stats = rescore_changed_sentences(gold, system, stats_path, score_sentence, 
+                                                        len(scratch.get_state()), meta)
+    if scratch.realigned_sentences:
+        print(scratch.get_realignment_str(), file=sys.stderr)
+    
+    evaluation = ExtendedEvaluation(task)
+    evaluation.set_state(totals)
+    scores, overall_scores = evaluation.get_scores()
+    return scores, overall_scores, rescoring_stats
 
 
 
 def get_print_str(scores, overall_scores, rounding=2):
     """
+    scores - {level : {metric : {detail : Score}}} as returned by evaluate 
+             (MetricPlan.scores, i.e. the Scores read the compiled counters)
     rounding specifies the number of digits after the decimal point.
     """
     rounding = str(rounding)
@@ -907,6 +1591,24 @@ if __name__ == "__main__":
                            help="task to be evaluated (negation/speculation), default: negation")
     argparser.add_argument("-o", "--rounding", type=int, default=2,
                            help="number of decimal points to round to, default: 2")
+    argparser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_PATH, default=None, metavar="PATH",
+                           help="look up results in (and add them to) a result cache, default location: {}".format(DEFAULT_CACHE_PATH))
+    argparser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), metavar="MB",
+                           help="maximum size of the result cache in MiB, default: %(default)s")
+    argparser.add_argument("-a", "--align-keys", action="store_true",
+                           help="pair gold and system sentences by their (doc_id, sent_id) columns instead of their position; missing and extra system sentences are reported on stderr")
+    argparser.add_argument("--realign-tokens", action="store_true",
+                           help="align system tokens that differ from the gold tokens and project their labels instead of failing; re-aligned sentences are reported on stderr")
+    argparser.add_argument("--sentence-stats", type=str, metavar="PATH",
+                           help="keep per-sentence statistics in PATH and only re-score sentences that changed since the last evaluation")
+    argparser.add_argument("--validate", action="store_true",
+                           help="check the format of both files first and list all problems on stderr instead of stopping at the first one")
+    argparser.add_argument("-j", "--jobs", type=int, default=None, metavar="N",
+                           help="evaluate on N worker processes; the sentences are packed into chunks of about equal estimated cost, which idle workers take largest first")
+    argparser.add_argument("--schedule-stats", action="store_true",
+                           help="with --jobs: print how evenly the chunks were spread over the workers to stderr")
+    argparser.add_argument("--group-by", type=DocumentGrouping, metavar="SPEC",
+                           help="also report the scores per group of documents: doc (every document), prefix:P1,P2,... (first matching prefix of the document id) or regex:PATTERN (first group of the expression); printed with micro and macro totals")
     gold_name = "../data/ConanDoyle-neg/reannotated/SEM-2012-SharedTask-CD-SCO-test-circle-cardboard-GOLD-reannotated.txt"
     pred_name = "../data/BioScope/Abstracts/pred/strasem2012_format/direct/STARSEM_test-parsed_neg_bio-abs_direct_0607_103656_conan.conll.pred"
 
@@ -917,6 +1619,21 @@ if __name__ == "__main__":
 ##                                 "-t", "speculation"])
 
     args = argparser.parse_args()
+    if args.align_keys and args.sentence_stats:
+        argparser.error("--align-keys cannot be combined with --sentence-stats")
+    if args.group_by and (args.align_keys or args.sentence_stats):
+        argparser.error("--group-by cannot be combined with --align-keys or --sentence-stats")
+    if args.jobs is not None and args.jobs < 1:
+        argparser.error("--jobs must be at least 1")
+    if args.jobs and (args.align_keys or args.sentence_stats or args.group_by):
+        argparser.error("--jobs cannot be combined with --align-keys, --sentence-stats or --group-by")
+    if args.schedule_stats and not args.jobs:
+        argparser.error("--schedule-stats requires --jobs")
+    # a cached result is printed without evaluating, so reports on stderr (and 
+    # updates of the sentence statistics) would silently be skipped
+    if args.cache and (args.align_keys or args.realign_tokens or args.sentence_stats or args.schedule_stats):
+        argparser.error("--cache cannot be combined with --align-keys, --realign-tokens, --sentence-stats "
+                        "or --schedule-stats")
     
     if args.readme:
         readme_str = """
@@ -1002,14 +1719,61 @@ Full negation (no punct):              |        |      |      |      |
         print("System output file is missing.\n")
         argparser.parse_args(["-h"])
     
-    # extract gold and system text
-    with open(args.gold, encoding="utf-8") as f:
-        gold_str = f.read()
+    if args.validate:
+        # with aligned sentences or tokens, the files are not compared position by position
+        report = validate_files(args.gold, args.system, ignore_case=True, 
+                                compare=not (args.align_keys or args.realign_tokens))
+        if not report.ok:
+            print(report, file=sys.stderr, end="")
+            sys.exit(1)
     
-    with open(args.system, encoding="utf-8") as f:
-        system_str = f.read()    
+    def evaluate_files():
+        if args.align_keys:
+            scores, overall_scores, alignment_report = evaluate_aligned(read_text(args.gold), read_text(args.system),
+                                                                        task=args.task,
+                                                                        realign_tokens=args.realign_tokens)
+            print(alignment_report, file=sys.stderr)
+            return get_print_str(scores, overall_scores, rounding=args.rounding)
+        
+        if args.sentence_stats:
+            scores, overall_scores, rescoring_stats = evaluate_incremental(args.gold, args.system, 
+                                                                           args.sentence_stats, task=args.task,
+                                                                           realign_tokens=args.realign_tokens)
+            print(rescoring_stats, file=sys.stderr)
+            return get_print_str(scores, overall_scores, rounding=args.rounding)
+        
+        # extract gold and system text (gzip/xz/bz2 files are decompressed on the fly)
+        gold_str = read_text(args.gold)
+        system_str = read_text(args.system)
+        
+        if args.group_by:
+            states = evaluate_grouped(gold_str, system_str, args.group_by, task=args.task,
+                                      realign_tokens=args.realign_tokens)
+            return get_group_print_str(states, args.group_by, task=args.task, rounding=args.rounding)
+        
+        if args.jobs and args.jobs > 1:
+            scores, overall_scores, report = evaluate_parallel(gold_str, system_str, args.jobs, task=args.task,
+                                                               realign_tokens=args.realign_tokens)
+            if args.schedule_stats:
+                print(report, file=sys.stderr)
+            return get_print_str(scores, overall_scores, rounding=args.rounding)
+        
+        # get results
+        scores, overall_scores = evaluate(gold_str, system_str, task=args.task, 
+                                          realign_tokens=args.realign_tokens)
+        return get_print_str(scores, overall_scores, rounding=args.rounding)
     
-    # get results and print them out
-    scores, overall_scores = evaluate(gold_str, system_str, task=args.task)
-    print(get_print_str(scores, overall_scores, rounding=args.rounding))
+    if args.cache:
+        # the results table is cached as printed, so the rounding is part of the key
+        cache = ResultCache(args.cache, max_bytes=args.cache_size * 1024 * 1024)
+        # hash the whole instance-based evaluation folder, whose modules the script imports
+        version = source_version(os.path.abspath(__file__), 
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), 
+                                              "..", "instance_based_eval"))
+        key = cache.make_key(args.gold, args.system, "starsem2012_extended", version, 
+                             {"task": args.task, "rounding": args.rounding,
+                              "group_by": args.group_by.spec if args.group_by else None})
+        print(cache.get_or_compute(key, evaluate_files))
+    else:
+        print(evaluate_files())
     
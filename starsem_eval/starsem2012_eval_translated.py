@@ -11,7 +11,17 @@
 """
 
 import argparse  # take args from a command line
+import os
 import re
+import sys
+
+# myconll lives in the instance-based evaluation folder;
+# it is used here for reading (possibly compressed) corpus files
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "instance_based_eval"))
+from myconll import iter_rows_from_file
+from result_cache import ResultCache, source_version, DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES
+from validation import validate_files
 
 
 # globals
@@ -64,402 +74,235 @@ count_sentences_negation = 0
 count_error_sentences = 0
 count_error_sentences_negation = 0
 
+# initial values of all counts above (see reset_counts)
+INITIAL_COUNTS = {name: value for name, value in globals().items()
+                  if not name.startswith("_") and type(value) is int}
+
+
+# scope words of POS tags without a word character (punctuation) are ignored
+WORD_REGEX = re.compile(r"\w")
+# cases with a dot in the end like Mr. / Mrs. / Dr.
+DOT_REGEX = re.compile(r"^(\w+)\.")
+
+
+
+class Negation:
+    """
+    negation instance of a sentence
+
+    ### stores the words and token numbers of the cue, the scope (without punctuation)
+    ### and the negated [event] of one negation
+    ### the strings compared between gold and system (words or token numbers
+    ### separated by blank space) are built once by finish()
+    """
+    __slots__ = ("cue_words", "cue_tokens", "scope_words", "scope_tokens",
+                 "negated_words", "negated_tokens",
+                 "st_cue_words", "st_cue_tokens", "st_scope_words", "st_scope_tokens",
+                 "st_negated_words", "st_negated_tokens",
+                 "cue_token_set", "negated_token_set", "scope_by_token")
+
+    def __init__(self):
+        self.cue_words = []
+        self.cue_tokens = []
+        self.scope_words = []
+        self.scope_tokens = []
+        self.negated_words = []
+        self.negated_tokens = []
+
+    def finish(self):
+        """
+        build the strings and lookups used when comparing gold and system negations
+        """
+        self.st_cue_words = " ".join(self.cue_words)
+        self.st_cue_tokens = " ".join(str(num) for num in self.cue_tokens)
+        self.st_scope_words = " ".join(self.scope_words)
+        self.st_scope_tokens = " ".join(str(num) for num in self.scope_tokens)
+        self.st_negated_words = " ".join(self.negated_words)
+        self.st_negated_tokens = " ".join(str(num) for num in self.negated_tokens)
+
+        self.cue_token_set = set(self.cue_tokens)
+        self.negated_token_set = set(self.negated_tokens)
+        # a token number occurs at most once in a scope
+        self.scope_by_token = dict(zip(self.scope_tokens, self.scope_words))
+
 
 
-def get_info_sentence(st_tmp_lineg, st_tmp_linep):
+def get_info_sentence(tmp_lineg, tmp_linep):
     """
     get info per sentence per line
-    
-    takes two strings:
-        st_tmp_lineg - gold line
-        st_tmp_linep - system line
-    
-    ### reads the lines
-    ### returns strings tmp_neg_g, tmp_neg_p 
-    ### where the columns with negation information (7 to end) are stored
+
+    takes two lists with the columns of a line:
+        tmp_lineg - gold line
+        tmp_linep - system line
+
+    ### returns tuples neg_cols_g, neg_cols_p
+    ### with the columns with negation information (7 to end)
     ### and the POS tag
     ### g stands for gold file, p for system file
-    """    
-    tmp_lineg = st_tmp_lineg.split("\t")
-    tmp_linep = st_tmp_linep.split("\t")
-    
-    max_lineg = len(tmp_lineg)-1
-    max_linep = len(tmp_linep)-1
-    
-    tmp_neg_g = ""
-    tmp_neg_p = ""
-    
-    POS_tag = tmp_lineg[5]
-    
-    for i in range(7, max_lineg+1):
-        # if it's the first neg col signifying there is no negation
-        if i == 7 and tmp_lineg[i] == "***":
-            tmp_neg_g = tmp_lineg[i]
-        # if it's the first neg col and there is negation
-        elif i == 7:
-            # separate elements of the same instance by space
-            tmp_neg_g = tmp_lineg[i] + " "
-        # if it's the last col
-        elif i == max_lineg:
-            # don't add a space
-            tmp_neg_g += tmp_lineg[i]
-        # if it's the end of one instance
-        elif i % 3 == 0:
-            # separate different instances by tab
-            tmp_neg_g += tmp_lineg[i] + "\t"
-        else:
-            # separate elements of the same instance by space
-            tmp_neg_g += tmp_lineg[i] + " "
-        
-    for i in range(7, max_linep+1):
-        # if it's the first neg col signifying there is no negation
-        if i == 7 and tmp_linep[i] == "***":
-            tmp_neg_p = tmp_linep[i]
-        # if it's the first neg col and there is negation
-        elif i == 7:
-            # separate elements of the same instance by space
-            tmp_neg_p = tmp_linep[i] + " "
-        # if it's the last col
-        elif i == max_linep:
-            # don't add a space
-            tmp_neg_p += tmp_linep[i]
-        # if it's the end of one instance
-        elif i % 3 == 0:
-            # separate different instances by tab
-            tmp_neg_p += tmp_linep[i] + "\t"
-        else:
-            # separate elements of the same instance by space
-            tmp_neg_p += tmp_linep[i] + " "
-        
-    return tmp_neg_g, tmp_neg_p, POS_tag
+    """
+    return tuple(tmp_lineg[7:]), tuple(tmp_linep[7:]), tmp_lineg[5]
+
+
+
+def read_negations(neg_cols, POS):
+    """
+    read the negations of a sentence
+
+    ### neg_cols contains as many elements as tokens in sentence
+    ### each element is the tuple of negation columns of the token:
+    ### cue, scope and negated for each negation
+    ### POS is the list of POS tags in the sentence
+
+    ### returns a list with a Negation per negation in the sentence
+    """
+    negs = [Negation() for z in range(len(neg_cols[0]) // 3)]
+
+    # i counts line number in sentence
+    for i, cols in enumerate(neg_cols):
+        # avoid punctuation
+        is_word = (WORD_REGEX.search(POS[i]) and
+                   POS[i] != "-LRB-" and
+                   POS[i] != "-RRB-")
+
+        # z counts index of negation per line
+        for z in range(len(cols) // 3):
+            neg = negs[z]
+            cue, scope, negated = cols[3*z:3*z+3]
+
+            # if the current token is the cue
+            if cue != "_":
+                # save the cue word / affix and the token idx
+                neg.cue_words.append(cue)
+                neg.cue_tokens.append(i)
+
+            # if the current token is the scope
+            if scope != "_" and is_word:
+                dot_regex = DOT_REGEX.search(scope)
+                if dot_regex:
+                    # only keep the part without a dot
+                    scope = dot_regex.group(1)
+
+                # save the scope word and the token idx
+                neg.scope_words.append(scope)
+                neg.scope_tokens.append(i)
+
+            # if the current token is the event
+            if negated != "_":
+                # save the event word and the token idx
+                neg.negated_words.append(negated)
+                neg.negated_tokens.append(i)
+
+    for neg in negs:
+        neg.finish()
+
+    return negs
 
 
 
 def process_sentence(neg_cols_g, neg_cols_p, POS, starsem_exact=False):
-    """    
+    """
     process sentence
-    
-    ### processes information in arrays neg_cols_g, neg_cols_p
-    ### the arrays contain as main elements as tokens in sentence
-    ### each element of the array contains information per negation separated by tabs, 
-    ### and information of each negation separated by blank space
-    ### _ _ _\t_ _ _
-    
+
+    ### processes information in lists neg_cols_g, neg_cols_p
+    ### the lists contain as many elements as tokens in sentence
+    ### each element is the tuple of negation columns of the token
+    ### (see get_info_sentence)
+
     ### POS is the list of POS tags in the sentence
-    
-    ### Information is stored in the arrays below
-    ### They have as many elements as negations there are in the sentence
-    
-    ### arrays of arrays
-    
-    ### neg_words_g 
-    ### scope_words_g 
-    ### scope_words_nopunc_g 
-    ### negated_words_g 
-    
-    ### neg_tokens_g 
-    ### scope_tokens_g 
-    ### scope_tokens_nopunc_g
-    ### negated_tokens_g 
-    
-    ### neg_words_p 
-    ### scope_words_p 
-    ### scope_words_nopunc_p
-    ### negated_words_p 
-    
-    ### neg_tokens_p 
-    ### scope_tokens_p 
-    ### scope_tokens_nopunc_p 
-    ### negated_tokens_p 
-    
-    ### arrays
-    
-    ### first_token_negs_g 
-    ### first_token_negs_p 
-    
-    ### first_token_negated_g 
-    ### first_token_negated_p 
-    
-    ### first_token_scope_g 
-    ### first_token_scope_p
-    """
-    neg_words_g = []
-    scope_words_g = []
-    scope_words_nopunc_g = []
-    negated_words_g = []
-    
-    neg_tokens_g = []
-    neg_found_g = []
-    scope_tokens_g = []
-    scope_tokens_nopunc_g = []
-    negated_tokens_g = []
-    
-    neg_words_p = []
-    scope_words_p = []
-    scope_words_nopunc_p = []
-    negated_words_p = []
-    
-    neg_tokens_p = []
-    neg_found_p = []
-    scope_tokens_p = []
-    scope_tokens_nopunc_p = []
-    negated_tokens_p = []
-    
-    first_token_negs_g = []
-    first_token_negs_p = []
-    
-    first_token_negated_g = []
-    first_token_negated_p = []
-    
-    first_token_scope_g = []
-    first_token_scope_p = []
-    
-    negated_found_g = []
-    negated_found_p = []
-    
-    scope_found_g = []
-    scope_found_p = []
-    
-    zero_negs_p = ""
-    zero_negs_g = ""
 
-    tmp_neg_cols_g = []
-    neg_by_neg_cols_g = []
-    
-    tmp_neg_cols_p = []
-    neg_by_neg_cols_p = []
+    ### the negations are read into the lists negs_g, negs_p
+    ### (see read_negations)
+    ### they have as many elements as negations there are in the sentence
+
+    ### neg_found_*, scope_found_*, negated_found_* mark the negations that have been
+    ### matched by cue overlap (cue and scope metrics) or by event overlap (negated apart)
+    """
 
     #############################
     ### 1. Process gold sentence
     #############################
-    
+
     global count_sentences, count_sentences_negation
     global total_scope_tokens_g, cues_g, negated_g, scopes_g
 
-#    count_sentences += 1    
-    
-    max_negs_g = 0
-    max_negs_p = 0
-        
+#    count_sentences += 1
+
     ### no negations in gold
-    if neg_cols_g[0] == "***":
+    if neg_cols_g[0][0] == "***":
         zero_negs_g = "yes"
-    
+        negs_g = []
+
     ### negations in gold
     else:
         count_sentences_negation += 1
         zero_negs_g = "no"
-        
-        #### process gold file
-        
-        max_neg_cols_g = len(neg_cols_g)  # number of tokens in gold sentence
-        
-        # i count line number in gold sentence
-        for i in range(max_neg_cols_g):
-            # the gold negation columns
-            tmp_neg_cols_g = neg_cols_g[i].split("\t")
-            max_negs_g = len(tmp_neg_cols_g)  # number of negation instances
-                        
-            # z counts index of negation per line
-            for z in range(max_negs_g):
-                neg_by_neg_cols_g = tmp_neg_cols_g[z].split(" ")
-                
-                if i == 0:
-                    # add necessary lists to create lists of lists
-                    neg_words_g.append([])           # cue words
-                    neg_tokens_g.append([])          # cue tokens
-                    scope_words_g.append([])         # scope words
-                    scope_tokens_g.append([])        # scope tokens
-                    scope_words_nopunc_g.append([])  # scope words (no punct)
-                    scope_tokens_nopunc_g.append([]) # scope tokens (no punct)
-                    negated_words_g.append([])       # event words
-                    negated_tokens_g.append([])      # event tokens
-
-                    # put placeholders
-                    neg_found_g.append(0)
-                    scope_found_g.append(0)
-                    negated_found_g.append(0)
-                
-                # if the current token is the cue
-                if neg_by_neg_cols_g[0] != "_":
-                    # save the cue word / affix
-                    neg_words_g[z].append(neg_by_neg_cols_g[0])
-                    # save the token idx
-                    neg_tokens_g[z].append(i)
-                
-                # if the current token is the scope
-                if neg_by_neg_cols_g[1] != "_":
-                    # avoid punctuation
-                    if (re.search("\w", POS[i]) and 
-                        POS[i] != "-LRB-" and
-                        POS[i] != "-RRB-"):
-                        
-                        # cases with a dot in the end like Mr. / Mrs. / Dr.
-                        dot_regex = re.search("^(\w+)\.", neg_by_neg_cols_g[1])
-                        if dot_regex:
-                            # only keep the part without a dot
-                            tmp_word = dot_regex.group(1)
-                        else:
-                            tmp_word = neg_by_neg_cols_g[1]
-                        
-                        # save the scope word
-                        scope_words_g[z].append(tmp_word)
-                        # save the token idx
-                        scope_tokens_g[z].append(i)
-                        
-                        # used to be two different if statements? line 537
-                        # save the scope word (no punct)
-                        scope_words_nopunc_g[z].append(tmp_word)
-                        # save the token idx (no punct)
-                        scope_tokens_nopunc_g[z].append(i)
-                        
-                        total_scope_tokens_g += 1
-
-                # if the current token is the event
-                if neg_by_neg_cols_g[2] != "_":
-                    # save the event word
-                    negated_words_g[z].append(neg_by_neg_cols_g[2])
-                    negated_tokens_g[z].append(i)
-                
-
-                
-        
-    for z in range(max_negs_g):
+        negs_g = read_negations(neg_cols_g, POS)
+
+    for neg in negs_g:
+        total_scope_tokens_g += len(neg.scope_tokens)
+
         # handle cues
-        if neg_tokens_g[z]:
-            first_token_negs_g.append(neg_tokens_g[z][0])
+        if neg.cue_tokens:
             cues_g += 1
-        else:
-            first_token_negs_g.append("_")
-        
+
         # handle events
-        if negated_tokens_g[z]:
-            first_token_negated_g.append(negated_tokens_g[z][0])
+        if neg.negated_tokens:
             negated_g += 1
-        else:
-            first_token_negated_g.append("_")
-        
+
         # handle scopes
-        if scope_tokens_g[z]:
-            first_token_scope_g.append(scope_tokens_g[z][0])
+        if neg.scope_tokens:
             scopes_g += 1
-        else:
-            first_token_scope_g.append("_")
 
 
     #############################
     ### 2. Process system sentence
     #############################
-    
+
     global total_scope_tokens_p, cues_p, negated_p, scopes_p
-    
+
     ### no negations in system
-    if neg_cols_p[0] == "***":
+    if neg_cols_p[0][0] == "***":
         zero_negs_p = "yes"
-    
+        negs_p = []
+
     ### negations in system
     else:
         zero_negs_p = "no"
-        
-        #### process system file
-        
-        max_neg_cols_p = len(neg_cols_p)-1
-        
-        # i count line number in sentence
-        for i in range(max_neg_cols_p+1):
-            tmp_neg_cols_p = neg_cols_p[i].split("\t")
-            max_negs_p = len(tmp_neg_cols_p)
-            
-            # z counts index of negation per line
-            for z in range(max_negs_p):
-                neg_by_neg_cols_p = tmp_neg_cols_p[z].split(" ")
-                
-                if i == 0:
-                    # add necesscary lists to create lists of lists
-                    neg_words_p.append([])           # cue words
-                    neg_tokens_p.append([])          # cue tokens
-                    scope_words_p.append([])         # scope words
-                    scope_tokens_p.append([])        # scope tokens
-                    scope_words_nopunc_p.append([])  # scope words (no punct)
-                    scope_tokens_nopunc_p.append([]) # scope tokens (no punct)
-                    negated_words_p.append([])       # event words
-                    negated_tokens_p.append([])      # event tokens
- 
-                    # put placeholders
-                    neg_found_p.append(0)
-                    scope_found_p.append(0)
-                    negated_found_p.append(0)
-
-                # if the current token is the cue
-                if neg_by_neg_cols_p[0] != "_":
-                    # save the cue word / affix
-                    neg_words_p[z].append(neg_by_neg_cols_p[0])
-                    # save the token idx
-                    neg_tokens_p[z].append(i)
-                
-                # if the current token is the scope
-                if neg_by_neg_cols_p[1] != "_":
-                    # avoid punctuation
-                    if (re.search("\w", POS[i]) and 
-                        POS[i] != "-LRB-" and
-                        POS[i] != "-RRB-"):
-                        
-                        # cases like with a dot in the end like Mr. / Mrs. /Dr.
-                        dot_regex = re.search("^(\w+)\.", neg_by_neg_cols_p[1])
-                        if dot_regex:
-                            # only keep the part without a dot
-                            tmp_word = dot_regex.group(1)
-                        else:
-                            tmp_word = neg_by_neg_cols_p[1]
-                        
-                        # save the scope word
-                        scope_words_p[z].append(tmp_word)
-                        # save the token idx
-                        scope_tokens_p[z].append(i)
-                        
-                        # used to be two different if statements? line 537
-                        # save the scope word (no punct)
-                        scope_words_nopunc_p[z].append(tmp_word)
-                        # save the token idx (no punct)
-                        scope_tokens_nopunc_p[z].append(i)
-                        
-                        total_scope_tokens_p += 1
-
-                # if the current token is the event
-                if neg_by_neg_cols_p[2] != "_":
-                    # save the event word
-                    negated_words_p[z].append(neg_by_neg_cols_p[2])
-                    negated_tokens_p[z].append(i)
-    
-    
-    for z in range(max_negs_p):
+        negs_p = read_negations(neg_cols_p, POS)
+
+    for neg in negs_p:
         # make sure a cue is predicted for the scope
         assert_msg = "Sentence before line " + str(line_number) + " lacks at least a negation cue."
         assert_msg += "The columns for negation where found without cue."
         assert_msg += "Fix this before proceedings to evaluate."
-        assert neg_words_p[z], assert_msg
-        
+        assert neg.cue_words, assert_msg
+
+        total_scope_tokens_p += len(neg.scope_tokens)
+
         # handle cues
-        if neg_tokens_p[z]:
-            first_token_negs_p.append(neg_tokens_p[z][0])
+        if neg.cue_tokens:
             cues_p += 1
-        else:
-            first_token_negs_p.append("_")
-        
+
         # handle events
-        if negated_tokens_p[z]:
-            first_token_negated_p.append(negated_tokens_p[z][0])
+        if neg.negated_tokens:
             negated_p += 1
-        else:
-            first_token_negated_p.append("_")
-        
+
         # handle scopes
-        if scope_tokens_p[z]:
-            first_token_scope_p.append(scope_tokens_p[z][0])
+        if neg.scope_tokens:
             scopes_p += 1
-        else:
-            first_token_scope_p.append("_")
-            
+
+    max_negs_g = len(negs_g)
+    max_negs_p = len(negs_p)
+
+    neg_found_g = [0] * max_negs_g
+    neg_found_p = [0] * max_negs_p
+
+    negated_found_g = [0] * max_negs_g
+    negated_found_p = [0] * max_negs_p
+
+    scope_found_g = [0] * max_negs_g
+    scope_found_p = [0] * max_negs_p
+
 
     """
     update counts for eval
@@ -473,7 +316,7 @@ def process_sentence(neg_cols_g, neg_cols_p, POS, starsem_exact=False):
     ### correclty identified, else they count as fn
     ### example 1:
     ### gold: cue is "un" and  scope is "decided"
-    ### if system identifies "und" as cue and "decided" as scope, it will be counted as false negative for cue, 
+    ### if system identifies "und" as cue and "decided" as scope, it will be counted as false negative for cue,
     ### and scope will also be false negative, because cue is incorrect;
     ### if system identifies "un" as cue and "undecided" as scope, cue will count as true positive
     ### and scope as false negative;
@@ -487,29 +330,17 @@ def process_sentence(neg_cols_g, neg_cols_p, POS, starsem_exact=False):
     ### example 4:
     ### gold: cue is "never", scope is "Holmes entered in the house"
     ### system: cue is "never", scope is "entered in the house"
-    ### cue will be true positive, but scope will be false negative because not all tokens have been found by system 
-    
-    
+    ### cue will be true positive, but scope will be false negative because not all tokens have been found by system
+
+
     ### false negatives are produced either by the system not identifying a negation and its elements present in gold
-    ### or by identifying them incorrectly: not all tokens have been identified or the word forms are incorrect    
+    ### or by identifying them incorrectly: not all tokens have been identified or the word forms are incorrect
     """
     global fp_cue, fp_scope, fp_scope_tokens, fp_negated
     global fn_cue, fn_scope, fn_scope_tokens, fn_negated
     global tp_cue, tp_scope, tp_scope_tokens, tp_negated
     global fp_full_negation, fn_full_negation, tp_full_negation
-    
-    # handle gold cues number
-    if first_token_negs_g:
-        max_negs_g = len(first_token_negs_g)
-    else:
-        max_negs_g = -1
 
-    # handle pred cues number
-    if first_token_negs_p:
-        max_negs_p = len(first_token_negs_p)
-    else:
-        max_negs_p = -1
-    
     error_found = 0
 
     ####################################################
@@ -518,364 +349,247 @@ def process_sentence(neg_cols_g, neg_cols_p, POS, starsem_exact=False):
     ####################################################
     if zero_negs_g == "no" and zero_negs_p == "yes":
         error_found = 1
-        
-        for i in range(max_negs_g):
+
+        for neg_g in negs_g:
             # cue fn (scope-level)
-            if neg_tokens_g[i]:
+            if neg_g.cue_tokens:
                 fn_cue += 1
-            
+
             # scope fn
-            if scope_tokens_g[i]:
+            if neg_g.scope_tokens:
                 # scope-level
                 fn_scope += 1
                 # token-level
-                for z in range(len(scope_tokens_g[i])):
-                    fn_scope_tokens += 1
-            
+                fn_scope_tokens += len(neg_g.scope_tokens)
+
             # event fn (scope-level)
-            if negated_tokens_g[i]:
+            if neg_g.negated_tokens:
                 fn_negated += 1
-            
+
             # full negation fn
             fn_full_negation += 1
-    
-    
+
+
     ####################################################
     ## gold and system have negations in sentence
-    ####################################################    
+    ####################################################
     elif zero_negs_g == "no" and zero_negs_p == "no":
-        
-        ## i iterates over negations in gold
-        for i in range(max_negs_g):
-
-            ## udpate variables with the string of negation cue, scope
-            ## and negated in gold
-            
-            # gold cue words
-            st_neg_words_g = " ".join(neg_words_g[i])
-                
-            # gold scope words
-            st_scope_words_g = " ".join(scope_words_g[i])
-
-            # gold event words
-            st_negated_words_g = " ".join(negated_words_g[i])
-
-            # gold cue tokens
-            st_neg_tokens_g = " ".join(str(num) for num in neg_tokens_g[i])
-            
-            # gold scope tokens
-            st_scope_tokens_g = " ".join(str(num) for num in scope_tokens_g[i])
-
-            # gold event tokens
-            st_negated_tokens_g = " ".join(str(num) for num in negated_tokens_g[i])
-
-
-            # get the number of negation tokens in gold
-            max_neg_tokens_g = len(neg_tokens_g[i])
-            
-            
-            ## z iterates over negations in system
-            for z in range(max_negs_p):
 
-                ## udpate variables with the string of negation cue, scope and negated
-                ## in system
-
-                # pred cue words
-                st_neg_words_p = " ".join(neg_words_p[z])
+        ## i iterates over negations in gold
+        for i, neg_g in enumerate(negs_g):
 
-                # pred scope words
-                st_scope_words_p = " ".join(scope_words_p[z])
+            ## z iterates over negations in system
+            for z, neg_p in enumerate(negs_p):
 
-                # pred event words
-                st_negated_words_p = " ".join(negated_words_p[z])
+                found = 0
 
-                # pred cue tokens
-                st_neg_tokens_p = " ".join(str(num) for num in neg_tokens_p[z])
+                # look for matching negation cues in gold and system
+                if (neg_found_p[z] == 0 and
+                    neg_found_g[i] == 0 and
+                    not neg_g.cue_token_set.isdisjoint(neg_p.cue_tokens)):
+                    found = 1
+                    neg_found_p[z] = 1
+                    neg_found_g[i] = 1
 
-                # pred scope tokens
-                st_scope_tokens_p = " ".join(str(num) for num in scope_tokens_p[z])
 
-                # pred event tokens
-                st_negated_tokens_p = " ".join(str(num) for num in negated_tokens_p[z])
-                
-                
-                # get the number of negation tokens in system
-                max_neg_tokens_p = len(neg_tokens_p[z])
-                
-                found = 0
-                
-                # look for matching negation cues in gold and system
-                for y in range(max_neg_tokens_g):
-                    for x in range(max_neg_tokens_p):
-                        if (neg_tokens_g[i][y] == neg_tokens_p[z][x] and
-                            neg_found_p[z] == 0 and
-                            neg_found_g[i] == 0):
-                            found = 1
-                            neg_found_p[z] = 1
-                            neg_found_g[i] = 1
-                            break
-                
-                
                 ## if a negation in gold is also found in system
                 if found == 1:
-                    
-                    ## update count for scope tokens (scope-level)
-                    max_scope_tokens_g = len(scope_tokens_g[i])-1
-                    max_scope_tokens_p = len(scope_tokens_p[z])-1
-                    
+
                     ## iterate over gold tokens to find tp and fn
-                    for y in range(max_scope_tokens_g+1):
-                        found_scope_token = 0
-                        for x in range(max_scope_tokens_p+1):
-                            if scope_tokens_g[i][y] == scope_tokens_p[z][x]:
-                                if scope_words_g[i][y] == scope_words_p[z][x]:
-                                    found_scope_token = 1
-                                break
-                        
+                    ## (a token is found if it has the same token number
+                    ## and word in system)
+                    for y, word in zip(neg_g.scope_tokens, neg_g.scope_words):
                         # scope (scope-level)
-                        if found_scope_token == 1:
+                        if neg_p.scope_by_token.get(y) == word:
                             tp_scope_tokens += 1
                         else:
                             fn_scope_tokens += 1
-                
+
                     ## iterate over system tokens to find fp
-                    for x in range(max_scope_tokens_p+1):
-                        found_scope_token = 0
-                        for y in range(max_scope_tokens_g+1):
-                            if scope_tokens_g[i][y] == scope_tokens_p[z][x]:
-                                if scope_words_g[i][y] == scope_words_p[z][x]:
-                                    found_scope_token = 1
-                                break
-                        
+                    for x, word in zip(neg_p.scope_tokens, neg_p.scope_words):
                         # scope (scope-level)
-                        if found_scope_token == 0:
+                        if neg_g.scope_by_token.get(x) != word:
                             fp_scope_tokens += 1
-                    
+
                     ## check whether full negation is correct
-                    if (st_neg_tokens_g != "" and 
-                        st_neg_tokens_g == st_neg_tokens_p  and 
-                        st_neg_words_g == st_neg_words_p and 
-                        st_scope_tokens_g == st_scope_tokens_p and
-                        st_scope_words_g == st_scope_words_p and
-                        st_negated_tokens_g == st_negated_tokens_p and
-                        st_negated_words_g == st_negated_words_p):
+                    if (neg_g.st_cue_tokens != "" and
+                        neg_g.st_cue_tokens == neg_p.st_cue_tokens and
+                        neg_g.st_cue_words == neg_p.st_cue_words and
+                        neg_g.st_scope_tokens == neg_p.st_scope_tokens and
+                        neg_g.st_scope_words == neg_p.st_scope_words and
+                        neg_g.st_negated_tokens == neg_p.st_negated_tokens and
+                        neg_g.st_negated_words == neg_p.st_negated_words):
                         tp_full_negation += 1
                     else:
                         fn_full_negation += 1
                         error_found = 1
-                    
-                    ## gold cue is correctly identified: 
+
+                    ## gold cue is correctly identified:
                     ## both the token number and the word or part of a word
-                    if (st_neg_tokens_g != "" and
-                        st_neg_tokens_g == st_neg_tokens_p and
-                        st_neg_words_g == st_neg_words_p):
+                    if (neg_g.st_cue_tokens != "" and
+                        neg_g.st_cue_tokens == neg_p.st_cue_tokens and
+                        neg_g.st_cue_words == neg_p.st_cue_words):
                         tp_cue += 1
-                        
+
                         ########### scope (scope-level, cue match)
-                        # if no scope was marked for this cue in gold, 
+                        # if no scope was marked for this cue in gold,
                         # and system marks it, then it is fp
-                        if st_scope_tokens_g == "" and st_scope_tokens_p != "":
+                        if neg_g.st_scope_tokens == "" and neg_p.st_scope_tokens != "":
                             fp_scope += 1
                             error_found = 1
-                        
-                        ## scope is correctly identified: 
+
+                        ## scope is correctly identified:
                         ## both the token numbers and the words or parts of words
-                        ## cue needs to have been correctly identified 
+                        ## cue needs to have been correctly identified
                         ## for scope to be counted as correct
-                        elif (st_scope_tokens_g != "" and
-                              st_scope_tokens_g == st_scope_tokens_p and
-                              st_scope_words_g == st_scope_words_p):
+                        elif (neg_g.st_scope_tokens != "" and
+                              neg_g.st_scope_tokens == neg_p.st_scope_tokens and
+                              neg_g.st_scope_words == neg_p.st_scope_words):
                             tp_scope += 1
-                        
-                        ## gold marks a scope, in system either the tokens 
+
+                        ## gold marks a scope, in system either the tokens
                         ## or words are incorrect
-                        elif (st_scope_tokens_g != "" and 
-                              (st_scope_tokens_p != st_scope_tokens_g or
-                               st_scope_words_p != st_scope_words_g)):
+                        elif (neg_g.st_scope_tokens != "" and
+                              (neg_p.st_scope_tokens != neg_g.st_scope_tokens or
+                               neg_p.st_scope_words != neg_g.st_scope_words)):
                             fn_scope += 1
                             error_found = 1
-                        
+
                         ########### negated [event] (scope-level)
-                        # if no negated was marked for this cue in gold, 
+                        # if no negated was marked for this cue in gold,
                         # and system marks it, then it is fp
-                        if (st_negated_tokens_g == "" and 
-                            st_negated_tokens_p != ""):
+                        if (neg_g.st_negated_tokens == "" and
+                            neg_p.st_negated_tokens != ""):
                             fp_negated += 1
                             error_found = 1
-                        
-                        ## negated is correctly identified: 
+
+                        ## negated is correctly identified:
                         ## both the token numbers and the words or parts of words
-                        ## cue needs to have been correctly identified 
+                        ## cue needs to have been correctly identified
                         ## for negated to be counted as correct
-                        elif (st_negated_tokens_g != "" and
-                              st_negated_tokens_g == st_negated_tokens_p and
-                              st_negated_words_g == st_negated_words_p):
+                        elif (neg_g.st_negated_tokens != "" and
+                              neg_g.st_negated_tokens == neg_p.st_negated_tokens and
+                              neg_g.st_negated_words == neg_p.st_negated_words):
                             tp_negated += 1
-                        
-                        ## gold marks a negated, in system either the tokens 
+
+                        ## gold marks a negated, in system either the tokens
                         ## or words are incorrect
-                        elif (st_negated_tokens_g != "" and
-                              (st_negated_tokens_p != st_negated_tokens_g or
-                               st_negated_words_p != st_negated_words_g)):
+                        elif (neg_g.st_negated_tokens != "" and
+                              (neg_p.st_negated_tokens != neg_g.st_negated_tokens or
+                               neg_p.st_negated_words != neg_g.st_negated_words)):
                             fn_negated += 1
                             error_found = 1
-                    
+
                     ### well identified token number of negation,
                     ### but not well identified the word;
                     ### for example, in "unbrushed", "un" is the negation,
                     ### but not "unbrushed"
-                    elif (st_neg_tokens_g != "" and
-                          (st_neg_tokens_g != st_neg_tokens_p or
-                           st_neg_words_g != st_neg_words_p)):
+                    elif (neg_g.st_cue_tokens != "" and
+                          (neg_g.st_cue_tokens != neg_p.st_cue_tokens or
+                           neg_g.st_cue_words != neg_p.st_cue_words)):
                         fn_cue += 1
-                        
+
                         # scope (scope-level)
-                        if st_scope_tokens_g != "":
+                        if neg_g.st_scope_tokens != "":
                             fn_scope += 1
-                        
+
                         # event (scope-level)
-                        if st_negated_tokens_g != "":
+                        if neg_g.st_negated_tokens != "":
                             fn_negated += 1
-                        
+
                         error_found = 1
-                    
+
                     ## gold negation found in system negations search stops
                     break
-                
-                
-                ## iteration on system negations has finished and gold negation has not been found 
+
+
+                ## iteration on system negations has finished and gold negation has not been found
                 elif z == max_negs_p-1:
                     error_found = 1
-                    
+
                     # cues (scope-level)
-                    if st_neg_tokens_g != "":
+                    if neg_g.st_cue_tokens != "":
                         fn_cue += 1
-                    
+
                     # scope
-                    if st_scope_tokens_g != "":
+                    if neg_g.st_scope_tokens != "":
                         fn_scope += 1 # scope-level
-                        for y in range(len(scope_tokens_g[i])):
-                            fn_scope_tokens += 1 # token-level
-                    
+                        fn_scope_tokens += len(neg_g.scope_tokens) # token-level
+
                     # event (scope-level)
-                    if st_negated_tokens_g != "":
+                    if neg_g.st_negated_tokens != "":
                         fn_negated += 1
-                    
+
                     fn_full_negation += 1
-        
-        
-        ### iterate over negations in system if they are not found in gold, 
+
+
+        ### iterate over negations in system if they are not found in gold,
         ### then count false positives
-        
+        ### (a system negation that was matched above overlaps the cue
+        ### of the gold negation it was matched with, so it is found in gold)
+
         ## z iterates over negations in system
-        for z in range(max_negs_p):
-
-            ## udpate variables with the string of the negation cue 
-            ## in system
-            
-            # cue words
-            st_neg_words_p = " ".join(neg_words_p[z])
-            
-            # scope words
-            st_scope_words_p = " ".join(scope_words_p[z])
-
-            # event words
-            st_negated_words_p = " ".join(negated_words_p[z])
-            
-            # cue tokens
-            st_neg_tokens_p = " ".join(str(num) for num in neg_tokens_p[z])
-            
-            # scope tokens
-            st_scope_tokens_p = " ".join(str(num) for num in scope_tokens_p[z])
-
-            # event tokens
-            st_negated_tokens_p = " ".join(str(num) for num in negated_tokens_p[z])
-
-            
-            max_neg_tokens_p = len(neg_tokens_p[z])
-            
-            
-            ## i iterates over negations in gold
-            for i in range(max_negs_g):
-                
-                max_neg_tokens_g = len(neg_tokens_g[i])
-                
-                found = 0                    
-                
-                # find matching negation instances in gold and system
-                for x in range(max_neg_tokens_p):
-                    for y in range(max_neg_tokens_g):
-                        if (neg_tokens_g[i][y] == neg_tokens_p[z][x] and
-                            neg_found_p[z] == 1):
-                            found = 1
-                            break
-                
-                ## negation in system is found in gold
-                ## this has been treated above
-                if found == 1:
-                    break
-                
-                ## negation in system is not found in gold
-                elif i == max_negs_g-1:
-                    error_found = 1
-                
-                    # cues (scope-level)
-                    if st_neg_tokens_p != "":
-                        fp_cue += 1
-                    
-                    # scope
-                    if st_scope_tokens_p != "":
-                        fp_scope += 1 # scope-level
-                        for y in range(len(scope_tokens_p[z])):
-                            fp_scope_tokens += 1 # token-level
-                    
-                    # event (scope-level)
-                    if st_negated_tokens_p != "":
-                        fp_negated += 1
-                    
-                    fp_full_negation += 1                
-    
-    
+        for z, neg_p in enumerate(negs_p):
+
+            ## negation in system is not found in gold
+            if neg_found_p[z] == 0:
+                error_found = 1
+
+                # cues (scope-level)
+                if neg_p.st_cue_tokens != "":
+                    fp_cue += 1
+
+                # scope
+                if neg_p.st_scope_tokens != "":
+                    fp_scope += 1 # scope-level
+                    fp_scope_tokens += len(neg_p.scope_tokens) # token-level
+
+                # event (scope-level)
+                if neg_p.st_negated_tokens != "":
+                    fp_negated += 1
+
+                fp_full_negation += 1
+
+
     ####################################################
     ##  gold doesn't have negations and system has
     ####################################################
     elif zero_negs_g == "yes" and zero_negs_p == "no":
         error_found = 1
-        
-        for z in range(max_negs_p):
+
+        for neg_p in negs_p:
             # cue fp (scope-level)
-            if neg_tokens_p[z]:
+            if neg_p.cue_tokens:
                 fp_cue += 1
-            
+
             # scope fp
-            if scope_tokens_p[z]:
+            if neg_p.scope_tokens:
                 # scope-level
                 fp_scope += 1
                 # token-level
-                for y in range(len(scope_tokens_p[z])):
-                    fp_scope_tokens += 1
-            
+                fp_scope_tokens += len(neg_p.scope_tokens)
+
             # event fp (scope-level)
-            if negated_tokens_p[z]:
+            if neg_p.negated_tokens:
                 fp_negated += 1
-            
+
             # full negation fp
             fp_full_negation += 1
-    
-    
-    
+
+
+
     #######################################################
     ###### update counts for negated apart from negation cues
     #######################################################
     global fp_negated_apart, fn_negated_apart, tp_negated_apart
-    
+
 
     ####################################################
     ## gold has negations in sentence, system not
     ####################################################
     if zero_negs_g == "no" and zero_negs_p == "yes":
-        for i in range(max_negs_g):
-            if negated_tokens_g[i]:
+        for neg_g in negs_g:
+            if neg_g.negated_tokens:
                 fn_negated_apart += 1  # original line 1684
 
 
@@ -883,177 +597,98 @@ def process_sentence(neg_cols_g, neg_cols_p, POS, starsem_exact=False):
     ## gold and system have negations in sentence
     ####################################################
     elif zero_negs_g == "no" and zero_negs_p == "no":
-        
+
         ### iterate over negations in gold
-        
-        ## i iterates over negations in gold
-        for i in range(max_negs_g):
 
-            ## update string of negated in gold
+        ## i iterates over negations in gold
+        for i, neg_g in enumerate(negs_g):
 
-            # gold event words
-            st_negated_words_g = " ".join(negated_words_g[i])
+            ## z iterates over negations in system
+            for z, neg_p in enumerate(negs_p):
 
-            # gold event tokens
-            st_negated_tokens_g = " ".join(str(num) for num in negated_tokens_g[i])
-            
+                found = 0
 
-            max_negated_tokens_g = len(negated_tokens_g[i])
-            
-            ## z iterates over negations in system
-            for z in range(max_negs_p):
-                
-                ## update string of negated in system
-
-                # pred event words
-                st_negated_words_p = " ".join(negated_words_p[z])
-
-                # pred event tokens
-                st_negated_tokens_p = " ".join(str(num) for num in negated_tokens_p[z])
-
-                
-                max_negated_tokens_p = len(negated_tokens_p[z])
-                max_neg_tokens_p = len(neg_tokens_p[z])
-                
-                found = 0 
-                
-                # code for events ***dependent*** on [partial] cue match (not in the original)
-#                for y in range(max_neg_tokens_g):
-#                    for x in range(max_neg_tokens_p):
-#                        if (neg_tokens_g[i][y] == neg_tokens_p[z][x] and
-#                            negated_found_p[z] == 0 and
-#                            negated_found_g[i] == 0):
-#                            found = 1
-#                            negated_found_p[z] = 1
-#                            negated_found_g[i] = 1
-#                            break
-                
                 # iterate over events
                 # find the ones that match (regardless of the cue)
-                for y in range(max_negated_tokens_g):
-                    for x in range(max_negated_tokens_p):
-                        if (negated_tokens_g[i][y] == negated_tokens_p[z][x] and
-                            negated_found_p[z] == 0 and
-                            negated_found_g[i] == 0):
-                            found = 1
-                            negated_found_p[z] = 1
-                            negated_found_g[i] = 1
-                            break        
-                
-                
+                if (negated_found_p[z] == 0 and
+                    negated_found_g[i] == 0 and
+                    not neg_g.negated_token_set.isdisjoint(neg_p.negated_tokens)):
+                    found = 1
+                    negated_found_p[z] = 1
+                    negated_found_g[i] = 1
+
+
                 ## if a negation in gold is also found in system
                 if found == 1:
                     ## negated is correctly identified
-                    ## both token number and word or part of word 
+                    ## both token number and word or part of word
                     ## have to be correctly identified
-                    if (st_negated_tokens_g != "" and 
-                        st_negated_tokens_g == st_negated_tokens_p and 
-                        st_negated_words_g == st_negated_words_p):
+                    if (neg_g.st_negated_tokens != "" and
+                        neg_g.st_negated_tokens == neg_p.st_negated_tokens and
+                        neg_g.st_negated_words == neg_p.st_negated_words):
                         tp_negated_apart += 1
-                        break    
-                    
+                        break
+
                     ## if negated is not correctly identified
-                    elif (st_negated_tokens_g != "" and 
-                          (st_negated_tokens_p != st_negated_tokens_g or 
-                           st_negated_words_p != st_negated_words_g)):
-                        
+                    elif (neg_g.st_negated_tokens != "" and
+                          (neg_p.st_negated_tokens != neg_g.st_negated_tokens or
+                           neg_p.st_negated_words != neg_g.st_negated_words)):
+
                         if starsem_exact:
                             # the loop in this if statement was omitted due to a bug
-                            # --> did not add fn to fn_negated_apart whenever there 
+                            # --> did not add fn to fn_negated_apart whenever there
                             # was a gold-pred match, but not full (not all words / tokens matched)
                             continue
-                        
-                        ## we need to check whether we are comparing 
+
+                        ## we need to check whether we are comparing
                         ## negated elements of the same negation
-                        found = 0
-                        
-                        # this loop is omitted in original due to a bug
+
+                        # this check is omitted in original due to a bug
                         # original iterated over range(max_negated_words_g)
                         # where max_negated_words_g was not [re]defined (alw set to -1)
-                        # the loop looks checks if there is a word match and not only
+                        # the check looks if there is a word match and not only
                         # a token is match (affixational cues can have a part of a word
                         # as the event, and be events themselves, e.g. event 1: unlike,
                         # event 2: like (where cue is un), where the token id is the same)
-                        for y in range(max_negated_tokens_g):  # original line 1777
-                            for x in range(max_negated_tokens_p):
-                                if negated_words_g[i][y] == negated_words_p[z][x]:
-                                    found = 1
-                                    break
-                        
+                        # original line 1777
+
                         # fn if gold did match a prediction, but not fully
-                        if found == 1:
+                        if not set(neg_g.negated_words).isdisjoint(neg_p.negated_words):
                             fn_negated_apart += 1  # original line 1790
                             break
-                        
+
                         # addition: set the instances to NOT found
                         else:
                             negated_found_p[z] = 0
-                            negated_found_g[i] = 0                            
-                        
-            
+                            negated_found_g[i] = 0
+
+
                 elif z == max_negs_p-1:
-                    if st_negated_tokens_g != "":
+                    if neg_g.st_negated_tokens != "":
                         # fn if gold didn't match any prediction
                         fn_negated_apart += 1 # original line 1800
 
-    
-        ### iterate over negations in system 
+
+        ### iterate over negations in system
         ### if they are not found in gold, then count false positives
+        ### (a system event that is still marked as found overlaps
+        ### the gold event it was matched with)
 
         ## z iterates over negations in system
-        for z in range(max_negs_p):
-            
-            ## update string of negated in system
-            
-            # pred event words
-            st_negated_words_p = " ".join(negated_words_p[z])
-
-            # pred event tokens
-            st_negated_tokens_p = " ".join(str(num) for num in negated_tokens_p[z])
-
-            
-            max_negated_tokens_p = len(negated_tokens_p[z])
-            max_neg_tokens_p = len(neg_tokens_p[z])
-            
-            ## i iterates over negations in gold
-            for i in range(max_negs_g):
-                
-                max_negated_tokens_g = len(negated_tokens_g[i])                
-                max_neg_tokens_g = len(neg_tokens_g[i])
-                
-                found = 0
-
-                # code for events ***dependent*** on [partial] cue match (not in the original)
-#                for x in range(max_neg_tokens_p):
-#                    for y in range(max_neg_tokens_g):
-#                        if (neg_tokens_g[i][y] == neg_tokens_p[z][x] and
-#                            negated_found_p[z] == 1):
-#                            found = 1
-#                            break
-                
-                for x in range(max_negated_tokens_p):
-                    for y in range(max_negated_tokens_g):
-                        if (negated_tokens_g[i][y] == negated_tokens_p[z][x] and
-                            negated_found_p[z] == 1):
-                            found = 1
-                            break
+        for z, neg_p in enumerate(negs_p):
 
-                ## if a negation in gold is also found in system
-                if found == 1:
-                    break
-                
-                ## negation in system is not found in gold
-                elif i == max_negs_g-1:
-                    if st_negated_tokens_p != "":
-                        fp_negated_apart += 1
+            ## negation in system is not found in gold
+            if negated_found_p[z] == 0:
+                if neg_p.st_negated_tokens != "":
+                    fp_negated_apart += 1
 
 
     ####################################################
     ##  gold doesn't have negations and system has
     ####################################################
     elif zero_negs_g == "yes" and zero_negs_p == "no":
-        for z in range(max_negs_p):
-            if negated_tokens_p[z]:
+        for neg_p in negs_p:
+            if neg_p.negated_tokens:
                 fp_negated_apart += 1
 
 
@@ -1063,387 +698,258 @@ def process_sentence(neg_cols_g, neg_cols_p, POS, starsem_exact=False):
     #######################################################
     global fp_scope_apart, fn_scope_apart, tp_scope_apart
     global fp_scope_nopunc, fn_scope_nopunc, tp_scope_nopunc
-    
+
+    # punctuation is never part of the stored scopes, so the scopes
+    # without punctuation (nopunc) are the same as the scopes
+
     ####################################################
     ## gold has negations in sentence, system has
     ## not found negations in sentence
     ####################################################
     if zero_negs_g == "no" and zero_negs_p == "yes":
-        for i in range(max_negs_g):
-            if scope_tokens_g[i]:
+        for neg_g in negs_g:
+            if neg_g.scope_tokens:
                 fn_scope_apart += 1
-
-            if scope_tokens_nopunc_g[i]:
                 fn_scope_nopunc += 1
-    
-    
+
+
     ####################################################
     ## gold and system have negations in sentence
     ####################################################
     elif zero_negs_g == "no" and zero_negs_p == "no":
-        
-        ## i iterates over negations in gold
-        for i in range(max_negs_g):
-
-            ## udpate variables with the string of negation cue,
-            ## scope and negated in gold
-
-            # gold cue words
-            st_neg_words_g = " ".join(neg_words_g[i])
 
-            # gold scope words
-            st_scope_words_g = " ".join(scope_words_g[i])
-
-            # gold scope words (no punct)
-            st_scope_words_nopunc_g = " ".join(scope_words_nopunc_g[i])
-
-            # gold cue tokens
-            st_neg_tokens_g = " ".join(str(num) for num in neg_tokens_g[i])
-
-            # gold scope tokens
-            st_scope_tokens_g = " ".join(str(num) for num in scope_tokens_g[i])
+        ## i iterates over negations in gold
+        for i, neg_g in enumerate(negs_g):
 
-            # gold scope words (no punct)
-            st_scope_tokens_nopunc_g = " ".join(str(num) for num in scope_tokens_nopunc_g[i])
-            
-            max_neg_tokens_g = len(neg_tokens_g[i])
-            
-            
             ## z iterates over negations in system
-            for z in range(max_negs_p):
-                
-                ## udpate variables with the string of negation cue, scope and negated
-                ## in system
-
-                # pred scope words
-                st_scope_words_p = " ".join(scope_words_p[z])
-
-                # pred scope words (no punct)
-                st_scope_words_nopunc_p = " ".join(scope_words_nopunc_p[z])
-
-                # pred scope tokens
-                st_scope_tokens_p = " ".join(str(num) for num in scope_tokens_p[z])
-
-                # pred scope tokens (no punct)
-                st_scope_tokens_nopunc_p = " ".join(str(num) for num in scope_tokens_nopunc_p[z])
-                
-                
-                max_neg_tokens_p = len(neg_tokens_p[z])
-                
+            for z, neg_p in enumerate(negs_p):
+
                 found = 0
-                
+
                 # look for matching negation cues in gold and system
                 # check if negation is found in both system and gold
-                for y in range(max_neg_tokens_g):
-                    for x in range(max_neg_tokens_p):
-                        if (neg_tokens_g[i][y] == neg_tokens_p[z][x] and
-                            scope_found_p[z] == 0 and
-                            scope_found_g[i] == 0):
-                            found = 1
-                            scope_found_p[z] = 1
-                            scope_found_g[i] = 1
-                            break
-                
+                if (scope_found_p[z] == 0 and
+                    scope_found_g[i] == 0 and
+                    not neg_g.cue_token_set.isdisjoint(neg_p.cue_tokens)):
+                    found = 1
+                    scope_found_p[z] = 1
+                    scope_found_g[i] = 1
+
                 ## if a negation in gold is also found in system
                 if found == 1:
-                    
-                    ########### scope apart #####################
+
+                    ########### scope apart (and no punctuation) #####################
                     # if no scope was marked for this cue in gold,
                     # and system marks it, then it is fp
-                    if st_scope_tokens_g == "" and st_scope_tokens_p != "":
+                    if neg_g.st_scope_tokens == "" and neg_p.st_scope_tokens != "":
                         fp_scope_apart += 1
-                    
-                    ## scope is correctly identified: 
+                        fp_scope_nopunc += 1
+
+                    ## scope is correctly identified:
                     ## both the token numbers and the words or parts of words
-                    ## cue needs to have been correctly identified 
+                    ## cue needs to have been correctly identified
                     ## for scope to be counted as correct
-                    elif (st_scope_tokens_g != "" and 
-                          st_scope_tokens_g == st_scope_tokens_p and 
-                          st_scope_words_g == st_scope_words_p):
+                    elif (neg_g.st_scope_tokens != "" and
+                          neg_g.st_scope_tokens == neg_p.st_scope_tokens and
+                          neg_g.st_scope_words == neg_p.st_scope_words):
                         tp_scope_apart += 1
-        
-                    ## gold marks a scope, in system either the tokens 
+                        tp_scope_nopunc += 1
+
+                    ## gold marks a scope, in system either the tokens
                     ## or words are incorrect
-                    elif (st_scope_tokens_g != "" and 
-                          (st_scope_tokens_p != st_scope_tokens_g or 
-                           st_scope_words_p != st_scope_words_g)):
+                    elif (neg_g.st_scope_tokens != "" and
+                          (neg_p.st_scope_tokens != neg_g.st_scope_tokens or
+                           neg_p.st_scope_words != neg_g.st_scope_words)):
                         fn_scope_apart += 1
-                    
-                    
-                    ########### scope no punctuation #####################
-                    # if no scope was marked for this cue in gold,
-                    # and system marks it, then it is fp
-                    if (st_scope_tokens_nopunc_g == "" and 
-                        st_scope_tokens_nopunc_p != ""):
-                        fp_scope_nopunc += 1
-                    
-                    ## scope is correctly identified: boh the token numbers and the words or parts of words
-                    ## cue needs to have been correctly identified for scope to be counted as correct
-                    elif (st_scope_tokens_nopunc_g != "" and 
-                          st_scope_tokens_nopunc_g == st_scope_tokens_nopunc_p and 
-                          st_scope_words_nopunc_g == st_scope_words_nopunc_p):
-                        tp_scope_nopunc += 1
-                    
-                    ## gold marks a scope, in system either the tokens or words are incorrect
-                    elif (st_scope_tokens_nopunc_g != "" and 
-                          (st_scope_tokens_nopunc_p != st_scope_tokens_nopunc_g or 
-                           st_scope_words_nopunc_p != st_scope_words_nopunc_g)):
                         fn_scope_nopunc += 1
-                    
-                    
-                    ## gold negation found in system negations search 
+
+
+                    ## gold negation found in system negations search
                     ## in system negations stops
                     break
-                
-                
+
+
                 ## iteration on system negations has finished
-                ## and gold negation has not been found 
+                ## and gold negation has not been found
                 elif z == max_negs_p-1:
-                    if st_scope_tokens_g != "":
+                    if neg_g.st_scope_tokens != "":
                         fn_scope_apart += 1
-                    if st_scope_tokens_nopunc_g!="":
                         fn_scope_nopunc += 1
-        
-        
+
+
         ### iterate over negations in system if they are not found in gold,
         ## then count false positives
-        
-        ## z iterates over negations in system
-        for z in range(max_negs_p): 
-
-            ## udpate variables with the string of the negation scope
-            ## in system
+        ### (a system negation that was matched above overlaps the cue
+        ### of the gold negation it was matched with)
 
-            # pred scope tokens
-            st_scope_tokens_p = " ".join(str(num) for num in scope_tokens_p[z])
+        ## z iterates over negations in system
+        for z, neg_p in enumerate(negs_p):
 
-            # pred scope tokens (no punct)
-            st_scope_tokens_nopunc_p = " ".join(str(num) for num in scope_tokens_nopunc_p[z])
-            
-            
-            max_neg_tokens_p = len(neg_tokens_p[z])
-            
-            ## i iterates over negations in gold
-            for i in range(max_negs_g):
+            ## negation in system is not found in gold
+            if scope_found_p[z] == 0:
+                if neg_p.st_scope_tokens != "":
+                    fp_scope_apart += 1
+                    fp_scope_nopunc += 1
 
-                max_neg_tokens_g = len(neg_tokens_g[i])
-                                
-                found = 0
 
-                for x in range(max_neg_tokens_p):
-                    for y in range(max_neg_tokens_g):
-                        if (neg_tokens_g[i][y] == neg_tokens_p[z][x] and
-                            scope_found_p[z] == 1):
-                            found = 1
-                            break
-                
-                ## negation in system is found in gold
-                ## this has been treated above 
-                if found == 1:
-                    break
-                
-                ## negation in system is not found in gold
-                elif i == max_negs_g-1:
-                    if st_scope_tokens_p != "":
-                        fp_scope_apart += 1
-                    if st_scope_tokens_nopunc_p != "":
-                        fp_scope_nopunc += 1
-    
-    
     ####################################################
     ##  gold doesn't have negations and system has
     ####################################################
     elif zero_negs_g == "yes" and zero_negs_p =="no":
-        for z in range(max_negs_p):
-            if scope_tokens_p[z]:
+        for neg_p in negs_p:
+            if neg_p.scope_tokens:
                 fp_scope_apart += 1
-            if scope_tokens_nopunc_p[z]:
                 fp_scope_nopunc += 1
 
 
     # count error sentences
     global count_error_sentences, count_error_sentences_negation
-    
+
     if error_found == 1:
         count_error_sentences += 1
-                 
+
         if zero_negs_g == "no":
             count_error_sentences_negation += 1
 
 
+def reset_counts():
+    """
+    set all counts back to their initial values,
+    e.g. before evaluating another pair of files
+    """
+    globals().update(INITIAL_COUNTS)
 
 
-def main(gold, system, starsem_exact=False):
-    """
-    This version differs from the original script in the following:
-        - original omits some FNs for negated event that had a partial match
-        - original counts as FN cases with one token being an event twice and 
-          written in prediction in a diffferent order than in gold 
-          (e.g. event 1: unlike, event 2: like (where the cue is un))
-        - original outputs TP of Scope (cue match) when reporting results 
-          for Scope (no cue match)
-        - original rounds precision and recall before calculating f1
-    
-    To obtain exactly the same output as the original, set starsem_exact to True.
+
+def line_mismatch_msg(tmp_lineg):
+    msg = "ATTENTION: mismatch between lines of GOLD file and "
+    msg += "SYSTEM file\nIn file: " + tmp_lineg[0] + ", sentence: "
+    msg += tmp_lineg[1] + ", word: " + tmp_lineg[2] + "\nThis "
+    msg += "needs to be fixed before evaluating\nProcess ended\n"
+    return msg
+
+
+def column_consistency_msg(current_line):
+    msg = "Inconsistency detected in the number of columns at "
+    msg += "line number " + str(current_line) + "\nAll tokens in a "
+    msg += "sentence should have the same number of columns\n"
+    return msg
+
+
+def column_count_msg(current_line):
+    msg = "Incorrect number of columns in line number " + str(current_line)
+    msg += "\nThere should be 3 columns per negation cue\n"
+    msg += "Fix this before proceeding to evaluation\n"
+    return msg
+
+
+def check_sentence(rows_g, rows_p):
     """
-    
-    #######################################################################
+    check sentence
+
+    takes two lists with the columns of each line of a sentence:
+        rows_g - gold sentence
+        rows_p - system sentence
+
     ##### 1. check that GOLD file and SYSTEM file have the same sentences
     ##### evaluation does not proceed if sentences are different
-    ##### 2.1 Check that SYSTEM file annotates sentences without negation consistently 
+    ##### 2.1 Check that SYSTEM file annotates sentences without negation consistently
     ##### All tokens in column 7 need to have "***"
     ##### 2.2 Check that all tokens of the same sentence have the same
-    ##### number of columns and that the number of columns is 
+    ##### number of columns and that the number of columns is
     ##### either 7 (starting by 0) or, if larger, divisible by 3
-    ######################################################################
-    
-    global count_sentences, line_number
-    
-    with open(gold) as f:
-        # split into sentences
-        GOLD = f.read().strip().split("\n\n")
-    with open(system) as f:
-        # split into sentences
-        SYSTEM = f.read().strip().split("\n\n")
 
+    ### line_number is the number of the line before the sentence
+    """
     col7_p = []
     max_tmp_linep = -1
-    
-    count_sentences = len(GOLD)
-    current_sent_idx = 0
-    
-    while current_sent_idx < count_sentences:
-        
-        # add empty line to have the required format for the given code
-        gold_sent = GOLD[current_sent_idx].split("\n") + [""]
-        system_sent = SYSTEM[current_sent_idx].split("\n") + [""]
-        
-        current_sent_idx += 1
-        
-        for idx in range(len(gold_sent)):            
-            st_tmp_lineg = gold_sent[idx].strip()
-            st_tmp_linep = system_sent[idx].strip()
-
-            line_number += 1
-                    
-            # if the sentence has ended
-            if st_tmp_lineg == "":
-                # 1. check if the sentence in SYSTEM has ended as well
-                assert_msg = "Line " + str(line_number)
-                assert_msg += ": Blank line in GOLD file is not blank line in SYSTEM file"
-                assert st_tmp_linep == "", assert_msg
-                
-                # 2. check if all lines of the sentence without negation in SYSTEM
-                # have *** in negation columns
-                max_col7_p = len(col7_p)
-                for i in range(0, max_col7_p-1):
-                    if col7_p[i] == "***":
-                        assert_msg = "Inconsistency detected in column 7 of SYSTEM's "
-                        assert_msg += "file\nAll tokens should have value *** for this"
-                        assert_msg += "column\nError in sentence that finishes before "
-                        assert_msg += "line number " + str(line_number) + ", token "
-                        assert_msg_end ="\nFix this before proceeding with evaluation"
-                        if i > 0:
-                            assert col7_p[i-1] == "***", assert_msg+str(i-1)+assert_msg_end
-                        assert col7_p[i+1] == "***", assert_msg+str(i+1)+assert_msg_end
-                        
-                col7_p = []
-                max_tmp_linep = -1            
-        
-                
-            else:
-                tmp_lineg = st_tmp_lineg.split("\t")
-                tmp_linep = st_tmp_linep.split("\t")
-                
-                # 1. check for line mismatches
-                assert_msg = "ATTENTION: mismatch between lines of GOLD file and "
-                assert_msg += "SYSTEM file\nIn file: " + tmp_lineg[0] + ", sentence: "
-                assert_msg += tmp_lineg[1] + ", word: " + tmp_lineg[2] + "\nThis "
-                assert_msg += "needs to be fixed before evaluating\nProcess ended\n"
-                
-                assert tmp_linep[0] == tmp_lineg[0], assert_msg  # file name
-                assert tmp_linep[1] == tmp_lineg[1], assert_msg  # sent number
-                assert tmp_linep[2] == tmp_lineg[2], assert_msg  # token number
-                assert tmp_linep[3] == tmp_lineg[3], assert_msg  # word
-                
-                # 2. check the annotation consistency
-                col7_p.append(tmp_linep[7])
-                
-                if max_tmp_linep == -1:
-                    max_tmp_linep = len(tmp_linep)-1
-                
-                # check if the number of negation columns is the same in all lines
-                assert_msg = "Inconsistency detected in the number of columns at "
-                assert_msg += "line number " + str(line_number) + "\nAll tokens in a "
-                assert_msg += "sentence should have the same number of columns\n"
-                assert max_tmp_linep == len(tmp_linep)-1, assert_msg
-                
-                # check if the number of columns is correct
-                if max_tmp_linep != 7:
-                    assert_msg = "Incorrect number of columns in line number " + str(line_number)
-                    assert_msg += "\nThere should be 3 columns per negation cue\n"
-                    assert_msg += "Fix this before proceeding to evaluation\n"
-                    assert max_tmp_linep % 3 == 0, assert_msg
-    
-    tmp_lineg = []
-    tmp_linep = []
-    st_tmp_lineg = ""
-    st_tmp_linep = ""
-    max_tmp_linep = -1
-    line_number = 0
-    
 
-    #######################################################################
-    ###### 3. evaluate
-    #######################################################################
-    
+    for idx, tmp_lineg in enumerate(rows_g):
+        # a line missing in SYSTEM is a blank line
+        tmp_linep = rows_p[idx] if idx < len(rows_p) else [""]
+        current_line = line_number + idx + 1
+
+        # 1. check for line mismatches
+        # (the messages are only built if a check fails)
+        assert tmp_linep[0] == tmp_lineg[0], line_mismatch_msg(tmp_lineg)  # file name
+        assert tmp_linep[1] == tmp_lineg[1], line_mismatch_msg(tmp_lineg)  # sent number
+        assert tmp_linep[2] == tmp_lineg[2], line_mismatch_msg(tmp_lineg)  # token number
+        assert tmp_linep[3] == tmp_lineg[3], line_mismatch_msg(tmp_lineg)  # word
+
+        # 2. check the annotation consistency
+        col7_p.append(tmp_linep[7])
+
+        if max_tmp_linep == -1:
+            max_tmp_linep = len(tmp_linep)-1
+
+        # check if the number of negation columns is the same in all lines
+        assert max_tmp_linep == len(tmp_linep)-1, column_consistency_msg(current_line)
+
+        # check if the number of columns is correct
+        if max_tmp_linep != 7:
+            assert max_tmp_linep % 3 == 0, column_count_msg(current_line)
+
+    # the sentence has ended
+    current_line = line_number + len(rows_g) + 1
+
+    # 1. check if the sentence in SYSTEM has ended as well
+    assert_msg = "Line " + str(current_line)
+    assert_msg += ": Blank line in GOLD file is not blank line in SYSTEM file"
+    assert len(rows_p) <= len(rows_g), assert_msg
+
+    # 2. check if all lines of the sentence without negation in SYSTEM
+    # have *** in negation columns
+    max_col7_p = len(col7_p)
+    for i in range(0, max_col7_p-1):
+        if col7_p[i] == "***":
+            assert_msg = "Inconsistency detected in column 7 of SYSTEM's "
+            assert_msg += "file\nAll tokens should have value *** for this"
+            assert_msg += "column\nError in sentence that finishes before "
+            assert_msg += "line number " + str(current_line) + ", token "
+            assert_msg_end ="\nFix this before proceeding with evaluation"
+            if i > 0:
+                assert col7_p[i-1] == "***", assert_msg+str(i-1)+assert_msg_end
+            assert col7_p[i+1] == "***", assert_msg+str(i+1)+assert_msg_end
+
+
+
+def evaluate_sentence(rows_g, rows_p, starsem_exact=False):
+    """
+    evaluate sentence
+
+    takes two lists with the columns of each line of a sentence:
+        rows_g - gold sentence
+        rows_p - system sentence
+
+    ### gets the information about the sentence from each line
+    ### (see get_info_sentence) and processes the sentence
+    """
+    global count_sentences, line_number
+
+    count_sentences += 1
+    line_number += len(rows_g) + 1
+
     POS = []
 
     neg_cols_g = []
-    neg_cols_p = []    
+    neg_cols_p = []
 
-    current_sent_idx = 0
-    
-    while current_sent_idx < count_sentences:
-        
-        # add empty line to have the required format for the given code
-        gold_sent = GOLD[current_sent_idx].split("\n") + [""]
-        system_sent = SYSTEM[current_sent_idx].split("\n") + [""]
-        
-        current_sent_idx += 1
-        
-        for idx in range(len(gold_sent)):
-            st_tmp_lineg = gold_sent[idx].strip()
-            st_tmp_linep = system_sent[idx].strip()
-            
-            line_number += 1
-            
-            ### if line is blank or if end of file is reached
-            ### process sentence
-            if st_tmp_lineg == "":
-                process_sentence(neg_cols_g, neg_cols_p, POS, starsem_exact=starsem_exact)
-                         
-                ###################################
-                ## initialize variables 
-                ## before processing next sentence
-                ###################################
-                POS = []
-            
-                neg_cols_g = []
-                neg_cols_p = []
-    
-            ###################################
-            ## get information about sentence
-            ###################################
-            else:
-                tmp_neg_g, tmp_neg_p, POS_tag = get_info_sentence(st_tmp_lineg, 
-                                                                  st_tmp_linep)
-                
-                POS.append(POS_tag)
-                neg_cols_g.append(tmp_neg_g)
-                neg_cols_p.append(tmp_neg_p)
-    
-    
+    for tmp_lineg, tmp_linep in zip(rows_g, rows_p):
+        tmp_neg_g, tmp_neg_p, POS_tag = get_info_sentence(tmp_lineg, tmp_linep)
+
+        POS.append(POS_tag)
+        neg_cols_g.append(tmp_neg_g)
+        neg_cols_p.append(tmp_neg_p)
+
+    process_sentence(neg_cols_g, neg_cols_p, POS, starsem_exact=starsem_exact)
+
+
+
+def get_print_str(starsem_exact=False):
+    """
+    calculates the F measures from the counts of all processed sentences
+    and returns the results table
+    """
     ######### calculate F measures
 
     def calculate_f1(precision, recall, starsem_exact=starsem_exact):
@@ -1548,7 +1054,59 @@ def main(gold, system, starsem_exact=False):
     print_str += f" % correct sentences: {perc_correct_sentences:.2f}\n"
     print_str += f" % correct negation sentences: {perc_correct_negation_sentences:.2f}\n"
     print_str += "--------------------------------------------------------------------------------------------------------\n"
-    print(print_str)
+
+    return print_str
+
+
+
+def main(gold, system, starsem_exact=False, cache=None):
+    """
+    This version differs from the original script in the following:
+        - original omits some FNs for negated event that had a partial match
+        - original counts as FN cases with one token being an event twice and 
+          written in prediction in a diffferent order than in gold 
+          (e.g. event 1: unlike, event 2: like (where the cue is un))
+        - original outputs TP of Scope (cue match) when reporting results 
+          for Scope (no cue match)
+        - original rounds precision and recall before calculating f1
+    
+    To obtain exactly the same output as the original, set starsem_exact to True.
+    
+    If a ResultCache is given, the results table is looked up in (and added to) the cache.
+    """
+    
+    if cache is not None:
+        # hash the whole instance-based evaluation folder, whose modules the script imports
+        version = source_version(os.path.abspath(__file__), 
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), 
+                                              "..", "instance_based_eval"))
+        key = cache.make_key(gold, system, "starsem2012_translated", version, 
+                             {"starsem_exact": starsem_exact})
+        print(cache.get_or_compute(key, lambda: evaluate_files(gold, system, starsem_exact)))
+    else:
+        print(evaluate_files(gold, system, starsem_exact))
+    
+
+def evaluate_files(gold, system, starsem_exact=False):
+    """
+    Evaluate the system file against the gold file and return the results table (see main).
+    """
+    
+    reset_counts()
+    
+    # split into sentences of token rows (gzip/xz/bz2 files are decompressed on the fly)
+    GOLD = list(iter_rows_from_file(gold))
+    SYSTEM = list(iter_rows_from_file(system))
+
+    for current_sent_idx in range(len(GOLD)):
+        ##### 1. and 2. check the sentence
+        check_sentence(GOLD[current_sent_idx], SYSTEM[current_sent_idx])
+        
+        ##### 3. evaluate
+        evaluate_sentence(GOLD[current_sent_idx], SYSTEM[current_sent_idx], 
+                          starsem_exact=starsem_exact)
+    
+    return get_print_str(starsem_exact=starsem_exact)
     
 
 if __name__ == "__main__":
@@ -1560,16 +1118,14 @@ if __name__ == "__main__":
                            help="print a brief explanation about the evaluation output") 
     argparser.add_argument("-e", "--starsem-exact", default=False, action="store_true", 
                            help="output the exact same results as the original (use -r for a readme that includes a description of differences between this evaluation script and the original)")
-
-
-    gold_name = "../data/BioScope/Abstracts/created_splits/starsem2012_format/starsem2012.abstracts.negation.txt.test"
-    pred_name = "../data/ConanDoyle-neg/pred/reannotated/starsem2012_format/direct_syntbert/STARSEM_test-parsed_neg-conan-reann_syntax_direct_0601_005256_bio-abs.conll.pred"
-
-    
-    args = argparser.parse_args(["-g", gold_name, 
-                                 "-s", pred_name])#, 
-##                                 "-e"])
-#    args = argparser.parse_args(["-h"])
+    argparser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_PATH, default=None, metavar="PATH",
+                           help="look up results in (and add them to) a result cache, default location: {}".format(DEFAULT_CACHE_PATH))
+    argparser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), metavar="MB",
+                           help="maximum size of the result cache in MiB, default: %(default)s")
+    argparser.add_argument("--validate", action="store_true",
+                           help="check the format of both files first and list all problems on stderr instead of stopping at the first one")
+
+    args = argparser.parse_args()
         
     if args.readme:
         readme_str = """
@@ -1717,6 +1273,14 @@ This evaluation script compares the output of a system versus a gold annotation
         print("System output file (-s) missing\n")
         argparser.parse_args(["-h"])
     
+    if args.validate:
+        report = validate_files(args.gold, args.system)
+        if not report.ok:
+            print(report, file=sys.stderr, end="")
+            sys.exit(1)
+    
+    cache = ResultCache(args.cache, max_bytes=args.cache_size * 1024 * 1024) if args.cache else None
+    
     # get results and print them out
-    main(args.gold, args.system, starsem_exact=args.starsem_exact)
+    main(args.gold, args.system, starsem_exact=args.starsem_exact, cache=cache)
     
@@ -0,0 +1,65 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Shared fixtures of the tests.
+
+The evaluation scripts import their modules from their own folders, so these folders are added to the path
+(and the benchmark folder, for its synthetic corpora).
+
+The fixture corpus (data/fixture_gold.txt, data/fixture_system.txt) has six sentences:
+  0. "He was not happy ." - the system misses "was" in the scope;
+  1. "It was impossible ." - affix cue "im"; the system scope is only "possible", without an event;
+  2. "He neither ate nor drank ." - multiword cue; the system has no instance;
+  3. "The door was open ." - no gold instance; the system has a spurious cue "door";
+  4. "Yes ." - no instance on either side;
+  5. "He did not go ." - the system cue "did not" only partially matches the gold cue "not".
+"""
+
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(TESTS_DIR, "..")
+for folder in ("instance_based_eval", "starsem_eval", "benchmarks"):
+    sys.path.insert(0, os.path.join(ROOT_DIR, folder))
+
+from synthetic_corpus import generate_corpus_pair
+
+NUM_SENTENCES = 120
+
+FIXTURE_GOLD = os.path.join(TESTS_DIR, "data", "fixture_gold.txt")
+FIXTURE_SYSTEM = os.path.join(TESTS_DIR, "data", "fixture_system.txt")
+
+
+def read_text(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def write_text(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return str(path)
+
+
+def assert_same_result(result, expected):
+    """Assert that two EvaluationResults have the same metrics (up to rounding)."""
+    assert vars(result) == pytest.approx(vars(expected), abs=1e-12)
+
+
+@pytest.fixture
+def fixture_pair():
+    """Paths of the gold and the system file of the fixture corpus."""
+    return FIXTURE_GOLD, FIXTURE_SYSTEM
+
+
+@pytest.fixture
+def corpus_pair(tmp_path):
+    """Paths of a synthetic gold file and a system file for it (see benchmarks/synthetic_corpus.py)."""
+    gold_str, system_str = generate_corpus_pair(NUM_SENTENCES, seed=1)
+    return write_text(tmp_path / "gold.txt", gold_str), write_text(tmp_path / "system.txt", system_str)
@@ -0,0 +1,108 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Alignment of gold and system sentences by their (doc_id, sent_id) key, and re-alignment of system tokens."""
+
+import pytest
+
+import starsem2012_eval_extended as extended
+from alignment import FIRST_INSTANCE_COLUMN, align_by_key, project_label, project_rows
+from conftest import read_text, write_text
+from run_evaluation import run_evaluation_aligned
+from test_scores import EXPECTED_EXTENDED_ROWS, EXPECTED_INSTANCE_BASED
+
+
+def sentence_rows(words, labels, sent_id="0"):
+    return [["doc", sent_id, str(idx), word, word.lower(), "NN", "*"] + list(word_labels)
+            for idx, (word, word_labels) in enumerate(zip(words, labels))]
+
+
+def sentence_rows_of(corpus_str):
+    return [[line.split("\t") for line in sent.split("\n")] for sent in corpus_str.strip().split("\n\n")]
+
+
+def split_sentences(path):
+    return read_text(path).strip().split("\n\n")
+
+
+def join_sentences(sentences):
+    return "\n\n".join(sentences) + "\n"
+
+
+def test_align_by_key():
+    gold = [sentence_rows(["a"], [["_"]], sent_id=str(idx)) for idx in range(4)]
+    system = [gold[2], gold[0], gold[1], sentence_rows(["b"], [["_"]], sent_id="9")]
+
+    pairs, report = align_by_key(gold, system)
+    assert [(gold_sent, system_sent) for gold_sent, system_sent in pairs] == \
+        [(gold[0], gold[0]), (gold[1], gold[1]), (gold[2], gold[2]), (gold[3], None), (None, system[3])]
+    assert report.num_aligned == 3 and report.reordered
+    assert report.missing == [("doc", "3")] and report.extra == [("doc", "9")]
+
+
+def test_aligned(fixture_pair, tmp_path):
+    gold_path, system_path = fixture_pair
+    shuffled_path = write_text(tmp_path / "shuffled.txt", join_sentences(reversed(split_sentences(system_path))))
+
+    result, report = run_evaluation_aligned(gold_path, shuffled_path)
+    assert vars(result) == pytest.approx(EXPECTED_INSTANCE_BASED[True], abs=1e-12)
+    assert report.complete and report.reordered and report.num_aligned == 6
+
+    scores, overall_scores, report = extended.evaluate_aligned(read_text(gold_path), read_text(shuffled_path))
+    for row in EXPECTED_EXTENDED_ROWS:
+        assert row in extended.get_print_str(scores, overall_scores).split("\n")
+
+
+def test_aligned_missing_sentence(fixture_pair, tmp_path):
+    gold_path, system_path = fixture_pair
+    # Without "He did not go .", the system has 3 cues, 2 of which match one of the 4 gold cues
+    truncated_path = write_text(tmp_path / "truncated.txt", join_sentences(split_sentences(system_path)[:5]))
+
+    result, report = run_evaluation_aligned(gold_path, truncated_path)
+    assert (result.cue_precision, result.cue_recall) == pytest.approx((2 / 3, 1 / 2))
+    assert not report.complete and not report.reordered and report.missing == [("doc1", "3")]
+
+
+@pytest.mark.parametrize("retokenize", [False, True])
+def test_realign_tokens(fixture_pair, retokenize):
+    gold_path, system_path = fixture_pair
+    system_str = read_text(system_path)
+    if retokenize:
+        # "Yes ." has no instances, so merging its tokens does not change any score
+        system_str = system_str.replace("doc1\t2\t0\tYes\tyes\tUH\t*\t***\ndoc1\t2\t1\t.\t.\t.\t*\t***",
+                                        "doc1\t2\t0\tYes.\tyes.\tUH\t*\t***")
+    evaluation = extended.ExtendedEvaluation(realign_tokens=True)
+    for gold_rows, pred_rows in zip(sentence_rows_of(read_text(gold_path)), sentence_rows_of(system_str)):
+        evaluation.add_sentence(gold_rows, pred_rows)
+
+    for row in EXPECTED_EXTENDED_ROWS:
+        assert row in extended.get_print_str(*evaluation.get_scores()).split("\n")
+    assert len(evaluation.realigned_sentences) == int(retokenize)
+
+
+def test_project_label():
+    assert project_label("_", "cannot", "can") == "_"
+    # A label of the whole word covers the whole gold word
+    assert project_label("cannot", "cannot", "can") == "can"
+    # An affix label is only kept on gold words that contain it
+    assert project_label("not", "cannot", "not") == "not"
+    assert project_label("not", "cannot", "can") == "_"
+    # ... in the case of the gold word
+    assert project_label("Un", "Unhappy", "unhappy") == "un"
+    assert project_label("happy", "Unhappy", "unhappy") == "happy"
+
+
+def test_project_rows_affixes():
+    gold_rows = sentence_rows(["It", "can", "not", "be", "unhappy"], [["_"]] * 5)
+    system_rows = sentence_rows(["It", "cannot", "be", "Unhappy"],
+                                [("_", "It", "_"), ("not", "can", "_"), ("_", "be", "_"), ("Un", "happy", "happy")])
+
+    projected, distance = project_rows(gold_rows, system_rows)
+    labels = [tuple(cols[FIRST_INSTANCE_COLUMN:]) for cols in projected]
+    assert distance > 0
+    assert [cue for cue, _, _ in labels] == ["_", "_", "not", "_", "un"]
+    # The scope label "can" of the system token "cannot" is not part of the gold word it is aligned with
+    assert [scope for _, scope, _ in labels] == ["It", "_", "_", "be", "happy"]
@@ -0,0 +1,58 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Transparent reading of gzip/xz/bz2 compressed corpus files (myconll/compression.py)."""
+
+import bz2
+import gzip
+import lzma
+import shutil
+
+import pytest
+
+import myconll
+import starsem2012_eval_extended as extended
+from conftest import assert_same_result
+from myconll.compression import detect_compression, read_text
+from run_evaluation import run_evaluation_single
+
+COMPRESSIONS = [("gzip", gzip.open), ("xz", lzma.open), ("bz2", bz2.open)]
+
+
+def compress(path, opener, compressed_path):
+    with open(path, "rb") as f, opener(compressed_path, "wb") as compressed:
+        shutil.copyfileobj(f, compressed)
+    return str(compressed_path)
+
+
+@pytest.mark.parametrize("name, opener", COMPRESSIONS)
+def test_detected_by_magic_bytes(fixture_pair, tmp_path, name, opener):
+    gold_path, _ = fixture_pair
+    # No telling extension
+    compressed_path = compress(gold_path, opener, tmp_path / "gold.corpus")
+
+    assert detect_compression(compressed_path) == name
+    assert detect_compression(gold_path) is None
+    assert read_text(compressed_path) == read_text(gold_path)
+
+
+@pytest.mark.parametrize("name, opener", COMPRESSIONS)
+def test_compressed_corpus(fixture_pair, tmp_path, name, opener):
+    gold_path, system_path = fixture_pair
+    compressed_path = compress(gold_path, opener, tmp_path / "gold.corpus")
+
+    expected = [sentence.conll() for sentence in myconll.load_from_file(gold_path)]
+    assert [sentence.conll() for sentence in myconll.load_from_file(compressed_path)] == expected
+    assert [sentence.conll() for sentence in myconll.iter_from_file(compressed_path)] == expected
+    assert_same_result(run_evaluation_single(compressed_path, system_path),
+                       run_evaluation_single(gold_path, system_path))
+
+
+def test_compressed_extended(fixture_pair, tmp_path):
+    gold_path, system_path = fixture_pair
+    compressed_path = compress(system_path, gzip.open, tmp_path / "system.txt.gz")
+    assert extended.get_print_str(*extended.evaluate(read_text(gold_path), read_text(compressed_path))) == \
+        extended.get_print_str(*extended.evaluate(read_text(gold_path), read_text(system_path)))
@@ -0,0 +1,23 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""EvaluationResult and EvaluationCounts (eval_utils.py)."""
+
+import pytest
+
+from eval_utils import EvaluationResult
+
+
+def test_result_without_events():
+    result = EvaluationResult(0.5, 0.5, 0.5, 0.25, 0.25, 0.25)
+    assert result.event_precision is None and "Event" not in str(result)
+
+    with_events = EvaluationResult(1.0, 1.0, 1.0, 0.75, 0.75, 0.75, 1.0, 0.5, 2 / 3)
+    assert "Event F1:         66.7" in str(with_events)
+
+    average = EvaluationResult.average([result, with_events])
+    assert (average.cue_f1, average.scope_f1, average.event_f1) == (0.75, 0.5, None)
+    assert EvaluationResult.average([with_events, with_events]).event_f1 == pytest.approx(2 / 3)
@@ -0,0 +1,50 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""The list-based and the multiset-based process_independent of the extended *SEM 2012 script."""
+
+import copy
+
+import pytest
+
+import starsem2012_eval_extended as extended
+from bench_process_independent import parse_sentences
+from conftest import read_text
+from synthetic_corpus import generate_corpus_pair
+from test_scores import EXPECTED_EXTENDED_ROWS
+
+
+@pytest.mark.parametrize("min_instances", [0, 10 ** 6])
+def test_fixture_lists_and_multisets(fixture_pair, monkeypatch, min_instances):
+    monkeypatch.setattr(extended, "MULTISET_MIN_INSTANCES", min_instances)
+    gold_path, system_path = fixture_pair
+    output = extended.get_print_str(*extended.evaluate(read_text(gold_path), read_text(system_path)))
+    for row in EXPECTED_EXTENDED_ROWS:
+        assert row in output.split("\n")
+
+
+def test_many_instances_lists_and_multisets(monkeypatch):
+    gold_str, system_str = generate_corpus_pair(10, seed=3, min_instances=40, max_instances=60, max_tokens=40)
+    monkeypatch.setattr(extended, "MULTISET_MIN_INSTANCES", 0)
+    multisets = extended.get_print_str(*extended.evaluate(gold_str, system_str))
+    monkeypatch.setattr(extended, "MULTISET_MIN_INSTANCES", 10 ** 6)
+    assert extended.get_print_str(*extended.evaluate(gold_str, system_str)) == multisets
+
+
+# Both sides of MULTISET_MIN_INSTANCES (150 gold and predicted instances per sentence)
+@pytest.mark.parametrize("num_instances", [1, 5, 60, 100])
+def test_process_independent_lists_and_multisets(num_instances):
+    gold_str, system_str = generate_corpus_pair(10, seed=num_instances, min_instances=num_instances,
+                                                max_instances=num_instances, max_tokens=40)
+    sents = parse_sentences(gold_str, system_str)
+    plans = []
+    for func in (extended.process_independent_lists, extended.process_independent_multisets):
+        plan = extended.MetricPlan()
+        for gold_insts, pred_insts in copy.deepcopy(sents):
+            func(plan, gold_insts, pred_insts)
+        plans.append(plan)
+    assert any(plans[0].counts)
+    assert plans[0].counts == plans[1].counts
@@ -0,0 +1,62 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Results per group of documents (grouping.py), in the instance-based and the extended evaluation."""
+
+import pytest
+
+import starsem2012_eval_extended as extended
+from conftest import read_text
+from grouping import OTHER_GROUP, DocumentGrouping
+from run_evaluation import run_evaluation_grouped
+from test_scores import EXPECTED_EXTENDED_ROWS, EXPECTED_INSTANCE_BASED
+
+
+def split_sentences(path):
+    return read_text(path).strip().split("\n\n")
+
+
+def test_document_grouping():
+    assert DocumentGrouping("doc")("doc1") == "doc1"
+    grouping = DocumentGrouping("prefix:news,wiki")
+    assert [grouping(doc_id) for doc_id in ("wiki_1", "news_2", "blog_3")] == ["wiki", "news", OTHER_GROUP]
+    grouping = DocumentGrouping(r"regex:_(\d)")
+    assert [grouping(doc_id) for doc_id in ("wiki_1", "news_2", "blog")] == ["1", "2", OTHER_GROUP]
+
+
+@pytest.mark.parametrize("spec", ["docs", "prefix:", "regex:("])
+def test_invalid_grouping(spec):
+    with pytest.raises(ValueError):
+        DocumentGrouping(spec)
+
+
+def test_grouped(fixture_pair):
+    group_counts = run_evaluation_grouped(*fixture_pair, DocumentGrouping("doc"))
+    assert vars(group_counts.micro().to_result()) == pytest.approx(EXPECTED_INSTANCE_BASED[True], abs=1e-12)
+    assert group_counts.num_sentences == {"doc0": 2, "doc1": 4}
+
+    # Both cues of doc0 ("not", "im") match exactly, none of the two cues of doc1 do
+    results = group_counts.to_results()
+    assert (results["doc0"].cue_precision, results["doc0"].cue_recall) == (1, 1)
+    assert (results["doc1"].cue_precision, results["doc1"].cue_recall) == (0, 0)
+    assert group_counts.macro().cue_f1 == 0.5
+
+
+def test_grouped_extended(fixture_pair):
+    gold_path, system_path = fixture_pair
+    states = extended.evaluate_grouped(read_text(gold_path), read_text(system_path), DocumentGrouping("doc"))
+    assert list(states) == ["doc0", "doc1"]
+
+    # The counts of a group are those of its sentences evaluated on their own
+    evaluation = extended.ExtendedEvaluation()
+    evaluation.set_state(states["doc0"])
+    doc0_scores = extended.evaluate("\n\n".join(split_sentences(gold_path)[:2]),
+                                    "\n\n".join(split_sentences(system_path)[:2]))
+    assert extended.get_print_str(*evaluation.get_scores()) == extended.get_print_str(*doc0_scores)
+
+    evaluation.set_state([sum(values) for values in zip(*states.values())])
+    for row in EXPECTED_EXTENDED_ROWS:
+        assert row in extended.get_print_str(*evaluation.get_scores()).split("\n")
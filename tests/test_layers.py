@@ -0,0 +1,76 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Evaluation of several annotation layers in one pass (layers.py)."""
+
+import pytest
+
+from conftest import read_text, write_text
+from layers import AnnotationLayer, layer_rows
+from run_evaluation import run_evaluation_layers
+from test_scores import EXPECTED_INSTANCE_BASED
+
+PERFECT_RESULT = {"cue_precision": 1.0, "cue_recall": 1.0, "cue_f1": 1.0,
+                  "scope_precision": 1.0, "scope_recall": 1.0, "scope_f1": 1.0,
+                  "event_precision": 1.0, "event_recall": 1.0, "event_f1": 1.0}
+
+
+def instance_columns(line):
+    cols = line.split("\t")
+    return ["_"] * 3 if cols[7:] == ["***"] else cols[7:]
+
+
+def combine_layers(path, *layer_paths):
+    """Write a file with the token columns of the first layer file followed by the instance columns of all of
+    them (each fixture sentence has at most one instance).
+    """
+    layer_lines = [read_text(layer_path).split("\n") for layer_path in layer_paths]
+    lines = ["\t".join(line.split("\t")[:7] + [col for lines in layer_lines for col in instance_columns(lines[idx])])
+             if line else line for idx, line in enumerate(layer_lines[0])]
+    return write_text(path, "\n".join(lines))
+
+
+def test_from_spec():
+    layer = AnnotationLayer.from_spec("speculation:10-12=gold.txt,system.txt")
+    assert (layer.name, layer.columns, layer.gold_path, layer.system_path) == \
+        ("speculation", (10, 12), "gold.txt", "system.txt")
+    layer = AnnotationLayer.from_spec("negation").with_paths("gold.txt", "system.txt")
+    assert (layer.columns, layer.gold_path, layer.system_path) == (None, "gold.txt", "system.txt")
+
+
+@pytest.mark.parametrize("spec", [":7-9", "negation:7", "negation:7-8", "negation:4-6", "negation=gold.txt"])
+def test_invalid_spec(spec):
+    with pytest.raises(ValueError):
+        AnnotationLayer.from_spec(spec)
+
+
+def test_layer_rows():
+    rows = [["doc", "0", "0", "not", "not", "RB", "*", "_", "_", "_", "not", "_", "_"],
+            ["doc", "0", "1", "sure", "sure", "JJ", "*", "_", "_", "_", "_", "sure", "sure"]]
+    assert layer_rows(rows, (7, 9)) == [row[:7] + ["***"] for row in rows]
+    assert layer_rows(rows, (10, 12)) == [row[:7] + row[10:] for row in rows]
+    assert layer_rows(rows, None) is rows
+
+
+def test_layers(fixture_pair, tmp_path):
+    gold_path, system_path = fixture_pair
+    # Negation: the gold annotation on both sides; speculation: the fixture corpus
+    combined_gold = combine_layers(tmp_path / "gold.txt", gold_path, gold_path)
+    combined_system = combine_layers(tmp_path / "system.txt", gold_path, system_path)
+
+    layers = [AnnotationLayer("negation", columns=(7, 9)), AnnotationLayer("speculation", columns=(10, 12))]
+    results = run_evaluation_layers([layer.with_paths(combined_gold, combined_system) for layer in layers])
+    assert list(results) == ["negation", "speculation"]
+    assert vars(results["negation"]) == pytest.approx(PERFECT_RESULT)
+    assert vars(results["speculation"]) == pytest.approx(EXPECTED_INSTANCE_BASED[True], abs=1e-12)
+
+
+def test_empty_layer(fixture_pair):
+    # Columns 10-12 are beyond the instances of the fixture files
+    layers = [AnnotationLayer("negation", columns=(7, 9)), AnnotationLayer("speculation", columns=(10, 12))]
+    results = run_evaluation_layers([layer.with_paths(*fixture_pair) for layer in layers])
+    assert vars(results["negation"]) == pytest.approx(EXPECTED_INSTANCE_BASED[True], abs=1e-12)
+    assert set(vars(results["speculation"]).values()) == {0}
@@ -0,0 +1,80 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Evaluation matrix (matrix.py)."""
+
+import csv
+import json
+import os
+
+import pytest
+
+from conftest import read_text, write_text
+from matrix import Manifest, check_output_format, evaluate_matrix, write_matrix
+from test_layers import PERFECT_RESULT
+from test_scores import EXPECTED_INSTANCE_BASED
+
+# The two sentences of doc0: both cues match. Scopes, with the '_' placeholders of the instances: the system
+# matches 4 of the 5 tokens of "He was not happy ." and 2 of the 4 tokens of "It was impossible ." ("possible"
+# and "."). The event "happy" is correct, "possible" is missed.
+EXPECTED_DOC0 = {"cue_precision": 1.0, "cue_recall": 1.0, "cue_f1": 1.0,
+                 "scope_precision": 0.65, "scope_recall": 0.65, "scope_f1": 0.65,
+                 "event_precision": 1.0, "event_recall": 0.5, "event_f1": 2 / 3}
+
+
+def first_sentences(path, num_sentences):
+    return "\n\n".join(read_text(path).split("\n\n")[:num_sentences]) + "\n"
+
+
+@pytest.fixture
+def manifest_path(fixture_pair, tmp_path):
+    """A manifest of two gold sets (the fixture corpus and its first document) and three systems, one of them
+    given by a path template.
+    """
+    gold_path, system_path = fixture_pair
+    write_text(tmp_path / "dev.txt", read_text(gold_path))
+    write_text(tmp_path / "test.txt", first_sentences(gold_path, 2))
+    os.makedirs(str(tmp_path / "a"))
+    write_text(tmp_path / "a" / "dev.txt", read_text(system_path))
+    write_text(tmp_path / "b-dev.txt", read_text(system_path))
+    write_text(tmp_path / "b-test.txt", first_sentences(system_path, 2))
+
+    manifest = {"gold": {"dev": "dev.txt", "test": "test.txt"},
+                "systems": {"a": "a/{gold}.txt", "b": {"dev": "b-dev.txt", "test": "b-test.txt"},
+                            "gold": {"test": "test.txt"}}}
+    return write_text(tmp_path / "manifest.json", json.dumps(manifest))
+
+
+# With 4 workers, the pairs of the dev set are split into two tasks, which share the parsed gold corpus
+@pytest.mark.parametrize("jobs", [1, 2, 4])
+def test_matrix(manifest_path, jobs, tmp_path):
+    results = evaluate_matrix(Manifest.from_file(manifest_path), jobs=jobs)
+
+    # System a has no output for the test set
+    assert list(results) == [("a", "dev"), ("b", "dev"), ("b", "test"), ("gold", "test")]
+    expected = [EXPECTED_INSTANCE_BASED[True], EXPECTED_INSTANCE_BASED[True], EXPECTED_DOC0, PERFECT_RESULT]
+    for result, expected_result in zip(results.values(), expected):
+        assert vars(result) == pytest.approx(expected_result, abs=1e-12)
+
+    write_matrix(results, str(tmp_path / "matrix.csv"))
+    with open(str(tmp_path / "matrix.csv"), newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [(row["system"], row["gold"]) for row in rows] == list(results)
+    assert float(rows[2]["scope_f1"]) == pytest.approx(0.65)
+
+
+@pytest.mark.parametrize("missing", ["b-test.txt", "test.txt"])
+def test_manifest_missing_files(manifest_path, tmp_path, missing):
+    os.remove(str(tmp_path / missing))
+    with pytest.raises(ValueError, match="missing .*" + missing):
+        Manifest.from_file(manifest_path)
+
+
+def test_check_output_format():
+    assert check_output_format("matrix.CSV") == "csv"
+    assert check_output_format("matrix.out", "json") == "json"
+    with pytest.raises(ValueError, match="Unknown output format out"):
+        check_output_format("matrix.out")
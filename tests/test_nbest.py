@@ -0,0 +1,85 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""N-best evaluation (nbest.py): the fixture system output and the gold annotation as two hypotheses."""
+
+import pytest
+
+from conftest import NUM_SENTENCES, assert_same_result, write_text
+from nbest import NUM_GOLD, NUM_SYSTEM, evaluate_nbest, hypothesis_layers
+from run_evaluation import run_evaluation_single
+from synthetic_corpus import generate_corpus_pair
+from test_layers import PERFECT_RESULT
+from test_scores import EXPECTED_INSTANCE_BASED
+
+
+def select_columns(corpus_str, columns):
+    """Return a corpus with the token columns and the given instance columns of every line of corpus_str."""
+    sentences = []
+    for sentence in corpus_str.strip().split("\n\n"):
+        rows = [line.split("\t") for line in sentence.split("\n")]
+        sentences.append("\n".join("\t".join(cols[:7] + [cols[idx] for idx in columns]) for cols in rows))
+    return "\n\n".join(sentences) + "\n\n"
+
+
+@pytest.fixture
+def hypotheses(fixture_pair):
+    gold_path, system_path = fixture_pair
+    return hypothesis_layers(gold_path, system_paths=[system_path, gold_path])
+
+
+def test_hypotheses_and_oracle(hypotheses):
+    counts = evaluate_nbest(hypotheses)
+    results = counts.to_results()
+    assert vars(results["hypothesis 1"]) == pytest.approx(EXPECTED_INSTANCE_BASED[True], abs=1e-12)
+    assert vars(results["hypothesis 2"]) == pytest.approx(PERFECT_RESULT)
+
+    # The gold hypothesis is better in every sentence but "Yes .", where both have no instances
+    assert vars(results["oracle"]) == pytest.approx(PERFECT_RESULT)
+    assert counts.oracle_choices.tolist() == [1, 5]
+
+    # Uniform weights: (2 + 4) / 2 expected matches of (4 + 4) / 2 expected system and gold cues
+    assert (results["expected"].cue_precision, results["expected"].cue_recall) == pytest.approx((0.75, 0.75))
+
+
+def test_identical_hypotheses(fixture_pair):
+    gold_path, system_path = fixture_pair
+    results = evaluate_nbest(hypothesis_layers(gold_path, system_paths=[system_path] * 3)).to_results()
+    for name in ("hypothesis 1", "hypothesis 3", "oracle", "expected"):
+        assert vars(results[name]) == pytest.approx(EXPECTED_INSTANCE_BASED[True], abs=1e-12)
+
+
+def test_scores(hypotheses, tmp_path):
+    # The first hypothesis is much more likely in every sentence
+    scores_path = write_text(tmp_path / "scores.txt", "0 -1000\n" * 6)
+    results = evaluate_nbest(hypotheses, scores_path=scores_path).to_results()
+    assert vars(results["expected"]) == pytest.approx(EXPECTED_INSTANCE_BASED[True], abs=1e-12)
+
+
+@pytest.mark.parametrize("scores, message", [("0 -1\n" * 5, "fewer lines"), ("0 -1\n" * 7, "more lines"),
+                                             ("0 -1\n" * 5 + "0\n", "1 scores")])
+def test_invalid_scores(hypotheses, tmp_path, scores, message):
+    with pytest.raises(ValueError, match=message):
+        evaluate_nbest(hypotheses, scores_path=write_text(tmp_path / "scores.txt", scores))
+
+
+def test_column_groups_keep_all_gold_instances(tmp_path):
+    # Every gold sentence has 3 instances; each hypothesis is one of them (a group of one column triple)
+    gold_str, _ = generate_corpus_pair(NUM_SENTENCES, seed=2, min_instances=3, max_instances=3)
+    gold_path = write_text(tmp_path / "gold.txt", gold_str)
+    layers = hypothesis_layers(gold_path, system_path=gold_path, column_groups=[(7, 9), (10, 12)])
+    counts = evaluate_nbest(layers)
+
+    # Every hypothesis is scored against all gold instances, and finds all of its own instances there
+    assert counts.hypotheses[:, NUM_GOLD].tolist() == [3 * NUM_SENTENCES] * 2
+    assert counts.hypotheses[:, NUM_SYSTEM].tolist() == [NUM_SENTENCES] * 2
+
+    # Synthetic instances may share their cue, so the scores themselves come from the plain evaluation of every
+    # column group against the full gold file
+    results = counts.to_results()
+    for name, columns in (("hypothesis 1", [7, 8, 9]), ("hypothesis 2", [10, 11, 12])):
+        hypothesis_path = write_text(tmp_path / "hypothesis.txt", select_columns(gold_str, columns))
+        assert_same_result(results[name], run_evaluation_single(gold_path, hypothesis_path))
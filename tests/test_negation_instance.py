@@ -0,0 +1,60 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Negation instances of the fixture corpus, and compact instances against full ones."""
+
+import gc
+import weakref
+
+import myconll
+from conftest import FIXTURE_GOLD, assert_same_result
+from negation_instance import SentenceTextIndex, read_negation_instances_from_corpus
+from run_evaluation import evaluate_sents
+
+# Labelled (index, form) cue, scope and event tokens of the gold instances, by sentence. Like NegationInstances,
+# compact instances keep a ("_") placeholder for every other token of the sentence.
+EXPECTED_GOLD_INSTANCES = [
+    [((("2", "not"),), (("0", "He"), ("1", "was"), ("3", "happy")), (("3", "happy"),))],
+    [((("2", "im"),), (("0", "It"), ("1", "was"), ("2", "possible")), (("2", "possible"),))],
+    [((("1", "neither"), ("3", "nor")), (("0", "He"), ("2", "ate"), ("4", "drank")), (("2", "ate"),))],
+    [],
+    [],
+    [((("2", "not"),), (("0", "He"), ("1", "did"), ("3", "go")), (("3", "go"),))],
+]
+
+
+def labelled(span):
+    return tuple((i, form) for i, form in span if form != "_")
+
+
+def test_compact_instances():
+    text_index = SentenceTextIndex()
+    neg_sents = read_negation_instances_from_corpus(myconll.iter_from_file(FIXTURE_GOLD), compact=True,
+                                                    text_index=text_index)
+    assert [[(labelled(inst.cue), labelled(inst.scope), labelled(inst.event)) for inst in neg_insts]
+            for neg_insts in neg_sents] == EXPECTED_GOLD_INSTANCES
+
+    (neither_nor,) = neg_sents[2]
+    assert neither_nor.scope_length == 6 and neither_nor.has_event
+    assert neither_nor.sentence_text(text_index) == "He neither ate nor drank ."
+    assert len(text_index) == 6
+
+
+def test_compact_instances_do_not_pin_sentences():
+    sentences = list(myconll.iter_from_file(FIXTURE_GOLD))
+    sentence_ref = weakref.ref(sentences[0])
+    neg_sents = read_negation_instances_from_corpus(sentences, compact=True)
+    del sentences
+    gc.collect()
+    assert sentence_ref() is None and neg_sents[0]
+
+
+def test_compact_and_full_instances(corpus_pair):
+    gold_path, system_path = corpus_pair
+    results = [evaluate_sents(read_negation_instances_from_corpus(myconll.iter_from_file(gold_path), compact=compact),
+                              read_negation_instances_from_corpus(myconll.iter_from_file(system_path), compact=compact))
+               for compact in (False, True)]
+    assert_same_result(*results)
@@ -0,0 +1,59 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""The threaded evaluation pipeline (pipeline.py) against the sequential evaluation."""
+
+import pytest
+
+import run_evaluation
+from conftest import assert_same_result, read_text, write_text
+from pipeline import run_evaluation_pipelined
+from run_evaluation import run_evaluation_single
+
+
+@pytest.fixture
+def long_pair(fixture_pair, tmp_path):
+    """The fixture corpus repeated 50 times, so that the queues fill up."""
+    gold_path, system_path = fixture_pair
+    return (write_text(tmp_path / "gold.txt", read_text(gold_path) * 50),
+            write_text(tmp_path / "system.txt", read_text(system_path) * 50))
+
+
+@pytest.mark.parametrize("num_parsers, queue_size", [(1, 1), (2, 256), (3, 4)])
+@pytest.mark.parametrize("normalize_scopes", [True, False])
+def test_pipelined(long_pair, num_parsers, queue_size, normalize_scopes):
+    result, stats = run_evaluation_pipelined(*long_pair, normalize_scopes=normalize_scopes,
+                                             num_parsers=num_parsers, queue_size=queue_size)
+    assert_same_result(result, run_evaluation_single(*long_pair, normalize_scopes=normalize_scopes))
+
+    for queue_stats in stats.queues:
+        assert queue_stats.maxsize == queue_size and queue_stats.max_depth <= queue_size
+    assert "Pipeline statistics" in str(stats)
+
+
+def test_pipelined_cli_path(fixture_pair, monkeypatch):
+    all_stats = []
+
+    def pipelined(*args, **kwargs):
+        result, stats = run_evaluation_pipelined(*args, **kwargs)
+        all_stats.append(stats)
+        return result, stats
+
+    monkeypatch.setattr(run_evaluation, "run_evaluation_pipelined", pipelined)
+    assert_same_result(run_evaluation_single(*fixture_pair, pipelined=True), run_evaluation_single(*fixture_pair))
+    assert_same_result(run_evaluation_single(*fixture_pair, pipelined=True, pipeline_parsers=3, pipeline_queue_size=4),
+                       run_evaluation_single(*fixture_pair))
+
+    # The default and the given number of parsers and queue size reach the pipeline
+    for stats, num_parsers, queue_size in zip(all_stats, (2, 3), (256, 4)):
+        assert [stage.num_workers for stage in stats.stages if stage.name == "parse"] == [num_parsers]
+        assert {queue_stats.maxsize for queue_stats in stats.queues} == {queue_size}
+
+
+def test_missing_file(fixture_pair, tmp_path):
+    gold_path, _ = fixture_pair
+    with pytest.raises(FileNotFoundError):
+        run_evaluation_pipelined(gold_path, str(tmp_path / "missing.txt"), queue_size=1)
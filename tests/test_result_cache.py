@@ -0,0 +1,69 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""The result cache (result_cache.py) and its use in run_evaluation.py."""
+
+import pytest
+
+import run_evaluation
+from conftest import write_text
+from result_cache import ResultCache, source_version
+from run_evaluation import run_evaluation_single
+from test_scores import EXPECTED_INSTANCE_BASED
+
+
+def fail(*args, **kwargs):
+    raise AssertionError("evaluated on a cache hit")
+
+
+def test_cache(fixture_pair, tmp_path, monkeypatch):
+    gold_path, system_path = fixture_pair
+    with ResultCache(str(tmp_path / "cache.sqlite")) as cache:
+        for normalize_scopes in (True, False):
+            result = run_evaluation_single(gold_path, system_path, normalize_scopes=normalize_scopes, cache=cache)
+            assert vars(result) == pytest.approx(EXPECTED_INSTANCE_BASED[normalize_scopes], abs=1e-12)
+
+        # The second runs are cache hits, also with a different number of workers
+        monkeypatch.setattr(run_evaluation, "read_negation_instances_from_corpus", fail)
+        for normalize_scopes in (True, False):
+            result = run_evaluation_single(gold_path, system_path, normalize_scopes=normalize_scopes, cache=cache,
+                                           jobs=2)
+            assert vars(result) == pytest.approx(EXPECTED_INSTANCE_BASED[normalize_scopes], abs=1e-12)
+
+        # A different system file is a miss
+        with pytest.raises(AssertionError, match="cache hit"):
+            run_evaluation_single(gold_path, gold_path, cache=cache)
+
+
+@pytest.mark.parametrize("option", [{"sentence_stats": "stats"}, {"align_keys": True}, {"pipeline_stats": True},
+                                    {"jobs": 2, "schedule_stats": True}])
+def test_cache_rejects_reports(fixture_pair, tmp_path, option):
+    with ResultCache(str(tmp_path / "cache.sqlite")) as cache:
+        with pytest.raises(ValueError):
+            run_evaluation_single(*fixture_pair, cache=cache, **option)
+
+
+def test_lru_eviction(tmp_path):
+    with ResultCache(str(tmp_path / "cache.sqlite"), max_bytes=10) as cache:
+        cache.put("a", "1234")
+        cache.put("b", "1234")
+        assert cache.get("a") == "1234"
+        # "b" is the least recently used entry
+        cache.put("c", "1234")
+        assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("1234", None, "1234")
+        # Too large to be stored
+        cache.put("d", "12345678901")
+        assert cache.get("d") is None
+
+
+def test_source_version(tmp_path):
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    write_text(source_dir / "module.py", "x = 1\n")
+    version = source_version(str(source_dir))
+    assert source_version(str(source_dir)) == version
+    write_text(source_dir / "module.py", "x = 2\n")
+    assert source_version(str(source_dir)) != version
@@ -0,0 +1,51 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Chunk scheduling (scheduling.py) and the evaluations on worker processes."""
+
+import pytest
+
+import starsem2012_eval_extended as extended
+from conftest import FIXTURE_GOLD, FIXTURE_SYSTEM, read_text
+from run_evaluation import run_evaluation_single
+from scheduling import CostModel, estimate_costs, pack_chunks, sentence_shape, split_sentences
+from test_scores import EXPECTED_EXTENDED_ROWS, EXPECTED_INSTANCE_BASED
+
+
+def test_sentence_shapes():
+    assert [sentence_shape(sentence) for sentence in split_sentences(read_text(FIXTURE_GOLD))] == \
+        [(5, 1), (4, 1), (6, 1), (5, 0), (2, 0), (5, 1)]
+
+
+def test_estimate_costs():
+    gold_sentences = split_sentences(read_text(FIXTURE_GOLD))
+    system_sentences = split_sentences(read_text(FIXTURE_SYSTEM))
+    # Tokens times the gold and system instances: the system has no instance in sentence 2, but one in sentence 3
+    costs = estimate_costs(gold_sentences, system_sentences, CostModel(sentence=0, token=0, instance=0,
+                                                                      token_instance=1))
+    assert costs.tolist() == [10, 8, 6, 5, 0, 10]
+    # A sentence missing on the system side
+    costs = estimate_costs(gold_sentences, system_sentences[:5], CostModel(sentence=1, token=0, instance=1,
+                                                                          token_instance=0))
+    assert costs.tolist() == [3, 3, 2, 2, 1, 2]
+
+
+def test_pack_chunks():
+    # The target cost of a chunk is 16 / 3; the sentence of cost 10 gets a chunk of its own
+    assert pack_chunks([1, 1, 1, 1, 10, 1, 1], 3) == [(0, 4), (4, 5), (5, 7)]
+    assert pack_chunks([1, 1, 1], 10) == [(0, 1), (1, 2), (2, 3)]
+    assert pack_chunks([], 2) == []
+
+
+def test_parallel(fixture_pair):
+    assert vars(run_evaluation_single(*fixture_pair, jobs=2)) == \
+        pytest.approx(EXPECTED_INSTANCE_BASED[True], abs=1e-12)
+
+    gold_path, system_path = fixture_pair
+    scores, overall_scores, report = extended.evaluate_parallel(read_text(gold_path), read_text(system_path), 2)
+    for row in EXPECTED_EXTENDED_ROWS:
+        assert row in extended.get_print_str(scores, overall_scores).split("\n")
+    assert report.jobs == 2 and sum(end - start for start, end in report.chunks) == 6
@@ -0,0 +1,125 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Scores of all three evaluations on the fixture corpus (see conftest.py), as computed by the original scripts,
+and of the one-pass driver (run_all_metrics.py)."""
+
+import subprocess
+import sys
+
+import pytest
+
+import run_all_metrics
+import starsem2012_eval_extended as extended
+from conftest import ROOT_DIR, read_text, write_text
+from run_evaluation import run_evaluation_single
+
+# Cues: 2 of the 4 gold and 4 system cues match exactly (sentences 0 and 1).
+# Events of these matches: "happy" is correct, the system misses "possible". Normalized, this gives a precision
+# of (1 + 1) / 4 system instances and a recall of (1 + 0) / 4 gold instances. Over tokens, 1 of the 2 system
+# event tokens ("happy", "go") and 1 of the 4 gold event tokens ("happy", "possible", "ate", "go") are correct.
+EXPECTED_EVENTS = {"event_precision": 0.5, "event_recall": 0.25, "event_f1": 1 / 3}
+EXPECTED_INSTANCE_BASED = {
+    True: {"cue_precision": 0.5, "cue_recall": 0.5, "cue_f1": 0.5,
+           "scope_precision": 0.325, "scope_recall": 0.325, "scope_f1": 0.325, **EXPECTED_EVENTS},
+    False: {"cue_precision": 0.5, "cue_recall": 0.5, "cue_f1": 0.5,
+            "scope_precision": 6 / 19, "scope_recall": 0.3, "scope_f1": 0.3076923076923077, **EXPECTED_EVENTS},
+}
+# Without events, the two matched instances have no event on either side: correct when normalized, while no
+# event tokens are scored over tokens
+EXPECTED_WITHOUT_EVENTS = {
+    True: {**EXPECTED_INSTANCE_BASED[True], "event_precision": 0.5, "event_recall": 0.5, "event_f1": 0.5},
+    False: {**EXPECTED_INSTANCE_BASED[False], "event_precision": 0.0, "event_recall": 0.0, "event_f1": 0.0},
+}
+
+EXPECTED_TRANSLATED_ROWS = [
+    "Cues:                            4 |      4 |    2 |    1 |    2 |         66.67 |      50.00 |   57.14",
+    "Scopes(cue match):               4 |      4 |    0 |    1 |    4 |          0.00 |       0.00 |    0.00",
+    "Scope tokens(no cue match):     12 |      7 |    6 |    1 |    6 |         85.71 |      50.00 |   63.16",
+    "Negated(no cue match):           4 |      2 |    2 |    0 |    2 |        100.00 |      50.00 |   66.67",
+    "Cues B:                          4 |      4 |    2 |    1 |    2 |         50.00 |      50.00 |   50.00",
+    "Scopes B (no cue match):         4 |      4 |    1 |    1 |    3 |         25.00 |      25.00 |   25.00",
+    " % correct sentences: 16.67",
+]
+# The original script (-e) reports the true positives of "Scopes(cue match)" for "Scopes(no cue match)"
+EXPECTED_SCOPES_NO_CUE_MATCH = {
+    False: "Scopes(no cue match):            4 |      4 |    1 |    1 |    3 |         50.00 |      25.00 |   33.33",
+    True: "Scopes(no cue match):            4 |      4 |    0 |    1 |    3 |         50.00 |      25.00 |   33.33",
+}
+
+# Token-level cues: "not", "im", "neither", "nor", "not" in gold, "not", "im", "door", "did", "not" in the system;
+# scope-level cues: the exact matches in sentences 0 and 1
+EXPECTED_EXTENDED_ROWS = [
+    "Cue:                                 5 |      5 |    3 |    2 |    2 |         60.00 |      60.00 |   60.00",
+    "Scope (full cue):                   12 |      7 |    3 |    4 |    9 |         42.86 |      25.00 |   31.58",
+    "Event (full cue):                    4 |      2 |    1 |    1 |    3 |         50.00 |      25.00 |   33.33",
+    "Cue:                                 4 |      4 |    2 |    2 |    2 |         50.00 |      50.00 |   50.00",
+    "Cue:                                 4 |      4 |    2 |    1 |    2 |         66.67 |      50.00 |   57.14",
+    "Event (full cue):                    4 |      2 |    1 |    0 |    3 |        100.00 |      25.00 |   40.00",
+    " % correct sentences: 16.67",
+]
+
+
+@pytest.mark.parametrize("normalize_scopes", [True, False])
+def test_instance_based(fixture_pair, normalize_scopes):
+    result = run_evaluation_single(*fixture_pair, normalize_scopes=normalize_scopes)
+    assert vars(result) == pytest.approx(EXPECTED_INSTANCE_BASED[normalize_scopes], abs=1e-12)
+
+
+def remove_events(path, out_path):
+    """Write the corpus at path without events (the last column of every instance) to out_path."""
+    lines = []
+    for line in read_text(path).split("\n"):
+        cols = line.split("\t")
+        if len(cols) > 8:
+            cols[9::3] = ["_"] * len(cols[9::3])
+        lines.append("\t".join(cols))
+    return write_text(out_path, "\n".join(lines))
+
+
+@pytest.mark.parametrize("normalize_scopes", [True, False])
+def test_without_events(fixture_pair, tmp_path, normalize_scopes):
+    gold_path, system_path = (remove_events(path, tmp_path / name)
+                              for path, name in zip(fixture_pair, ("gold.txt", "system.txt")))
+    result = run_evaluation_single(gold_path, system_path, normalize_scopes=normalize_scopes)
+    assert vars(result) == pytest.approx(EXPECTED_WITHOUT_EVENTS[normalize_scopes], abs=1e-12)
+    result, _, _ = run_all_metrics.evaluate_all(gold_path, system_path, normalize_scopes=normalize_scopes)
+    assert vars(result) == pytest.approx(EXPECTED_WITHOUT_EVENTS[normalize_scopes], abs=1e-12)
+
+
+def run_translated(gold_path, system_path, starsem_exact=False):
+    # The translated script keeps its counts in module globals, so every evaluation gets its own process
+    code = ("import sys; sys.path.insert(0, {!r}); import starsem2012_eval_translated as translated; "
+            "translated.main({!r}, {!r}, starsem_exact={!r})").format(
+        ROOT_DIR + "/starsem_eval", gold_path, system_path, starsem_exact)
+    return subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+
+
+@pytest.mark.parametrize("starsem_exact", [False, True])
+def test_translated(fixture_pair, starsem_exact):
+    output = run_translated(*fixture_pair, starsem_exact=starsem_exact)
+    for row in EXPECTED_TRANSLATED_ROWS + [EXPECTED_SCOPES_NO_CUE_MATCH[starsem_exact]]:
+        assert row in output.split("\n")
+
+
+def test_extended(fixture_pair):
+    gold_path, system_path = fixture_pair
+    output = extended.get_print_str(*extended.evaluate(read_text(gold_path), read_text(system_path)))
+    for row in EXPECTED_EXTENDED_ROWS:
+        assert row in output.split("\n")
+
+
+@pytest.mark.parametrize("normalize_scopes", [True, False])
+@pytest.mark.parametrize("starsem_exact", [False, True])
+def test_evaluate_all(fixture_pair, normalize_scopes, starsem_exact):
+    result, translated_str, (scores, overall_scores) = run_all_metrics.evaluate_all(
+        *fixture_pair, normalize_scopes=normalize_scopes, starsem_exact=starsem_exact)
+
+    assert vars(result) == pytest.approx(EXPECTED_INSTANCE_BASED[normalize_scopes], abs=1e-12)
+    for row in EXPECTED_TRANSLATED_ROWS + [EXPECTED_SCOPES_NO_CUE_MATCH[starsem_exact]]:
+        assert row in translated_str.split("\n")
+    for row in EXPECTED_EXTENDED_ROWS:
+        assert row in extended.get_print_str(scores, overall_scores).split("\n")
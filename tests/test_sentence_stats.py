@@ -0,0 +1,66 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Incremental re-scoring with per-sentence statistics files (sentence_stats.py), in the instance-based and the
+extended evaluation.
+"""
+
+import pytest
+
+import starsem2012_eval_extended as extended
+from conftest import read_text, write_text
+from run_evaluation import run_evaluation_incremental, run_evaluation_single
+from test_scores import EXPECTED_EXTENDED_ROWS, EXPECTED_INSTANCE_BASED
+
+
+@pytest.fixture
+def system_copy(fixture_pair, tmp_path):
+    """A copy of the fixture system file, which the tests change."""
+    _, system_path = fixture_pair
+    return write_text(tmp_path / "system.txt", read_text(system_path))
+
+
+def fix_last_sentence(gold_path, system_path):
+    """Replace the last system sentence ("He did not go .", with the cue "did not") by the gold sentence."""
+    sentences = read_text(system_path).strip().split("\n\n")
+    sentences[-1] = read_text(gold_path).strip().split("\n\n")[-1]
+    write_text(system_path, "\n\n".join(sentences) + "\n")
+
+
+@pytest.mark.parametrize("normalize_scopes", [True, False])
+def test_incremental(fixture_pair, system_copy, tmp_path, normalize_scopes):
+    gold_path, _ = fixture_pair
+    stats_path = str(tmp_path / "stats")
+    for num_rescored in (6, 0):
+        result, rescoring_stats = run_evaluation_incremental(gold_path, system_copy, stats_path,
+                                                             normalize_scopes=normalize_scopes)
+        assert vars(result) == pytest.approx(EXPECTED_INSTANCE_BASED[normalize_scopes], abs=1e-12)
+        assert rescoring_stats.num_rescored == num_rescored
+
+    # Only the changed sentence is re-scored; its cue now matches, so 3 of the 4 gold and system cues match
+    fix_last_sentence(gold_path, system_copy)
+    result, rescoring_stats = run_evaluation_incremental(gold_path, system_copy, stats_path,
+                                                         normalize_scopes=normalize_scopes)
+    assert rescoring_stats.num_rescored == 1
+    assert (result.cue_precision, result.cue_recall) == (0.75, 0.75)
+    assert vars(result) == pytest.approx(
+        vars(run_evaluation_single(gold_path, system_copy, normalize_scopes=normalize_scopes)), abs=1e-12)
+
+
+def test_incremental_extended(fixture_pair, system_copy, tmp_path):
+    gold_path, _ = fixture_pair
+    stats_path = str(tmp_path / "stats")
+    for num_rescored in (6, 0):
+        scores, overall_scores, rescoring_stats = extended.evaluate_incremental(gold_path, system_copy, stats_path)
+        for row in EXPECTED_EXTENDED_ROWS:
+            assert row in extended.get_print_str(scores, overall_scores).split("\n")
+        assert rescoring_stats.num_rescored == num_rescored
+
+    fix_last_sentence(gold_path, system_copy)
+    scores, overall_scores, rescoring_stats = extended.evaluate_incremental(gold_path, system_copy, stats_path)
+    assert rescoring_stats.num_rescored == 1
+    assert extended.get_print_str(scores, overall_scores) == \
+        extended.get_print_str(*extended.evaluate(read_text(gold_path), read_text(system_copy)))
@@ -0,0 +1,58 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Gold corpora in shared memory (shared_corpus.py)."""
+
+import io
+
+import pytest
+
+import myconll
+from conftest import FIXTURE_GOLD, write_text
+from matrix import evaluate_task
+from myconll.writer import StarsemWriter
+from negation_instance import read_negation_instances_from_corpus
+from shared_corpus import SharedCorpus
+from test_scores import EXPECTED_INSTANCE_BASED
+
+
+def instance_fields(neg_sents):
+    return [[(inst.id, inst.sent_idx, inst.cue, inst.scope, inst.event, inst.affix_cue,
+              inst.num_neg_instances_in_sent) for inst in neg_insts] for neg_insts in neg_sents]
+
+
+def assert_same_instances(shared_corpus, path):
+    expected = read_negation_instances_from_corpus(myconll.iter_from_file(path), compact=True)
+    assert len(shared_corpus) == len(expected)
+    assert instance_fields(shared_corpus) == instance_fields(expected)
+
+
+def test_fixture_instances():
+    with SharedCorpus.from_file(FIXTURE_GOLD) as corpus:
+        assert_same_instances(corpus, FIXTURE_GOLD)
+        assert [corpus.doc_id(idx) for idx in range(len(corpus))] == ["doc0"] * 2 + ["doc1"] * 4
+
+
+def test_many_instances(tmp_path):
+    # 70 instances need two 64-bit words per token: instance i has the cue "un" (an affix) on token i and the
+    # scope on token i + 1
+    forms = ["unclear"] * 71
+    out = io.StringIO()
+    with StarsemWriter(out) as writer:
+        writer.write_instances("doc", 0, forms, [({i: "un"}, {i + 1: "clear"}, ()) for i in range(70)])
+    path = write_text(tmp_path / "many.txt", out.getvalue())
+
+    with SharedCorpus.from_file(path) as corpus:
+        assert_same_instances(corpus, path)
+        assert len(corpus.sentence_instances(0)) == 70
+
+
+def test_evaluate_task(fixture_pair):
+    gold_path, system_path = fixture_pair
+    with SharedCorpus.from_file(gold_path) as corpus:
+        results = evaluate_task(corpus.handle, [system_path, gold_path])
+    assert vars(results[0]) == pytest.approx(EXPECTED_INSTANCE_BASED[True], abs=1e-12)
+    assert results[1].cue_f1 == results[1].scope_f1 == results[1].event_f1 == 1
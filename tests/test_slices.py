@@ -0,0 +1,70 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Breakdown of the instance-based evaluation by slices (slices.py).
+
+The instances of the fixture corpus (see conftest.py), with their scope_length (the length of the scope span,
+including the '_' placeholders of the unlabelled tokens of the sentence):
+  gold: "not" (5), "im" (affix, 4), "neither ... nor" (multiword, 6), "not" (5);
+  system: "not" (5), "im" (affix, 4), "door" (5), "did not" (multiword, 5).
+The first two instances match; all instances are the only ones in their sentence.
+"""
+
+import pytest
+
+from run_evaluation import run_evaluation_slices
+from slices import SliceCounts
+from test_scores import EXPECTED_INSTANCE_BASED
+
+# Gold, system, matched gold and matched system instances per slice
+EXPECTED_INSTANCE_COUNTS = {
+    ("cue type", "word"): [3, 3, 1, 1],
+    ("cue type", "affix"): [1, 1, 1, 1],
+    ("cue length", "single-word"): [3, 3, 2, 2],
+    ("cue length", "multiword"): [1, 1, 0, 0],
+    ("scope length", "0"): [0, 0, 0, 0],
+    ("scope length", "1-5"): [3, 4, 2, 2],
+    ("scope length", "6-10"): [1, 0, 0, 0],
+    ("scope length", "11-20"): [0, 0, 0, 0],
+    ("scope length", "21+"): [0, 0, 0, 0],
+    ("negations in sentence", "single"): [4, 4, 2, 2],
+    ("negations in sentence", "multiple"): [0, 0, 0, 0],
+}
+INSTANCE_COLUMNS = [SliceCounts.NUM_GOLD, SliceCounts.NUM_SYSTEM, SliceCounts.NUM_MATCHED_GOLD,
+                    SliceCounts.NUM_MATCHED_SYSTEM]
+
+
+def test_slices(fixture_pair):
+    result, slice_counts = run_evaluation_slices(*fixture_pair)
+    assert vars(result) == pytest.approx(EXPECTED_INSTANCE_BASED[True], abs=1e-12)
+
+    assert dict(zip(slice_counts.slice_names, slice_counts.tensor[:, INSTANCE_COLUMNS].tolist())) == \
+        EXPECTED_INSTANCE_COUNTS
+
+    # The scope of "not" (with the '_' placeholders of the instance) is 4/5 correct, that of "im" 2/4; the event of
+    # "not" is correct and that of "im" is missed
+    results = slice_counts.to_results()
+    affix, word = results[("cue type", "affix")], results[("cue type", "word")]
+    assert (affix.cue_precision, affix.scope_precision, affix.event_precision, affix.event_recall) == \
+        pytest.approx((1, 0.5, 1, 0))
+    assert (word.cue_precision, word.cue_recall, word.scope_precision, word.event_precision) == \
+        pytest.approx((1 / 3, 1 / 3, 0.8 / 3, 1 / 3))
+    assert results[("cue length", "multiword")].cue_f1 == 0
+
+
+def test_slices_token_eval(fixture_pair):
+    result, slice_counts = run_evaluation_slices(*fixture_pair, normalize_scopes=False)
+    assert vars(result) == pytest.approx(EXPECTED_INSTANCE_BASED[False], abs=1e-12)
+
+    # The scope tokens of the slices of a dimension add up to the 20 gold and 19 system scope tokens of the whole
+    # evaluation; the 6 correct scope tokens are all in the slice "1-5"
+    tensor = slice_counts.tensor
+    for dimension in ("cue type", "scope length"):
+        rows = [idx for idx, (name, _) in enumerate(slice_counts.slice_names) if name == dimension]
+        assert tensor[rows][:, [SliceCounts.NUM_SCOPE_TOKENS_GOLD, SliceCounts.NUM_SCOPE_TOKENS_SYSTEM]].sum(
+            axis=0).tolist() == [20, 19]
+    scope_1_5 = slice_counts.to_results()[("scope length", "1-5")]
+    assert (scope_1_5.scope_precision, scope_1_5.scope_recall) == pytest.approx((6 / 19, 6 / 14))
@@ -0,0 +1,98 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Evaluation of sentence subsets through the sentence index (myconll/index.py), and the option checks of
+run_evaluation.py.
+"""
+
+import argparse
+
+import pytest
+
+from conftest import read_text, write_text
+from myconll.index import build_index
+from run_evaluation import (EVALUATION_MODES, MODE_OPTIONS, check_options, parse_sentence_ranges,
+                            run_evaluation_single, run_evaluation_subset)
+from test_matrix import EXPECTED_DOC0
+from test_scores import EXPECTED_INSTANCE_BASED
+
+
+@pytest.fixture
+def pair_copy(fixture_pair, tmp_path):
+    """A copy of the fixture corpus (the index files are written next to the corpus files)."""
+    return tuple(write_text(tmp_path / name, read_text(path)) for name, path in zip(("gold.txt", "system.txt"),
+                                                                                  fixture_pair))
+
+
+def test_index(pair_copy):
+    gold_path, _ = pair_copy
+    text = read_text(gold_path)
+    index = build_index(gold_path)
+
+    assert len(index) == 6
+    assert list(index.num_tokens) == [5, 4, 6, 5, 2, 5]
+    assert [index.offsets[idx] for idx in (0, 1, 5)] == [0, text.index("doc0\t1\t0"), text.index("doc1\t3\t0")]
+    assert index.negation_sentences() == [0, 1, 2, 5]
+    assert index.sentences_of_doc("doc0") == [0, 1] and index.doc_id(2) == "doc1"
+
+
+def test_subset(pair_copy):
+    assert vars(run_evaluation_subset(*pair_copy, [1, 0])) == pytest.approx(EXPECTED_DOC0, abs=1e-12)
+    result = run_evaluation_single(*pair_copy, sentences=list(reversed(range(6))))
+    assert vars(result) == pytest.approx(EXPECTED_INSTANCE_BASED[True], abs=1e-12)
+
+
+def test_empty_subset(pair_copy):
+    # "Yes ." has no instances at all
+    for sentences in ([], [4]):
+        assert set(vars(run_evaluation_subset(*pair_copy, sentences)).values()) == {0}
+
+
+@pytest.mark.parametrize("sentence", [6, -1])
+def test_subset_out_of_range(pair_copy, sentence):
+    with pytest.raises(ValueError, match="out of range"):
+        run_evaluation_subset(*pair_copy, [0, sentence])
+
+
+def test_parse_sentence_ranges():
+    assert parse_sentence_ranges("0-3, 2-5,9,1") == [0, 1, 2, 3, 4, 5, 9]
+    with pytest.raises(ValueError):
+        parse_sentence_ranges("5-3")
+    with pytest.raises(ValueError):
+        parse_sentence_ranges("a-3")
+
+
+def test_modes_cannot_be_combined(fixture_pair):
+    with pytest.raises(ValueError):
+        run_evaluation_single(*fixture_pair, pipelined=True, jobs=2)
+    with pytest.raises(ValueError):
+        run_evaluation_single(*fixture_pair, align_keys=True, sentences=[0])
+
+
+def _options(system_files=("system.txt",), **kwargs):
+    args = dict({name: None for name in list(EVALUATION_MODES) + list(MODE_OPTIONS)},
+                cache=None, system_files=list(system_files))
+    args.update(kwargs)
+    return argparse.Namespace(**args)
+
+
+def test_check_options():
+    assert check_options(_options()) is None
+    assert check_options(_options(jobs=2, cache="cache.sqlite")) is None
+    assert check_options(_options(pipelined=True, pipeline_parsers=3, pipeline_queue_size=4,
+                                  cache="cache.sqlite")) is None
+    assert check_options(_options(sentences=[0], system_files=["a.txt", "b.txt"])) is None
+
+    assert check_options(_options(pipelined=True, align_keys=True)) == "--pipeline cannot be combined with " \
+                                                                       "--align-keys"
+    assert check_options(_options(schedule_stats=True)) == "--schedule-stats requires --jobs"
+    assert check_options(_options(pipeline_queue_size=4)) == "--pipeline-queue-size requires --pipeline"
+    assert check_options(_options(align_keys=True, cache="cache.sqlite")) == "--cache cannot be combined with " \
+                                                                             "--align-keys"
+    assert check_options(_options(jobs=2, schedule_stats=True, cache="cache.sqlite")) == \
+        "--cache cannot be combined with --schedule-stats"
+    assert check_options(_options(sentence_stats="stats", system_files=["a.txt", "b.txt"])) == \
+        "--sentence-stats requires a single system file"
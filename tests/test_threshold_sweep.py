@@ -0,0 +1,141 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Threshold sweep (threshold_sweep.py) over a token score file of the fixture gold corpus."""
+
+import random
+
+import pytest
+
+import starsem2012_eval_extended as extended
+from conftest import read_text, write_text
+from threshold_sweep import PRCurve, sweep_thresholds
+
+# Token id, cue score and the scope score of the gold instance (if any) of every fixture token. The gold cue
+# tokens are "not", "impossible", "neither", "nor" and "not"; the tokens with the tied cue score 0.6 are two
+# gold cue tokens and "door". The "." of sentence 0 has the highest scope score, but punctuation is not scored.
+SCORES = [
+    [("0", .0, .8), ("1", .0, .4), ("2", .9, .4), ("3", .0, .8), ("4", .0, .9)],
+    [("0", .0, .8), ("1", .0, .8), ("2", .6, .4), ("3", .0, .0)],
+    [("0", .0, .4), ("1", .6, .0), ("2", .0, .4), ("3", .3, .0), ("4", .0, .4), ("5", .0, .0)],
+    [("0", .0), ("1", .6), ("2", .0), ("3", .0), ("4", .0)],
+    [("0", .0), ("1", .0)],
+    [("0", .0, .8), ("1", .3, .8), ("2", .9, .0), ("3", .0, .8), ("4", .0, .0)],
+]
+
+# (threshold, true positives, predicted) of every point: 5 gold cue tokens, and 12 gold scope tokens among the
+# 16 (instance, word) pairs
+EXPECTED_CUE_POINTS = [(.9, 2, 2), (.6, 4, 5), (.3, 5, 7), (.0, 5, 27)]
+EXPECTED_SCOPE_POINTS = [(.8, 7, 7), (.4, 12, 13), (.0, 12, 16)]
+
+
+def gold_sentences(gold_path):
+    return [[line.split("\t") for line in sentence.split("\n")]
+            for sentence in read_text(gold_path).strip().split("\n\n")]
+
+
+def score_lines(gold_path):
+    return ["\n".join("\t".join(row[:2] + [token_id] + [str(score) for score in scores])
+                      for row, (token_id, *scores) in zip(sentence, sentence_scores))
+            for sentence, sentence_scores in zip(gold_sentences(gold_path), SCORES)]
+
+
+def write_scores(path, sentences):
+    return write_text(path, "\n\n".join(sentences) + "\n\n")
+
+
+@pytest.fixture
+def scores_path(fixture_pair, tmp_path):
+    return write_scores(tmp_path / "scores.txt", score_lines(fixture_pair[0]))
+
+
+def binarize(gold_path, threshold, metric):
+    """Return a system corpus with the tokens whose cue (metric "cue") or scope score (metric "scope", given the
+    gold cues) is at least threshold, as input of the extended evaluator.
+    """
+    sentences = []
+    for sentence, sentence_scores in zip(gold_sentences(gold_path), SCORES):
+        lines = []
+        for row, (_, cue_score, *scope_score) in zip(sentence, sentence_scores):
+            gold_cue, gold_scope = (row[7], row[8]) if len(row) > 8 else ("_", "_")
+            if metric == "cue":
+                cue = (gold_cue if gold_cue != "_" else row[3]) if cue_score >= threshold else "_"
+                columns = [cue, "_", "_"]
+            else:
+                scope = (gold_scope if gold_scope != "_" else row[3]) if scope_score and scope_score[0] >= threshold \
+                    else "_"
+                columns = [gold_cue, scope, "_"]
+            lines.append(row[:7] + columns)
+        if all(line[7] == "_" for line in lines):
+            lines = [line[:7] + ["***"] for line in lines]
+        sentences.append("\n".join("\t".join(line) for line in lines))
+    return "\n\n".join(sentences) + "\n\n"
+
+
+def test_sweep(fixture_pair, scores_path):
+    result = sweep_thresholds(fixture_pair[0], scores_path)
+    for metric, expected_points, num_gold in (("Cue", EXPECTED_CUE_POINTS, 5), ("Scope", EXPECTED_SCOPE_POINTS, 12)):
+        curve = result.curves[metric]
+        assert [(threshold, tp, predicted) for threshold, tp, predicted, *_ in curve.to_rows()] == \
+            pytest.approx(expected_points)
+        assert curve.num_gold == num_gold
+
+    cue_curve, scope_curve = result.curves["Cue"], result.curves["Scope"]
+    assert cue_curve.best()["threshold"] == pytest.approx(.3)
+    assert cue_curve.best()["f1"] == pytest.approx(5 / 6)
+    assert scope_curve.best()["threshold"] == pytest.approx(.4)
+    assert scope_curve.best()["f1"] == pytest.approx(24 / 25)
+
+    # Between thresholds, the point of the next higher threshold applies
+    assert (cue_curve.at(.5)["tp"], cue_curve.at(.5)["predicted"]) == (4, 5)
+    assert (scope_curve.at(.5)["precision"], scope_curve.at(.5)["recall"]) == pytest.approx((1, 7 / 12))
+    assert cue_curve.at(.95) == {"threshold": .95, "tp": 0, "predicted": 0, "gold": 5,
+                                 "precision": 0.0, "recall": 0.0, "f1": 0.0}
+
+
+@pytest.mark.parametrize("metric, threshold", [("cue", .9), ("cue", .6), ("cue", .3),
+                                               ("scope", .8), ("scope", .4), ("scope", .0)])
+def test_sweep_vs_extended(fixture_pair, scores_path, metric, threshold):
+    # The token-level cue and scope (given the gold cues) metrics of the extended evaluation of the system files
+    # with the tokens above the threshold
+    gold_path = fixture_pair[0]
+    scores, _ = extended.evaluate(read_text(gold_path), binarize(gold_path, threshold, metric))
+    level = scores["Token-level"]
+    score = level["Cue"][""] if metric == "cue" else level["Scope"]["(full cue, no punct)"]
+    point = sweep_thresholds(gold_path, scores_path).curves[metric.capitalize()].at(threshold)
+    assert (point["tp"], point["predicted"] - point["tp"], point["gold"] - point["tp"]) == \
+        (score._tp, score._fp, score._fn)
+
+
+def test_ties():
+    scores, labels = [.5, .2, .5, .5, .9], [False, True, True, False, False]
+    for _ in range(5):
+        # The point of a tied score includes all of its tokens, in any order
+        curve = PRCurve.from_scores(scores, labels)
+        assert curve.thresholds.tolist() == [.9, .5, .2]
+        assert curve.num_true_positives.tolist() == [0, 1, 2]
+        assert curve.num_predicted.tolist() == [1, 4, 5]
+        order = random.Random(len(scores)).sample(range(len(scores)), len(scores))
+        scores, labels = [scores[idx] for idx in order], [labels[idx] for idx in order]
+
+
+def test_empty_curve():
+    curve = PRCurve.from_scores([], [])
+    assert curve.best() is None and curve.to_rows() == []
+
+
+@pytest.mark.parametrize("change, message", [
+    (lambda lines: lines[:-1], "different number of sentences"),
+    (lambda lines: lines[:4] + [lines[4].split("\n")[0]] + lines[5:], "has 2 tokens in the gold file but 1"),
+    (lambda lines: lines[:1] + [lines[1].replace("doc0\t1\t3", "doc0\t1\t4")] + lines[2:],
+     "Token doc0 1 3 expected"),
+    (lambda lines: lines[:5] + [lines[5].replace("\t0.8\n", "\n", 1)] + lines[6:],
+     "Token doc1 3 0 expected in the score file with 5 columns, found doc1\t3\t0\t0.0$"),
+])
+def test_invalid_scores(fixture_pair, tmp_path, change, message):
+    path = write_scores(tmp_path / "scores.txt", change(score_lines(fixture_pair[0])))
+    with pytest.raises(ValueError, match=message):
+        sweep_thresholds(fixture_pair[0], path)
@@ -0,0 +1,55 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""Validation of *SEM files (validation.py), in one process and in parallel chunks."""
+
+import pytest
+
+from conftest import FIXTURE_GOLD, FIXTURE_SYSTEM, read_text
+from validation import validate
+
+# Line 2 of the gold file is "was" of "He was not happy ."; line 25 of both files is "Yes" of "Yes ."
+EXPECTED_ERRORS = [
+    ("gold", 2, "instance_columns", (9,)),
+    ("gold", 2, "inconsistent_columns", (9, 10)),
+    ("system", 25, "token_mismatch", ("doc1/2/0/yes", "doc1/2/0/Yes", 25)),
+]
+
+
+def replace_line(text, line, new_line):
+    lines = text.split("\n")
+    lines[line - 1] = new_line
+    return "\n".join(lines)
+
+
+@pytest.fixture
+def broken_pair():
+    """The fixture corpus with a missing event column in the gold file and a lowercased system token."""
+    gold_str, system_str = read_text(FIXTURE_GOLD), read_text(FIXTURE_SYSTEM)
+    gold_str = replace_line(gold_str, 2, gold_str.split("\n")[1].rsplit("\t", 1)[0])
+    system_str = replace_line(system_str, 25, "doc1\t2\t0\tyes\tyes\tUH\t*\t***")
+    return gold_str, system_str
+
+
+def test_valid_fixture():
+    report = validate(read_text(FIXTURE_GOLD), read_text(FIXTURE_SYSTEM), jobs=1)
+    assert report.ok and (report.num_sentences, report.num_tokens) == (6, 27)
+
+
+def test_errors(broken_pair):
+    report = validate(*broken_pair, jobs=1)
+    assert [(error.source, error.line, error.code, error.args) for error in report.errors] == EXPECTED_ERRORS
+    assert str(report.errors[-1]) == "system file, line 25: token doc1/2/0/yes does not match gold token " \
+                                     "doc1/2/0/Yes at line 25"
+
+    report = validate(*broken_pair, ignore_case=True, jobs=1)
+    assert [error.code for error in report.errors] == ["instance_columns", "inconsistent_columns"]
+
+
+def test_parallel_chunks(broken_pair):
+    report = validate(*broken_pair, jobs=2, chunk_sentences=2)
+    assert [(error.source, error.line, error.code, error.args) for error in report.errors] == EXPECTED_ERRORS
+    assert (report.num_sentences, report.num_tokens) == (6, 27)
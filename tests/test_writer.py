@@ -0,0 +1,63 @@
+#  Copyright (c) 2021 Robert Bosch GmbH
+#  All rights reserved.
+#
+#  This source code is licensed under the BSD 3-Clause license found in the
+#  LICENSE file in the root directory of this source tree.
+
+"""The buffered *SEM writer (myconll/writer.py)."""
+
+import io
+
+import pytest
+
+import myconll
+from conftest import FIXTURE_GOLD, FIXTURE_SYSTEM, read_text
+from myconll.writer import StarsemWriter, write_sentences
+
+IMPOSSIBLE_LINES = [
+    "doc0\t1\t0\tIt\tit\t_\t_\t_\tIt\t_",
+    "doc0\t1\t1\twas\twas\t_\t_\t_\twas\t_",
+    "doc0\t1\t2\timpossible\timpossible\t_\t_\tim\tpossible\tpossible",
+    "doc0\t1\t3\t.\t.\t_\t_\t_\t_\t_",
+]
+
+DID_NOT_GO_LINES = [
+    "doc1\t3\t0\tHe\the\t_\t_\t_\tHe\t_",
+    "doc1\t3\t1\tdid\tdid\t_\t_\t_\tdid\t_",
+    "doc1\t3\t2\tnot\tnot\t_\t_\tnot\t_\t_",
+    "doc1\t3\t3\tgo\tgo\t_\t_\t_\tgo\tgo",
+    "doc1\t3\t4\t.\t.\t_\t_\t_\t_\t_",
+]
+
+
+class CountingWritable(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.num_writes = 0
+
+    def write(self, s):
+        self.num_writes += 1
+        return super().write(s)
+
+
+@pytest.mark.parametrize("path", [FIXTURE_GOLD, FIXTURE_SYSTEM])
+def test_round_trip(path):
+    out = CountingWritable()
+    write_sentences(out, myconll.iter_from_file(path), buffer_size=100)
+    assert out.getvalue() == read_text(path)
+    # Each sentence of the fixture has fewer than 300 characters
+    assert 1 < out.num_writes < 6
+
+
+def test_write_instances():
+    out = io.StringIO()
+    with StarsemWriter(out) as writer:
+        writer.write_instances("doc0", 1, ["It", "was", "impossible", "."],
+                               [({2: "im"}, {0: "It", 1: "was", 2: "possible"}, {2: "possible"})])
+        # Full words can be given as token indices
+        writer.write_instances("doc1", 3, ["He", "did", "not", "go", "."], [([2], [0, 1, 3], [3])])
+        writer.write_instances("doc1", 2, ["Yes", "."], [], xpos=["UH", "."], parses=["*", "*"])
+        assert out.getvalue() == ""
+
+    assert out.getvalue().split("\n") == IMPOSSIBLE_LINES + [""] + DID_NOT_GO_LINES + [
+        "", "doc1\t2\t0\tYes\tyes\tUH\t*\t***", "doc1\t2\t1\t.\t.\t.\t*\t***", "", ""]